@@ -0,0 +1,7 @@
+"""
+Benchmarks of the `lstm_ee` data pipeline.
+
+Benchmarks are run as modules from the repository root, e.g.
+
+$ python -m benchmarks.bench_pipeline --events 100000 --format hdf
+"""
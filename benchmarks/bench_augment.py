@@ -0,0 +1,192 @@
+"""Benchmark per-batch time of the fused and unfused batch augmentation.
+
+Compares a chain of `DataProngSorter`, `DataNoise` and `DataNANMask`
+decorators to the fused `DataAugment` decorator on synthetic batches.
+
+Examples
+--------
+$ python benchmarks/bench_augment.py --batch-size 1024 --noise-layers 2
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from lstm_ee.data.data_generator.data_augment      import DataAugment
+from lstm_ee.data.data_generator.data_nan_mask     import DataNANMask
+from lstm_ee.data.data_generator.data_noise        import DataNoise
+from lstm_ee.data.data_generator.data_prong_sorter import DataProngSorter
+from lstm_ee.data.data_generator.idata_generator   import IDataGenerator
+
+class SyntheticBatches(IDataGenerator):
+    """`IDataGenerator` that returns copies of pregenerated random batches"""
+
+    def __init__(
+        self, n_batches, batch_size, n_slice, n_png, max_prongs, seed = 0
+    ):
+        super(SyntheticBatches, self).__init__()
+        prg = np.random.RandomState(seed)
+
+        self._vars_input_slice = [ 'slice_%d' % i for i in range(n_slice) ]
+        self._vars_input_png2d = [ 'png2d_%d' % i for i in range(n_png) ]
+        self._vars_input_png3d = [ 'png3d_%d' % i for i in range(n_png) ]
+
+        self._batches = [
+            {
+                'input_slice' : prg.rand(batch_size, n_slice)
+                    .astype(np.float32),
+                'input_png2d' : self._make_prongs(
+                    prg, batch_size, max_prongs, n_png
+                ),
+                'input_png3d' : self._make_prongs(
+                    prg, batch_size, max_prongs, n_png
+                ),
+            } for _ in range(n_batches)
+        ]
+
+    @staticmethod
+    def _make_prongs(prg, batch_size, max_prongs, n_vars):
+        result  = prg.rand(batch_size, max_prongs, n_vars).astype(np.float32)
+        lengths = np.minimum(prg.geometric(0.3, batch_size), max_prongs)
+
+        result[np.arange(max_prongs)[np.newaxis, :] >= lengths[:, np.newaxis]]\
+            = np.nan
+
+        return result
+
+    def __len__(self):
+        return len(self._batches)
+
+    def __getitem__(self, index):
+        inputs = { k : v.copy() for (k, v) in self._batches[index].items() }
+        return (inputs, {})
+
+def make_noise(dgen, n_layers):
+    """Create `n_layers` noise configurations affecting all inputs"""
+    return [
+        {
+            'noise'               : 'gaussian',
+            'noise_kwargs'        : { 'mu' : 0, 'sigma' : 0.1 },
+            'affected_vars_slice' : dgen.vars_input_slice[::2],
+            'affected_vars_png2d' : dgen.vars_input_png2d[::2],
+            'affected_vars_png3d' : dgen.vars_input_png3d,
+        } for _ in range(n_layers)
+    ]
+
+def make_unfused(dgen, prong_sorters, noise):
+    """Create the unfused chain of decorators, as `create_data_generators`"""
+    for (k, v) in prong_sorters.items():
+        dgen = DataProngSorter(dgen, v, k, getattr(dgen, 'vars_' + k))
+
+    for n in noise:
+        dgen = DataNoise(dgen, **n)
+
+    return DataNANMask(dgen)
+
+def time_dgen(dgen, repeats):
+    """Return the best mean per-batch time in ms over `repeats` epochs"""
+    result = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+
+        for i in range(len(dgen)):
+            dgen[i]
+
+        result.append((time.perf_counter() - start) / len(dgen))
+
+    return 1000 * min(result)
+
+def parse_cmdargs():
+    # pylint: disable=missing-function-docstring
+    parser = argparse.ArgumentParser("Benchmark batch augmentation")
+
+    parser.add_argument(
+        '--batches',
+        help    = 'Number of synthetic batches',
+        dest    = 'batches',
+        default = 20,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--batch-size',
+        help    = 'Size of synthetic batches',
+        dest    = 'batch_size',
+        default = 1024,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--max-prongs',
+        help    = 'Number of prongs per event',
+        dest    = 'max_prongs',
+        default = 20,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--vars-slice',
+        help    = 'Number of slice level variables',
+        dest    = 'vars_slice',
+        default = 20,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--vars-png',
+        help    = 'Number of prong level variables',
+        dest    = 'vars_png',
+        default = 30,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--noise-layers',
+        help    = 'Number of noise decorators',
+        dest    = 'noise_layers',
+        default = 2,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--repeats',
+        help    = 'Number of timing repeats',
+        dest    = 'repeats',
+        default = 5,
+        type    = int,
+    )
+
+    return parser.parse_args()
+
+def main():
+    # pylint: disable=missing-function-docstring
+    cmdargs = parse_cmdargs()
+
+    dgen = SyntheticBatches(
+        cmdargs.batches, cmdargs.batch_size, cmdargs.vars_slice,
+        cmdargs.vars_png, cmdargs.max_prongs
+    )
+
+    noise         = make_noise(dgen, cmdargs.noise_layers)
+    prong_sorters = {
+        'input_png2d' : '-' + dgen.vars_input_png2d[0],
+        'input_png3d' : 'random',
+    }
+
+    base    = time_dgen(dgen, cmdargs.repeats)
+    unfused = time_dgen(
+        make_unfused(dgen, prong_sorters, noise), cmdargs.repeats
+    )
+    fused   = time_dgen(
+        DataAugment(dgen, prong_sorters, noise), cmdargs.repeats
+    )
+
+    print("Per batch time (excluding %.2f ms to produce batch):" % base)
+    print("    Unfused : %8.2f ms" % (unfused - base))
+    print("    Fused   : %8.2f ms" % (fused - base))
+    print("    Speedup : %8.2f" % ((unfused - base) / (fused - base)))
+
+if __name__ == '__main__':
+    main()
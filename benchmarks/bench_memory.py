@@ -0,0 +1,484 @@
+"""Peak memory profiling harness of the data pipeline configurations.
+
+For each pipeline configuration (combination of RAM cache, disk cache, event
+store, concurrency and prefetch options) the harness builds the full chain
+of `create_data_generators` on a synthetic dataset (c.f.
+`benchmarks.synthetic`) in a fresh process and iterates one training epoch
+followed by the validation pass.
+While the epoch runs, the memory of the process and of all its children
+(e.g. process pool workers) is sampled from /proc. The harness reports:
+
+  - peak RSS of the process tree (and of the children alone),
+  - PSS, shared and private memory of the process tree at the peak,
+  - peak RSS recorded by the kernel (`getrusage`),
+  - bytes held by the RAM caches and bytes of the disk caches.
+
+This harness is Linux only.
+
+Examples
+--------
+$ python -m benchmarks.bench_memory --events 200000 --workers 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from lstm_ee.data.data      import create_data_generators
+from lstm_ee.data.instrument import get_nbytes
+
+from .bench_pipeline import make_dataset
+from .synthetic      import get_synthetic_vars
+
+# Pipeline configurations. C.f. `create_data_generators`.
+CONFIGS = {
+    'none'        : { 'cache' : False },
+    'ram'         : { 'cache' : True },
+    'ram+thread'  : { 'cache' : True, 'concurrency' : 'thread' },
+    'ram+process' : { 'cache' : True, 'concurrency' : 'process' },
+    'ram+stream'  : { 'cache' : True, 'concurrency' : 'stream' },
+    'ram+process+prefetch' : {
+        'cache' : True, 'concurrency' : 'process', 'prefetch' : 4,
+        'prefetch_mode' : 'thread',
+    },
+    'disk'        : { 'cache' : False, 'disk_cache' : True },
+    'disk+ram'    : { 'cache' : True,  'disk_cache' : True },
+    'disk+ram+process' : {
+        'cache' : True, 'disk_cache' : True, 'concurrency' : 'process',
+    },
+    'event_store' : { 'cache' : False, 'event_store' : True },
+}
+
+# Configurations that read from the data loader in multiple threads
+THREADED_CONFIGS = [ 'ram+thread' ]
+
+# Smaps fields (in kB) accumulated over the process tree
+SMAPS_FIELDS = [
+    'Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean',
+    'Private_Dirty'
+]
+
+COLUMNS = [
+    ('peak_rss',          'PEAK RSS'),
+    ('peak_rss_children', 'CHILDREN'),
+    ('pss',               'PSS'),
+    ('shared',            'SHARED'),
+    ('private',           'PRIVATE'),
+    ('maxrss',            'MAXRSS'),
+    ('cache',             'RAM CACHE'),
+    ('disk',              'DISK'),
+]
+
+def get_children(pid):
+    """Return pids of all descendants of process `pid`"""
+    result = []
+
+    try:
+        for task in os.listdir('/proc/%d/task' % pid):
+            with open('/proc/%d/task/%s/children' % (pid, task), 'rt') as f:
+                result += [ int(x) for x in f.read().split() ]
+    except OSError:
+        return []
+
+    return result + [ y for x in result for y in get_children(x) ]
+
+def read_smaps(pid):
+    """Read memory summary of process `pid` in bytes"""
+    result = { k : 0 for k in SMAPS_FIELDS }
+
+    try:
+        with open('/proc/%d/smaps_rollup' % pid, 'rt') as f:
+            for line in f:
+                fields = line.split()
+
+                if fields[0][:-1] in result:
+                    result[fields[0][:-1]] = int(fields[1]) * 1024
+    except OSError:
+        pass
+
+    return result
+
+class MemorySampler:
+    """Sampler of the memory usage of the current process tree.
+
+    Parameters
+    ----------
+    interval : float, optional
+        Sampling interval in seconds. Default: 0.05.
+    """
+
+    def __init__(self, interval = 0.05):
+        self._interval = interval
+        self._stop     = threading.Event()
+        self._thread   = None
+        self.peak      = None
+
+    def sample(self):
+        """Take a single sample and update the peak"""
+        pid      = os.getpid()
+        children = [ read_smaps(x) for x in get_children(pid) ]
+        own      = read_smaps(pid)
+
+        sample = {
+            'rss'          : own['Rss'] + sum(x['Rss'] for x in children),
+            'rss_children' : sum(x['Rss'] for x in children),
+            'pss'          : own['Pss'] + sum(x['Pss'] for x in children),
+            'shared'       : sum(
+                x['Shared_Clean'] + x['Shared_Dirty']
+                    for x in [ own ] + children
+            ),
+            'private'      : sum(
+                x['Private_Clean'] + x['Private_Dirty']
+                    for x in [ own ] + children
+            ),
+            'children'     : len(children),
+        }
+
+        if self.peak is None:
+            self.peak = dict(sample)
+            self.peak['rss_children'] = 0
+
+        peak_children = max(
+            self.peak['rss_children'], sample['rss_children']
+        )
+
+        if sample['rss'] >= self.peak['rss']:
+            self.peak = sample
+
+        self.peak['rss_children'] = peak_children
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.sample()
+
+    def __enter__(self):
+        self.sample()
+        self._thread = threading.Thread(target = self._run, daemon = True)
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+def get_cache_nbytes(dgen):
+    """Return a dict { decorator : bytes } of RAM caches in the `dgen` chain"""
+    # pylint: disable=protected-access
+    result = {}
+
+    while dgen is not None:
+        cache = getattr(dgen, '_cache', None)
+
+        if isinstance(cache, list):
+            name         = type(dgen).__name__
+            result[name] = result.get(name, 0) + get_nbytes(cache)
+
+        dgen = getattr(dgen, '_dgen', None)
+
+    return result
+
+def get_dir_nbytes(path):
+    """Calculate size of the files under the directory `path`"""
+    result = 0
+
+    for (root, _dirs, files) in os.walk(path):
+        for fname in files:
+            fname = os.path.join(root, fname)
+
+            if not os.path.islink(fname):
+                result += os.path.getsize(fname)
+
+    return result
+
+def run_config(datadir, dataset, config):
+    """Iterate one epoch of the pipeline `config` and measure its memory.
+
+    Parameters
+    ----------
+    datadir : str
+        Directory with the dataset. Disk caches will be created here.
+    dataset : str
+        Name of the dataset file in `datadir`.
+    config : dict
+        Benchmark configuration. Items of `config['pipeline']` are passed to
+        `create_data_generators`.
+
+    Returns
+    -------
+    dict
+        Memory statistics (in bytes) and time of the epoch.
+    """
+    pipeline = config['pipeline']
+    workers  = None
+
+    if pipeline.get('concurrency') or pipeline.get('prefetch'):
+        workers = config['workers']
+
+    kwargs = {
+        'batch_size' : config['batch_size'],
+        'max_prongs' : config['max_prongs'],
+        'seed'       : 0,
+        'test_size'  : 0.2,
+        'workers'    : workers,
+        'disk_cache' : False,
+        **get_synthetic_vars(),
+        **pipeline,
+    }
+
+    start = time.perf_counter()
+
+    with MemorySampler(config['interval']) as sampler:
+        dgen_list = create_data_generators(
+            datadir = datadir, dataset = dataset, **kwargs
+        )
+
+        # Training epoch followed by the validation pass
+        for dgen in dgen_list:
+            for i in range(len(dgen)):
+                dgen[i]
+                sampler.sample()
+
+        cache = {}
+
+        for dgen in dgen_list:
+            for (name, nbytes) in get_cache_nbytes(dgen).items():
+                cache[name] = cache.get(name, 0) + nbytes
+
+        dgen_list[0].on_epoch_end()
+
+    usage_self     = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return {
+        'time'              : time.perf_counter() - start,
+        'peak_rss'          : sampler.peak['rss'],
+        'peak_rss_children' : sampler.peak['rss_children'],
+        'pss'               : sampler.peak['pss'],
+        'shared'            : sampler.peak['shared'],
+        'private'           : sampler.peak['private'],
+        'children'          : sampler.peak['children'],
+        # ru_maxrss is in kB on Linux
+        'maxrss'            : 1024 * max(
+            usage_self.ru_maxrss, usage_children.ru_maxrss
+        ),
+        'cache'             : sum(cache.values()),
+        'cache_decorators'  : cache,
+        'disk'              : sum(
+            get_dir_nbytes(os.path.join(datadir, x))
+                for x in [ '.cache', '.store' ]
+        ),
+    }
+
+def run_config_isolated(datadir, dataset, config):
+    """Run `run_config` in a fresh python process.
+
+    The peak memory of a process never decreases, so each configuration
+    needs to be measured in a separate process.
+    """
+    proc = subprocess.run(
+        [
+            sys.executable, '-m', 'benchmarks.bench_memory', '--run-one',
+            json.dumps({
+                'datadir' : datadir, 'dataset' : dataset, 'config' : config,
+            })
+        ],
+        stdout = subprocess.PIPE,
+        cwd    = os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check  = False,
+    )
+
+    if proc.returncode != 0:
+        raise RuntimeError(
+            "Memory benchmark of '%s' failed with code %d" % (
+                config['name'], proc.returncode
+            )
+        )
+
+    # Output may be followed by messages printed at the interpreter exit
+    lines = [
+        x for x in proc.stdout.decode().splitlines() if x.startswith('{')
+    ]
+
+    return json.loads(lines[-1])
+
+def format_table(results):
+    """Format memory statistics of `results` as a human readable table"""
+    lines = [
+        "%-22s" % 'CONFIG'
+        + ''.join("%11s" % title for (_, title) in COLUMNS)
+        + "%9s" % 'TIME'
+    ]
+
+    for (name, stats) in results.items():
+        lines.append(
+            "%-22s" % name
+            + ''.join(
+                "%9.1fMB" % (stats[key] / 2**20) for (key, _) in COLUMNS
+            )
+            + "%8.1fs" % stats['time']
+        )
+
+    return '\n'.join(lines)
+
+def parse_cmdargs():
+    # pylint: disable=missing-function-docstring
+    parser = argparse.ArgumentParser(
+        "Measure peak memory of the data pipeline configurations"
+    )
+
+    parser.add_argument(
+        '--events',
+        help    = 'Number of events in the synthetic dataset',
+        dest    = 'events',
+        default = 100000,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--format',
+        help    = 'Format of the synthetic dataset',
+        dest    = 'format',
+        choices = [ 'csv', 'hdf' ],
+        default = 'csv',
+    )
+
+    parser.add_argument(
+        '--batch-size',
+        help    = 'Batch size',
+        dest    = 'batch_size',
+        default = 1024,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--max-prongs',
+        help    = 'Prong limit',
+        dest    = 'max_prongs',
+        default = 20,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--workers',
+        help    = 'Number of workers of the concurrent configurations',
+        dest    = 'workers',
+        default = 4,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--interval',
+        help    = 'Memory sampling interval in seconds',
+        dest    = 'interval',
+        default = 0.05,
+        type    = float,
+    )
+
+    parser.add_argument(
+        '--configs',
+        help    = 'Pipeline configurations to measure',
+        dest    = 'configs',
+        choices = list(CONFIGS),
+        default = None,
+        nargs   = '+',
+    )
+
+    parser.add_argument(
+        '--workdir',
+        help    = 'Directory for the dataset and caches (default: temporary)',
+        dest    = 'workdir',
+        default = None,
+        type    = str,
+    )
+
+    parser.add_argument(
+        '-o', '--output',
+        help    = 'Path of the json file to save results to',
+        dest    = 'output',
+        default = None,
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--run-one',
+        help    = argparse.SUPPRESS,
+        dest    = 'run_one',
+        default = None,
+        type    = str,
+    )
+
+    return parser.parse_args()
+
+def measure_all(workdir, cmdargs):
+    """Measure all requested configurations and return their statistics"""
+    config = {
+        k : getattr(cmdargs, k) for k in [
+            'events', 'format', 'batch_size', 'max_prongs', 'workers',
+            'interval',
+        ]
+    }
+
+    path    = make_dataset(workdir, config)
+    dataset = os.path.basename(path)
+    results = {}
+
+    for name in (cmdargs.configs or list(CONFIGS)):
+        if (config['format'] == 'hdf') and (name in THREADED_CONFIGS):
+            # `HDFLoader` does not support concurrent reads from threads
+            print("Skipping configuration '%s' for the hdf format" % name)
+            continue
+
+        # Each configuration gets a separate data directory, so that its
+        # disk caches are built from scratch.
+        datadir = os.path.join(workdir, name)
+        os.makedirs(datadir, exist_ok = True)
+
+        if not os.path.exists(os.path.join(datadir, dataset)):
+            os.symlink(os.path.abspath(path), os.path.join(datadir, dataset))
+
+        results[name] = run_config_isolated(
+            datadir, dataset,
+            { 'name' : name, 'pipeline' : CONFIGS[name], **config }
+        )
+
+    return (config, results)
+
+def main():
+    # pylint: disable=missing-function-docstring
+    logging.basicConfig(level = logging.WARNING)
+    cmdargs = parse_cmdargs()
+
+    if cmdargs.run_one is not None:
+        job = json.loads(cmdargs.run_one)
+        print(json.dumps(
+            run_config(job['datadir'], job['dataset'], job['config'])
+        ))
+        return
+
+    if cmdargs.workdir is None:
+        with tempfile.TemporaryDirectory() as workdir:
+            config, results = measure_all(workdir, cmdargs)
+    else:
+        os.makedirs(cmdargs.workdir, exist_ok = True)
+        config, results = measure_all(cmdargs.workdir, cmdargs)
+
+    print(format_table(results))
+
+    if cmdargs.output is not None:
+        with open(cmdargs.output, 'wt') as f:
+            json.dump(
+                { 'config' : config, 'results' : results }, f,
+                indent = 4, sort_keys = True
+            )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,457 @@
+"""Benchmark suite of the `lstm_ee` data pipeline.
+
+The suite generates a synthetic dataset (c.f. `benchmarks.synthetic`) and
+times the data loader construction, `IDataLoader.get`, `unpack_varr_arrays`,
+`DataGenerator`, every batch decorator and every cache mode. Results are
+saved as json and can be compared against a stored baseline.
+
+Examples
+--------
+Run the suite and store results as a baseline:
+
+$ python -m benchmarks.bench_pipeline --format hdf -o baseline.json
+
+Run the suite again and compare to the baseline:
+
+$ python -m benchmarks.bench_pipeline --format hdf --baseline baseline.json
+"""
+
+import argparse
+import copy
+import logging
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from lstm_ee.data.data import (
+    add_cache_decorators, create_basic_data_generators, guess_data_loader
+)
+from lstm_ee.data.data_loader import DataShuffle
+from lstm_ee.data.data_generator import (
+    DataAugment, DataCache, DataGenerator, DataNANMask, DataNoise,
+    DataProngSorter, DataSmear, DataTimer, DataWeight
+)
+from lstm_ee.data.data_generator.idata_decorator  import IDataDecorator
+from lstm_ee.data.data_generator.funcs.funcs_varr import unpack_varr_arrays
+
+from .synthetic import (
+    generate_synthetic_data, get_synthetic_vars, save_synthetic_data
+)
+from .timing import (
+    compare_to_baseline, format_comparison, load_results, measure,
+    save_results
+)
+
+FORMAT_EXTS = { 'csv' : 'csv', 'hdf' : 'h5' }
+
+CACHE_MODES = {
+    'ram'           : { 'cache' : True },
+    'thread'        : { 'cache' : True, 'concurrency' : 'thread' },
+    'process'       : { 'cache' : True, 'concurrency' : 'process' },
+    'stream'        : { 'cache' : True, 'concurrency' : 'stream' },
+    'disk'          : { 'disk_cache' : True },
+    'disk_prefetch' : { 'disk_cache' : True, 'disk_cache_prefetch' : 4 },
+    'event_store'   : { 'event_store' : True },
+}
+
+# Cache modes that read from the data loader in multiple threads
+THREADED_MODES = [ 'thread', 'disk_prefetch' ]
+
+class BatchSource(IDataDecorator):
+    """Decorator that serves copies of the precomputed batches of `dgen`"""
+
+    def __init__(self, dgen, n_batches):
+        super(BatchSource, self).__init__(dgen)
+        self._batches = [ dgen[i] for i in range(min(n_batches, len(dgen))) ]
+
+    def __len__(self):
+        return len(self._batches)
+
+    def __getitem__(self, index):
+        return copy.deepcopy(self._batches[index])
+
+def run_epoch(dgen, n_batches = None):
+    """Request `n_batches` (or all) batches of `dgen` sequentially"""
+    if n_batches is None:
+        n_batches = len(dgen)
+
+    for i in range(min(n_batches, len(dgen))):
+        dgen[i]
+
+def get_decorators(vars_, batch_size):
+    """Return a list of (name, factory) of the benchmarked decorators"""
+    noise = {
+        'noise'               : 'gaussian',
+        'noise_kwargs'        : { 'mu' : 0, 'sigma' : 0.1 },
+        'affected_vars_slice' : vars_['vars_input_slice'],
+        'affected_vars_png3d' : vars_['vars_input_png3d'],
+    }
+    prong_sorters = {
+        'input_png2d' : '-' + vars_['vars_input_png2d'][0],
+        'input_png3d' : 'random',
+    }
+
+    return [
+        ('DataWeight',      lambda x : DataWeight(x, batch_size, None)),
+        ('DataProngSorter/random', lambda x : DataProngSorter(
+            x, 'random', 'input_png3d', x.vars_input_png3d
+        )),
+        ('DataProngSorter/var', lambda x : DataProngSorter(
+            x, prong_sorters['input_png2d'], 'input_png2d',
+            x.vars_input_png2d
+        )),
+        ('DataNoise',       lambda x : DataNoise(x, **noise)),
+        ('DataSmear',       lambda x : DataSmear(
+            x, 0.1,
+            affected_vars_slice = x.vars_input_slice,
+            affected_vars_png3d = x.vars_input_png3d,
+        )),
+        ('DataNANMask',     DataNANMask),
+        ('DataAugment',     lambda x : DataAugment(
+            x, prong_sorters, [ noise, noise ]
+        )),
+        ('DataTimer',       DataTimer),
+        ('DataCache/hit',   DataCache),
+    ]
+
+def bench_loader(path, vars_, config):
+    """Benchmark data loader construction, `get` and `unpack_varr_arrays`"""
+    results = {}
+    n       = config['batches']
+    bs      = config['batch_size']
+
+    results['loader/construct'] = measure(
+        lambda : guess_data_loader(path), repeats = 1
+    )
+
+    loader  = guess_data_loader(path)
+    perm    = np.random.RandomState(0).permutation(len(loader))
+    indices = [ perm[i * bs:(i + 1) * bs] for i in range(n) ]
+
+    var_slice = vars_['vars_input_slice'][0]
+    var_png   = vars_['vars_input_png3d'][0]
+
+    results['loader/get/slice'] = measure(
+        lambda : [ loader.get(var_slice, x) for x in indices ],
+        config['repeats'], n
+    )
+    results['loader/get/png'] = measure(
+        lambda : [ loader.get(var_png, x) for x in indices ],
+        config['repeats'], n
+    )
+    results['unpack_varr_arrays/png3d'] = measure(
+        lambda : [
+            unpack_varr_arrays(
+                loader, vars_['vars_input_png3d'], x, config['max_prongs']
+            ) for x in indices
+        ],
+        config['repeats'], n
+    )
+
+    return results
+
+def bench_decorators(path, vars_, config):
+    """Benchmark `DataGenerator` and per batch time of every decorator"""
+    results = {}
+    n       = config['batches']
+
+    dgen = DataGenerator(
+        DataShuffle(guess_data_loader(path), 0),
+        batch_size = config['batch_size'],
+        max_prongs = config['max_prongs'],
+        **vars_
+    )
+    n = min(n, len(dgen))
+
+    results['generator/DataGenerator'] = measure(
+        lambda : run_epoch(dgen, n), config['repeats'], n
+    )
+
+    source = BatchSource(dgen, n)
+    base   = measure(lambda : run_epoch(source), config['repeats'], n)
+
+    for (name, factory) in get_decorators(vars_, config['batch_size']):
+        np.random.seed(0)
+        decorated = factory(source)
+
+        if name.endswith('/hit'):
+            run_epoch(decorated)
+
+        elapsed = measure(
+            lambda dgen = decorated : run_epoch(dgen), config['repeats'], n
+        )
+        results['decorator/' + name] = max(elapsed - base, 0)
+
+    return results
+
+def bench_cache_mode(workdir, path, vars_, config, mode, kwargs):
+    """Benchmark construction, filling and reuse of cache `mode`"""
+    # Each mode gets a separate data directory, so that disk caches and
+    # event stores are not shared between modes.
+    datadir = os.path.join(workdir, mode)
+    dataset = os.path.basename(path)
+
+    os.makedirs(datadir, exist_ok = True)
+
+    if not os.path.exists(os.path.join(datadir, dataset)):
+        os.symlink(os.path.abspath(path), os.path.join(datadir, dataset))
+
+    basic_kwargs = {
+        k : v for (k, v) in kwargs.items()
+            if k not in [ 'cache', 'concurrency' ]
+    }
+
+    dgen_list = []
+
+    def construct():
+        dgen_list[:] = create_basic_data_generators(
+            datadir    = datadir,
+            dataset    = dataset,
+            batch_size = config['batch_size'],
+            max_prongs = config['max_prongs'],
+            seed       = 0,
+            test_size  = 0.2,
+            **vars_,
+            **basic_kwargs
+        )
+
+    results = {}
+    results['cache/%s/construct' % mode] = measure(construct, repeats = 1)
+
+    concurrency = kwargs.get('concurrency')
+    dgen        = add_cache_decorators(
+        dgen_list[:1], kwargs.get('cache'), concurrency,
+        config['workers'] if concurrency is not None else 0
+    )[0]
+
+    results['cache/%s/fill' % mode] = measure(
+        lambda : run_epoch(dgen), 1, len(dgen)
+    )
+    results['cache/%s/hit' % mode] = measure(
+        lambda : run_epoch(dgen), config['repeats'], len(dgen)
+    )
+
+    return results
+
+def bench_caches(workdir, path, vars_, config):
+    """Benchmark all cache modes"""
+    results = {}
+
+    if config['format'] == 'dict':
+        # Pipelines with caches are constructed from dataset files only
+        print("Skipping cache benchmarks for the dict format")
+        return results
+
+    for (mode, kwargs) in CACHE_MODES.items():
+
+        if (config['format'] == 'hdf') and (mode in THREADED_MODES):
+            # `HDFLoader` does not support concurrent reads from threads
+            print("Skipping cache mode '%s' for the hdf format" % mode)
+            continue
+
+        results.update(
+            bench_cache_mode(workdir, path, vars_, config, mode, kwargs)
+        )
+
+    return results
+
+def make_dataset(workdir, config):
+    """Generate synthetic dataset and return its path (or dict)"""
+    data = generate_synthetic_data(config['events'], seed = 0)
+
+    if config['format'] == 'dict':
+        return data
+
+    path = os.path.join(
+        workdir, 'synthetic_%d.%s' % (
+            config['events'], FORMAT_EXTS[config['format']]
+        )
+    )
+
+    if not os.path.exists(path):
+        save_synthetic_data(data, path)
+
+    return path
+
+def run_benchmarks(workdir, config, only = None):
+    """Run benchmark suite.
+
+    Parameters
+    ----------
+    workdir : str
+        Directory where the synthetic dataset and caches will be created.
+    config : dict
+        Benchmark configuration. C.f. `parse_cmdargs`.
+    only : list of str or None, optional
+        If not None, only benchmark groups from `only` will be run.
+        Possible groups: 'loader', 'decorators', 'caches'.
+
+    Returns
+    -------
+    dict
+        Dictionary { benchmark_name : time in seconds }.
+    """
+    path    = make_dataset(workdir, config)
+    vars_   = get_synthetic_vars()
+    results = {}
+
+    groups = [
+        ('loader',     bench_loader),
+        ('decorators', bench_decorators),
+        ('caches',
+            lambda p, v, c : bench_caches(workdir, p, v, c)),
+    ]
+
+    for (name, func) in groups:
+        if (only is None) or (name in only):
+            results.update(func(path, vars_, config))
+
+    return results
+
+def parse_cmdargs():
+    # pylint: disable=missing-function-docstring
+    parser = argparse.ArgumentParser("Benchmark lstm_ee data pipeline")
+
+    parser.add_argument(
+        '--events',
+        help    = 'Number of events in the synthetic dataset',
+        dest    = 'events',
+        default = 100000,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--format',
+        help    = 'Format of the synthetic dataset',
+        dest    = 'format',
+        choices = [ 'csv', 'hdf', 'dict' ],
+        default = 'hdf',
+    )
+
+    parser.add_argument(
+        '--batch-size',
+        help    = 'Batch size',
+        dest    = 'batch_size',
+        default = 1024,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--max-prongs',
+        help    = 'Prong limit',
+        dest    = 'max_prongs',
+        default = 20,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--batches',
+        help    = 'Number of batches for loader and decorator benchmarks',
+        dest    = 'batches',
+        default = 20,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--repeats',
+        help    = 'Number of timing repeats',
+        dest    = 'repeats',
+        default = 3,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--workers',
+        help    = 'Number of workers of the concurrent caches',
+        dest    = 'workers',
+        default = 4,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--only',
+        help    = 'Benchmark groups to run',
+        dest    = 'only',
+        choices = [ 'loader', 'decorators', 'caches' ],
+        default = None,
+        nargs   = '+',
+    )
+
+    parser.add_argument(
+        '--workdir',
+        help    = 'Directory for the dataset and caches (default: temporary)',
+        dest    = 'workdir',
+        default = None,
+        type    = str,
+    )
+
+    parser.add_argument(
+        '-o', '--output',
+        help    = 'Path of the json file to save results to',
+        dest    = 'output',
+        default = None,
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--baseline',
+        help    = 'Path of the json file with the baseline results',
+        dest    = 'baseline',
+        default = None,
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--tolerance',
+        help    = 'Slowdown factor reported as a regression',
+        dest    = 'tolerance',
+        default = 1.25,
+        type    = float,
+    )
+
+    return parser.parse_args()
+
+def main():
+    # pylint: disable=missing-function-docstring
+    logging.basicConfig(level = logging.WARNING)
+    cmdargs = parse_cmdargs()
+
+    config = {
+        k : getattr(cmdargs, k) for k in [
+            'events', 'format', 'batch_size', 'max_prongs', 'batches',
+            'repeats', 'workers',
+        ]
+    }
+
+    if cmdargs.workdir is None:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = run_benchmarks(workdir, config, cmdargs.only)
+    else:
+        os.makedirs(cmdargs.workdir, exist_ok = True)
+        results = run_benchmarks(cmdargs.workdir, config, cmdargs.only)
+
+    if cmdargs.output is not None:
+        save_results(cmdargs.output, results, config)
+
+    baseline = {}
+
+    if cmdargs.baseline is not None:
+        stored = load_results(cmdargs.baseline)
+
+        if stored['config'] != config:
+            print("WARNING: baseline configuration differs: %s" % (
+                stored['config']
+            ))
+
+        baseline = stored['results']
+
+    comparison = compare_to_baseline(results, baseline, cmdargs.tolerance)
+    print(format_comparison(comparison))
+
+    if any(x[-1] == 'slower' for x in comparison):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
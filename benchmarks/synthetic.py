@@ -0,0 +1,194 @@
+"""Generate synthetic datasets that mimic the structure of NOvA data.
+
+A synthetic dataset holds slice level scalar variables, 2D and 3D prong level
+variable length arrays and two energy targets. The number of prongs per
+event follows a long-tailed (log-normal) distribution.
+
+Examples
+--------
+Create a dataset of 1M events in the HDF format:
+
+$ python -m benchmarks.synthetic --events 1000000 -o synthetic_1M.h5
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import tables
+
+from lstm_ee.data.data import H5_EXTS
+
+VAR_TARGET_TOTAL   = 'trueE'
+VAR_TARGET_PRIMARY = 'trueLepE'
+
+def get_synthetic_vars(n_slice = 10, n_png2d = 10, n_png3d = 20):
+    """Return input and target variable names of a synthetic dataset.
+
+    Returns
+    -------
+    dict
+        Dictionary with keys 'vars_input_slice', 'vars_input_png2d',
+        'vars_input_png3d', 'var_target_total', 'var_target_primary', that
+        can be passed to the `DataGenerator` constructor.
+    """
+    return {
+        'vars_input_slice'   : [ 'slice.var%d' % i for i in range(n_slice) ],
+        'vars_input_png2d'   : [ 'png2d.var%d' % i for i in range(n_png2d) ],
+        'vars_input_png3d'   : [ 'png3d.var%d' % i for i in range(n_png3d) ],
+        'var_target_total'   : VAR_TARGET_TOTAL,
+        'var_target_primary' : VAR_TARGET_PRIMARY,
+    }
+
+def sample_multiplicity(prg, n_events, mean = 3, sigma = 0.7, limit = 100):
+    """Sample long-tailed numbers of prongs of `n_events` events"""
+    result = prg.lognormal(np.log(mean), sigma, n_events)
+    return np.minimum(result.astype(int), limit)
+
+def make_varr_column(prg, lengths):
+    """Create an object array of random variable length arrays"""
+    values  = prg.lognormal(0, 1, np.sum(lengths)).astype(np.float32)
+    offsets = np.cumsum(lengths)[:-1]
+
+    result    = np.empty(len(lengths), dtype = object)
+    result[:] = np.split(values, offsets)
+
+    return result
+
+def generate_synthetic_data(
+    n_events,
+    n_slice     = 10,
+    n_png2d     = 10,
+    n_png3d     = 20,
+    mean_prongs = 3,
+    seed        = 0,
+):
+    """Generate a synthetic dataset.
+
+    Parameters
+    ----------
+    n_events : int
+        Number of events.
+    n_slice : int, optional
+        Number of slice level variables.
+    n_png2d : int, optional
+        Number of 2D prong level variables.
+    n_png3d : int, optional
+        Number of 3D prong level variables.
+    mean_prongs : float, optional
+        Median number of prongs per event.
+    seed : int, optional
+        Seed of the random number generator.
+
+    Returns
+    -------
+    dict
+        Dictionary { var_name : values } that can be used by `DictLoader`.
+        Values of prong level variables are object arrays of arrays.
+    """
+    prg    = np.random.RandomState(seed)
+    vars_  = get_synthetic_vars(n_slice, n_png2d, n_png3d)
+    result = {}
+
+    for var in vars_['vars_input_slice']:
+        result[var] = prg.normal(size = n_events).astype(np.float32)
+
+    for key in [ 'vars_input_png2d', 'vars_input_png3d' ]:
+        lengths = sample_multiplicity(prg, n_events, mean_prongs)
+
+        for var in vars_[key]:
+            result[var] = make_varr_column(prg, lengths)
+
+    result[VAR_TARGET_TOTAL]   = prg.gamma(2, 1.5, n_events)
+    result[VAR_TARGET_PRIMARY] = result[VAR_TARGET_TOTAL] \
+                               * prg.uniform(0, 1, n_events)
+
+    return result
+
+def is_hdf_path(path):
+    """Check whether `path` has an extension of the HDF file"""
+    return any(path.endswith(ext) for ext in H5_EXTS)
+
+def save_synthetic_data(data, path):
+    """Save synthetic `data` into a csv or HDF file, depending on extension.
+
+    Variable length arrays are serialized into strings "v1,v2,..." in csv
+    files, and stored as vlarrays in HDF files. C.f. `CSVLoader`,
+    `HDFLoader`.
+    """
+    if is_hdf_path(path):
+        filters = tables.Filters(complib = 'zlib', complevel = 1)
+
+        with tables.open_file(path, 'w', filters = filters) as f:
+            for (var, values) in data.items():
+                if values.dtype != object:
+                    f.create_array('/', var, obj = values)
+                    continue
+
+                node = f.create_vlarray(
+                    '/', var, atom = tables.Float32Atom(shape = ())
+                )
+
+                for row in values:
+                    node.append(row)
+
+        return
+
+    columns = {}
+
+    for (var, values) in data.items():
+        if values.dtype != object:
+            columns[var] = values
+        else:
+            columns[var] = [
+                ','.join('%.6g' % x for x in row) if len(row) > 0 else None
+                    for row in values
+            ]
+
+    pd.DataFrame(columns).to_csv(path, index = False)
+
+def parse_cmdargs():
+    # pylint: disable=missing-function-docstring
+    parser = argparse.ArgumentParser("Generate synthetic dataset")
+
+    parser.add_argument(
+        '-o', '--output',
+        help     = 'Output file (.csv or .h5)',
+        dest     = 'output',
+        required = True,
+        type     = str,
+    )
+
+    parser.add_argument(
+        '--events',
+        help    = 'Number of events',
+        dest    = 'events',
+        default = 100000,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--seed',
+        help    = 'Random seed',
+        dest    = 'seed',
+        default = 0,
+        type    = int,
+    )
+
+    return parser.parse_args()
+
+def main():
+    # pylint: disable=missing-function-docstring
+    cmdargs = parse_cmdargs()
+
+    data = generate_synthetic_data(cmdargs.events, seed = cmdargs.seed)
+    save_synthetic_data(data, cmdargs.output)
+
+    print("Saved %d events into '%s' (%.1f MB)" % (
+        cmdargs.events, cmdargs.output,
+        os.path.getsize(cmdargs.output) / 2**20
+    ))
+
+if __name__ == '__main__':
+    main()
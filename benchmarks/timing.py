@@ -0,0 +1,109 @@
+"""Helpers to time benchmarks and compare results to a stored baseline"""
+
+import json
+import time
+
+def measure(func, repeats = 3, number = 1):
+    """Measure time per call of `func`.
+
+    Parameters
+    ----------
+    func : callable
+        Function to be timed. Called without arguments.
+    repeats : int, optional
+        Number of timing repeats. The best one is reported.
+    number : int, optional
+        Number of units of work done by a single call of `func` (e.g. number
+        of batches in an epoch). The reported time is divided by it.
+
+    Returns
+    -------
+    float
+        Best time per unit of work in seconds.
+    """
+    result = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        result.append((time.perf_counter() - start) / max(number, 1))
+
+    return min(result)
+
+def save_results(path, results, config):
+    """Save benchmark `results` together with their `config` to json"""
+    with open(path, 'wt') as f:
+        json.dump(
+            { 'config' : config, 'results' : results }, f,
+            indent = 4, sort_keys = True
+        )
+
+def load_results(path):
+    """Load benchmark results saved by `save_results`"""
+    with open(path, 'rt') as f:
+        return json.load(f)
+
+def compare_to_baseline(results, baseline, tolerance = 1.25):
+    """Compare benchmark `results` to `baseline` results.
+
+    Parameters
+    ----------
+    results : dict
+        Dictionary { benchmark_name : time }.
+    baseline : dict
+        Dictionary { benchmark_name : time } of the baseline.
+    tolerance : float, optional
+        Results slower than `tolerance` times baseline are reported as
+        regressions, and faster than 1/`tolerance` as improvements.
+
+    Returns
+    -------
+    list of (name, baseline_time, time, ratio, status)
+        Status is one of 'slower', 'faster', 'ok', 'new', 'missing'.
+    """
+    result = []
+
+    for name in sorted(set(results) | set(baseline)):
+        new  = results.get(name)
+        base = baseline.get(name)
+
+        if base is None:
+            result.append((name, None, new, None, 'new'))
+            continue
+
+        if new is None:
+            result.append((name, base, None, None, 'missing'))
+            continue
+
+        ratio = max(new, 1e-12) / max(base, 1e-12)
+
+        if ratio > tolerance:
+            status = 'slower'
+        elif ratio < 1 / tolerance:
+            status = 'faster'
+        else:
+            status = 'ok'
+
+        result.append((name, base, new, ratio, status))
+
+    return result
+
+def format_comparison(comparison):
+    """Format result of `compare_to_baseline` as a table"""
+
+    def fmt(x, pattern):
+        return '-' if x is None else (pattern % x)
+
+    lines = [
+        "%-45s %12s %12s %8s  %s" % (
+            'BENCHMARK', 'BASELINE', 'CURRENT', 'RATIO', 'STATUS'
+        )
+    ]
+
+    for (name, base, new, ratio, status) in comparison:
+        lines.append("%-45s %12s %12s %8s  %s" % (
+            name, fmt(base, '%.3es'), fmt(new, '%.3es'),
+            fmt(ratio, '%.2f'), status
+        ))
+
+    return '\n'.join(lines)
@@ -48,12 +48,15 @@ class Args:
         If True data batches will be cached in on a disk. Default: False.
         Caches are stored under "`root_outdir`/.cache" and should be
         cleaned manually.
-    concurrency : { 'process', 'thread', None}, optional
+    concurrency : { 'process', 'thread', 'stream', None}, optional
         Type of the parallel data batch generation to use.
         If `concurrency` is "process" then will spawn several parallel
         processes for the data batch generation (may eat all your RAM).
         If "thread" then will spawn several parallel threads, mostly
         ineffective due to GIL.
+        If "stream" then will spawn several parallel processes, like
+        "process", but the training will start as soon as the first batch is
+        ready. Without `cache` it is equivalent to "process".
         The number of parallel threads or processes is controlled by the
         `workers` parameter.
         If None then will not use parallelized data batch generation.
@@ -61,6 +64,49 @@ class Args:
     workers : int or None, optional
         Number of parallel workers to spawn for the purpose of data batch
         generation. If None then no parallelization will be used.
+    event_store : bool, optional
+        If True data batches will be gathered from a preprocessed event store
+        that is saved under "`root_datadir`/.store". The event store does not
+        depend on the batch size or prong limit and is shared between
+        trainings. It should be cleaned manually. Default: False.
+    disk_cache_prefetch : int or None, optional
+        Number of disk cached batches to read ahead in a background thread.
+        Hides disk latency on slow (e.g. network) filesystems. Has no effect
+        unless `disk_cache` is True. If None then no read ahead will be
+        performed. Default: None.
+    chunksize : int or None, optional
+        Number of batches sent to a worker process at once when `concurrency`
+        is "stream". If None then 1 will be used. Default: None.
+    prefetch : int or None, optional
+        Number of batches to produce ahead of the training in background
+        workers. If not None, the whole chain of data generators (including
+        augmentations on top of the cache) runs concurrently with the model
+        computations, and the `keras` concurrent data generation is disabled.
+        The number of workers is controlled by the `workers` parameter.
+        Default: None.
+    prefetch_mode : { 'thread', 'process', None }, optional
+        Type of the prefetch workers. If None then "thread" will be used.
+        Default: None.
+    fuse_augment : bool, optional
+        If True, prong sorting, noise and NaN masking of batches will be
+        performed by a single fused decorator `DataAugment` instead of a
+        chain of decorators. Default: False.
+    instrument : bool or None, optional
+        If True, every stage of the data pipeline will be instrumented, and
+        the per epoch statistics of the stages will be saved into
+        "`savedir`/profile.csv". If None, then the instrumentation is
+        enabled by a non empty environment variable "LSTM_EE_INSTRUMENT".
+        Default: None.
+    stream_buffer : int or None, optional
+        If not None, the dataset will be read from disk sequentially in
+        chunks instead of being loaded into RAM, and the training events will
+        be shuffled in a buffer of `stream_buffer` events. In this mode the
+        `dataset` can be a directory with shards or a glob pattern of shards.
+        Caches and process based concurrency cannot be used in this mode.
+        Default: None.
+    stream_chunk : int or None, optional
+        Number of events to read at once in the streaming mode. If None then
+        a quarter of `stream_buffer` will be used. Default: None.
     **kwargs : dict
         Parameters to be passed to the `Config` constructor.
     extra_kwargs : dict or None, optional
@@ -119,6 +165,15 @@ class Args:
         'disk_cache',
         'concurrency',
         'workers',
+        'event_store',
+        'disk_cache_prefetch',
+        'chunksize',
+        'prefetch',
+        'prefetch_mode',
+        'fuse_augment',
+        'instrument',
+        'stream_buffer',
+        'stream_chunk',
 
         'extra_kwargs',
     )
@@ -16,12 +16,25 @@ class Config:
         Training batch size.
     dataset : str
         Dataset path inside "${LSTM_EE_DATADIR}".
+    derived_vars : dict or None, optional
+        Definitions of variables derived from the `dataset` variables, of the
+        form { name : expression }, e.g.
+        { 'sumPngCalE' : 'sum(png.calE)' }. Derived variables can be used
+        as input variables and in `filters`.
+        C.f. `lstm_ee.data.data_loader.DerivedVariables` for the expression
+        syntax. If None, no variables will be derived. Default: None.
     early_stop : dict or None, optional
         Early stopping configuration.
         C.f. `lstm_ee.train.setup.get_early_stop` for available configurations.
         If None, no early stopping will be used. Default: None.
     epochs : int
         Number of epochs training will be run.
+    filters : str or list of str or None, optional
+        Selection cuts applied to the `dataset` at load time, e.g.
+        [ "calE < 5", "len(png.calE) >= 1" ]. Events that do not pass all
+        the cuts are dropped before the train/test split.
+        C.f. `lstm_ee.data.data_loader.DataFilter` for the cut syntax.
+        If None, no events will be dropped. Default: None.
     max_prongs : int or None, optional
         Limit number of 3d prongs to `max_prongs`. In other words, if the
         number of 3d prongs is greater than `max_prongs` the remaining prongs
@@ -53,6 +66,18 @@ class Config:
         Regularization configuration to be used during the training.
         C.f. `lstm_ee.train.setup.get_regularizer` for the available options.
         If None, no regularization will be used. Default: None.
+    resample : dict or None, optional
+        If not None, then instead of weighting the training events by
+        `weights`, events of each training epoch will be drawn with
+        probabilities proportional to `weights` and used with unit weights.
+        The dict holds parameters of the draw, e.g. { 'replace' : False }.
+        C.f. `lstm_ee.data.data_generator.DataResample` for the available
+        parameters. Validation events are still weighted. Default: None.
+    rotate_epochs : bool or None, optional
+        If True and `steps_per_epoch` is smaller than the number of training
+        batches, then each epoch will continue from the batch where the
+        previous epoch has stopped, instead of starting from the first batch.
+        C.f. `lstm_ee.data.data_generator.DataEpochWindow`. Default: None.
     schedule : dict or None, optional
         Learning rate decay schedule configuration.
         C.f. `lstm_ee.train.setup.get_schedule` for the available options.
@@ -104,8 +129,10 @@ class Config:
     __slots__ = (
         'batch_size',
         'dataset',
+        'derived_vars',
         'early_stop',
         'epochs',
+        'filters',
         'loss',
         'max_prongs',
         'model',
@@ -113,6 +140,8 @@ class Config:
         'optimizer',
         'prong_sorters',
         'regularizer',
+        'resample',
+        'rotate_epochs',
         'schedule',
         'seed',
         'steps_per_epoch',
@@ -125,6 +154,13 @@ class Config:
         'weights',
     )
 
+    # Parameters that were added after the first trainings. They are omitted
+    # from the str representation when unset, so that hashes of the older
+    # configurations stay the same.
+    OPTIONAL_SLOTS = (
+        'derived_vars', 'filters', 'resample', 'rotate_epochs',
+    )
+
     def __init__(self, **kwargs):
 
         for k in self.__slots__:
@@ -150,7 +186,13 @@ class Config:
         return Config(**kwargs)
 
     def __str__(self):
-        kwargs = { x : getattr(self, x) for x in self.__slots__ }
+        kwargs = {
+            x : getattr(self, x) for x in self.__slots__
+                if (
+                       (x not in self.OPTIONAL_SLOTS)
+                    or (getattr(self, x) is not None)
+                )
+        }
         return json.dumps(kwargs, sort_keys = True)
 
     def pprint(self):
@@ -21,3 +21,13 @@ if 'LSTM_EE_OUTDIR' in os.environ:
 else:
     ROOT_OUTDIR = '/'
 
+
+if 'LSTM_EE_CACHE_MAX_SIZE' in os.environ:
+    CACHE_MAX_SIZE = os.environ['LSTM_EE_CACHE_MAX_SIZE']
+else:
+    CACHE_MAX_SIZE = None
+
+if 'LSTM_EE_INSTRUMENT' in os.environ:
+    INSTRUMENT = (os.environ['LSTM_EE_INSTRUMENT'] not in [ '', '0' ])
+else:
+    INSTRUMENT = False
@@ -12,7 +12,12 @@ This module contains several parts:
     - `data` file defines a number of routines to simplify data handling.
 """
 
-from .data import load_data, create_data_generators, construct_data_loader
+from .data import (
+    load_data, load_test_data, create_data_generators, construct_data_loader
+)
 
-__all__ = [ 'load_data', 'create_data_generators', 'construct_data_loader' ]
+__all__ = [
+    'load_data', 'load_test_data', 'create_data_generators',
+    'construct_data_loader',
+]
 
@@ -0,0 +1,254 @@
+"""
+Functions to fill disk caches of data batches ahead of the training.
+"""
+
+import ast
+import logging
+import multiprocessing
+import os
+import time
+
+from lstm_ee.args import Args
+from .data import create_basic_data_generators
+
+LOGGER = logging.getLogger('lstm_ee.data.cache_warmup')
+
+# Calls that start training or parse command line in the training scripts
+SKIPPED_CALLS = [
+    'create_and_train_model', 'parse_concurrency_cmdargs', 'setup_logging',
+    'speval',
+]
+
+# Parameters of the `Args` that define contents of the disk cache
+CACHE_KEYS = [
+    'dataset', 'batch_size', 'max_prongs', 'seed', 'test_size',
+    'vars_input_slice', 'vars_input_png3d', 'vars_input_png2d',
+    'var_target_total', 'var_target_primary', 'filters', 'derived_vars',
+]
+
+# DataDiskCache that is being filled. Shared with the forked workers.
+_DGEN = None
+
+def _get_call_name(node):
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+
+    return None
+
+def _is_skipped_statement(stmt):
+    if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+        return all(
+            (x.asname or x.name).split('.')[-1] in SKIPPED_CALLS
+                for x in stmt.names
+        )
+
+    return any(
+        isinstance(node, ast.Call) and (_get_call_name(node) in SKIPPED_CALLS)
+            for node in ast.walk(stmt)
+    )
+
+def load_script_config(path):
+    """Extract training configuration from a training script.
+
+    Training scripts define a dictionary `config` and optionally a list
+    `search_space` of the hyper-parameter overrides, and then start the
+    training. This function executes top level statements of the script
+    except for those that parse command line, setup logging or start the
+    training (and imports of the corresponding functions).
+
+    Parameters
+    ----------
+    path : str
+        Path to the training script.
+
+    Returns
+    -------
+    (config, search_space)
+        Training configuration and a list of `extra_kwargs` overrides.
+        `search_space` is [ None ] if it is not defined in the script.
+    """
+    with open(path, 'rt') as f:
+        tree = ast.parse(f.read(), filename = path)
+
+    tree.body = [ x for x in tree.body if not _is_skipped_statement(x) ]
+    namespace = { '__name__' : '__lstm_ee_config__', '__file__' : path }
+
+    # pylint: disable=exec-used
+    exec(compile(tree, path, 'exec'), namespace)
+
+    if 'config' not in namespace:
+        raise RuntimeError("Training script '%s' has no config" % path)
+
+    return (namespace['config'], namespace.get('search_space', [ None ]))
+
+def load_args_list(path):
+    """Load a list of `Args` from a saved model directory or a script.
+
+    Parameters
+    ----------
+    path : str
+        Either a directory with a saved `Args` (e.g. trained model directory),
+        or a training script. C.f. `load_script_config`.
+
+    Returns
+    -------
+    list of Args
+        `Args` that produce different disk caches.
+    """
+    if os.path.isdir(path):
+        return [ Args.load(path) ]
+
+    config, search_space = load_script_config(path)
+
+    result = []
+    keys   = []
+
+    for extra_kwargs in search_space:
+        args = Args(loaded = True, extra_kwargs = extra_kwargs, **config)
+        # pylint: disable=protected-access
+        args._modify_variables()
+
+        key = [ args[k] for k in CACHE_KEYS ]
+
+        if key not in keys:
+            keys.append(key)
+            result.append(args)
+
+    return result
+
+def create_disk_cached_data_generators(args, datadir = None):
+    """Create disk cached train/test data generators for `args`.
+
+    C.f. `create_basic_data_generators`.
+    """
+    if datadir is None:
+        datadir = args.root_datadir
+
+    return create_basic_data_generators(
+        datadir            = datadir,
+        dataset            = args.dataset,
+        batch_size         = args.batch_size,
+        max_prongs         = args.max_prongs,
+        seed               = args.seed,
+        test_size          = args.test_size,
+        vars_input_slice   = args.vars_input_slice,
+        vars_input_png3d   = args.vars_input_png3d,
+        vars_input_png2d   = args.vars_input_png2d,
+        var_target_total   = args.var_target_total,
+        var_target_primary = args.var_target_primary,
+        disk_cache         = True,
+        event_store        = args.event_store,
+        filters            = args.filters,
+        derived_vars       = args.derived_vars,
+    )
+
+def _fill_chunk_local(dgen, indices):
+    dgen.fill(indices)
+    return len(indices)
+
+def _fill_chunk(indices):
+    return _fill_chunk_local(_DGEN, indices)
+
+def fill_disk_cache(dgen, workers = None, chunk_size = 16, batch_size = None):
+    """Fill disk cache `dgen` in parallel processes and report throughput.
+
+    Workers are forked from the current process, so that they share the
+    loaded dataset with it (copy-on-write) instead of loading their copies.
+
+    Parameters
+    ----------
+    dgen : DataDiskCache
+        Disk cache to be filled.
+    workers : int or None, optional
+        Number of parallel processes. If None or 1, the cache will be filled
+        in the current process.
+    chunk_size : int, optional
+        Number of batches that a worker fills at once. Default: 16.
+    batch_size : int or None, optional
+        Size of batches. Only used to report throughput in events/s.
+
+    Returns
+    -------
+    dict
+        Dictionary with keys 'batches', 'time', 'batches_per_sec'.
+    """
+    # pylint: disable=global-statement
+    global _DGEN
+
+    missing = [ i for i in range(len(dgen)) if not dgen.is_cached(i) ]
+    chunks  = [
+        missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)
+    ]
+
+    LOGGER.info(
+        "Filling %d of %d batches of cache '%s'",
+        len(missing), len(dgen), dgen.cache_root
+    )
+
+    start = time.perf_counter()
+    done  = 0
+
+    def report(done):
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        msg     = "Filled %d / %d batches. %.1f batches/s" % (
+            done, len(missing), done / elapsed
+        )
+
+        if batch_size is not None:
+            msg += ", %.0f events/s" % (done * batch_size / elapsed)
+
+        LOGGER.info(msg)
+
+    if (workers is None) or (workers <= 1):
+        for chunk in chunks:
+            done += _fill_chunk_local(dgen, chunk)
+            report(done)
+    else:
+        _DGEN = dgen
+
+        try:
+            ctx = multiprocessing.get_context('fork')
+
+            with ctx.Pool(processes = workers) as pool:
+                for n in pool.imap_unordered(_fill_chunk, chunks):
+                    done += n
+                    report(done)
+        finally:
+            _DGEN = None
+
+    dgen.fill()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'batches'         : done,
+        'time'            : elapsed,
+        'batches_per_sec' : done / max(elapsed, 1e-9),
+    }
+
+def warm_disk_cache(args, workers = None, datadir = None):
+    """Fill disk caches of the train and test splits of `args`.
+
+    Parameters
+    ----------
+    args : Args
+        Training arguments.
+    workers : int or None, optional
+        Number of parallel processes. C.f. `fill_disk_cache`.
+    datadir : str or None, optional
+        Root data directory. If None, `args.root_datadir` will be used.
+
+    Returns
+    -------
+    list of dict
+        Fill statistics of each split. C.f. `fill_disk_cache`.
+    """
+    dgen_list = create_disk_cached_data_generators(args, datadir)
+
+    return [
+        fill_disk_cache(dgen, workers, batch_size = args.batch_size)
+            for dgen in dgen_list
+    ]
+
@@ -2,6 +2,7 @@
 A collection of routines to simplify data handling.
 """
 
+import hashlib
 import json
 import logging
 import os
@@ -9,16 +10,36 @@ import os
 import numpy as np
 
 from lstm_ee.data.data_loader import (
-    CSVLoader, HDFLoader, DictLoader, DataShuffle, DataSlice
+    CSVLoader, HDFLoader, DictLoader, DataFilter, DataRows, DataShuffle,
+    DataSlice, DerivedVariables, ShardReader
 )
+from lstm_ee.data.data_loader.data_filter  import get_filter_variables
+from lstm_ee.data.data_loader.idata_loader import IDataLoader
+from lstm_ee.data.data_loader.shard_reader import H5_EXTS, find_shards
 from lstm_ee.data.data_generator import (
-    DataCache, DataDiskCache, DataGenerator, DataNANMask, DataNoise,
-    DataProngSorter, DataWeight, MultiprocessedCache, MultithreadedCache
+    DataAugment, DataCache, DataDiskCache, DataEpochWindow, DataGenerator,
+    DataNANMask, DataNoise, DataPrefetch, DataProngSorter, DataResample,
+    DataStoreGenerator, DataStreamGenerator, DataTimer, DataWeight,
+    EventStore, MultiprocessedCache, MultithreadedCache, StreamingCache
 )
-from lstm_ee.data.data_generator.funcs.weights      import flat_weights
+from lstm_ee.data.data_generator.data_timer    import find_decorator
+from lstm_ee.data.data_generator.funcs.weights import (
+    flat_weights, flat_weights_nd, get_weights_path, persistent_weights,
+    stream_flat_weights
+)
+from lstm_ee.data.instrument import (
+    instrument_data_generators, is_instrument_enabled
+)
+from lstm_ee.data.summary    import get_split_key
+
+LOGGER = logging.getLogger('lstm_ee.data')
 
-H5_EXTS = [ 'h5', 'hdf', 'hdf5' ]
-LOGGER  = logging.getLogger('lstm_ee.data')
+# Files under the model directory that hold the train/test split
+SPLIT_FNAME       = 'split.json'
+SPLIT_INDEX_FNAME = 'split_test.npy'
+
+# Names of the parts of the train/test split
+PART_NAMES = [ 'train', 'test' ]
 
 def guess_data_loader(path):
     """Find appropriate DataLoader based on a file path
@@ -26,6 +47,9 @@ def guess_data_loader(path):
     This function tries to guess proper instance of `IDataLoader` based on a
     file extension.
     """
+    if isinstance(path, IDataLoader):
+        return path
+
     if isinstance(path, dict):
         return DictLoader(path)
 
@@ -78,18 +102,22 @@ def train_test_split(data_loader, test_size):
         DataSlice(data_loader, indices[n_train:]),
     ]
 
-def construct_data_loader(path, seed, test_size):
+def construct_data_loader(path, seed, test_size, filters = None):
     """Load dataset to DataLoader, shuffle it and split into train/test parts.
 
     Parameters
     ----------
-    path : str
-        File path from which dataset will be loaded.
+    path : str or IDataLoader
+        File path from which dataset will be loaded, or an already loaded
+        raw `IDataLoader`.
     seed : int or None
         Seed that will be used to shuffle data.
     test_size : int or float or None
         Fraction of the dataset that will go to the test sample.
         C.f. `train_test_split` for the detailed description.
+    filters : str or list of str or None, optional
+        Selection cuts to apply to the dataset before shuffling. If None, no
+        events will be dropped. C.f. `DataFilter`. Default: None.
 
     Returns
     -------
@@ -99,13 +127,63 @@ def construct_data_loader(path, seed, test_size):
     See Also
     --------
     train_test_split
+    DataFilter
     """
 
     data_loader = guess_data_loader(path)
+
+    if filters is not None:
+        n_total     = len(data_loader)
+        data_loader = DataFilter(data_loader, filters)
+
+        LOGGER.info(
+            "Selection cuts %s keep %d out of %d events",
+            filters, len(data_loader), n_total
+        )
+
     data_loader = DataShuffle(data_loader, seed)
 
     return train_test_split(data_loader, test_size)
 
+def construct_test_data_loader(data_loader, test_index, derived_vars = None):
+    """Construct test DataLoader from the saved rows of the dataset.
+
+    Parameters
+    ----------
+    data_loader : str or IDataLoader
+        File path from which dataset will be loaded, or an already loaded
+        raw `IDataLoader`.
+    test_index : ndarray
+        Rows of the raw dataset that make the test sample, in the order of
+        the test sample. C.f. `save_split`.
+    derived_vars : dict or None, optional
+        Definitions of the derived variables. They are only calculated for
+        the test rows. Default: None.
+
+    Returns
+    -------
+    IDataLoader
+        Test DataLoader, that only reads the `test_index` rows of the
+        dataset. Csv datasets are still read whole, but only the
+        `test_index` rows are parsed and kept in memory.
+
+    See Also
+    --------
+    DataRows
+    """
+    data_loader = guess_data_loader(data_loader)
+
+    if isinstance(data_loader, CSVLoader):
+        rows, test_index = np.unique(test_index, return_inverse = True)
+        data_loader      = CSVLoader(data_loader.path, rows)
+
+    data_loader = DataRows(data_loader, test_index)
+
+    if derived_vars:
+        data_loader = DerivedVariables(data_loader, derived_vars)
+
+    return data_loader
+
 def add_noise(dgen_list, noise):
     """Add noise decorators to the DataGenerators from `dgen_list` list.
 
@@ -163,9 +241,14 @@ def get_weights(weights):
         # pylint: disable = unnecessary-lambda
         return lambda data_loader : flat_weights(data_loader, **kwargs)
 
+    if name == 'flat_nd':
+        return lambda data_loader : flat_weights_nd(data_loader, **kwargs)
+
     return weights
 
-def add_cache_decorators(dgen_list, cache, concurrency, workers):
+def add_cache_decorators(
+    dgen_list, cache, concurrency, workers, chunksize = None
+):
     """Add cache decorators to the DataGenerators from `dgen_list` list.
 
     Parameters
@@ -175,13 +258,18 @@ def add_cache_decorators(dgen_list, cache, concurrency, workers):
     cache : bool or None
         If True then the DataGenerators from `dgen_list` will be cached.
         Otherwise, this function will return unmodified `dgen_list`.
-    concurrency : { 'process', 'thread', None }
+    concurrency : { 'process', 'thread', 'stream', None }
         Specifies Whether to precompute cache. If None, then cache will not be
         precomputed. Otherwise, it will be precomputed by parallelizing data
-        generation in multiple threads/processes.
+        generation in multiple threads/processes. If 'stream', then batches
+        will be precomputed in multiple processes and served as soon as they
+        are ready.
     workers : int or None
         Number of parallel threads/processes to use for precomputing cache.
         Has no effect if `concurrency` is None.
+    chunksize : int or None, optional
+        Number of batches sent to a worker process at once. Only used if
+        `concurrency` is 'stream'. If None, 1 will be used.
 
     Returns
     -------
@@ -193,6 +281,7 @@ def add_cache_decorators(dgen_list, cache, concurrency, workers):
     DataCache
     MultiprocessedCache
     MultithreadedCache
+    StreamingCache
     """
 
     if (cache is None) or (not cache):
@@ -215,6 +304,14 @@ def add_cache_decorators(dgen_list, cache, concurrency, workers):
             return [
                 MultithreadedCache(x, workers) for x in dgen_list
             ]
+        elif concurrency == 'stream':
+            LOGGER.info(
+                "Using streaming multiprocess data generator cache"
+                " with %d workers", workers
+            )
+            return [
+                StreamingCache(x, workers, chunksize or 1) for x in dgen_list
+            ]
         else:
             raise RuntimeError(
                 "Unknown concurrency type: %s" % concurrency
@@ -223,7 +320,9 @@ def add_cache_decorators(dgen_list, cache, concurrency, workers):
         LOGGER.info("Using data generator cache")
         return [ DataCache(x) for x in dgen_list ]
 
-def add_disk_cache_decorators(dgen_list, use_disk_cache, **kwargs):
+def add_disk_cache_decorators(
+    dgen_list, use_disk_cache, parts = None, **kwargs
+):
     """Add disk cache decorators to the DataGenerators from `dgen_list` list.
 
     Parameters
@@ -233,6 +332,10 @@ def add_disk_cache_decorators(dgen_list, use_disk_cache, **kwargs):
     use_disk_cache : bool
         If True then disk cache decorators will be used. Otherwise, this
         function will return `dgen_list` unmodified.
+    parts : list of int or None, optional
+        Indices of the parts of the train/test split that DataGenerators from
+        `dgen_list` generate batches for. If None, then `dgen_list` is
+        assumed to hold all parts in order. Default: None.
     **kwargs : dict
         Dictionary that uniquely specifies given disk cache.
         C.f. DataDiskCache constructor.
@@ -253,13 +356,60 @@ def add_disk_cache_decorators(dgen_list, use_disk_cache, **kwargs):
     if len(dgen_list) > 2:
         return dgen_list
 
+    if parts is None:
+        parts = range(len(dgen_list))
+
     LOGGER.info("Using disk based data generator cache")
     return [
         DataDiskCache(dgen = dgen, part = idx, **kwargs)
-            for idx,dgen in enumerate(dgen_list)
+            for idx,dgen in zip(parts, dgen_list)
     ]
 
-def add_weights(dgen_list, batch_size, weights):
+def add_prefetch_decorators(dgen_list, prefetch, parts = None, seed = None):
+    """Add read ahead decorators to the DataGenerators from `dgen_list` list.
+
+    Parameters
+    ----------
+    dgen_list : list of IDataGenerator
+        A list of DataGenerators to be decorated.
+    prefetch : int or None
+        Number of batches to read ahead in a background thread. If None or 0
+        then this function will return `dgen_list` unmodified.
+    parts : list of int or None, optional
+        Parts of the train/test split (0 -- train, 1 -- test) that
+        DataGenerators from `dgen_list` are created for. Batches of the
+        training part are shuffled at each epoch by the decorator, since
+        the read ahead needs to know the order of batches. If None,
+        batches are not shuffled. Default: None.
+    seed : int or None, optional
+        Seed of the batch order shuffling. Default: None.
+
+    Returns
+    -------
+    list of IDataGenerator
+        DataGenerators from `dgen_list` decorated by `DataPrefetch` decorators
+
+    See Also
+    --------
+    DataPrefetch
+    """
+
+    if not prefetch:
+        return dgen_list
+
+    if parts is None:
+        parts = [ None ] * len(dgen_list)
+
+    LOGGER.info("Using read ahead of %d batches", prefetch)
+    return [
+        DataPrefetch(dgen, prefetch, shuffle = (part == 0), seed = seed)
+            for (part, dgen) in zip(parts, dgen_list)
+    ]
+
+def add_weights(
+    dgen_list, batch_size, weights, datadir = None, split_key = None,
+    resample = None, seed = None, parts = None
+):
     """Add weight decorators to the DataGenerators from `dgen_list` list.
 
     Parameters
@@ -272,6 +422,24 @@ def add_weights(dgen_list, batch_size, weights):
     weights : dict or str or None
         Weights specification. C.f. `get_weights`. If None then this function
         will return `dgen_list` unmodified.
+    datadir : str or None, optional
+        Root directory where datasets are located. If not None, then the
+        calculated weights will be saved under `datadir`/.weights and
+        memory mapped on the subsequent runs. Default: None.
+    split_key : dict or None, optional
+        Key of the dataset and its train/test split that DataGenerators from
+        `dgen_list` are created for. C.f. `get_split_key`. Weights are only
+        saved if `split_key` is not None. Default: None.
+    resample : dict or None, optional
+        If not None, then the events of the first (training) DataGenerator
+        will be drawn according to the weights by the `DataResample`
+        decorator with parameters `resample`. The other DataGenerators are
+        still weighted by `DataWeight`. Default: None.
+    seed : int or None, optional
+        Seed of the `DataResample` draws. Default: None.
+    parts : list of int or None, optional
+        Indices of the parts of the train/test split of `dgen_list`.
+        C.f. `add_disk_cache_decorators`. Default: None.
 
     Returns
     -------
@@ -281,15 +449,45 @@ def add_weights(dgen_list, batch_size, weights):
     See Also
     --------
     DataWeight
+    DataResample
     get_weights
+    persistent_weights
     """
 
     if weights is None:
+        if resample is not None:
+            raise RuntimeError("Resampling requires weights to be specified")
+
         return dgen_list
 
-    return [
-        DataWeight(x, batch_size, get_weights(weights)) for x in dgen_list
-    ]
+    if parts is None:
+        parts = list(range(len(dgen_list)))
+
+    func_list = [ get_weights(weights) ] * len(dgen_list)
+
+    if (datadir is not None) and (split_key is not None):
+        if callable(func_list[0]):
+            func_list = [
+                persistent_weights(func, get_weights_path(
+                    datadir, dict(split_key, part = idx, weights = weights)
+                )) for (idx, func) in zip(parts, func_list)
+            ]
+
+    result = []
+
+    for (idx, dgen, func) in zip(parts, dgen_list, func_list):
+        if (idx == 0) and (resample is not None):
+            LOGGER.info(
+                "Resampling training events by weights: %s",
+                json.dumps(resample, sort_keys = True)
+            )
+            result.append(
+                DataResample(dgen, batch_size, func, seed = seed, **resample)
+            )
+        else:
+            result.append(DataWeight(dgen, batch_size, func))
+
+    return result
 
 def add_prong_sorters(
     dgen_list, prong_sorters, vars_input_png2d, vars_input_png3d
@@ -343,19 +541,76 @@ def add_prong_sorters(
 
     return dgen_list
 
+def create_event_store(
+    event_store, data_loader, datadir, dataset,
+    vars_input_slice, vars_input_png3d, vars_input_png2d,
+    var_target_total, var_target_primary, derived_vars = None
+):
+    """Create (or open existing) preprocessed `EventStore` of the dataset.
+
+    Parameters
+    ----------
+    event_store : bool or None
+        If True then the `EventStore` will be created. Otherwise, this function
+        will return None.
+    data_loader : IDataLoader
+        Raw `IDataLoader` of the dataset.
+    datadir : str
+        Root directory where datasets are located. The store will be saved
+        under `datadir`/.store
+    dataset : str
+        Path relative `datadir` of the dataset.
+    vars_input_slice, vars_input_png3d, vars_input_png2d : list of str or None
+        Names of slice, 3d prong and 2d prong level input variables.
+    var_target_total, var_target_primary : str or None
+        Names of total and primary energy target variables.
+    derived_vars : dict or None, optional
+        Definitions of the derived variables of `data_loader`.
+        C.f. `DerivedVariables`.
+
+    Returns
+    -------
+    EventStore or None
+        Store of the preprocessed events.
+
+    See Also
+    --------
+    EventStore
+    """
+
+    if not event_store:
+        return None
+
+    LOGGER.info("Using preprocessed event store")
+
+    return EventStore(
+        data_loader, datadir, dataset,
+        vars_input_slice   = vars_input_slice,
+        vars_input_png3d   = vars_input_png3d,
+        vars_input_png2d   = vars_input_png2d,
+        var_target_total   = var_target_total,
+        var_target_primary = var_target_primary,
+        derived_vars       = derived_vars,
+    )
+
 def create_basic_data_generators(
-    datadir            = None,
-    dataset            = None,
-    batch_size         = 1024,
-    max_prongs         = None,
-    seed               = None,
-    test_size          = 0.2,
-    vars_input_slice   = None,
-    vars_input_png3d   = None,
-    vars_input_png2d   = None,
-    var_target_total   = None,
-    var_target_primary = None,
-    disk_cache         = None,
+    datadir             = None,
+    dataset             = None,
+    batch_size          = 1024,
+    max_prongs          = None,
+    seed                = None,
+    test_size           = 0.2,
+    vars_input_slice    = None,
+    vars_input_png3d    = None,
+    vars_input_png2d    = None,
+    var_target_total    = None,
+    var_target_primary  = None,
+    disk_cache          = None,
+    event_store         = None,
+    disk_cache_prefetch = None,
+    filters             = None,
+    derived_vars        = None,
+    test_index          = None,
 ):
     """
     Load dataset, shuffle, and create train/test DataGenerators.
@@ -390,22 +645,63 @@ def create_basic_data_generators(
         the event (e.g. lepton energy).
     disk_cache : bool or None
         If True then disk cache decorators will be used.
+    event_store : bool or None
+        If True then batches will be gathered from a preprocessed
+        `EventStore` of the dataset. C.f. `create_event_store`.
+    disk_cache_prefetch : int or None
+        Number of disk cached batches to read ahead in a background thread.
+        Has no effect if `disk_cache` is not True.
+        C.f. `add_prefetch_decorators`.
+    filters : str or list of str or None
+        Selection cuts to apply to the dataset. C.f. `DataFilter`.
+    derived_vars : dict or None
+        Definitions of variables to derive from the dataset variables.
+        C.f. `DerivedVariables`.
+    test_index : ndarray or None
+        If not None, then only the test DataGenerator will be created from
+        the rows `test_index` of the dataset, instead of shuffling and
+        splitting the dataset. C.f. `load_split`.
 
     Returns
     -------
     [ DataGenerator, DataGenerator ]
-        Train and test DataGenerators.
+        Train and test DataGenerators. Only the test DataGenerator if
+        `test_index` is not None.
 
     See Also
     --------
     construct_data_loader
+    create_event_store
     DataGenerator
+    DataStoreGenerator
     add_disk_cache_decorators
+    add_prefetch_decorators
     """
 
     LOGGER.info("Loading %s dataset from %s.", dataset, datadir)
-    path = os.path.join(datadir, dataset)
-    data_loader_list = construct_data_loader(path, seed, test_size)
+    raw_loader  = guess_data_loader(os.path.join(datadir, dataset))
+    data_loader = raw_loader
+
+    if derived_vars:
+        data_loader = DerivedVariables(data_loader, derived_vars)
+
+    store = create_event_store(
+        event_store, data_loader, datadir, dataset,
+        vars_input_slice, vars_input_png3d, vars_input_png2d,
+        var_target_total, var_target_primary, derived_vars
+    )
+
+    if test_index is None:
+        data_loader_list = construct_data_loader(
+            data_loader, seed, test_size, filters
+        )
+        parts = list(range(len(data_loader_list)))
+    else:
+        LOGGER.info("Loading %d test events", len(test_index))
+        data_loader_list = [
+            construct_test_data_loader(raw_loader, test_index, derived_vars)
+        ]
+        parts = [ 1 ]
 
     LOGGER.info(
           "Creating data generators with:\n"
@@ -415,17 +711,37 @@ def create_basic_data_generators(
         + "    test size    : %s\n" % (test_size)
     )
 
-    dgen_list = [
-        DataGenerator(
-            x, batch_size, max_prongs,
-            vars_input_slice, vars_input_png3d, vars_input_png2d,
-            var_target_total, var_target_primary,
-        )
-        for x in data_loader_list
-    ]
+    dgen_kwargs = {
+        'batch_size'         : batch_size,
+        'max_prongs'         : max_prongs,
+        'vars_input_slice'   : vars_input_slice,
+        'vars_input_png3d'   : vars_input_png3d,
+        'vars_input_png2d'   : vars_input_png2d,
+        'var_target_total'   : var_target_total,
+        'var_target_primary' : var_target_primary,
+    }
+
+    if store is None:
+        dgen_list = [
+            DataGenerator(x, **dgen_kwargs) for x in data_loader_list
+        ]
+    else:
+        dgen_list = [
+            DataStoreGenerator(store, x, **dgen_kwargs)
+                for x in data_loader_list
+        ]
+
+    # Filters and derived variables are not a part of the older cache
+    # configurations
+    cache_kwargs = {}
+    if filters is not None:
+        cache_kwargs['filters'] = filters
+
+    if derived_vars:
+        cache_kwargs['derived_vars'] = derived_vars
 
-    return add_disk_cache_decorators(
-        dgen_list, disk_cache,
+    dgen_list = add_disk_cache_decorators(
+        dgen_list, disk_cache, parts,
         datadir            = datadir,
         dataset            = dataset,
         batch_size         = batch_size,
@@ -435,15 +751,54 @@ def create_basic_data_generators(
         vars_input_png2d   = vars_input_png2d,
         var_target_total   = var_target_total,
         var_target_primary = var_target_primary,
+        **cache_kwargs
     )
 
-def create_data_generators(
+    if disk_cache:
+        dgen_list = add_prefetch_decorators(
+            dgen_list, disk_cache_prefetch, parts, seed
+        )
+
+    return dgen_list
+
+def get_stream_weights(weights):
+    """Get weights of the streamed dataset based on configuration `weights`.
+
+    C.f. `get_weights`, `DataStreamGenerator`.
+    """
+
+    if weights is None:
+        return None
+
+    if isinstance(weights, str):
+        return weights
+
+    name   = weights['name']
+    kwargs = weights.get('kwargs', {})
+
+    if name == 'flat':
+        return lambda chunks : stream_flat_weights(chunks, **kwargs)
+
+    raise RuntimeError(
+        "Weights are not supported in the streaming mode: %s" % (weights)
+    )
+
+def get_stream_weight_vars(weights):
+    """Get names of variables required to calculate stream `weights`"""
+
+    if weights is None:
+        return []
+
+    if isinstance(weights, str):
+        return [ weights ]
+
+    return [ weights.get('kwargs', {}).get('var', 'trueE') ]
+
+def create_stream_data_generators(
     datadir            = None,
     dataset            = None,
     batch_size         = 1024,
     max_prongs         = None,
-    noise              = None,
-    prong_sorters      = None,
     seed               = None,
     test_size          = 0.2,
     weights            = None,
@@ -452,10 +807,249 @@ def create_data_generators(
     vars_input_png2d   = None,
     var_target_total   = None,
     var_target_primary = None,
-    cache              = True,
-    disk_cache         = True,
-    concurrency        = None,
-    workers            = 1,
+    buffer_size        = None,
+    chunk_size         = None,
+    filters            = None,
+    derived_vars       = None,
+):
+    """Create train/test DataGenerators that stream a sharded dataset.
+
+    Parameters
+    ----------
+    datadir : str
+        Root directory where datasets are located.
+    dataset : str
+        Path relative `datadir` to a dataset file, a directory with dataset
+        shards, or a glob pattern of shards. C.f. `find_shards`.
+    batch_size : int
+        Size of the batches to be generated.
+    max_prongs : int or None, optional
+        If `max_prongs` is not None, then the number of 2D and 3D prongs will
+        be truncated by `max_prongs`. Default: None.
+    seed : int or None
+        Seed of the train/test split and shuffling.
+    test_size : int or float or None
+        Amount of samples that will go to the test sample.
+    weights : dict or str or None
+        Weights specification. C.f. `get_stream_weights`.
+    vars_input_slice : list of str or None, optional
+        Names of slice level input variables.
+    vars_input_png3d : list of str or None, optional
+        Names of 3d prong level input variables.
+    vars_input_png2d : list of str or None, optional
+        Names of 2d prong level input variables.
+    var_target_total : str or None, optional
+        Name of the variable that holds total energy of the event.
+    var_target_primary : str or None, optional
+        Name of the variable that holds primary energy of the event.
+    buffer_size : int
+        Number of events in the shuffle buffer of the training generator.
+    chunk_size : int or None
+        Number of events read from the shards at once. If None, then
+        `buffer_size` // 4 (but at least `batch_size`) is used.
+    filters : str or list of str or None
+        Selection cuts to apply to the streamed chunks.
+        C.f. `DataFilter`.
+    derived_vars : dict or None
+        Definitions of variables to derive from the dataset variables.
+        C.f. `DerivedVariables`.
+
+    Returns
+    -------
+    [ DataStreamGenerator, DataStreamGenerator ]
+        Train and test DataGenerators.
+
+    See Also
+    --------
+    DataStreamGenerator
+    ShardReader
+    """
+    # pylint: disable=too-many-locals
+
+    shards = find_shards(os.path.join(datadir, dataset))
+
+    if chunk_size is None:
+        chunk_size = max(buffer_size // 4, batch_size)
+
+    varr_vars = (vars_input_png3d or []) + (vars_input_png2d or [])
+    variables = (vars_input_slice or []) + varr_vars + [
+        x for x in [ var_target_total, var_target_primary ] if x is not None
+    ]
+    for var in get_stream_weight_vars(weights) + get_filter_variables(filters):
+        if var not in variables:
+            variables.append(var)
+
+    LOGGER.info(
+          "Streaming %d shards of %s dataset from %s with:\n"
+        + "    buffer size  : %d\n" % (buffer_size)
+        + "    chunk size   : %d\n" % (chunk_size),
+        len(shards), dataset, datadir
+    )
+
+    reader = ShardReader(
+        shards, variables, chunk_size, varr_vars, filters, derived_vars
+    )
+
+    dgen_kwargs = {
+        'batch_size'         : batch_size,
+        'max_prongs'         : max_prongs,
+        'seed'               : seed,
+        'test_size'          : test_size,
+        'weights'            : get_stream_weights(weights),
+        'vars_input_slice'   : vars_input_slice,
+        'vars_input_png3d'   : vars_input_png3d,
+        'vars_input_png2d'   : vars_input_png2d,
+        'var_target_total'   : var_target_total,
+        'var_target_primary' : var_target_primary,
+    }
+
+    return [
+        DataStreamGenerator(
+            reader, part = 0, shuffle = True, buffer_size = buffer_size,
+            **dgen_kwargs
+        ),
+        DataStreamGenerator(reader, part = 1, shuffle = False, **dgen_kwargs),
+    ]
+
+def add_fused_augment(dgen_list, prong_sorters, noise):
+    """Add fused augmentation decorators to the DataGenerators.
+
+    The fused decorator replaces the chain of decorators created by
+    `add_prong_sorters`, `add_noise` and `DataNANMask`.
+
+    Parameters
+    ----------
+    dgen_list : list of IDataGenerator
+        A list of DataGenerators to be decorated.
+    prong_sorters : dict or None
+        Prong sorting specifications. C.f. `add_prong_sorters`.
+    noise : list of dict or dict or None
+        Noise configuration. C.f. `add_noise`.
+
+    Returns
+    -------
+    list of IDataGenerator
+        DataGenerators from `dgen_list` decorated by `DataAugment`.
+
+    See Also
+    --------
+    DataAugment
+    """
+
+    LOGGER.info(
+        "Adding fused augmentation. Prong sorters: %s. Noise: %s",
+        json.dumps(prong_sorters, sort_keys = True),
+        json.dumps(noise, sort_keys = True)
+    )
+
+    return [ DataAugment(x, prong_sorters, noise) for x in dgen_list ]
+
+def add_keras_sequences(
+    dgen_list, prefetch, prefetch_mode, workers, parts = None, seed = None
+):
+    """Make DataGenerators from `dgen_list` usable by `keras`.
+
+    Parameters
+    ----------
+    dgen_list : list of IDataGenerator
+        List of DataGenerators to be decorated.
+    prefetch : int or None
+        If not None, then `prefetch` batches will be produced ahead of the
+        training by background workers. Otherwise, batches will be produced
+        on demand.
+    prefetch_mode : { 'thread', 'process', None }
+        Type of the prefetch workers. If None, threads will be used.
+    workers : int or None
+        Number of prefetch workers. If None, 1 worker will be used.
+    parts : list of int or None, optional
+        Parts of the train/test split (0 -- train, 1 -- test) of `dgen_list`.
+        If `prefetch` is used, then the order of training batches is
+        shuffled at each epoch by `PrefetchSequence`, unless they are
+        already shuffled by a disk cache read ahead (`DataPrefetch`). If
+        None, batches are not shuffled. Default: None.
+    seed : int or None, optional
+        Seed of the batch order shuffling. Default: None.
+
+    Returns
+    -------
+    list of IDataGenerator
+        List of decorated DataGenerators.
+
+    See Also
+    --------
+    KerasSequence
+    PrefetchSequence
+    """
+    # pylint: disable = import-outside-toplevel
+
+    if not prefetch:
+        from lstm_ee.data.data_generator.keras_sequence import KerasSequence
+        return [ KerasSequence(x) for x in dgen_list ]
+
+    from lstm_ee.data.data_generator.prefetch_sequence import (
+        PrefetchSequence
+    )
+
+    prefetch_mode = prefetch_mode or 'thread'
+    workers       = workers or 1
+
+    if parts is None:
+        parts = [ None ] * len(dgen_list)
+
+    LOGGER.info(
+        "Producing %d batches ahead with %d %s workers",
+        prefetch, workers, prefetch_mode
+    )
+
+    result = []
+
+    for (part, dgen) in zip(parts, dgen_list):
+        # Disk cache read ahead needs batches to be requested sequentially
+        read_ahead = find_decorator(dgen, DataPrefetch)
+        shuffle    = (
+                (part == 0)
+            and ((read_ahead is None) or (not read_ahead.shuffle))
+        )
+
+        result.append(PrefetchSequence(
+            dgen, prefetch, workers, prefetch_mode, shuffle, seed
+        ))
+
+    return result
+
+def create_data_generators(
+    datadir             = None,
+    dataset             = None,
+    batch_size          = 1024,
+    max_prongs          = None,
+    noise               = None,
+    prong_sorters       = None,
+    seed                = None,
+    test_size           = 0.2,
+    weights             = None,
+    vars_input_slice    = None,
+    vars_input_png3d    = None,
+    vars_input_png2d    = None,
+    var_target_total    = None,
+    var_target_primary  = None,
+    cache               = True,
+    disk_cache          = True,
+    concurrency         = None,
+    workers             = 1,
+    event_store         = False,
+    disk_cache_prefetch = None,
+    chunksize           = None,
+    prefetch            = None,
+    prefetch_mode       = None,
+    fuse_augment        = False,
+    instrument          = None,
+    stream_buffer       = None,
+    stream_chunk        = None,
+    filters             = None,
+    derived_vars        = None,
+    resample            = None,
+    epoch_window        = None,
+    test_index          = None,
 ):
     """
     Construct train/test DataGenerators from a dataset.
@@ -499,18 +1093,68 @@ def create_data_generators(
     disk_cache : bool or None
         Specifies whether to cache batches on disk.
         C.f. `add_disk_cache_decorators`.
-    concurrency : { None, 'thread', 'process' }
+    concurrency : { None, 'thread', 'process', 'stream' }
         If not None then batches will be precomputed in parallel.
         C.f. `add_cache_decorators`.
     workers : int or None
         Number of parallel threads/processes to use for precomputing batches.
         C.f. `add_cache_decorators`.
+    event_store : bool or None
+        Specifies whether to gather batches from a preprocessed event store.
+        C.f. `create_basic_data_generators`.
+    disk_cache_prefetch : int or None
+        Number of disk cached batches to read ahead.
+        C.f. `create_basic_data_generators`.
+    chunksize : int or None
+        Number of batches sent to a worker process at once.
+        C.f. `add_cache_decorators`.
+    prefetch : int or None
+        Number of batches to produce ahead of the training.
+        C.f. `add_keras_sequences`.
+    prefetch_mode : { None, 'thread', 'process' }
+        Type of the prefetch workers. C.f. `add_keras_sequences`.
+    fuse_augment : bool or None
+        If True, then prong sorting, noise and NaN masking will be performed
+        by a single fused decorator. C.f. `add_fused_augment`.
+    instrument : bool or None
+        If True, then each stage of the data pipeline will be instrumented.
+        If None, then the instrumentation is controlled by the environment
+        variable `LSTM_EE_INSTRUMENT`.
+        C.f. `lstm_ee.data.instrument.instrument_data_generators`.
+    stream_buffer : int or None
+        If not None, then the dataset will be streamed from disk in chunks
+        instead of being loaded into memory, and training events will be
+        shuffled in a buffer of `stream_buffer` events. Caches and
+        concurrency other than the thread based prefetching are not
+        supported in this mode.
+        C.f. `create_stream_data_generators`.
+    stream_chunk : int or None
+        Number of events read at once in the streaming mode.
+        C.f. `create_stream_data_generators`.
+    filters : str or list of str or None
+        Selection cuts to apply to the dataset at load time.
+        C.f. `DataFilter`.
+    derived_vars : dict or None
+        Definitions of variables to derive from the dataset variables at
+        load time. C.f. `DerivedVariables`.
+    resample : dict or None
+        If not None, then training events will be drawn according to
+        `weights` each epoch, instead of being weighted. Not supported
+        together with caches and streaming. C.f. `add_weights`.
+    epoch_window : int or None
+        If not None, then each training epoch will consist of `epoch_window`
+        batches, continuing from the batch where the previous epoch has
+        stopped. C.f. `DataEpochWindow`.
+    test_index : ndarray or None
+        If not None, then only the test DataGenerator will be created from
+        the rows `test_index` of the dataset. Not supported in the
+        streaming mode. C.f. `create_basic_data_generators`.
 
     Returns
     -------
     [ IDataGenerator, IDataGenerator ]
         Train and test DataGenerators that can be used for training with
-        `keras`.
+        `keras`. Only the test DataGenerator if `test_index` is not None.
 
     See Also
     --------
@@ -519,53 +1163,242 @@ def create_data_generators(
     add_cache_decorators
     add_prong_sorters
     add_noise
+    add_fused_augment
+    add_keras_sequences
+    create_stream_data_generators
     """
 
+    if (resample is not None) and (
+        cache or disk_cache or (stream_buffer is not None)
+    ):
+        raise RuntimeError(
+            "Resampling is not supported with caches and in the streaming"
+            " mode"
+        )
 
-    dgen_list = create_basic_data_generators(
-        datadir, dataset, batch_size, max_prongs, seed, test_size,
-        vars_input_slice, vars_input_png3d, vars_input_png2d,
-        var_target_total, var_target_primary, disk_cache
+    parts = [ 0, 1 ] if test_index is None else [ 1 ]
+
+    if stream_buffer is not None:
+        if test_index is not None:
+            raise RuntimeError(
+                "Loading of the saved test sample is not supported in the"
+                " streaming mode"
+            )
+
+        if cache or disk_cache or event_store:
+            raise RuntimeError(
+                "Caches are not supported in the streaming mode"
+            )
+
+        if (concurrency is not None) or (prefetch_mode == 'process'):
+            raise RuntimeError(
+                "Only thread based prefetching is supported in the"
+                " streaming mode"
+            )
+
+        dgen_list = create_stream_data_generators(
+            datadir, dataset, batch_size, max_prongs, seed, test_size,
+            weights, vars_input_slice, vars_input_png3d, vars_input_png2d,
+            var_target_total, var_target_primary, stream_buffer,
+            stream_chunk, filters, derived_vars
+        )
+    else:
+        dgen_list = create_basic_data_generators(
+            datadir, dataset, batch_size, max_prongs, seed, test_size,
+            vars_input_slice, vars_input_png3d, vars_input_png2d,
+            var_target_total, var_target_primary, disk_cache, event_store,
+            disk_cache_prefetch, filters, derived_vars, test_index
+        )
+
+        # Unseeded shuffle does not reproduce the event order of a split
+        split_key = None
+
+        if seed is not None:
+            split_key = get_split_key(
+                datadir, dataset, seed, test_size, filters, derived_vars
+            )
+
+        dgen_list = add_weights(
+            dgen_list, batch_size, weights, datadir, split_key,
+            resample, seed, parts
+        )
+        dgen_list = add_cache_decorators(
+            dgen_list, cache, concurrency, workers, chunksize
+        )
+
+    if fuse_augment:
+        dgen_list = add_fused_augment(dgen_list, prong_sorters, noise)
+    else:
+        dgen_list = add_prong_sorters(
+            dgen_list, prong_sorters, vars_input_png2d, vars_input_png3d
+        )
+        dgen_list = add_noise(dgen_list, noise)
+        dgen_list = [ DataNANMask(x) for x in dgen_list ]
+
+    if (epoch_window is not None) and (parts[0] == 0):
+        LOGGER.info("Rotating training epochs of %d batches", epoch_window)
+        dgen_list[0] = DataEpochWindow(dgen_list[0], epoch_window)
+
+    # Generator side hook of the `TrainThroughput` callback
+    dgen_list = [ DataTimer(x) for x in dgen_list ]
+
+    if is_instrument_enabled(instrument):
+        dgen_list = instrument_data_generators(
+            dgen_list, [ PART_NAMES[idx] for idx in parts ]
+        )
+
+    dgen_list = add_keras_sequences(
+        dgen_list, prefetch, prefetch_mode, workers, parts, seed
     )
 
-    dgen_list = add_weights(dgen_list, batch_size, weights)
-    dgen_list = add_cache_decorators(dgen_list, cache, concurrency, workers)
+    return dgen_list
 
-    dgen_list = add_prong_sorters(
-        dgen_list, prong_sorters, vars_input_png2d, vars_input_png3d
+def get_args_split_key(args):
+    """Get key of the train/test split defined by `args`"""
+    result = get_split_key(
+        args.root_datadir, args.dataset, args.seed, args.test_size,
+        args.filters, args.derived_vars
     )
-    dgen_list = add_noise(dgen_list, noise)
-    dgen_list = [ DataNANMask(x) for x in dgen_list ]
 
-    # pylint: disable = import-outside-toplevel
-    from lstm_ee.data.data_generator.keras_sequence import KerasSequence
-    dgen_list = [ KerasSequence(x) for x in dgen_list ]
+    if args.stream_buffer is not None:
+        # Streamed split is drawn per event and differs from the shuffled one
+        result['stream'] = True
 
-    return dgen_list
+    return result
+
+def get_index_digest(index):
+    """Calculate checksum of the saved split indices `index`"""
+    return hashlib.sha1(np.ascontiguousarray(index).tobytes()).hexdigest()
+
+def save_split(args, dgen):
+    """Save rows of the test sample of `dgen` to `args.savedir`.
+
+    The rows are saved to `args.savedir`/split_test.npy, and the key of the
+    split together with the checksum of the rows is saved to
+    `args.savedir`/split.json. C.f. `load_split`.
+
+    Parameters
+    ----------
+    args : Args
+        Arguments that define the dataset and its train/test split.
+    dgen : IDataGenerator
+        Test DataGenerator created by `load_data`.
+    """
+    index = np.asarray(dgen.data_loader.get_base_index(), dtype = np.int64)
+    np.save(os.path.join(args.savedir, SPLIT_INDEX_FNAME), index)
+
+    split = {
+        'key'    : get_args_split_key(args),
+        'size'   : len(index),
+        'digest' : get_index_digest(index),
+    }
 
-def load_data(args):
+    with open(os.path.join(args.savedir, SPLIT_FNAME), 'wt') as f:
+        json.dump(split, f, sort_keys = True, indent = 4)
+
+def load_split(args):
+    """Load rows of the test sample saved by `save_split`.
+
+    Parameters
+    ----------
+    args : Args
+        Arguments that define the dataset and its train/test split.
+
+    Returns
+    -------
+    ndarray or None
+        Rows of the raw dataset that make the test sample. None if the split
+        was not saved, or if it was saved for a different dataset (e.g. the
+        dataset files were modified) or split parameters.
+    """
+    path = os.path.join(args.savedir, SPLIT_FNAME)
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rt') as f:
+        split = json.load(f)
+
+    # Normalize key, so that it can be compared to the saved one
+    key = json.loads(json.dumps(get_args_split_key(args)))
+
+    if split['key'] != key:
+        LOGGER.info("Saved train/test split does not match the dataset")
+        return None
+
+    index = np.load(os.path.join(args.savedir, SPLIT_INDEX_FNAME))
+
+    if (
+           (len(index) != split['size'])
+        or (get_index_digest(index) != split['digest'])
+    ):
+        LOGGER.warning("Saved train/test split is corrupted. Ignoring it.")
+        return None
+
+    return index
+
+def load_data(args, test_index = None):
     """
     Wrapper around `create_data_generators` that unpacks arguments from `args`.
     """
 
     return create_data_generators(
-        datadir            = args.root_datadir,
-        dataset            = args.dataset,
-        batch_size         = args.batch_size,
-        max_prongs         = args.max_prongs,
-        noise              = args.noise,
-        prong_sorters      = args.prong_sorters,
-        seed               = args.seed,
-        test_size          = args.test_size,
-        weights            = args.weights,
-        vars_input_slice   = args.vars_input_slice,
-        vars_input_png3d   = args.vars_input_png3d,
-        vars_input_png2d   = args.vars_input_png2d,
-        var_target_total   = args.var_target_total,
-        var_target_primary = args.var_target_primary,
-        cache              = args.cache,
-        disk_cache         = args.disk_cache,
-        concurrency        = args.concurrency,
-        workers            = args.workers,
+        datadir             = args.root_datadir,
+        dataset             = args.dataset,
+        batch_size          = args.batch_size,
+        max_prongs          = args.max_prongs,
+        noise               = args.noise,
+        prong_sorters       = args.prong_sorters,
+        seed                = args.seed,
+        test_size           = args.test_size,
+        weights             = args.weights,
+        vars_input_slice    = args.vars_input_slice,
+        vars_input_png3d    = args.vars_input_png3d,
+        vars_input_png2d    = args.vars_input_png2d,
+        var_target_total    = args.var_target_total,
+        var_target_primary  = args.var_target_primary,
+        cache               = args.cache,
+        disk_cache          = args.disk_cache,
+        concurrency         = args.concurrency,
+        workers             = args.workers,
+        event_store         = args.event_store,
+        disk_cache_prefetch = args.disk_cache_prefetch,
+        chunksize           = args.chunksize,
+        prefetch            = args.prefetch,
+        prefetch_mode       = args.prefetch_mode,
+        fuse_augment        = args.fuse_augment,
+        instrument          = args.instrument,
+        stream_buffer       = args.stream_buffer,
+        stream_chunk        = args.stream_chunk,
+        filters             = args.filters,
+        derived_vars        = args.derived_vars,
+        resample            = args.resample,
+        epoch_window        = (
+            args.steps_per_epoch if args.rotate_epochs else None
+        ),
+        test_index          = test_index,
     )
 
+def load_test_data(args):
+    """Create only the test DataGenerator of `args`.
+
+    If the train/test split was saved by the training (c.f. `save_split`),
+    then only the test rows of the dataset are loaded. Otherwise, this
+    function falls back to `load_data`.
+
+    Returns
+    -------
+    IDataGenerator
+        Test DataGenerator.
+    """
+
+    test_index = None
+
+    if args.stream_buffer is None:
+        test_index = load_split(args)
+
+    if test_index is None:
+        return load_data(args)[1]
+
+    return load_data(args, test_index)[0]
+
@@ -8,20 +8,31 @@ This module also defines a number of transformations that modify data batches
 produced by the `DataGenerator` (following the Decorator Pattern).
 """
 
+from .data_augment         import DataAugment
 from .data_cache           import DataCache
 from .data_disk_cache      import DataDiskCache
+from .data_epoch_window    import DataEpochWindow
 from .data_generator       import DataGenerator
 from .data_nan_mask        import DataNANMask
 from .data_noise           import DataNoise
+from .data_prefetch        import DataPrefetch
 from .data_prong_sorter    import DataProngSorter
+from .data_resample        import DataResample
 from .data_smear           import DataSmear
+from .data_store_generator import DataStoreGenerator
+from .data_stream_generator import DataStreamGenerator
+from .data_timer           import DataTimer
 from .data_weight          import DataWeight
+from .event_store          import EventStore
 from .multiprocessed_cache import MultiprocessedCache
 from .multithreaded_cache  import MultithreadedCache
+from .streaming_cache      import StreamingCache
 
 __all__ = [
-    'DataCache', 'DataDiskCache', 'DataGenerator', 'DataNANMask', 'DataNoise',
-    'DataProngSorter', 'DataSmear', 'DataWeight', 'MultiprocessedCache',
-    'MultithreadedCache'
+    'DataAugment', 'DataCache', 'DataDiskCache', 'DataEpochWindow',
+    'DataGenerator', 'DataNANMask', 'DataNoise', 'DataPrefetch',
+    'DataProngSorter', 'DataResample', 'DataSmear', 'DataStoreGenerator',
+    'DataStreamGenerator', 'DataTimer', 'DataWeight', 'EventStore',
+    'MultiprocessedCache', 'MultithreadedCache', 'StreamingCache',
 ]
 
@@ -8,13 +8,119 @@ import fcntl
 import hashlib
 import json
 import logging
-import pickle
+import mmap
 import tempfile
+import threading
+
+import numpy as np
+
+from lstm_ee.consts import CACHE_MAX_SIZE
+from ..funcs.disk_cache import lock_cache_dir, prune_caches, touch_cache
 
 LOGGER = logging.getLogger(
     'lstm_ee.data.data_generator.base.data_disk_cache_base'
 )
 
+# Version of the on-disk cache layout
+CACHE_VERSION = 2
+
+# Alignment (in bytes) of batches and arrays in the cache data file
+ALIGNMENT = 64
+
+# Columns of the batch table that precede array shapes
+COL_FILLED = 0
+COL_OFFSET = 1
+COL_SHAPES = 2
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def flatten_batch(batch):
+    """Flatten nested batch into a list of arrays and its structure.
+
+    Parameters
+    ----------
+    batch : tuple, list, dict, ndarray or None
+        Nested structure of arrays, e.g. (inputs, targets, weights) tuple
+        returned by `IDataGenerator`.
+
+    Returns
+    -------
+    (leaves, treedef)
+        `leaves` is a list of C contiguous arrays found in `batch`.
+        `treedef` is a json serializable description of the `batch` structure
+        that allows to reassemble it from `leaves`.
+
+    See Also
+    --------
+    unflatten_batch
+    """
+    leaves = []
+
+    def flatten(obj):
+        if obj is None:
+            return { 'type' : 'none' }
+
+        if isinstance(obj, dict):
+            return {
+                'type'  : 'dict',
+                'keys'  : list(obj.keys()),
+                'items' : [ flatten(v) for v in obj.values() ],
+            }
+
+        if isinstance(obj, (list, tuple)):
+            return {
+                'type'  : type(obj).__name__,
+                'items' : [ flatten(v) for v in obj ],
+            }
+
+        obj = np.ascontiguousarray(obj)
+
+        if obj.dtype.hasobject:
+            raise ValueError("Cannot cache arrays of python objects")
+
+        leaves.append(obj)
+        return { 'type' : 'array', 'dtype' : obj.dtype.str, 'ndim' : obj.ndim }
+
+    treedef = flatten(batch)
+    return (leaves, treedef)
+
+def unflatten_batch(leaves, treedef):
+    """Reassemble batch from a list of arrays and its structure.
+
+    C.f. `flatten_batch`.
+    """
+    leaves = iter(leaves)
+
+    def unflatten(node):
+        if node['type'] == 'none':
+            return None
+
+        if node['type'] == 'array':
+            return next(leaves)
+
+        items = [ unflatten(x) for x in node['items'] ]
+
+        if node['type'] == 'dict':
+            return dict(zip(node['keys'], items))
+
+        if node['type'] == 'tuple':
+            return tuple(items)
+
+        return items
+
+    return unflatten(treedef)
+
+def get_treedef_leaves(treedef):
+    """Return a list of array nodes of `treedef` in the flattening order"""
+    if treedef['type'] == 'array':
+        return [ treedef ]
+
+    if treedef['type'] == 'none':
+        return []
+
+    return [ x for node in treedef['items'] for x in get_treedef_leaves(node) ]
+
 class DataDiskCacheBase:
     """A decorator around DataGenerator that caches results on a disk.
 
@@ -22,6 +128,26 @@ class DataDiskCacheBase:
     than building them on the fly from the raw dataset. This decorator
     caches data batches constructed by the DataGenerator on a disk.
 
+    All batches are stored in a single append-only data file ("data.bin").
+    Positions and array shapes of the batches in the data file are kept in a
+    preallocated batch table ("index.npy"). Both files are memory mapped, so
+    the cached batches are served straight from the OS page cache without
+    any deserialization. Each served batch is a private copy-on-write mapping
+    of the data file -- it can be safely modified in place.
+
+    A batch is published in the batch table only after its arrays are
+    completely written to the data file. Concurrent writers (threads and
+    processes) are serialized with a lock file. Therefore, the cache can be
+    filled concurrently and an interrupted fill never exposes partially
+    written batches.
+
+    Before building a missing batch, a thread or a process claims it by
+    locking the corresponding byte of the claims file ("claims.lock") with an
+    `fcntl` range lock. Others that need the same batch wait for the claim to
+    be released and then read the batch from the cache instead of building
+    it again. `fill` skips batches claimed by others and returns to them at
+    the end, so that several processes sharing the cache split its build.
+
     Parameters
     ----------
     dgen : DataGenerator
@@ -42,8 +168,12 @@ class DataDiskCacheBase:
 
     Notes
     -----
-    Caches on the disk should be cleaned manually. They are stored under
-    `datadir`/.cache
+    Caches on the disk are stored under `datadir`/.cache. Each cache keeps
+    its last access time and size in a file "meta.json". If environment
+    variable LSTM_EE_CACHE_MAX_SIZE (e.g. "100G") is set, then least recently
+    used caches that are not opened by any process are evicted, whenever a
+    cache is opened, to keep their total size under this limit. Otherwise,
+    caches should be cleaned manually, e.g. with `scripts/data/cache_admin.py`
     """
 
     def __init__(self, dgen, datadir, **kwargs):
@@ -51,7 +181,68 @@ class DataDiskCacheBase:
         self._config  = copy.deepcopy(kwargs)
         self._datadir = datadir
 
+        self._active_lock = None
+
         self._init_cache_dir()
+        self._init_handles()
+        self._enforce_size_limit()
+
+    def _init_handles(self):
+        """Reset memory maps and locks. Memory maps are opened lazily."""
+        self._table   = None
+        self._treedef = None
+        self._leaves  = None
+        self._lock    = threading.Lock()
+
+        # NOTE: POSIX range locks are released when any descriptor of the
+        #       claims file is closed by the process. Therefore, the claims
+        #       file is opened once and kept open.
+        self._claims   = None
+        self._building = {}
+
+    def __getstate__(self):
+        """Serialize object for pickle.
+
+        Memory maps and locks are dropped when pickling and reopened at first
+        use.
+        """
+        state = copy.copy(self.__dict__)
+
+        for k in [
+            '_table', '_treedef', '_leaves', '_lock', '_active_lock',
+            '_claims', '_building',
+        ]:
+            state.pop(k, None)
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._active_lock = None
+
+        self._acquire_active_lock()
+        self._init_handles()
+
+    def _acquire_active_lock(self):
+        """Hold shared lock that protects cache from eviction while in use"""
+        # pylint: disable=consider-using-with
+        self._active_lock = open(self._get_fname('active.lock'), 'a')
+        fcntl.flock(self._active_lock, fcntl.LOCK_SH)
+
+    def __del__(self):
+        for k in [ '_active_lock', '_claims' ]:
+            if getattr(self, k, None) is not None:
+                getattr(self, k).close()
+
+    def _enforce_size_limit(self):
+        """Evict least recently used caches if total size exceeds limit"""
+        if CACHE_MAX_SIZE is None:
+            return
+
+        prune_caches(
+            os.path.dirname(self._cache_root), max_size = CACHE_MAX_SIZE,
+            keep = [ self._cache_root ]
+        )
 
     def _save_cache_config(self):
         """Save cache configuration to a disk if it is missing.
@@ -102,45 +293,304 @@ class DataDiskCacheBase:
         self._cache_root = os.path.join(
             self._datadir, '.cache', '%s' % (cachedir)
         )
-        os.makedirs(self._cache_root, exist_ok = True)
 
-        self._save_cache_config()
+        with lock_cache_dir(os.path.dirname(self._cache_root), fcntl.LOCK_SH):
+            os.makedirs(self._cache_root, exist_ok = True)
 
-    def _get_batch_fname(self, index):
-        return os.path.join(self._cache_root, 'batch_%d.pkl' % (index,))
+            self._save_cache_config()
+            self._acquire_active_lock()
 
-    def _load_batch(self, index):
-        batch_fname = self._get_batch_fname(index)
+        touch_cache(self._cache_root)
+
+    def _get_fname(self, name):
+        return os.path.join(self._cache_root, name)
+
+    def _set_layout(self, treedef):
+        """Set structure of the cached batches"""
+        self._treedef = treedef
+        self._leaves  = get_treedef_leaves(treedef)
+
+    def _open_table(self):
+        """Memory map batch table if it exists.
+
+        Returns
+        -------
+        bool
+            True if the batch table exists.
+        """
+        if self._table is not None:
+            return True
 
         try:
-            with open(batch_fname, 'rb') as f:
-                batch = pickle.load(f)
+            with open(self._get_fname('layout.json'), 'rt') as f:
+                layout = json.load(f)
+
+            table = np.load(self._get_fname('index.npy'), mmap_mode = 'r+')
         except IOError:
-            return None
+            return False
 
-        return batch
+        if layout['version'] != CACHE_VERSION:
+            raise RuntimeError(
+                "Unsupported disk cache version %s at %s" % (
+                    layout['version'], self._cache_root
+                )
+            )
+
+        self._set_layout(layout['treedef'])
+        self._table = table
+
+        return True
+
+    def _create_table(self, treedef):
+        """Create an empty batch table and data file.
 
-    def _fetch_batch(self, index):
-        """Retrieves batch from the decorated object and saves it to disk."""
-        batch       = self._dgen[index]
-        batch_fname = self._get_batch_fname(index)
+        Must be called with the write lock held.
+        """
+        leaves = get_treedef_leaves(treedef)
+        ncols  = COL_SHAPES + sum(x['ndim'] for x in leaves)
+        layout = {
+            'version' : CACHE_VERSION,
+            'len'     : len(self._dgen),
+            'treedef' : treedef,
+        }
+
+        open(self._get_fname('data.bin'), 'ab').close()
 
         # To ensure atomicity of writes
+        with tempfile.NamedTemporaryFile(
+            'wt', dir = self._cache_root, delete = False
+        ) as f:
+            temp_fname = f.name
+            json.dump(layout, f, indent = 4)
+
+        os.rename(temp_fname, self._get_fname('layout.json'))
+
         with tempfile.NamedTemporaryFile(
             'wb', dir = self._cache_root, delete = False
         ) as f:
             temp_fname = f.name
-            pickle.dump(batch, f)
 
-        os.rename(temp_fname, batch_fname)
+        table = np.lib.format.open_memmap(
+            temp_fname, mode = 'w+', dtype = np.int64,
+            shape = (len(self._dgen), ncols)
+        )
+        table.flush()
+        del table
+
+        os.rename(temp_fname, self._get_fname('index.npy'))
+
+    def _map_batch(self, row):
+        """Memory map batch described by a row of the batch table"""
+        offset = int(row[COL_OFFSET])
+        dims   = iter(int(x) for x in row[COL_SHAPES:])
+
+        specs  = []
+        nbytes = 0
+
+        for leaf in self._leaves:
+            dtype  = np.dtype(leaf['dtype'])
+            shape  = tuple(next(dims) for _ in range(leaf['ndim']))
+
+            nbytes = _align(nbytes)
+            specs.append((nbytes, dtype, shape))
+            nbytes += dtype.itemsize * int(np.prod(shape))
+
+        buffer = None
+
+        if nbytes > 0:
+            start  = offset - offset % mmap.ALLOCATIONGRANULARITY
+
+            with open(self._get_fname('data.bin'), 'rb') as f:
+                buffer = mmap.mmap(
+                    f.fileno(), nbytes + (offset - start),
+                    access = mmap.ACCESS_COPY, offset = start
+                )
+
+            offset = offset - start
+
+        leaves = []
+
+        for (leaf_offset, dtype, shape) in specs:
+            if buffer is None or np.prod(shape) == 0:
+                leaves.append(np.empty(shape, dtype = dtype))
+            else:
+                leaves.append(np.ndarray(
+                    shape, dtype, buffer = buffer,
+                    offset = offset + leaf_offset
+                ))
+
+        return unflatten_batch(leaves, self._treedef)
+
+    def _load_batch(self, index):
+        if not self._open_table():
+            return None
+
+        row = np.array(self._table[index])
+
+        if row[COL_FILLED] == 0:
+            return None
+
+        return self._map_batch(row)
+
+    def _write_batch(self, index, leaves):
+        """Append `leaves` to the data file and publish them in the table.
+
+        Must be called with the write lock held.
+        """
+        with open(self._get_fname('data.bin'), 'ab') as f:
+            f.seek(0, os.SEEK_END)
+
+            start  = f.tell()
+            offset = _align(start)
+            f.write(b'\0' * (offset - start))
+
+            for leaf in leaves:
+                f.write(b'\0' * (_align(f.tell()) - f.tell()))
+                f.write(leaf.tobytes())
+
+            f.flush()
+
+        row = self._table[index]
+        row[COL_OFFSET] = offset
+        row[COL_SHAPES:] = [ x for leaf in leaves for x in leaf.shape ]
+
+        # Publish batch after all of its data is written
+        row[COL_FILLED] = 1
+
+    def _save_batch(self, index, batch):
+        """Save `batch` to the disk cache."""
+        leaves, treedef = flatten_batch(batch)
+
+        with self._lock, open(self._get_fname('data.lock'), 'w') as lockf:
+            fcntl.flock(lockf, fcntl.LOCK_EX)
+
+            if not self._open_table():
+                self._create_table(treedef)
+                self._open_table()
+
+            if treedef != self._treedef:
+                raise RuntimeError(
+                    "Batch structure differs from the cached batches at %s"
+                        % self._cache_root
+                )
+
+            if self._table[index, COL_FILLED] == 0:
+                self._write_batch(index, leaves)
+
+    def _claim(self, index, block):
+        """Claim batch `index` for building. Return True if succeeded."""
+        with self._lock:
+            if self._claims is None:
+                # pylint: disable=consider-using-with
+                self._claims = open(self._get_fname('claims.lock'), 'a')
+
+        if block:
+            fcntl.lockf(self._claims, fcntl.LOCK_EX, 1, index)
+            return True
+
+        try:
+            fcntl.lockf(self._claims, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, index)
+        except (IOError, OSError):
+            return False
+
+        return True
+
+    def _release(self, index):
+        fcntl.lockf(self._claims, fcntl.LOCK_UN, 1, index)
+
+    def _fetch_batch(self, index, block = True):
+        """Retrieves batch from the decorated object and saves it to disk.
+
+        If the batch is being built by another thread or process, this
+        function waits until it is done and loads the batch from the cache.
+
+        Parameters
+        ----------
+        index : int
+            Index of the batch.
+        block : bool, optional
+            If False and the batch is claimed by another thread or process,
+            then return None instead of waiting. Default: True.
+
+        Returns
+        -------
+        batch or None
+            Batch `index` or None if the batch is claimed and `block` is
+            False.
+        """
+        # POSIX range locks do not exclude threads of the same process
+        with self._lock:
+            thread_lock = self._building.setdefault(index, threading.Lock())
+
+        if not thread_lock.acquire(blocking = block):
+            return None
+
+        try:
+            if not self._claim(index, block):
+                return None
+
+            try:
+                batch = self._load_batch(index)
+
+                if batch is None:
+                    LOGGER.debug("Cache miss. Fetching batch: %d", index)
+                    batch = self._dgen[index]
+                    self._save_batch(index, batch)
+            finally:
+                self._release(index)
+        finally:
+            thread_lock.release()
 
         return batch
 
+    def is_cached(self, index):
+        """Check whether batch `index` is present in the disk cache"""
+        if not self._open_table():
+            return False
+
+        return bool(self._table[index, COL_FILLED])
+
+    def fill(self, indices = None):
+        """Generate and save batches that are missing in the cache.
+
+        Parameters
+        ----------
+        indices : list of int or None, optional
+            Indices of batches to be filled. If None, all batches will be
+            filled. Default: None.
+        """
+        if indices is None:
+            indices = range(len(self._dgen))
+
+        skipped = []
+
+        # First, build batches that are not claimed by others
+        for index in indices:
+            if self.is_cached(index):
+                continue
+
+            if self._fetch_batch(index, block = False) is None:
+                skipped.append(index)
+
+        # Then, wait for the batches claimed by others
+        for index in skipped:
+            if not self.is_cached(index):
+                self._fetch_batch(index)
+
+        touch_cache(self._cache_root)
+
+    @property
+    def cache_root(self):
+        """Directory where the cache is stored"""
+        return self._cache_root
+
     def __getitem__(self, index):
+        if index < 0:
+            index += len(self._dgen)
+
         batch = self._load_batch(index)
 
         if batch is None:
-            LOGGER.debug("Cache miss. Fetching batch: %d", index)
             batch = self._fetch_batch(index)
 
         return batch
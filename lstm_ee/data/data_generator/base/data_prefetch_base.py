@@ -0,0 +1,245 @@
+"""
+A definition of a decorator that reads batches ahead in background threads.
+"""
+
+import copy
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+LOGGER = logging.getLogger(
+    'lstm_ee.data.data_generator.base.data_prefetch_base'
+)
+
+def materialize_batch(batch):
+    """Copy all arrays of a nested `batch` into RAM.
+
+    Batches returned by the disk cache are lazy memory maps. Copying them
+    forces the actual disk reads to happen in the calling thread.
+    """
+    if isinstance(batch, dict):
+        return { k : materialize_batch(v) for (k, v) in batch.items() }
+
+    if isinstance(batch, (list, tuple)):
+        return type(batch)(materialize_batch(x) for x in batch)
+
+    if isinstance(batch, np.ndarray):
+        return np.array(batch)
+
+    return batch
+
+class DataPrefetchBase:
+    """A decorator around DataGenerator that reads batches ahead of time.
+
+    This decorator predicts which batches will be requested next and loads
+    them from the decorated object on a small thread pool. It is intended to
+    hide latency of slow disks (e.g. network filesystems) when batches are
+    served by the disk cache.
+
+    The next batch indices are predicted from the last requested index. By
+    default batches are assumed to be requested sequentially, wrapping around
+    at the end of the epoch. If the batches are requested in a known
+    permuted order, the order can be supplied with `set_order`.
+
+    If `shuffle` is True, then the decorator shuffles the order of batches
+    itself: batch `index` of an epoch is the batch `order[index]` of the
+    decorated object, where `order` is a permutation drawn from `seed` anew
+    at each epoch (c.f. `next_epoch`). Thus, batches can be requested
+    sequentially, while the read ahead follows the known permutation.
+
+    At most `depth` batches are kept in flight or ready. Batches that are not
+    predicted correctly are loaded synchronously.
+
+    Parameters
+    ----------
+    dgen : IDataGenerator
+        `IDataGenerator` to read batches from. It needs to be thread safe.
+    depth : int
+        Number of batches to read ahead.
+    workers : int, optional
+        Number of reading threads. Default: 1.
+    order : list of int or None, optional
+        Order in which batches will be requested. If None, then sequential
+        order will be assumed. Ignored if `shuffle` is True. Default: None.
+    shuffle : bool, optional
+        Whether to shuffle the order of batches at each epoch.
+        Default: False.
+    seed : int or None, optional
+        Seed of the batch order shuffling. If None, the order will not be
+        reproducible. Default: None.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self, dgen, depth, workers = 1, order = None, shuffle = False,
+        seed = None
+    ):
+        self._dgen    = dgen
+        self._depth   = depth
+        self._workers = workers
+        self._shuffle = shuffle
+        self._seed    = seed
+        self._epoch   = 0
+
+        if shuffle:
+            order = self._get_shuffled_order()
+
+        self.set_order(order)
+        self._init_state()
+
+    def _init_state(self):
+        self._lock     = threading.Lock()
+        self._executor = None
+        self._pending  = {}
+        self._stats    = {
+            'hits' : 0, 'waits' : 0, 'misses' : 0, 'wait_time' : 0.0
+        }
+        self._nreq     = 0
+
+    def __getstate__(self):
+        """Serialize object for pickle.
+
+        Thread pool, pending batches and locks are dropped when pickling.
+        """
+        state = copy.copy(self.__dict__)
+
+        for k in [ '_lock', '_executor', '_pending', '_stats', '_nreq' ]:
+            state.pop(k, None)
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
+
+    def set_order(self, order):
+        """Set order in which batches are going to be requested.
+
+        Parameters
+        ----------
+        order : list of int or None
+            Batch indices in the order of requests. If None, then sequential
+            order will be assumed.
+        """
+        if order is None:
+            self._order     = None
+            self._positions = None
+            return
+
+        self._order     = np.array(order, dtype = int)
+        self._positions = np.empty(len(self._order), dtype = int)
+        self._positions[self._order] = np.arange(len(self._order))
+
+    def _get_shuffled_order(self):
+        if self._seed is None:
+            prg = np.random.RandomState()
+        else:
+            prg = np.random.RandomState([ self._seed, self._epoch ])
+
+        return prg.permutation(len(self._dgen))
+
+    def next_epoch(self):
+        """Draw the batch order of the next epoch if `shuffle` is True"""
+        if not self._shuffle:
+            return
+
+        with self._lock:
+            self._epoch += 1
+            self.set_order(self._get_shuffled_order())
+
+    @property
+    def stats(self):
+        """Dictionary of prefetch statistics.
+
+        Contains number of requests that were served from ready batches
+        ('hits'), that had to wait for an in-flight batch ('waits'), that
+        were not predicted ('misses') and the total time spent waiting
+        ('wait_time') in seconds.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        """Reset prefetch statistics"""
+        with self._lock:
+            for k in self._stats:
+                self._stats[k] = type(self._stats[k])(0)
+
+    def _predict(self, index):
+        """Predict indices of `depth` batches that follow `index`"""
+        n     = len(self._dgen)
+        steps = range(1, min(self._depth, n - 1) + 1)
+
+        if self._order is None:
+            return [ (index + i) % n for i in steps ]
+
+        pos = self._positions[index]
+        return [ int(self._order[(pos + i) % n]) for i in steps ]
+
+    def _load(self, index):
+        return materialize_batch(self._dgen[index])
+
+    def _schedule(self, index):
+        """Schedule read ahead of the batches that will follow `index`"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers = self._workers)
+
+        predicted = self._predict(index)
+
+        for k in list(self._pending):
+            if k not in predicted:
+                self._pending.pop(k).cancel()
+
+        for k in predicted:
+            if k not in self._pending:
+                self._pending[k] = self._executor.submit(self._load, k)
+
+    def _log_stats(self):
+        self._nreq += 1
+
+        if self._nreq % len(self._dgen) == 0:
+            LOGGER.info(
+                "Prefetch stats: hits %d, waits %d, misses %d"
+                ", wait time %.2fs",
+                self._stats['hits'], self._stats['waits'],
+                self._stats['misses'], self._stats['wait_time']
+            )
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._dgen)
+
+        with self._lock:
+            if self._shuffle:
+                index = int(self._order[index])
+
+            future = self._pending.pop(index, None)
+            self._schedule(index)
+
+        if future is None:
+            LOGGER.debug("Prefetch miss. Fetching batch: %d", index)
+            result = self._load(index)
+            stat   = 'misses'
+
+        elif future.done():
+            result = future.result()
+            stat   = 'hits'
+
+        else:
+            start  = time.perf_counter()
+            result = future.result()
+            stat   = 'waits'
+
+            with self._lock:
+                self._stats['wait_time'] += time.perf_counter() - start
+
+        with self._lock:
+            self._stats[stat] += 1
+            self._log_stats()
+
+        return result
+
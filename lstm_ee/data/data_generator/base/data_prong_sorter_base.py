@@ -4,7 +4,7 @@ A definition of a decorator that changes prong order in batches.
 
 import logging
 from lstm_ee.data.data_generator.funcs.prong_sorter import (
-    SingleVarProngSorter, RandomizedProngSorter
+    select_prong_sorter
 )
 
 LOGGER = logging.getLogger(
@@ -43,27 +43,20 @@ class DataProngSorterBase:
         self._init_prong_sorter()
 
     def _init_prong_sorter(self):
-        if self._name is None:
-            return
-
-        if not isinstance(self._name, str):
-            self._prong_sorter = self._name
-
-        elif self._name == 'random':
+        if self._name == 'random':
             LOGGER.info(
                 "Using randomized prong order for '%s'", self._input_name
             )
-            self._prong_sorter = RandomizedProngSorter()
 
-        else:
+        elif isinstance(self._name, str):
             LOGGER.info(
                 "Sorting prongs by '%s' order for '%s'",
                 self._name, self._input_name
             )
 
-            self._prong_sorter = SingleVarProngSorter(
-                self._name, self._input_vars
-            )
+        self._prong_sorter = select_prong_sorter(
+            self._name, self._input_vars
+        )
 
     def __getitem__(self, index):
         batch = self._dgen[index]
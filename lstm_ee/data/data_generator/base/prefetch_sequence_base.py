@@ -0,0 +1,268 @@
+"""
+A definition of a decorator that produces batches of an epoch ahead of time
+in background threads or processes.
+"""
+
+import copy
+import itertools
+import logging
+import multiprocessing
+
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+
+from .streaming_cache_base import _pack_shared, _unpack_shared
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    resource_tracker = None
+    shared_memory    = None
+
+LOGGER = logging.getLogger(
+    'lstm_ee.data.data_generator.base.prefetch_sequence_base'
+)
+
+# Decorated objects of active producers. Inherited by the forked workers.
+_DGENS   = {}
+_COUNTER = itertools.count()
+
+def _init_worker():
+    # Forked workers inherit the random state of the parent. Reseed it, so
+    # that the random augmentations differ between workers and epochs.
+    np.random.seed()
+
+def _produce_batch(key, index):
+    batch = _DGENS[key][index]
+
+    if shared_memory is None:
+        return batch
+
+    return _pack_shared(batch)
+
+class _ProcessResult:
+    """Wrapper around `AsyncResult` that mimics a subset of `Future` API"""
+
+    def __init__(self, result):
+        self._result = result
+
+    def result(self):
+        # pylint: disable=missing-function-docstring
+        result = self._result.get()
+
+        if shared_memory is None:
+            return result
+
+        return _unpack_shared(*result)
+
+    def drop(self):
+        """Free resources of a result that is not going to be used"""
+        if self._result.successful():
+            self.result()
+
+class PrefetchSequenceBase:
+    """A decorator around DataGenerator that produces batches ahead of time.
+
+    This decorator runs the decorated chain of `IDataGenerator` (e.g.
+    augmentations on top of a RAM cache) in background threads or processes,
+    so that batch generation overlaps with the model computations.
+
+    Batches are assumed to be requested sequentially from the beginning of
+    the epoch. At most `depth` batches that follow the last requested one are
+    kept in flight or ready, and they are returned in the order of requests
+    regardless of the order in which workers finish them. If a batch is
+    requested out of order, the production is restarted from that batch.
+
+    If `shuffle` is True, then batch `index` of an epoch is the batch
+    `order[index]` of the decorated object, where `order` is a permutation
+    drawn from `seed` anew at each epoch. So, batches are still requested
+    sequentially and the workers know which batches to produce ahead.
+
+    Batches are never produced across the epoch boundary. Instead, the
+    production is restarted by `on_epoch_end` after the decorated object
+    has been notified about the end of epoch. With `concurrency` "process"
+    the workers are forked anew at the start of each epoch, so that they see
+    the up to date state of the decorated object. Note that in this mode
+    batches that are lazily cached by the decorated object (e.g. by
+    `DataCache`) are cached only in the worker copies, so the cache should
+    be precomputed.
+
+    Parameters
+    ----------
+    dgen : IDataGenerator
+        `IDataGenerator` to produce batches from. In the "thread" mode it
+        needs to be thread safe.
+    depth : int
+        Number of batches to produce ahead.
+    workers : int, optional
+        Number of worker threads or processes. Default: 1.
+    concurrency : { 'thread', 'process' }, optional
+        Type of workers to use. Default: 'thread'.
+    shuffle : bool, optional
+        Whether to shuffle the order of batches at each epoch.
+        Default: False.
+    seed : int or None, optional
+        Seed of the batch order shuffling. If None, the order will not be
+        reproducible. Default: None.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self, dgen, depth, workers = 1, concurrency = 'thread',
+        shuffle = False, seed = None
+    ):
+        if concurrency not in [ 'thread', 'process' ]:
+            raise ValueError(
+                "Unknown prefetch concurrency type: %s" % concurrency
+            )
+
+        self._dgen        = dgen
+        self._depth       = depth
+        self._workers     = workers
+        self._concurrency = concurrency
+        self._shuffle     = shuffle
+        self._seed        = seed
+        self._epoch       = 0
+        self._order       = None
+
+        self._shuffle_order()
+        self._init_state()
+
+    def _init_state(self):
+        self._executor = None
+        self._pool     = None
+        self._key      = None
+        self._pending  = []
+        self._next     = 0
+
+    def __getstate__(self):
+        """Serialize object for pickle.
+
+        Workers and pending batches are dropped when pickling.
+        """
+        state = copy.copy(self.__dict__)
+
+        for k in [ '_executor', '_pool', '_key', '_pending', '_next' ]:
+            state.pop(k, None)
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
+
+    def __del__(self):
+        self.close()
+
+    def _shuffle_order(self):
+        """Draw the batch order of the current epoch"""
+        if not self._shuffle:
+            return
+
+        if self._seed is None:
+            prg = np.random.RandomState()
+        else:
+            prg = np.random.RandomState([ self._seed, self._epoch ])
+
+        self._order = prg.permutation(len(self._dgen))
+
+    def _submit(self, index):
+        if self._order is not None:
+            index = int(self._order[index])
+
+        if self._concurrency == 'thread':
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers = self._workers
+                )
+
+            return self._executor.submit(self._dgen.__getitem__, index)
+
+        if self._pool is None:
+            self._key = next(_COUNTER)
+            _DGENS[self._key] = self._dgen
+
+            if resource_tracker is not None:
+                # C.f. `StreamingCacheBase._start`
+                resource_tracker.ensure_running()
+
+            self._pool = multiprocessing.get_context('fork').Pool(
+                processes = self._workers, initializer = _init_worker
+            )
+
+        return _ProcessResult(
+            self._pool.apply_async(_produce_batch, (self._key, index))
+        )
+
+    def _fill(self):
+        """Keep `depth` batches of the current epoch in flight"""
+        while (
+                (len(self._pending) < self._depth)
+            and (self._next < len(self._dgen))
+        ):
+            self._pending.append((self._next, self._submit(self._next)))
+            self._next += 1
+
+    def _stop(self):
+        """Drop pending batches and wait for the running workers"""
+        pending       = self._pending
+        self._pending = []
+
+        if self._concurrency == 'thread':
+            for (_, future) in pending:
+                future.cancel()
+
+            wait([ future for (_, future) in pending ])
+
+        else:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+
+            for (_, result) in pending:
+                result.drop()
+
+            _DGENS.pop(self._key, None)
+            self._pool = None
+            self._key  = None
+
+    def restart(self, index = 0):
+        """Restart production of batches from the batch `index`"""
+        self._stop()
+        self._next = index
+        self._fill()
+
+    def close(self):
+        """Stop producing batches and shut down the workers"""
+        if not hasattr(self, '_pending'):
+            return
+
+        self._stop()
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def on_epoch_end(self):
+        """Notify the decorated object and start producing the next epoch"""
+        self._stop()
+        self._dgen.on_epoch_end()
+
+        self._epoch += 1
+        self._shuffle_order()
+
+        self.restart(0)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._dgen)
+
+        if (not self._pending) or (self._pending[0][0] != index):
+            LOGGER.debug("Restarting batch production from %d", index)
+            self.restart(index)
+
+        _, result = self._pending.pop(0)
+        self._fill()
+
+        return result.result()
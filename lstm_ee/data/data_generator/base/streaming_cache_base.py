@@ -0,0 +1,208 @@
+"""
+A definition of a decorator that precomputes batches in concurrent processes
+and serves them as soon as they are ready.
+"""
+
+import copy
+import itertools
+import logging
+import multiprocessing
+import threading
+
+import numpy as np
+
+from .data_disk_cache_base import flatten_batch, unflatten_batch
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    resource_tracker = None
+    shared_memory    = None
+
+LOGGER = logging.getLogger(
+    'lstm_ee.data.data_generator.base.streaming_cache_base'
+)
+
+# Decorated objects of active caches. Inherited by the forked workers.
+_DGENS   = {}
+_COUNTER = itertools.count()
+
+def _pack_shared(batch):
+    """Copy arrays of `batch` into a shared memory segment.
+
+    Returns
+    -------
+    (name, treedef, specs)
+        Name of the shared memory segment, structure of the batch and a list
+        of (offset, dtype, shape) of each array in the segment.
+    """
+    leaves, treedef = flatten_batch(batch)
+
+    specs  = []
+    nbytes = 0
+
+    for leaf in leaves:
+        specs.append((nbytes, leaf.dtype.str, leaf.shape))
+        nbytes += (leaf.nbytes + 63) // 64 * 64
+
+    shm = shared_memory.SharedMemory(create = True, size = max(nbytes, 1))
+
+    for (leaf, (offset, _, _)) in zip(leaves, specs):
+        shm.buf[offset:offset + leaf.nbytes] = leaf.tobytes()
+
+    name = shm.name
+    shm.close()
+
+    return (name, treedef, specs)
+
+def _unpack_shared(name, treedef, specs):
+    """Copy batch out of a shared memory segment and free the segment"""
+    shm = shared_memory.SharedMemory(name = name)
+
+    try:
+        leaves = [
+            np.ndarray(shape, dtype, buffer = shm.buf, offset = offset).copy()
+                for (offset, dtype, shape) in specs
+        ]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return unflatten_batch(leaves, treedef)
+
+def _build_batch(args):
+    key, index = args
+    batch      = _DGENS[key][index]
+
+    if shared_memory is None:
+        return batch
+
+    return _pack_shared(batch)
+
+class StreamingCacheBase:
+    """A decorator around DataGenerator to precompute batches in parallel.
+
+    Similar to `MultiprocessedCacheBase`, this decorator spawns multiple
+    processes to generate batches from the decorated object on the first use
+    and stores them in the RAM cache. However, unlike
+    `MultiprocessedCacheBase` it does not wait for all batches to be
+    computed. Batches are collected in order by a background thread and each
+    batch is served as soon as it is ready, so the training can start while
+    the cache is still being filled.
+
+    Workers are forked from the current process and pass the generated
+    arrays to it through shared memory segments instead of pickling them.
+    If `multiprocessing.shared_memory` is not available, then batches are
+    pickled.
+
+    Parameters
+    ----------
+    dgen : DataGenerator
+        DataGenerator that creates batches to be precomputed and cached.
+    workers : int
+        Number of parallel processes to use.
+    chunksize : int, optional
+        Number of batches sent to a worker at once. Default: 1.
+    """
+
+    def __init__(self, dgen, workers = None, chunksize = 1):
+        self._dgen      = dgen
+        self._workers   = workers
+        self._chunksize = chunksize
+
+        self._cache   = [ None for _ in range(len(dgen)) ]
+        self._error   = None
+        self._started = False
+        self._cond    = threading.Condition()
+
+    def __getstate__(self):
+        state = copy.copy(self.__dict__)
+        state.pop('_cond', None)
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cond = threading.Condition()
+
+        # Unfinished precomputation is not transferred. Restart it.
+        if any(x is None for x in self._cache):
+            self._cache   = [ None for _ in range(len(self._cache)) ]
+            self._started = False
+
+    def _collect(self, pool, key):
+        """Collect results of the `pool` workers in order"""
+        try:
+            results = pool.imap(
+                _build_batch,
+                ((key, i) for i in range(len(self._cache))),
+                self._chunksize
+            )
+
+            for (index, result) in enumerate(results):
+                if shared_memory is not None:
+                    result = _unpack_shared(*result)
+
+                LOGGER.debug("Adding batch '%d' into cache", index)
+
+                with self._cond:
+                    self._cache[index] = result
+                    self._cond.notify_all()
+
+            pool.close()
+
+        # pylint: disable=broad-except
+        except Exception as e:
+            pool.terminate()
+
+            with self._cond:
+                self._error = e
+                self._cond.notify_all()
+
+        finally:
+            pool.join()
+            _DGENS.pop(key, None)
+
+    def _start(self):
+        """Fork workers and start collecting their results"""
+        key = next(_COUNTER)
+        _DGENS[key] = self._dgen
+
+        LOGGER.info(
+            "Starting streaming cache with %s workers", self._workers
+        )
+
+        if resource_tracker is not None:
+            # Forked workers should share the resource tracker with the
+            # parent. Otherwise, their trackers would complain about shared
+            # memory segments that are freed by the parent.
+            resource_tracker.ensure_running()
+
+        pool = multiprocessing.get_context('fork').Pool(
+            processes = self._workers
+        )
+
+        thread = threading.Thread(
+            target = self._collect, args = (pool, key), daemon = True
+        )
+        thread.start()
+
+        self._started = True
+
+    def __getitem__(self, index):
+        with self._cond:
+            if not self._started:
+                self._start()
+
+            while (self._cache[index] is None) and (self._error is None):
+                self._cond.wait()
+
+            if self._cache[index] is None:
+                raise RuntimeError(
+                    "Failed to precompute batch %d" % index
+                ) from self._error
+
+            result = self._cache[index]
+
+        return copy.deepcopy(result)
+
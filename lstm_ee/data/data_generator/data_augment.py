@@ -0,0 +1,173 @@
+"""
+A definition of a decorator that sorts prongs, adds noise and masks NaNs in a
+single pass over the batch.
+"""
+
+import numpy as np
+
+from lstm_ee.consts      import DEF_MASK
+from .idata_decorator    import IDataDecorator
+from .data_noise         import calc_var_indices
+from .funcs.noise        import select_noise
+from .funcs.prong_sorter import select_prong_sorter
+
+def flatten_noise_list(noise):
+    """Convert (nested) list of noise configurations into a flat list"""
+    if noise is None:
+        return []
+
+    if isinstance(noise, list):
+        return [ x for n in noise for x in flatten_noise_list(n) ]
+
+    return [ noise ]
+
+class DataAugment(IDataDecorator):
+    """A decorator that fuses `DataProngSorter`, `DataNoise`, `DataNANMask`.
+
+    This decorator produces the same batches as a chain of `DataProngSorter`
+    decorators (one for each item of `prong_sorters`), followed by the
+    `DataNoise` decorators (one for each item of `noise`) and `DataNANMask`.
+    However, instead of making a separate pass over the batch arrays for
+    each decorator, it draws noise of all `DataNoise` layers at once,
+    combines it into a single multiplicative factor per input variable and
+    applies it with one broadcast multiplication per input array, which is
+    followed by the NaN masking of the same array.
+
+    Noise values are drawn in the same order as by the unfused chain, so
+    for the same random state the batches agree up to the floating point
+    rounding.
+
+    Parameters
+    ----------
+    dgen : IDataGenerator
+        `IDataGenerator` to be decorated.
+    prong_sorters : dict or None, optional
+        Prong sorting specifications of the form
+        { 'input_png2d' : PRONG_SORT_TYPE, 'input_png3d' : PRONG_SORT_TYPE }.
+        C.f. `DataProngSorter`.
+    noise : list of dict or dict or None, optional
+        Noise configurations. Each dict holds parameters of the `DataNoise`
+        constructor.
+    nan_mask : bool, optional
+        If True, NaNs in inputs will be replaced by `DEF_MASK`.
+        Default: True.
+
+    See Also
+    --------
+    DataProngSorter
+    DataNoise
+    DataNANMask
+    """
+
+    def __init__(
+        self, dgen,
+        prong_sorters = None,
+        noise         = None,
+        nan_mask      = True,
+    ):
+        super(DataAugment, self).__init__(dgen)
+
+        self._nan_mask      = nan_mask
+        self._prong_sorters = []
+        self._noise_layers  = []
+
+        for (input_name, name) in (prong_sorters or {}).items():
+            if input_name not in [ 'input_png2d', 'input_png3d' ]:
+                raise ValueError(
+                    "Unknown prong input name '%s'" % (input_name)
+                )
+
+            sorter = select_prong_sorter(
+                name, self._get_input_vars(input_name)
+            )
+
+            if sorter is not None:
+                self._prong_sorters.append((input_name, sorter))
+
+        for config in flatten_noise_list(noise):
+            self._add_noise_layer(**config)
+
+    def _get_input_vars(self, input_name):
+        if input_name == 'input_slice':
+            return self.vars_input_slice
+
+        if input_name == 'input_png2d':
+            return self.vars_input_png2d
+
+        if input_name == 'input_png3d':
+            return self.vars_input_png3d
+
+        raise ValueError("Unknown input name '%s'" % (input_name))
+
+    def _add_noise_layer(
+        self,
+        noise               = None,
+        noise_kwargs        = None,
+        affected_vars_slice = None,
+        affected_vars_png2d = None,
+        affected_vars_png3d = None,
+    ):
+        noise = select_noise(noise, **(noise_kwargs or {}))
+
+        if noise is None:
+            return
+
+        var_indices = {}
+
+        for (input_name, affected_vars) in [
+            ('input_slice', affected_vars_slice),
+            ('input_png2d', affected_vars_png2d),
+            ('input_png3d', affected_vars_png3d),
+        ]:
+            if affected_vars is not None:
+                var_indices[input_name] = calc_var_indices(
+                    self._get_input_vars(input_name), affected_vars
+                )
+
+        self._noise_layers.append((noise, var_indices))
+
+    def _get_factors(self, inputs):
+        """Combine noise of all layers into per variable factors"""
+        factors    = {}
+        batch_size = [ x.shape[0] for x in inputs.values() ][0]
+
+        for (noise, var_indices) in self._noise_layers:
+            values = 1 + noise.get(batch_size)
+
+            for (input_name, var_idx) in var_indices.items():
+                if input_name not in factors:
+                    factors[input_name] = np.ones(
+                        (batch_size, inputs[input_name].shape[-1])
+                    )
+
+                factors[input_name][:, var_idx] *= values[:, np.newaxis]
+
+        return factors
+
+    def __getitem__(self, index):
+        batch_data = self._dgen[index]
+        inputs     = batch_data[0]
+
+        for (input_name, sorter) in self._prong_sorters:
+            sorter(inputs[input_name])
+
+        factors = {}
+
+        if self._noise_layers:
+            factors = self._get_factors(inputs)
+
+        for (input_name, data) in inputs.items():
+            if data.size == 0:
+                continue
+
+            factor = factors.get(input_name)
+
+            if factor is not None:
+                shape = (factor.shape[0],) + (1,) * (data.ndim - 2) \
+                      + (factor.shape[1],)
+                data *= factor.reshape(shape)
+
+            if self._nan_mask:
+                np.copyto(data, DEF_MASK, where = np.isnan(data))
+
+        return batch_data
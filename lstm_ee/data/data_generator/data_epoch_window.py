@@ -0,0 +1,47 @@
+"""
+A definition of a decorator that splits passes over data into short epochs.
+"""
+
+from .idata_decorator import IDataDecorator
+
+class DataEpochWindow(IDataDecorator):
+    """A decorator around `IDataGenerator` that rotates a window of batches.
+
+    Each epoch this decorator produces `n_batches` batches of the decorated
+    object, starting from the batch where the previous epoch has stopped.
+    So, when the number of steps per epoch is smaller than the number of
+    batches, successive epochs cover the whole dataset instead of always
+    covering the first `n_batches` batches. The decorated object is notified
+    about the end of epoch when a pass over all of its batches is complete.
+
+    Parameters
+    ----------
+    dgen : IDataGenerator
+        `IDataGenerator` to be decorated.
+    n_batches : int
+        Number of batches in an epoch.
+    """
+
+    def __init__(self, dgen, n_batches):
+        super(DataEpochWindow, self).__init__(dgen)
+
+        self._n_batches = n_batches
+        self._offset    = 0
+
+    @property
+    def offset(self):
+        """Index of the first batch of the decorated object in this epoch"""
+        return self._offset
+
+    def __len__(self):
+        return min(self._n_batches, len(self._dgen))
+
+    def __getitem__(self, index):
+        return self._dgen[(self._offset + index) % len(self._dgen)]
+
+    def on_epoch_end(self):
+        self._offset += len(self)
+
+        if self._offset >= len(self._dgen):
+            self._offset -= len(self._dgen)
+            self._dgen.on_epoch_end()
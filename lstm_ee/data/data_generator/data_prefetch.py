@@ -0,0 +1,31 @@
+"""
+Definition of a decorator that reads batches ahead in background threads.
+
+C.f. `lstm_ee.data.data_generator.base.data_prefetch_base`.
+"""
+
+from .idata_decorator         import IDataDecorator
+from .base.data_prefetch_base import DataPrefetchBase
+
+class DataPrefetch(DataPrefetchBase, IDataDecorator):
+    # pylint: disable=C0115
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self, dgen, depth, workers = 1, order = None, shuffle = False,
+        seed = None
+    ):
+        IDataDecorator  .__init__(self, dgen)
+        DataPrefetchBase.__init__(
+            self, dgen, depth, workers, order, shuffle, seed
+        )
+
+    @property
+    def shuffle(self):
+        """Whether the order of batches is shuffled at each epoch"""
+        return self._shuffle
+
+    def on_epoch_end(self):
+        self._dgen.on_epoch_end()
+        self.next_epoch()
+
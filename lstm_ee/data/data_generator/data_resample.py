@@ -0,0 +1,134 @@
+"""
+A definition of a decorator that resamples events according to their weights.
+"""
+
+import math
+import numpy as np
+
+from .data_weight import DataWeight
+
+class DataResample(DataWeight):
+    """A decorator around `DataGenerator` that draws events by their weights.
+
+    Instead of multiplying target weights in a batch by the event weights,
+    like `DataWeight` does, this decorator draws events of each epoch with
+    probabilities proportional to the event weights and produces batches of
+    the drawn events with unit weights. The expected loss is the same, but
+    with highly nonuniform weights (e.g. flat weights) batches are not
+    dominated by events that barely contribute to the gradient.
+
+    Events are drawn anew at the end of each epoch. Events of each batch are
+    sorted by their index to improve locality of the reads.
+
+    Parameters
+    ----------
+    dgen : DataGenerator
+        `DataGenerator` (or `DataStoreGenerator`) to be decorated. Batches are
+        assembled from the drawn events by its `get_data` method.
+    batch_size : int
+        Size of batches that will be generated.
+    weights : str or callable or ndarray
+        Weight specification. C.f. `DataWeight`.
+    replace : bool, optional
+        Whether to draw events with replacement. Default: True.
+    size : int or float or None, optional
+        Number of events to draw each epoch. If float, then it is a fraction
+        of the `dgen` events. If None, then the number of `dgen` events will
+        be drawn with replacement, or the effective sample size
+        (sum w)^2 / (sum w^2) of the weights will be drawn without
+        replacement. Default: None.
+    seed : int or None, optional
+        Seed of the draws. Events of the epoch `n` are drawn with the seed
+        [ `seed`, `n` ]. If None, draws are not reproducible. Default: None.
+
+    See Also
+    --------
+    DataWeight
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self, dgen, batch_size, weights,
+        replace = True,
+        size    = None,
+        seed    = None,
+    ):
+        super(DataResample, self).__init__(dgen, batch_size, weights)
+
+        if np.any(self._weights < 0):
+            raise ValueError("Cannot resample events with negative weights")
+
+        self._replace = replace
+        self._size    = self._calc_size(size)
+        self._seed    = seed
+        self._epoch   = 0
+        self._index   = None
+
+        if (not replace) and (self._size > np.count_nonzero(self._weights)):
+            raise ValueError(
+                "Cannot draw %d events without replacement out of %d events"
+                " with non zero weights"
+                    % (self._size, np.count_nonzero(self._weights))
+            )
+
+        self._resample()
+
+    def _calc_size(self, size):
+        if isinstance(size, float):
+            return int(round(size * len(self._weights)))
+
+        if size is not None:
+            return size
+
+        if self._replace:
+            return len(self._weights)
+
+        return int(
+            np.sum(self._weights)**2 / np.sum(self._weights**2)
+        )
+
+    def _resample(self):
+        if self._seed is None:
+            prg = np.random.RandomState()
+        else:
+            prg = np.random.RandomState([ self._seed, self._epoch ])
+
+        if self._replace:
+            self._index = prg.choice(
+                len(self._weights), self._size,
+                p = self._weights / np.sum(self._weights)
+            )
+            return
+
+        # Weighted sampling without replacement by the Gumbel top-k trick
+        with np.errstate(divide = 'ignore'):
+            keys = np.log(self._weights)
+
+        keys = keys + prg.gumbel(size = len(keys))
+
+        index = np.argpartition(-keys, self._size - 1)[:self._size]
+        prg.shuffle(index)
+
+        self._index = index
+
+    @property
+    def index(self):
+        """Indices of events drawn for the current epoch"""
+        return self._index
+
+    def __len__(self):
+        return math.ceil(self._size / self._batch_size)
+
+    def __getitem__(self, index):
+        start = index * self._batch_size
+        end   = min((index + 1) * self._batch_size, self._size)
+
+        batch_data    = self._dgen.get_data(np.sort(self._index[start:end]))
+        batch_weights = np.ones(end - start)
+
+        return batch_data + ( [batch_weights, ] * len(batch_data[1]), )
+
+    def on_epoch_end(self):
+        self._epoch += 1
+        self._resample()
+        self._dgen.on_epoch_end()
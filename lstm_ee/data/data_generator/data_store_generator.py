@@ -0,0 +1,46 @@
+"""
+Definition of a DataGenerator that gathers data batches from an `EventStore`.
+"""
+
+from .data_generator import DataGenerator
+
+class DataStoreGenerator(DataGenerator):
+    """`DataGenerator` that gathers batches from a preprocessed `EventStore`.
+
+    This generator behaves exactly like `DataGenerator`, except that input and
+    target batches are gathered from the memory mapped `EventStore` instead of
+    being joined from the raw values of `data_loader`. `data_loader` is still
+    used to define order of the samples and to retrieve values of variables
+    that are not part of the batches (e.g. weights).
+
+    Parameters
+    ----------
+    store : EventStore
+        Store with the preprocessed events of the raw dataset that
+        `data_loader` is built upon. The store should hold the same input and
+        target variables as specified by `vars_input_*` and `var_target_*`.
+    data_loader : `IDataLoader`
+        `IDataLoader` (possibly shuffled and sliced) that defines which events
+        of the raw dataset and in which order will be batched.
+    **kwargs : dict
+        Parameters passed to the `DataGenerator` constructor.
+
+    See Also
+    --------
+    DataGenerator
+    EventStore
+    """
+
+    def __init__(self, store, data_loader, **kwargs):
+        super(DataStoreGenerator, self).__init__(data_loader, **kwargs)
+
+        self._store      = store
+        self._base_index = data_loader.get_base_index()
+
+    @property
+    def store(self):
+        """`EventStore` from which batches are gathered"""
+        return self._store
+
+    def get_data(self, index):
+        return self._store.gather(self._base_index[index], self._max_prongs)
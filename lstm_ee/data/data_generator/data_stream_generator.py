@@ -0,0 +1,354 @@
+"""
+Definition of a DataGenerator that creates batches from a dataset streamed
+sequentially in chunks.
+"""
+
+import logging
+import math
+
+import numpy as np
+
+from lstm_ee.data.data_loader.shard_reader import ChunkLoader
+from .data_generator  import DataGenerator
+from .idata_generator import IDataGenerator
+
+LOGGER = logging.getLogger(
+    'lstm_ee.data.data_generator.data_stream_generator'
+)
+
+# Keys that distinguish random streams derived from the same seed
+SEED_KEY_SPLIT   = 0
+SEED_KEY_ORDER   = 1
+SEED_KEY_SHUFFLE = 2
+
+VAR_WEIGHT = '__weight__'
+
+def concatenate_arrays(arrays_list):
+    """Concatenate a list of dicts { var : values } along the event axis"""
+    return {
+        var : np.concatenate([ x[var] for x in arrays_list ])
+            for var in arrays_list[0]
+    }
+
+def take_arrays(arrays, index):
+    """Take events `index` from each array of a dict { var : values }"""
+    return { var : values[index] for (var, values) in arrays.items() }
+
+class DataStreamGenerator(IDataGenerator):
+    """DataGenerator that streams a dataset larger than RAM in chunks.
+
+    `DataStreamGenerator` reads dataset shards sequentially in chunks with a
+    `ShardReader`, keeps events of the part `part` of the train/test split,
+    mixes them in a shuffle buffer and batches them on the fly. At any time
+    at most (`buffer_size` + `chunk_size` + `batch_size`) events are held in
+    memory.
+
+    The train/test split is done per event, based on random numbers derived
+    from `seed` and the position of the event in the dataset, so train and
+    test generators of the same dataset never overlap.
+
+    If `shuffle` is True, then shards are read in a random order, and each
+    batch is drawn from a window of `buffer_size` events that is shuffled
+    after every chunk. The stream does not stop at the end of the dataset
+    nor at the end of an epoch, but continues with the next pass over the
+    shards. If `shuffle` is False, then batches are produced in the dataset
+    order and the stream restarts from the beginning at each epoch, so that
+    every epoch sees the same events (useful for validation).
+
+    Batches can only be requested sequentially: 0, 1, ..., len(self) - 1,
+    then 0 again for the next epoch. The generator cannot be used with the
+    process based concurrency.
+
+    Parameters
+    ----------
+    reader : ShardReader
+        Reader of the dataset shards.
+    batch_size : int
+        Size of the batches to be generated.
+    max_prongs : int or None, optional
+        If `max_prongs` is not None, then the number of 2D and 3D prongs will
+        be truncated by `max_prongs`. Default: None.
+    seed : int or None, optional
+        Seed of the train/test split, shards order and shuffling. If None,
+        0 is used. Default: None.
+    test_size : int or float or None, optional
+        Amount of events that will go to the test part. If float and
+        `test_size` < 1, then it is a fraction of the dataset. If None, no
+        split is performed. Default: None.
+    part : { 0, 1 }, optional
+        Part of the split to produce batches of: 0 -- train, 1 -- test.
+        Default: 0.
+    shuffle : bool, optional
+        Whether to shuffle events. Default: True.
+    buffer_size : int, optional
+        Number of events in the shuffle buffer. Default: 0.
+    weights : str or callable or None, optional
+        Weights specification. If None, all events get unit weights.
+        If str, then values of the variable `weights` will be used as weights.
+        If callable, then `weights(chunks)` will be called with an iterator
+        over all chunks of `part`, and should return a function that
+        calculates weights of a chunk. C.f. `stream_flat_weights`.
+        Default: None.
+    n_batches : int or None, optional
+        Number of batches in an epoch. If None, it is calculated from the
+        exact number of events in `part`, so that an unshuffled epoch holds
+        each event of `part` once. Default: None.
+    vars_input_slice : list of str or None, optional
+        Names of slice level input variables. Default: None.
+    vars_input_png3d : list of str or None, optional
+        Names of 3d prong level input variables. Default: None.
+    vars_input_png2d : list of str or None, optional
+        Names of 2d prong level input variables. Default: None.
+    var_target_total : str or None, optional
+        Name of the variable that holds total energy of the event.
+        Default: None.
+    var_target_primary : str or None, optional
+        Name of the variable that holds primary energy of the event.
+        Default: None.
+
+    See Also
+    --------
+    ShardReader
+    DataGenerator
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self, reader,
+        batch_size         = 1024,
+        max_prongs         = None,
+        seed               = None,
+        test_size          = None,
+        part               = 0,
+        shuffle            = True,
+        buffer_size        = 0,
+        weights            = None,
+        n_batches          = None,
+        vars_input_slice   = None,
+        vars_input_png3d   = None,
+        vars_input_png2d   = None,
+        var_target_total   = None,
+        var_target_primary = None,
+    ):
+        super(DataStreamGenerator, self).__init__()
+
+        self._reader      = reader
+        self._batch_size  = batch_size
+        self._max_prongs  = max_prongs
+        self._seed        = seed if seed is not None else 0
+        self._part        = part
+        self._shuffle     = shuffle
+        self._buffer_size = buffer_size if shuffle else 0
+
+        self._vars_input_slice   = vars_input_slice
+        self._vars_input_png3d   = vars_input_png3d
+        self._vars_input_png2d   = vars_input_png2d
+        self._var_target_total   = var_target_total
+        self._var_target_primary = var_target_primary
+
+        self._test_fraction = self._get_test_fraction(test_size)
+
+        if n_batches is None:
+            n_batches = self._calc_n_batches()
+
+        self._n_batches   = n_batches
+        self._weight_func = self._init_weights(weights)
+
+        self._init_state()
+
+    def _init_state(self):
+        self._stream = None
+        self._next   = 0
+        self._pass   = 0
+
+    def _get_test_fraction(self, test_size):
+        if test_size is None:
+            return 0
+
+        if test_size <= 1:
+            return test_size
+
+        return min(1, test_size / len(self._reader))
+
+    def _count_part_events(self):
+        """Count events of `part` without reading the dataset.
+
+        The split mask of a shard is drawn event by event from a random
+        stream of the shard, so it is enough to know the shard lengths to
+        redraw it. The mask is redrawn in chunks to limit memory usage.
+        """
+        result = 0
+
+        for (shard, n) in enumerate(self._reader.lengths):
+            prg = np.random.RandomState([ self._seed, SEED_KEY_SPLIT, shard ])
+
+            for start in range(0, n, self._reader.chunk_size):
+                size    = min(self._reader.chunk_size, n - start)
+                result += np.count_nonzero(self._get_part_mask(prg, size))
+
+        return result
+
+    def _calc_n_batches(self):
+        n_events = self._count_part_events()
+        return max(1, math.ceil(n_events / self._batch_size))
+
+    def _init_weights(self, weights):
+        if weights is None:
+            return lambda chunk : np.ones(len(chunk))
+
+        if isinstance(weights, str):
+            return lambda chunk : chunk.get(weights).ravel()
+
+        if callable(weights):
+            LOGGER.info("Calculating weights of the streamed dataset")
+            return weights(self._iter_part_chunks())
+
+        raise RuntimeError("Unknown weights: %s" % (weights))
+
+    def _get_part_mask(self, prg, n):
+        mask = (prg.uniform(size = n) < self._test_fraction)
+
+        if self._part == 0:
+            return ~mask
+
+        return mask
+
+    def _iter_part_chunks(self, order = None):
+        """Iterate over chunks that belong to `part` of the split"""
+        prg = None
+
+        for (shard, chunk_index, chunk) in self._reader.iter_chunks(order):
+            if chunk_index == 0:
+                # Split does not depend on the chunk size
+                prg = np.random.RandomState(
+                    [ self._seed, SEED_KEY_SPLIT, shard ]
+                )
+
+            mask = self._get_part_mask(prg, len(chunk))
+
+            yield ChunkLoader({
+                var : chunk.get(var)[mask] for var in chunk.variables()
+            })
+
+    def _iter_arrays(self):
+        """Iterate over chunks of `part`, pass after pass if shuffled"""
+        while True:
+            order = np.arange(len(self._reader.shards))
+
+            if self._shuffle:
+                np.random.RandomState(
+                    [ self._seed, SEED_KEY_ORDER, self._pass ]
+                ).shuffle(order)
+
+            LOGGER.debug("Starting pass %d over the dataset", self._pass)
+
+            for chunk in self._iter_part_chunks(order):
+                arrays = {
+                    var : chunk.get(var) for var in chunk.variables()
+                }
+                arrays[VAR_WEIGHT] = self._weight_func(chunk)
+
+                yield arrays
+
+            self._pass += 1
+
+            if not self._shuffle:
+                return
+
+    def _iter_batches(self):
+        """Iterate over batches of events produced from the shuffle buffer"""
+        prg    = np.random.RandomState([ self._seed, SEED_KEY_SHUFFLE ])
+        buffer = None
+
+        for arrays in self._iter_arrays():
+            if buffer is not None:
+                arrays = concatenate_arrays([ buffer, arrays ])
+
+            buffer = arrays
+            n      = len(buffer[VAR_WEIGHT])
+            n_out  = n - self._buffer_size
+
+            if n_out < self._batch_size:
+                continue
+
+            if self._shuffle:
+                buffer = take_arrays(buffer, prg.permutation(n))
+
+            n_out = (n_out // self._batch_size) * self._batch_size
+
+            for start in range(0, n_out, self._batch_size):
+                yield take_arrays(
+                    buffer, slice(start, start + self._batch_size)
+                )
+
+            buffer = take_arrays(buffer, slice(n_out, None))
+
+        if buffer is None:
+            return
+
+        n = len(buffer[VAR_WEIGHT])
+
+        for start in range(0, n, self._batch_size):
+            yield take_arrays(buffer, slice(start, start + self._batch_size))
+
+    def _make_batch(self, arrays):
+        loader = ChunkLoader(arrays)
+        dgen   = DataGenerator(
+            loader,
+            batch_size         = len(loader),
+            max_prongs         = self._max_prongs,
+            vars_input_slice   = self._vars_input_slice,
+            vars_input_png3d   = self._vars_input_png3d,
+            vars_input_png2d   = self._vars_input_png2d,
+            var_target_total   = self._var_target_total,
+            var_target_primary = self._var_target_primary,
+        )
+
+        inputs, targets = dgen.get_data(np.arange(len(loader)))
+        weights         = arrays[VAR_WEIGHT]
+
+        return (inputs, targets, [ weights, ] * len(targets))
+
+    def _next_arrays(self):
+        if self._stream is None:
+            self._stream = self._iter_batches()
+
+        result = next(self._stream, None)
+
+        if result is None:
+            # Dataset is exhausted before the end of epoch (e.g. if
+            # `n_batches` was specified explicitly)
+            self._stream = self._iter_batches()
+            result       = next(self._stream, None)
+
+        if result is None:
+            raise RuntimeError("Streamed dataset part is empty")
+
+        return result
+
+    def __len__(self):
+        return self._n_batches
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+
+        if (index != self._next) and (index != 0):
+            raise RuntimeError(
+                "DataStreamGenerator supports only sequential access."
+                " Requested batch %d, but expected %d" % (index, self._next)
+            )
+
+        if (index == 0) and (not self._shuffle):
+            self._stream = None
+
+        result     = self._make_batch(self._next_arrays())
+        self._next = (index + 1) % len(self)
+
+        return result
+
+    @property
+    def weights(self):
+        raise RuntimeError(
+            "Weights of the whole dataset are not available when streaming"
+        )
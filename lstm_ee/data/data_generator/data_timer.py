@@ -0,0 +1,87 @@
+"""
+A definition of a decorator that measures time spent producing batches.
+"""
+
+import multiprocessing
+import time
+
+from .idata_decorator import IDataDecorator
+
+def find_decorator(dgen, cls):
+    """Find decorator of type `cls` in the decorator chain of `dgen`.
+
+    Returns
+    -------
+    IDataGenerator or None
+        The outermost decorator of type `cls`, or None if `dgen` chain does
+        not contain it.
+    """
+    while dgen is not None:
+        if isinstance(dgen, cls):
+            return dgen
+
+        # pylint: disable=protected-access
+        dgen = getattr(dgen, '_dgen', None)
+
+    return None
+
+class DataTimer(IDataDecorator):
+    """A decorator around `IDataGenerator` that times batch generation.
+
+    This decorator accumulates number of batches and the wall time spent by
+    the decorated object to produce them. It is a generator side hook for the
+    training throughput monitoring (c.f. `TrainThroughput` callback) and
+    has negligible overhead. It is thread safe.
+
+    The accumulated values are kept in shared memory, so that batches
+    produced by the forked copies of this object (e.g. by `keras` workers
+    with `use_multiprocessing` or by `PrefetchSequence` processes) are
+    counted by the parent process. Copies created by `pickle` do not share
+    the values.
+
+    Parameters
+    ----------
+    dgen : IDataGenerator
+        `IDataGenerator` to be decorated.
+    """
+
+    def __init__(self, dgen):
+        super(DataTimer, self).__init__(dgen)
+        self._init_stats()
+
+    def _init_stats(self, calls = 0, elapsed = 0.0):
+        # Shared memory is inherited by the forked processes
+        self._lock  = multiprocessing.Lock()
+        self._stats = multiprocessing.RawArray('d', [ calls, elapsed ])
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_lock', None)
+        state['_stats'] = list(self._stats)
+
+        return state
+
+    def __setstate__(self, state):
+        stats = state.pop('_stats')
+
+        self.__dict__.update(state)
+        self._init_stats(*stats)
+
+    def pop_stats(self):
+        """Return accumulated (number of batches, time) and reset them"""
+        with self._lock:
+            result         = (int(self._stats[0]), self._stats[1])
+            self._stats[0] = 0
+            self._stats[1] = 0.0
+
+        return result
+
+    def __getitem__(self, index):
+        start  = time.perf_counter()
+        result = self._dgen[index]
+
+        with self._lock:
+            self._stats[0] += 1
+            self._stats[1] += time.perf_counter() - start
+
+        return result
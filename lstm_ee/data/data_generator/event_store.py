@@ -0,0 +1,329 @@
+"""
+Definition of an event level store of preprocessed slice and prong data.
+"""
+
+import copy
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .funcs.funcs_varr import pack_varr_arrays, gather_packed_varr_arrays
+
+LOGGER = logging.getLogger('lstm_ee.data.data_generator.event_store')
+
+class EventStore:
+    """A memory mapped store of preprocessed events.
+
+    Joining prong level variables into fixed size batches is the bottleneck of
+    the data generation. `EventStore` performs the expensive part of this work
+    once: it extracts slice level values and variable length prong arrays of
+    each event from the raw `IDataLoader` and writes them into a set of flat
+    files on a disk. Prong arrays are saved in a ragged layout -- a flat buffer
+    of prong values plus an array of offsets of each event in that buffer.
+
+    Once built, the store is memory mapped, and batches of any size, in any
+    order and with any prong limit can be gathered from it with a handful of
+    vectorized numpy operations. Since the store does not depend on the batch
+    size or the prong limit, it is shared by all trainings that use the same
+    dataset and variables.
+
+    Parameters
+    ----------
+    data_loader : IDataLoader
+        Raw (not shuffled or sliced) `IDataLoader` that holds the dataset.
+        It is only used if the store needs to be built.
+    datadir : str
+        Directory under which the store will be saved. The store is saved in a
+        subdir ".store".
+    dataset : str
+        Name of the dataset. Used to identify the store.
+    vars_input_slice : list of str or None, optional
+        Names of slice level input variables.
+    vars_input_png3d : list of str or None, optional
+        Names of 3d prong level input variables.
+    vars_input_png2d : list of str or None, optional
+        Names of 2d prong level input variables.
+    var_target_total : str or None, optional
+        Name of the variable that holds total energy of the event.
+    var_target_primary : str or None, optional
+        Name of the variable that holds primary energy of the event.
+    chunk_size : int, optional
+        Number of events to process at once while building the store.
+        Default: 100000.
+    derived_vars : dict or None, optional
+        Definitions of the derived variables of `data_loader`. Used to
+        identify the store. C.f. `DerivedVariables`. Default: None.
+
+    Notes
+    -----
+    Stores on the disk should be cleaned manually. They are stored under
+    `datadir`/.store
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self, data_loader, datadir, dataset,
+        vars_input_slice   = None,
+        vars_input_png3d   = None,
+        vars_input_png2d   = None,
+        var_target_total   = None,
+        var_target_primary = None,
+        chunk_size         = 100000,
+        derived_vars       = None,
+    ):
+        self._chunk_size = chunk_size
+        self._labels     = {
+            'input_slice'    : (vars_input_slice,   False),
+            'input_png3d'    : (vars_input_png3d,   True),
+            'input_png2d'    : (vars_input_png2d,   True),
+            'target_total'   : (var_target_total,   False),
+            'target_primary' : (var_target_primary, False),
+        }
+
+        self._config = {
+            'dataset' : dataset,
+            **{ k : v for (k, (v, _)) in self._labels.items() },
+        }
+
+        # Older stores do not have derived variables in their configuration
+        if derived_vars:
+            self._config['derived_vars'] = derived_vars
+
+        self._arrays = None
+        self._len    = None
+        self._init_store_dir(datadir)
+
+        if not os.path.exists(os.path.join(self._root, 'layout.json')):
+            self._build(data_loader)
+
+        self._load_layout()
+
+    def _init_store_dir(self, datadir):
+        """Calculate store directory name from the store configuration"""
+        digest = bytes(json.dumps(self._config, sort_keys = True), 'utf-8')
+        digest = hashlib.sha1(digest).hexdigest()
+
+        self._parent = os.path.join(datadir, '.store')
+        self._root   = os.path.join(self._parent, digest)
+
+        os.makedirs(self._parent, exist_ok = True)
+
+    @staticmethod
+    def _save_array(fname, chunks, n_var):
+        """Concatenate `chunks` into a flat file `fname` and return shape"""
+        shape = [ 0, n_var ]
+
+        with open(fname, 'wb') as f:
+            for chunk in chunks:
+                chunk = np.ascontiguousarray(chunk, dtype = np.float32)
+                f.write(chunk.tobytes())
+
+                shape[0] += chunk.shape[0]
+
+        return shape
+
+    def _iter_chunks(self, data_loader, variables, is_varr):
+        """Yield preprocessed values of `variables` chunk by chunk"""
+        offset = 0
+
+        for start in range(0, len(data_loader), self._chunk_size):
+            end   = min(start + self._chunk_size, len(data_loader))
+            index = np.arange(start, end)
+
+            if is_varr:
+                values, offsets = pack_varr_arrays(
+                    [ data_loader.get(v, index) for v in variables ]
+                )
+                yield (values, offsets[1:] + offset)
+                offset += offsets[-1]
+
+            else:
+                yield (
+                    np.stack(
+                        [ data_loader.get(v, index) for v in variables ],
+                        axis = 1
+                    ),
+                    None
+                )
+
+    def _build_label(self, data_loader, tmpdir, label, layout):
+        """Save preprocessed values of a single input/target to `tmpdir`"""
+        variables, is_varr = self._labels[label]
+
+        if variables is None:
+            return
+
+        if isinstance(variables, str):
+            variables = [ variables ]
+
+        LOGGER.info("Building event store for '%s'", label)
+
+        offsets_list = [ np.zeros(1, dtype = np.int64) ]
+
+        def values_iter():
+            for values, offsets in self._iter_chunks(
+                data_loader, variables, is_varr
+            ):
+                if offsets is not None:
+                    offsets_list.append(offsets)
+
+                yield values
+
+        shape = EventStore._save_array(
+            os.path.join(tmpdir, '%s.bin' % label), values_iter(),
+            len(variables)
+        )
+        layout[label] = { 'shape' : shape, 'dtype' : 'float32' }
+
+        if is_varr:
+            np.save(
+                os.path.join(tmpdir, '%s.offsets.npy' % label),
+                np.concatenate(offsets_list)
+            )
+
+    def _build(self, data_loader):
+        """Build store from `data_loader` and move it to its final location.
+
+        The store is built in a temporary directory that is atomically renamed
+        into the final store directory. Concurrent builds of the same store
+        are serialized with a lock file.
+        """
+        lockfile = self._root + '.lock'
+
+        with open(lockfile, 'w') as lockf:
+            fcntl.flock(lockf, fcntl.LOCK_EX)
+
+            if os.path.exists(os.path.join(self._root, 'layout.json')):
+                return
+
+            LOGGER.info("Building event store at '%s'", self._root)
+            tmpdir = tempfile.mkdtemp(dir = self._parent)
+
+            try:
+                layout = { 'len' : len(data_loader) }
+
+                for label in self._labels:
+                    self._build_label(data_loader, tmpdir, label, layout)
+
+                with open(os.path.join(tmpdir, 'config.json'), 'wt') as f:
+                    json.dump(self._config, f, sort_keys = True, indent = 4)
+
+                with open(os.path.join(tmpdir, 'layout.json'), 'wt') as f:
+                    json.dump(layout, f, sort_keys = True, indent = 4)
+
+                if os.path.exists(self._root):
+                    shutil.rmtree(self._root)
+
+                os.rename(tmpdir, self._root)
+
+            finally:
+                if os.path.exists(tmpdir):
+                    shutil.rmtree(tmpdir, ignore_errors = True)
+
+    def _load_layout(self):
+        with open(os.path.join(self._root, 'config.json'), 'rt') as f:
+            config = json.load(f)
+
+        if config != json.loads(json.dumps(self._config)):
+            raise RuntimeError(
+                "Finally hash collision for store dirs found. Bailing out"
+            )
+
+        with open(os.path.join(self._root, 'layout.json'), 'rt') as f:
+            self._layout = json.load(f)
+
+        self._len = self._layout['len']
+
+    def _lazy_load(self):
+        """Memory map store files"""
+        if self._arrays is not None:
+            return
+
+        arrays = {}
+
+        for label,spec in self._layout.items():
+            if label == 'len':
+                continue
+
+            fname  = os.path.join(self._root, '%s.bin' % label)
+            shape  = tuple(spec['shape'])
+            values = None
+
+            if np.prod(shape) > 0:
+                values = np.memmap(
+                    fname, dtype = spec['dtype'], mode = 'r', shape = shape
+                )
+            else:
+                values = np.empty(shape, dtype = spec['dtype'])
+
+            offsets = None
+            if self._labels[label][1]:
+                offsets = np.load(
+                    os.path.join(self._root, '%s.offsets.npy' % label)
+                )
+
+            arrays[label] = (values, offsets)
+
+        self._arrays = arrays
+
+    def __getstate__(self):
+        """Serialize object for pickle.
+
+        Memory maps are dropped when pickling (otherwise their contents will
+        be pickled) and reopened at first use.
+        """
+        state = copy.copy(self.__dict__)
+        state['_arrays'] = None
+
+        return state
+
+    @property
+    def root(self):
+        """Directory where the store files are saved"""
+        return self._root
+
+    def __len__(self):
+        return self._len
+
+    def gather(self, index, max_prongs = None):
+        """Gather batch of inputs and targets for events `index`.
+
+        Parameters
+        ----------
+        index : ndarray
+            Indices of events in the raw dataset to be batched together.
+        max_prongs : int or None, optional
+            If `max_prongs` is not None, then the number of 2D and 3D prongs
+            will be truncated by `max_prongs`.
+
+        Returns
+        -------
+        (inputs, targets)
+            Dictionaries of input and target batches. C.f.
+            `DataGenerator.get_data`.
+        """
+        self._lazy_load()
+
+        inputs  = {}
+        targets = {}
+
+        for label, (values, offsets) in self._arrays.items():
+            if offsets is not None:
+                batch = gather_packed_varr_arrays(
+                    values, offsets, index, max_prongs
+                )
+            else:
+                batch = np.asarray(values[index])
+
+            if label.startswith('input'):
+                inputs[label] = batch
+            else:
+                targets[label] = batch
+
+        return (inputs, targets)
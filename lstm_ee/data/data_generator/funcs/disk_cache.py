@@ -0,0 +1,311 @@
+"""
+Functions to manage disk caches of data batches.
+
+Each disk cache is stored in a subdirectory of the cache directory
+(`datadir`/.cache) and holds a file "meta.json" with the cache metadata:
+creation time, last access time and size.
+"""
+
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+LOGGER = logging.getLogger('lstm_ee.data.data_generator.funcs.disk_cache')
+
+SIZE_SUFFIXES = { 'K' : 2**10, 'M' : 2**20, 'G' : 2**30, 'T' : 2**40 }
+
+def parse_size(size):
+    """Parse human readable size like "100G" into a number of bytes.
+
+    Parameters
+    ----------
+    size : int or str or None
+        Size to be parsed. Strings may have one of K, M, G, T suffixes.
+
+    Returns
+    -------
+    int or None
+        Size in bytes. None if `size` is None or empty.
+    """
+    if size is None:
+        return None
+
+    if isinstance(size, (int, float)):
+        return int(size)
+
+    size = size.strip().upper().rstrip('B')
+
+    if not size:
+        return None
+
+    if size[-1] in SIZE_SUFFIXES:
+        return int(float(size[:-1]) * SIZE_SUFFIXES[size[-1]])
+
+    return int(float(size))
+
+def format_size(size):
+    """Format number of bytes `size` into a human readable string"""
+    for suffix in [ '', 'K', 'M', 'G' ]:
+        if abs(size) < 1024:
+            return "%.1f%sB" % (size, suffix)
+
+        size /= 1024
+
+    return "%.1fTB" % (size)
+
+def get_dir_size(path):
+    """Calculate total size of files under `path`"""
+    result = 0
+
+    for (root, _dirs, files) in os.walk(path):
+        for fname in files:
+            try:
+                result += os.stat(os.path.join(root, fname)).st_size
+            except OSError:
+                pass
+
+    return result
+
+@contextlib.contextmanager
+def lock_cache_dir(cachedir, operation = fcntl.LOCK_EX):
+    """Lock the whole cache directory `cachedir`.
+
+    Shared lock is held while opening caches, exclusive lock is held while
+    evicting them.
+    """
+    os.makedirs(cachedir, exist_ok = True)
+
+    with open(os.path.join(cachedir, '.lock'), 'w') as f:
+        fcntl.flock(f, operation)
+        yield
+
+def load_cache_meta(path):
+    """Load metadata of a cache under `path`.
+
+    If the metadata file is missing (e.g. for caches created by older
+    versions of `lstm_ee`) it is reconstructed from the files in `path`.
+    """
+    try:
+        with open(os.path.join(path, 'meta.json'), 'rt') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        pass
+
+    try:
+        mtime = os.stat(os.path.join(path, 'config.json')).st_mtime
+    except OSError:
+        mtime = os.stat(path).st_mtime
+
+    return { 'created' : mtime, 'last_access' : mtime, 'size' : None }
+
+def touch_cache(path):
+    """Update last access time and size of a cache under `path`"""
+    meta = load_cache_meta(path)
+
+    meta['last_access'] = time.time()
+    meta['size']        = get_dir_size(path)
+
+    # To ensure atomicity of writes
+    with tempfile.NamedTemporaryFile(
+        'wt', dir = path, prefix = '.meta', delete = False
+    ) as f:
+        temp_fname = f.name
+        json.dump(meta, f, indent = 4)
+
+    os.rename(temp_fname, os.path.join(path, 'meta.json'))
+
+def get_cache_fill(path):
+    """Return number of filled and total batches of a cache under `path`"""
+    try:
+        table = np.load(os.path.join(path, 'index.npy'), mmap_mode = 'r')
+        return (int(np.count_nonzero(table[:, 0])), len(table))
+    except (IOError, ValueError):
+        pass
+
+    nfilled = len([
+        x for x in os.listdir(path)
+            if x.startswith('batch_') and x.endswith('.pkl')
+    ])
+
+    return (nfilled, None)
+
+def get_cache_info(path):
+    """Collect configuration, metadata and fill status of a cache.
+
+    Returns
+    -------
+    dict
+        Dictionary with keys 'name', 'path', 'config', 'created',
+        'last_access', 'size', 'filled', 'len'.
+    """
+    meta = load_cache_meta(path)
+
+    try:
+        with open(os.path.join(path, 'config.json'), 'rt') as f:
+            config = json.load(f)
+    except (IOError, ValueError):
+        config = None
+
+    filled, length = get_cache_fill(path)
+
+    return {
+        'name'        : os.path.basename(path),
+        'path'        : path,
+        'config'      : config,
+        'created'     : meta['created'],
+        'last_access' : meta['last_access'],
+        'size'        : get_dir_size(path),
+        'filled'      : filled,
+        'len'         : length,
+    }
+
+def list_caches(cachedir):
+    """List caches under `cachedir` sorted by the last access time.
+
+    Returns
+    -------
+    list of dict
+        List of cache infos. C.f. `get_cache_info`.
+    """
+    if not os.path.isdir(cachedir):
+        return []
+
+    result = [
+        get_cache_info(os.path.join(cachedir, x))
+            for x in os.listdir(cachedir)
+            if os.path.isdir(os.path.join(cachedir, x))
+                and not x.startswith('.')
+    ]
+
+    return sorted(result, key = lambda x : x['last_access'])
+
+def is_cache_in_use(path):
+    """Check whether a cache under `path` is opened by any process"""
+    lockfile = os.path.join(path, 'active.lock')
+
+    if not os.path.exists(lockfile):
+        return False
+
+    with open(lockfile, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            return True
+
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+    return False
+
+def remove_caches(infos, dry_run = False):
+    """Remove caches described by `infos`.
+
+    Must be called with the exclusive lock of the cache directory held.
+
+    Returns
+    -------
+    list of dict
+        Infos of the removed caches.
+    """
+    result = []
+
+    for info in infos:
+        LOGGER.info(
+            "%s cache '%s' of size %s",
+            "Would remove" if dry_run else "Removing",
+            info['name'], format_size(info['size'])
+        )
+
+        if not dry_run:
+            shutil.rmtree(info['path'], ignore_errors = True)
+
+        result.append(info)
+
+    return result
+
+def select_lru_caches(infos, max_size):
+    """Select least recently used caches to make total size under `max_size`
+
+    Parameters
+    ----------
+    infos : list of dict
+        Cache infos sorted by the last access time.
+    max_size : int
+        Maximum total size of caches in bytes.
+
+    Returns
+    -------
+    list of dict
+        Infos of the caches to be evicted.
+    """
+    total  = sum(x['size'] for x in infos)
+    result = []
+
+    for info in infos:
+        if total <= max_size:
+            break
+
+        result.append(info)
+        total -= info['size']
+
+    return result
+
+def prune_caches(
+    cachedir, max_size = None, older_than = None, keep = None, dry_run = False
+):
+    """Remove unused caches from `cachedir`.
+
+    Parameters
+    ----------
+    cachedir : str
+        Cache directory (e.g. `datadir`/.cache).
+    max_size : int or str or None, optional
+        If not None, then least recently used caches will be removed until
+        their total size is below `max_size`. C.f. `parse_size`.
+    older_than : float or None, optional
+        If not None, then caches that were not accessed in the last
+        `older_than` seconds will be removed.
+    keep : list of str or None, optional
+        Paths of caches that should never be removed. Caches that are in use
+        by any process are never removed either.
+    dry_run : bool, optional
+        If True, then only report caches that would be removed.
+
+    Returns
+    -------
+    list of dict
+        Infos of the removed caches.
+    """
+    max_size = parse_size(max_size)
+    keep     = [ os.path.realpath(x) for x in (keep or []) ]
+
+    with lock_cache_dir(cachedir, fcntl.LOCK_EX):
+        infos     = []
+        kept_size = 0
+
+        for info in list_caches(cachedir):
+            if (
+                   (os.path.realpath(info['path']) in keep)
+                or is_cache_in_use(info['path'])
+            ):
+                kept_size += info['size']
+            else:
+                infos.append(info)
+
+        evict = []
+
+        if older_than is not None:
+            deadline = time.time() - older_than
+            evict    = [ x for x in infos if x['last_access'] < deadline ]
+            infos    = [ x for x in infos if x['last_access'] >= deadline ]
+
+        if max_size is not None:
+            evict += select_lru_caches(infos, max(max_size - kept_size, 0))
+
+        return remove_caches(evict, dry_run)
@@ -171,3 +171,122 @@ def unpack_varr_arrays(data_loader, variables, index, length_limit = None):
         [ data_loader.get(v, index) for v in variables ], length_limit
     )
 
+
+def pack_varr_arrays(raw_varr_list, dtype = np.float32):
+    """Pack a list of variable length arrays batches into a flat buffer.
+
+    This function is the inverse of the "ragged" layout used by `IDataLoader`
+    for the variable length arrays. It concatenates variable length arrays of
+    all variables from `raw_varr_list` into a single 2D buffer of values, and
+    records the position of each row in that buffer in an array of offsets.
+
+    Parameters
+    ----------
+    raw_varr_list : list of ndarray of ndarray
+        List of variable length array batches to be packed. All elements of
+        `raw_varr_list` should have the same length N_SAMPLE.
+    dtype : numpy.dtype, optional
+        Type of the packed values. Default: np.float32.
+
+    Returns
+    -------
+    values : ndarray, shape (N_TOTAL, N_VAR)
+        Values of the variable length arrays. Rows [offsets[i], offsets[i+1])
+        hold values of the i-th sample. If the lengths of variable length
+        arrays of different variables do not match, then the shorter arrays
+        are padded by NaNs.
+    offsets : ndarray, shape (N_SAMPLE + 1,)
+        Offsets of the samples in the `values` buffer.
+
+    See Also
+    --------
+    gather_packed_varr_arrays
+    """
+
+    n_var = len(raw_varr_list)
+    n_row = len(raw_varr_list[0]) if (n_var > 0) else 0
+
+    lengths = np.zeros(n_row, dtype = np.int64)
+
+    for values in raw_varr_list:
+        var_lengths = np.fromiter(
+            (len(x) for x in values), dtype = np.int64, count = n_row
+        )
+        lengths = np.maximum(lengths, var_lengths)
+
+    offsets     = np.zeros(n_row + 1, dtype = np.int64)
+    offsets[1:] = np.cumsum(lengths)
+
+    result = np.full((offsets[-1], n_var), np.nan, dtype = dtype)
+
+    for var_idx,values in enumerate(raw_varr_list):
+        if n_row == 0:
+            break
+
+        flat = np.concatenate([ np.asarray(x, dtype = dtype) for x in values ])
+
+        if len(flat) == offsets[-1]:
+            result[:, var_idx] = flat
+            continue
+
+        # Slow path: lengths of variables differ
+        for row_idx,row_values in enumerate(values):
+            start = offsets[row_idx]
+            result[start:start + len(row_values), var_idx] = row_values
+
+    return (result, offsets)
+
+def gather_packed_varr_arrays(values, offsets, index, length_limit = None):
+    """Gather rows of packed variable length arrays into a `np.ndarray`.
+
+    This is a vectorized analog of `join_varr_arrays` that works on arrays
+    packed by `pack_varr_arrays`. Rows can be gathered in any order.
+
+    Parameters
+    ----------
+    values : ndarray, shape (N_TOTAL, N_VAR)
+        Packed values of variable length arrays.
+    offsets : ndarray, shape (N_SAMPLE + 1,)
+        Offsets of samples in the `values` buffer.
+    index : ndarray
+        Indices of samples to be gathered.
+    length_limit : int or None, optional
+        If `length_limit` is not None, the variable length arrays will be
+        truncated by `length_limit`.
+
+    Return
+    ------
+    ndarray, shape (len(index), N_VARR, N_VAR)
+        Joined batches of variable length arrays. Missing values are padded
+        by NaNs.
+
+    See Also
+    --------
+    pack_varr_arrays
+    join_varr_arrays
+    """
+
+    index   = np.asarray(index)
+    starts  = offsets[index]
+    lengths = offsets[index + 1] - starts
+
+    if length_limit is not None:
+        lengths = np.minimum(lengths, length_limit)
+
+    n_row = len(index)
+    n_png = int(lengths.max()) if (n_row > 0) else 0
+
+    result = np.full((n_row, n_png, values.shape[1]), np.nan, values.dtype)
+
+    total = int(lengths.sum())
+    if total == 0:
+        return result
+
+    row_idx = np.repeat(np.arange(n_row), lengths)
+
+    seg_starts = np.cumsum(lengths) - lengths
+    png_idx    = np.arange(total) - np.repeat(seg_starts, lengths)
+
+    result[row_idx, png_idx, :] = values[np.repeat(starts, lengths) + png_idx]
+
+    return result
@@ -62,3 +62,25 @@ class RandomizedProngSorter(ProngSorter):
     def __call__(self, unpacked_prong_array):
         shuffle_unpacked_varr_arrays(unpacked_prong_array)
 
+def select_prong_sorter(name, prong_vars_list):
+    """Constructs `ProngSorter` based on a name
+
+    Parameters
+    ----------
+    name : { "random", "+var_name", "-var_name", ProngSorter, None }
+        Type of the prong reordering. C.f. `DataProngSorter`. If `name` is
+        already a `ProngSorter`, then it is returned as is.
+    prong_vars_list : list of str
+        List of prong variables. C.f. `SingleVarProngSorter`.
+    """
+
+    if name is None:
+        return None
+
+    if not isinstance(name, str):
+        return name
+
+    if name == 'random':
+        return RandomizedProngSorter()
+
+    return SingleVarProngSorter(name, prong_vars_list)
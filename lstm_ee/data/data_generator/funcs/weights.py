@@ -2,8 +2,15 @@
 Functions for calculating data weights.
 """
 
+import hashlib
+import json
+import logging
+import os
+
 import numpy as np
 
+LOGGER = logging.getLogger('lstm_ee.data.data_generator.funcs.weights')
+
 def calc_flat_whist(
     data_loader, var = 'trueE', bins = 50, range = (0, 5), clip = None
 ):
@@ -41,19 +48,137 @@ def calc_flat_whist(
     wvalues    = data_loader.get(var)
     hist, bins = np.histogram(wvalues, bins = bins, range = range)
 
+    return (wvalues, calc_inverse_hist(hist, clip), bins)
+
+def calc_summary_whist(summary, clip = None):
+    """Calculate normalized inverse of a histogram from a variable summary.
+
+    This is a counterpart of `calc_flat_whist` that takes the histogram of a
+    variable from its precomputed (unweighted) summary instead of scanning
+    the dataset.
+
+    Parameters
+    ----------
+    summary : VarSummary
+        Summary of the variable with a histogram.
+        C.f. `lstm_ee.data.summary`.
+    clip : float or None, optional
+        If `clip` is not None, then the maximum value of the inverse histogram
+        will be clipped by `clip`. Default: None.
+
+    Returns
+    -------
+    whist : ndarray
+        Inverse of the histogram.
+    bins : ndarray
+        List of bin edges.
+    """
+    if summary.hist is None:
+        raise ValueError("Summary does not have a histogram")
+
+    return (calc_inverse_hist(summary.hist, clip), summary.bins)
+
+def calc_inverse_hist(hist, clip = None):
+    """Calculate normalized inverse of a histogram `hist`.
+
+    C.f. `calc_flat_whist`.
+    """
     # Regularization
-    hist += 1
+    hist  = hist + 1
     whist = 1 / hist
 
     if clip is not None:
-        min_w = min(whist)
+        min_w = np.min(whist)
         max_w = clip * min_w
 
         whist[whist > max_w] = max_w
 
-    whist = whist / sum(whist)
+    return whist / np.sum(whist)
+
+def get_bin_edges(bins, range):
+    """Get histogram bin edges without looking at the data.
+
+    Parameters
+    ----------
+    bins : int or ndarray
+        Number of bins in a histogram, or a list of bin edges.
+    range : (float, float) or None
+        Range of a histogram (lower, upper). Cannot be None if `bins` is int.
+
+    Returns
+    -------
+    ndarray
+        List of bin edges.
+    """
+    # pylint: disable=redefined-builtin
+    if np.isscalar(bins) and (range is None):
+        raise ValueError(
+            "Histogram range needs to be specified to bin values in a stream"
+        )
+
+    return np.histogram_bin_edges([], bins = bins, range = range)
+
+def find_bins(values, bins):
+    """Find indices of `bins` for `values`, with overflows in the edge bins"""
+    wpos = np.digitize(values, bins)
+
+    # [0, len(bins)] are overflow bins
+    wpos[wpos == 0] = 1
+    wpos[wpos == len(bins)] = len(bins) - 1
+
+    return wpos - 1
+
+def find_bins_nd(values, bins):
+    """Find indices of N-D `bins` for `values` of shape (N, D).
+
+    Returns
+    -------
+    tuple of ndarray
+        Bin indices along each of D axes, that can be used to index an N-D
+        histogram. Overflows are put in the edge bins.
+    """
+    return tuple(
+        find_bins(values[:, axis], edges) for (axis, edges) in enumerate(bins)
+    )
+
+def calc_flat_whist_nd(
+    data_loader, vars = ('trueE', 'trueLepE'), bins = 50, range = None,
+    clip = None
+):
+    """Calculate normalized inverse of the joint histogram of `vars`.
+
+    This is a multidimensional version of `calc_flat_whist`.
+
+    Parameters
+    ----------
+    data_loader : IDataLoader
+        lstm_ee `IDataLoader` object that holds values of the `vars`.
+    vars : list of str
+        Variable names in `IDataLoader` which joint histogram is to be
+        calculated.
+    bins : int or list
+        Number of bins or bin edges of a histogram. C.f. `np.histogramdd`.
+    range : list of (float, float) or None, optional
+        Ranges of a histogram for each variable. C.f. `np.histogramdd`.
+        Default: None.
+    clip : float or None, optional
+        If `clip` is not None, then the maximum value of the inverse histogram
+        will be clipped by `clip`. Default: None.
+
+    Returns
+    -------
+    values : ndarray, shape (len(data_loader), len(vars))
+        Values of the `vars` variables extracted from `data_loader`
+    whist : ndarray
+        Inverse of the `values` histogram of dimension len(vars).
+    bins : list of ndarray
+        List of bin edges for each variable.
+    """
+    # pylint: disable=redefined-builtin
+    wvalues    = np.stack([ data_loader.get(var) for var in vars ], axis = 1)
+    hist, bins = np.histogramdd(wvalues, bins = bins, range = range)
 
-    return (wvalues, whist, bins)
+    return (wvalues, calc_inverse_hist(hist, clip), bins)
 
 def flat_weights(
     data_loader, var = 'trueE', bins = 50, range = (0, 5), clip = None
@@ -87,14 +212,128 @@ def flat_weights(
         data_loader, var, bins, range, clip
     )
 
-    wpos = np.digitize(wvalues, bins)
+    weights = whist[find_bins(wvalues, bins)]
+    weights = weights / sum(weights) * len(data_loader)
 
-    # [0, len(bins)] are overflow bins
-    wpos[wpos == 0] = 1
-    wpos[wpos == len(bins)] = len(bins) - 1
+    return weights
 
-    weights = whist[wpos - 1]
-    weights = weights / sum(weights) * len(data_loader)
+def flat_weights_nd(
+    data_loader, vars = ('trueE', 'trueLepE'), bins = 50, range = None,
+    clip = None
+):
+    """Calculate weights that will make joint histogram of `vars` flat.
+
+    This is a multidimensional version of `flat_weights`, e.g. weights that
+    flatten distribution of events jointly in `trueE` and `trueLepE`.
+    Parameters are the same as of `calc_flat_whist_nd`.
+
+    Returns
+    -------
+    ndarray, shape (len(data_loader),)
+        An array of weights, that will make weighted joint histogram of
+        `vars` flat (up to clipping).
+    """
+    # pylint: disable=redefined-builtin
+    (wvalues, whist, bins) = calc_flat_whist_nd(
+        data_loader, vars, bins, range, clip
+    )
+
+    weights = whist[find_bins_nd(wvalues, bins)]
+    weights = weights / np.sum(weights) * len(data_loader)
+
+    return weights
+
+def get_weights_path(datadir, key):
+    """Get path of the persistent weights file under `datadir`/.weights"""
+    digest = bytes(json.dumps(key, sort_keys = True), 'utf-8')
+    digest = hashlib.sha1(digest).hexdigest()
+
+    return os.path.join(datadir, '.weights', '%s.npy' % (digest))
+
+def persistent_weights(func, path):
+    """Wrap weights function `func` to save the weights it calculates.
+
+    Parameters
+    ----------
+    func : callable
+        Function that calculates weights of a `IDataLoader`,
+        e.g. `flat_weights`.
+    path : str
+        Path of the ".npy" file to save weights to. It must be unique to the
+        `IDataLoader` and `func` parameters. C.f. `get_weights_path`.
+
+    Returns
+    -------
+    callable
+        Function that takes `IDataLoader` and returns memory mapped weights
+        from `path` if they were already calculated. Otherwise, it calculates
+        weights with `func` and saves them to `path`.
+    """
+    def weights(data_loader):
+        if os.path.exists(path):
+            result = np.load(path, mmap_mode = 'r')
+
+            if len(result) == len(data_loader):
+                LOGGER.info("Loading weights from %s", path)
+                return result
+
+        result = np.asarray(func(data_loader))
+
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        tmp_path = '%s.%d.tmp.npy' % (path[:-len('.npy')], os.getpid())
+
+        np.save(tmp_path, result)
+        os.replace(tmp_path, path)
+
+        return result
 
     return weights
 
+def stream_flat_weights(
+    chunks, var = 'trueE', bins = 50, range = (0, 5), clip = None
+):
+    """Calculate flat weights in a single pass over a stream of data chunks.
+
+    This function is a streaming counterpart of `flat_weights`. Instead of
+    loading all values of `var` at once, it accumulates histograms of `var`
+    chunk by chunk.
+
+    Parameters
+    ----------
+    chunks : iterable of IDataLoader
+        Chunks of the dataset.
+    var : str
+        Variable name in `IDataLoader` which histogram should be flattened.
+    bins : int or ndarray
+        Number of bins in a histogram, or a list of bin edges.
+    range : (float, float) or None, optional
+        Range of a histogram (lower, upper). Cannot be None if `bins` is int.
+    clip : float or None, optional
+        If `clip` is not None, then it will limit the maximum value the weight
+        can achieve by `clip`. Default: None.
+
+    Returns
+    -------
+    callable
+        Function that takes a chunk `IDataLoader` and returns an array of
+        its weights. The weights are equal to the weights `flat_weights`
+        would calculate for the dataset made of all `chunks`.
+    """
+    # pylint: disable=redefined-builtin
+    bins   = get_bin_edges(bins, range)
+    hist   = np.zeros(len(bins) - 1, dtype = np.int64)
+    counts = np.zeros(len(bins) - 1, dtype = np.int64)
+
+    for chunk in chunks:
+        wvalues = chunk.get(var)
+
+        hist   += np.histogram(wvalues, bins = bins)[0]
+        counts += np.bincount(
+            find_bins(wvalues, bins), minlength = len(counts)
+        )
+
+    whist = calc_inverse_hist(hist, clip)
+    norm  = np.sum(counts) / np.sum(counts * whist)
+
+    return lambda chunk : whist[find_bins(chunk.get(var), bins)] * norm
+
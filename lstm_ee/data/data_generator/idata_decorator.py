@@ -17,6 +17,9 @@ class IDataDecorator(IDataGenerator):
     def __getitem__(self, index):
         return self._dgen[index]
 
+    def on_epoch_end(self):
+        self._dgen.on_epoch_end()
+
     @property
     def vars_input_slice(self):
         return self._dgen.vars_input_slice
@@ -87,3 +87,9 @@ class IDataGenerator:
 
         raise NotImplementedError
 
+    def on_epoch_end(self):
+        """Notify `IDataGenerator` that an epoch of training has ended.
+
+        By default does nothing. Decorators forward it to the decorated
+        objects.
+        """
@@ -0,0 +1,30 @@
+"""
+Definition of a `Sequence` decorator that produces batches ahead of time in
+background threads or processes.
+
+C.f. `lstm_ee.data.data_generator.base.prefetch_sequence_base`.
+"""
+
+from keras.utils import Sequence
+
+from .idata_decorator             import IDataDecorator
+from .base.prefetch_sequence_base import PrefetchSequenceBase
+
+class PrefetchSequence(PrefetchSequenceBase, IDataDecorator, Sequence):
+    """An alternative to `KerasSequence` that prefetches batches.
+
+    C.f. `PrefetchSequenceBase`.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self, dgen, depth, workers = 1, concurrency = 'thread',
+        shuffle = False, seed = None
+    ):
+        IDataDecorator      .__init__(self, dgen)
+        PrefetchSequenceBase.__init__(
+            self, dgen, depth, workers, concurrency, shuffle, seed
+        )
+
+    def __len__(self):
+        return len(self._dgen)
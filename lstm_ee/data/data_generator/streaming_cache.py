@@ -0,0 +1,17 @@
+"""
+A definition of a decorator that precomputes batches in concurrent processes
+and serves them as soon as they are ready.
+
+C.f. `lstm_ee.data.data_generator.base.streaming_cache_base`.
+"""
+
+from .idata_decorator           import IDataDecorator
+from .base.streaming_cache_base import StreamingCacheBase
+
+class StreamingCache(StreamingCacheBase, IDataDecorator):
+    # pylint: disable=C0115
+
+    def __init__(self, dgen, workers = None, chunksize = 1):
+        IDataDecorator    .__init__(self, dgen)
+        StreamingCacheBase.__init__(self, dgen, workers, chunksize)
+
@@ -8,8 +8,14 @@ from .hdf_loader   import HDFLoader
 from .dict_loader  import DictLoader
 from .data_shuffle import DataShuffle
 from .data_slice   import DataSlice
+from .data_rows    import DataRows
+from .data_filter  import DataFilter
+from .derived_variables import DerivedVariables
+from .shard_reader import ChunkLoader, ShardReader
 
 __all__ = [
-    'CSVLoader', 'HDFLoader', 'DictLoader', 'DataShuffle', 'DataSlice'
+    'CSVLoader', 'HDFLoader', 'DictLoader', 'DataShuffle', 'DataSlice',
+    'DataRows', 'DataFilter', 'DerivedVariables', 'ChunkLoader',
+    'ShardReader',
 ]
 
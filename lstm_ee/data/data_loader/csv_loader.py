@@ -9,6 +9,27 @@ import numpy  as np
 
 from .idata_loader import IDataLoader
 
+# Number of csv lines parsed at once when only a subset of rows is loaded
+CSV_CHUNK_SIZE = 2**16
+
+def convert_varr_series(s, dtype):
+    """Deserialize a `pd.Series` of variable length arrays "v1,v2,..." """
+
+    def convert_varrstr_to_varr(x, dtype):
+        if pd.isnull(x):
+            return np.empty((0,), dtype = dtype)
+
+        if isinstance(x, str):
+            return np.array(
+                [ float(y) for y in x.split(',') ], dtype = dtype
+            )
+
+        return np.array([ x ], dtype = dtype)
+
+    return s.apply(
+        lambda x, dtype = dtype : convert_varrstr_to_varr(x, dtype)
+    )
+
 class CSVLoader(IDataLoader):
     """DataLoader for loading data from the csv files.
 
@@ -31,10 +52,18 @@ class CSVLoader(IDataLoader):
          will be a numpy array of numpy arrays, with first dimension indexing
          slices and second prongs.
 
+    The csv file is parsed lazily, at the first request of values.
+
     Parameters
     ----------
     path : str
         Path to the csv file with the dataset.
+    rows : ndarray or None, optional
+        If not None, then only the rows `rows` of the csv file are kept, in
+        the increasing order of rows. The file is parsed in chunks of
+        `CSV_CHUNK_SIZE` lines and the other rows are dropped, so that the
+        memory usage is proportional to the number of `rows`. Note, that
+        the whole file is still read. Default: None.
 
     Notes
     -----
@@ -56,22 +85,74 @@ class CSVLoader(IDataLoader):
     """
     # pylint: disable=no-self-use
 
-    def __init__(self, path):
+    def __init__(self, path, rows = None):
         super(CSVLoader, self).__init__()
 
-        self._df = pd.read_csv(path)
-
+        self._df        = None
         self._fname     = path
-        self._variables = list(self._df.columns)
-        self._len       = len(self._df)
+        self._variables = None
         self._lock      = threading.Lock()
+        self._rows      = None
+
+        if rows is not None:
+            self._rows = np.unique(rows)
+
+            if len(self._rows) != len(rows):
+                raise ValueError("Row indices are not unique")
+
+    @property
+    def path(self):
+        """Path to the csv file with the dataset"""
+        return self._fname
 
     def variables(self):
+        if self._variables is None:
+            if self._df is not None:
+                self._variables = list(self._df.columns)
+            else:
+                self._variables = list(self._read_csv(nrows = 0).columns)
+
         return self._variables
 
+    def _read_csv(self, **kwargs):
+        if hasattr(self._fname, 'seek'):
+            self._fname.seek(0)
+
+        return pd.read_csv(self._fname, **kwargs)
+
+    def _read_rows(self):
+        """Parse csv file in chunks keeping only the rows `self._rows`"""
+        frames = []
+        start  = 0
+
+        for df in self._read_csv(chunksize = CSV_CHUNK_SIZE):
+            end  = start + len(df)
+            rows = self._rows[
+                np.searchsorted(self._rows, start) :
+                np.searchsorted(self._rows, end)
+            ]
+
+            frames.append(df.iloc[rows - start])
+            start = end
+
+        if (len(self._rows) > 0) and (self._rows[-1] >= start):
+            raise IndexError(
+                "Row %d is out of range of the csv file %s with %d rows" % (
+                    self._rows[-1], self._fname, start
+                )
+            )
+
+        if not frames:
+            return self._read_csv(nrows = 0)
+
+        return pd.concat(frames, ignore_index = True)
+
     def _lazy_load(self):
         if self._df is None:
-            self._df = pd.read_csv(self._fname)
+            if self._rows is None:
+                self._df = self._read_csv()
+            else:
+                self._df = self._read_rows()
 
         if self._lock is None:
             self._lock = threading.Lock()
@@ -102,24 +183,6 @@ class CSVLoader(IDataLoader):
 
         return self.__dict__
 
-    def _convert_varr_series(self, s, dtype):
-        """Deserialize a sequence of variable length arrays"""
-
-        def convert_varrstr_to_varr(x, dtype):
-            if pd.isnull(x):
-                return np.empty((0,), dtype = dtype)
-
-            if isinstance(x, str):
-                return np.array(
-                    [ float(y) for y in x.split(',') ], dtype = dtype
-                )
-
-            return np.array([ x ], dtype = dtype)
-
-        return s.apply(
-            lambda x, dtype = dtype : convert_varrstr_to_varr(x, dtype)
-        )
-
     def get(self, var, index = None):
         self._lazy_load()
 
@@ -137,13 +200,27 @@ class CSVLoader(IDataLoader):
         if np.issubdtype(s.dtype, np.number):
             result = s
         else:
-            result = self._convert_varr_series(s, np.float32)
+            result = convert_varr_series(s, np.float32)
 
         if isinstance(result, (pd.Series, pd.DataFrame)):
             result = result.values
 
         return result
 
+    def get_base_index(self, index = None):
+        if self._rows is None:
+            return super(CSVLoader, self).get_base_index(index)
+
+        if index is None:
+            return self._rows
+
+        return self._rows[index]
+
     def __len__(self):
-        return self._len
+        if self._rows is not None:
+            return len(self._rows)
+
+        self._lazy_load()
+
+        return len(self._df)
 
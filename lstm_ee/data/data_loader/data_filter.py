@@ -0,0 +1,173 @@
+"""
+Definition of a `IDataLoader` transformation that keeps only values passing
+selection cuts.
+"""
+
+import re
+
+import numpy as np
+from .data_slice import DataSlice
+
+COMPARISONS = {
+    '<'  : np.less,
+    '<=' : np.less_equal,
+    '>'  : np.greater,
+    '>=' : np.greater_equal,
+    '==' : np.equal,
+    '!=' : np.not_equal,
+}
+
+RE_COMPARISON = re.compile(r'(<=|>=|==|!=|<|>)')
+RE_VARIABLE   = re.compile(r'^[A-Za-z_][\w.]*$')
+RE_LENGTH     = re.compile(r'^len\(\s*([A-Za-z_][\w.]*)\s*\)$')
+
+def parse_operand(operand):
+    """Parse operand of a filter expression.
+
+    Parameters
+    ----------
+    operand : str
+        Either a number, a variable name, or "len(var)" which stands for
+        the number of prongs of a prong level variable "var".
+
+    Returns
+    -------
+    (str, object)
+        Pair of operand type ('const', 'var' or 'len') and its value.
+    """
+    operand = operand.strip()
+
+    try:
+        return ('const', float(operand))
+    except ValueError:
+        pass
+
+    match = RE_LENGTH.match(operand)
+    if match:
+        return ('len', match.group(1))
+
+    if RE_VARIABLE.match(operand):
+        return ('var', operand)
+
+    raise ValueError("Failed to parse filter operand '%s'" % (operand))
+
+def parse_filter(expr):
+    """Parse filter expression into a list of operands and comparisons.
+
+    Parameters
+    ----------
+    expr : str
+        Filter expression, e.g. "calE < 5", "len(png.calE) >= 1" or
+        chained "0.5 < trueE < 5".
+
+    Returns
+    -------
+    (list, list)
+        List of parsed operands (c.f. `parse_operand`) and list of comparison
+        operators between them.
+    """
+    tokens = RE_COMPARISON.split(expr)
+
+    if len(tokens) < 3:
+        raise ValueError("Filter '%s' does not contain comparisons" % (expr))
+
+    operands    = [ parse_operand(x) for x in tokens[0::2] ]
+    comparisons = tokens[1::2]
+
+    return (operands, comparisons)
+
+def get_filter_variables(filters):
+    """Get names of variables used by `filters`"""
+    if filters is None:
+        return []
+
+    if isinstance(filters, str):
+        filters = [ filters ]
+
+    result = []
+
+    for expr in filters:
+        for (kind, value) in parse_filter(expr)[0]:
+            if (kind != 'const') and (value not in result):
+                result.append(value)
+
+    return result
+
+def calc_operand(data_loader, operand):
+    """Calculate values of `operand` over the entire `data_loader`"""
+    kind, value = operand
+
+    if kind == 'const':
+        return value
+
+    values = data_loader.get(value)
+
+    if kind == 'len':
+        return np.fromiter(
+            (len(np.atleast_1d(x)) for x in values),
+            dtype = np.int64, count = len(values)
+        )
+
+    return values
+
+def eval_filters(data_loader, filters):
+    """Evaluate selection cuts over the entire `data_loader`.
+
+    Parameters
+    ----------
+    data_loader : IDataLoader
+        DataLoader to evaluate filters on.
+    filters : str or list of str
+        Filter expression or a list of expressions that are combined with the
+        logical AND. C.f. `parse_filter`.
+
+    Returns
+    -------
+    ndarray of bool
+        Mask of the values of `data_loader` that pass all `filters`.
+        Comparisons with NaN values never pass.
+    """
+    if isinstance(filters, str):
+        filters = [ filters ]
+
+    result = np.ones(len(data_loader), dtype = bool)
+    cache  = {}
+
+    for expr in filters:
+        operands, comparisons = parse_filter(expr)
+
+        for operand in operands:
+            if operand not in cache:
+                cache[operand] = calc_operand(data_loader, operand)
+
+        for (idx, comp) in enumerate(comparisons):
+            result &= COMPARISONS[comp](
+                cache[operands[idx]], cache[operands[idx + 1]]
+            ).ravel()
+
+    return result
+
+class DataFilter(DataSlice):
+    """decorator around `IDataLoader` that keeps only values passing filters.
+
+    `DataFilter` evaluates selection cuts once over the entire decorated
+    `IDataLoader`, and then acts as a `DataSlice` that keeps only indices of
+    the passing values. Therefore, filters are not reevaluated when the
+    batches are generated.
+
+    Parameters
+    ----------
+    data_loader : `IDataLoader`
+        DataLoader to decorate.
+    filters : str or list of str
+        Filter expression or a list of expressions that are combined with the
+        logical AND. Each expression is a (possibly chained) comparison
+        of numbers, variables and prong counts "len(var)" of prong level
+        variables, e.g. [ "calE < 5", "nHit > 20", "len(png.calE) >= 1" ].
+    """
+
+    def __init__(self, data_loader, filters):
+        mask = eval_filters(data_loader, filters)
+        super(DataFilter, self).__init__(data_loader, np.nonzero(mask)[0])
+
+        self._filters = filters
@@ -0,0 +1,56 @@
+"""
+Definition of a `IDataLoader` transformation that reads only a subset of rows.
+"""
+
+import numpy as np
+from .idata_loader_decorator import IDataLoaderDecorator
+
+class DataRows(IDataLoaderDecorator):
+    """decorator around `IDataLoader` that projects it on a subset of rows.
+
+    Like `DataSlice`, `DataRows` creates a "view" of the `IDataLoader` that
+    holds only the rows `indices` in the order of `indices`. However, instead
+    of forwarding each request to the decorated `IDataLoader`, `DataRows`
+    reads values of the selected rows of each requested variable once, in
+    the increasing order of rows, and keeps them in memory. So, the
+    decorated `IDataLoader` never needs to load values of the rows that are
+    not selected.
+
+    Parameters
+    ----------
+    data_loader : `IDataLoader`
+        DataLoader to decorate.
+    indices : list of int
+        Indices of rows to keep.
+    """
+
+    def __init__(self, data_loader, indices):
+        super(DataRows, self).__init__(data_loader)
+
+        self._rows, self._inverse = np.unique(indices, return_inverse = True)
+
+        if len(self._rows) != len(indices):
+            raise ValueError("Row indices are not unique")
+
+        self._values = {}
+
+    def __len__(self):
+        return len(self._inverse)
+
+    def get(self, var, index = None):
+        if var not in self._values:
+            self._values[var] = self._data_loader.get(var, self._rows)
+
+        if index is None:
+            return self._values[var][self._inverse]
+
+        return self._values[var][self._inverse[index]]
+
+    def get_base_index(self, index = None):
+
+        if index is None:
+            base_index = self._rows[self._inverse]
+        else:
+            base_index = self._rows[self._inverse[index]]
+
+        return self._data_loader.get_base_index(base_index)
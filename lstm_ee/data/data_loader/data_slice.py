@@ -37,3 +37,12 @@ class DataSlice(IDataLoaderDecorator):
 
         return self._data_loader.get(var, base_index)
 
+    def get_base_index(self, index = None):
+
+        if index is None:
+            base_index = self._indices
+        else:
+            base_index = self._indices[index]
+
+        return self._data_loader.get_base_index(base_index)
+
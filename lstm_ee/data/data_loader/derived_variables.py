@@ -0,0 +1,404 @@
+"""
+Definition of a `IDataLoader` transformation that adds variables derived from
+the existing ones.
+"""
+
+import ast
+import re
+
+import numpy as np
+from .idata_loader_decorator import IDataLoaderDecorator
+
+# Numbers are matched first, so that e.g. 1e-3 is not taken for a variable
+RE_TOKEN = re.compile(
+      r'(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)'
+    + r'|(?P<name>[A-Za-z_]\w*(?:\.[A-Za-z_]\w*|\[\d+\])*)(?P<call>\s*\()?'
+)
+
+ELEMENTWISE_FUNCS = {
+    'abs'     : np.abs,
+    'arctan2' : np.arctan2,
+    'cos'     : np.cos,
+    'exp'     : np.exp,
+    'log'     : np.log,
+    'log10'   : np.log10,
+    'maximum' : np.maximum,
+    'minimum' : np.minimum,
+    'sin'     : np.sin,
+    'sqrt'    : np.sqrt,
+}
+
+REDUCTION_FUNCS = [ 'len', 'max', 'mean', 'min', 'sum' ]
+
+BINARY_OPS = {
+    ast.Add  : np.add,
+    ast.Sub  : np.subtract,
+    ast.Mult : np.multiply,
+    ast.Div  : np.true_divide,
+    ast.Pow  : np.power,
+}
+
+UNARY_OPS = {
+    ast.UAdd : np.positive,
+    ast.USub : np.negative,
+}
+
+class Ragged:
+    """Values of a prong level variable as a flat buffer with lengths.
+
+    Parameters
+    ----------
+    values : ndarray
+        Concatenated values of all events.
+    lengths : ndarray of int
+        Number of values in each event.
+    """
+
+    def __init__(self, values, lengths):
+        self.values  = values
+        self.lengths = lengths
+
+    @staticmethod
+    def from_varr(varr):
+        """Construct `Ragged` from an array of variable length arrays"""
+        if varr.ndim == 2:
+            # All arrays have the same length
+            return Ragged(
+                varr.ravel(), np.full(len(varr), varr.shape[1], dtype = int)
+            )
+
+        lengths = np.fromiter(
+            (len(np.atleast_1d(x)) for x in varr),
+            dtype = np.int64, count = len(varr)
+        )
+
+        if lengths.sum() == 0:
+            return Ragged(np.zeros(0, dtype = np.float32), lengths)
+
+        values = np.concatenate([ np.atleast_1d(x) for x in varr ])
+        return Ragged(values, lengths)
+
+    def to_varr(self):
+        """Convert to an array of variable length arrays"""
+        result = np.empty(len(self.lengths), dtype = object)
+        splits = np.split(self.values, np.cumsum(self.lengths)[:-1])
+
+        # Assign one by one, so that arrays of equal lengths are not merged
+        # into a multidimensional array.
+        for (idx, x) in enumerate(splits):
+            result[idx] = x
+
+        return result
+
+    def broadcast(self, values):
+        """Broadcast event level `values` to the values of prongs"""
+        return np.repeat(values, self.lengths)
+
+    def reduce(self, name):
+        """Calculate event level reduction `name` of the prong values"""
+        if name == 'len':
+            return self.lengths
+
+        event = np.repeat(np.arange(len(self.lengths)), self.lengths)
+        sums  = np.bincount(
+            event, weights = self.values, minlength = len(self.lengths)
+        )
+
+        if name == 'sum':
+            return sums
+
+        if name == 'mean':
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                return sums / self.lengths
+
+        ufunc  = np.maximum if name == 'max' else np.minimum
+        result = np.full(len(self.lengths), np.nan)
+        mask   = (self.lengths > 0)
+
+        if np.any(mask):
+            starts       = (np.cumsum(self.lengths) - self.lengths)[mask]
+            result[mask] = ufunc.reduceat(self.values, starts)
+
+        return result
+
+def apply_elementwise(func, args):
+    """Apply `func` to `args`, where some of them may be `Ragged`"""
+    ragged = [ x for x in args if isinstance(x, Ragged) ]
+
+    if not ragged:
+        return func(*args)
+
+    lengths = ragged[0].lengths
+
+    if any(not np.array_equal(x.lengths, lengths) for x in ragged[1:]):
+        raise ValueError(
+            "Prong level variables have different numbers of prongs"
+        )
+
+    values = []
+
+    for x in args:
+        if isinstance(x, Ragged):
+            values.append(x.values)
+        elif np.ndim(x) == 0:
+            values.append(x)
+        else:
+            values.append(ragged[0].broadcast(x))
+
+    return Ragged(func(*values), lengths)
+
+def preprocess_expression(expr):
+    """Replace variable names in `expr` by valid python identifiers.
+
+    Variable names may contain dots and indices, e.g. "png.bpf[0].energy",
+    so they are replaced by placeholders before `expr` is parsed.
+
+    Returns
+    -------
+    (str, dict)
+        Expression with placeholders and a dictionary { placeholder : var }.
+    """
+    names = {}
+
+    def replace(match):
+        name = match.group('name')
+
+        if name is None:
+            return match.group(0)
+
+        if match.group('call') is not None:
+            if (name in ELEMENTWISE_FUNCS) or (name in REDUCTION_FUNCS):
+                return match.group(0)
+
+            raise ValueError("Unknown function '%s' in '%s'" % (name, expr))
+
+        placeholders = { v : k for (k, v) in names.items() }
+
+        if name not in placeholders:
+            placeholders[name] = '__var%d' % (len(names))
+            names[placeholders[name]] = name
+
+        return placeholders[name]
+
+    return (RE_TOKEN.sub(replace, expr), names)
+
+class Expression:
+    """Parsed expression of a derived variable.
+
+    Parameters
+    ----------
+    expr : str
+        Arithmetic expression (+, -, *, /, **) over numbers and variables.
+        Prong level variables are combined elementwise and can be reduced to
+        the event level by one of the functions sum(), mean(), max(), min()
+        or len(). Elementwise functions sqrt(), abs(), log(), log10(),
+        exp(), sin(), cos(), arctan2(), minimum() and maximum() are also
+        available.
+    """
+
+    def __init__(self, expr):
+        self._expr = expr
+        code, self._names = preprocess_expression(expr)
+
+        try:
+            self._tree = ast.parse(code.strip(), mode = 'eval').body
+        except SyntaxError as e:
+            raise ValueError(
+                "Failed to parse expression '%s': %s" % (expr, e)
+            ) from e
+
+        self._validate(self._tree)
+
+    @property
+    def variables(self):
+        """Names of variables used by the expression"""
+        return list(self._names.values())
+
+    def _validate(self, node):
+        if isinstance(node, ast.BinOp) and (type(node.op) in BINARY_OPS):
+            self._validate(node.left)
+            self._validate(node.right)
+        elif isinstance(node, ast.UnaryOp) and (type(node.op) in UNARY_OPS):
+            self._validate(node.operand)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if (
+                    (node.func.id not in ELEMENTWISE_FUNCS)
+                and (node.func.id not in REDUCTION_FUNCS)
+            ):
+                raise ValueError(
+                    "Unknown function '%s' in '%s'"
+                        % (node.func.id, self._expr)
+                )
+
+            if node.keywords:
+                raise ValueError(
+                    "Keyword arguments are not supported: %s" % (self._expr)
+                )
+
+            for arg in node.args:
+                self._validate(arg)
+        elif isinstance(node, ast.Name) and (node.id in self._names):
+            pass
+        elif isinstance(node, ast.Constant) and isinstance(
+            node.value, (int, float)
+        ):
+            pass
+        else:
+            raise ValueError(
+                "Unsupported expression '%s'" % (self._expr)
+            )
+
+    def _eval(self, node, get_var):
+        # pylint: disable=too-many-return-statements
+        if isinstance(node, ast.Constant):
+            return node.value
+
+        if isinstance(node, ast.Name):
+            return get_var(self._names[node.id])
+
+        if isinstance(node, ast.BinOp):
+            return apply_elementwise(
+                BINARY_OPS[type(node.op)],
+                [ self._eval(node.left,  get_var),
+                  self._eval(node.right, get_var) ]
+            )
+
+        if isinstance(node, ast.UnaryOp):
+            return apply_elementwise(
+                UNARY_OPS[type(node.op)], [ self._eval(node.operand, get_var) ]
+            )
+
+        name = node.func.id
+        args = [ self._eval(x, get_var) for x in node.args ]
+
+        if name in ELEMENTWISE_FUNCS:
+            return apply_elementwise(ELEMENTWISE_FUNCS[name], args)
+
+        if (len(args) != 1) or (not isinstance(args[0], Ragged)):
+            raise ValueError(
+                "Function %s() expects a single prong level variable: %s"
+                    % (name, self._expr)
+            )
+
+        return args[0].reduce(name)
+
+    def evaluate(self, get_var):
+        """Evaluate expression.
+
+        Parameters
+        ----------
+        get_var : callable
+            Function that returns values of a variable by its name, either as
+            an ndarray for slice level variables or `Ragged`.
+
+        Returns
+        -------
+        ndarray or Ragged
+            Values of the expression.
+        """
+        return self._eval(self._tree, get_var)
+
+def get_derived_inputs(derived_vars):
+    """Get names of the base variables used by `derived_vars`"""
+    if not derived_vars:
+        return []
+
+    result = []
+
+    for expr in derived_vars.values():
+        for var in Expression(expr).variables:
+            if (var not in derived_vars) and (var not in result):
+                result.append(var)
+
+    return result
+
+class DerivedVariables(IDataLoaderDecorator):
+    """decorator around `IDataLoader` that adds derived variables.
+
+    `DerivedVariables` adds variables that are calculated from the variables
+    of the decorated `IDataLoader` according to the expressions specified in
+    `derived_vars`. Expressions are evaluated vectorized over all events of
+    the decorated `IDataLoader`: prong level variables are handled as flat
+    buffers of values, so that elementwise operations and reductions to the
+    event level do not loop over events. Values of each derived variable are
+    calculated at the first request and memoized.
+
+    Parameters
+    ----------
+    data_loader : `IDataLoader`
+        DataLoader to decorate.
+    derived_vars : dict
+        Dictionary { name : expression } of derived variables. Expressions
+        may refer to the variables of `data_loader` and to other derived
+        variables. E.g.
+        {
+          'png.p' : 'sqrt(png.px**2 + png.py**2 + png.pz**2)',
+          'sumPngCalE' : 'sum(png.calE)',
+        }
+        C.f. `Expression` for the expression syntax.
+    """
+
+    def __init__(self, data_loader, derived_vars):
+        super(DerivedVariables, self).__init__(data_loader)
+
+        self._exprs = {
+            name : Expression(expr) for (name, expr) in derived_vars.items()
+        }
+
+        self._values = {}
+        self._ragged = {}
+        self._active = set()
+
+    def variables(self):
+        return self._data_loader.variables() + [
+            x for x in self._exprs if x not in self._data_loader.variables()
+        ]
+
+    def _get_ragged(self, var):
+        """Get values of `var` over the entire dataset for evaluation"""
+        if var in self._exprs:
+            self._calc(var)
+            return self._ragged.get(var, self._values[var])
+
+        if var not in self._ragged:
+            values = self._data_loader.get(var)
+
+            if (values.dtype == object) or (values.ndim == 2):
+                values = Ragged.from_varr(values)
+
+            self._ragged[var] = values
+
+        return self._ragged[var]
+
+    def _calc(self, var):
+        if var in self._values:
+            return
+
+        if var in self._active:
+            raise ValueError(
+                "Circular definition of derived variable '%s'" % (var)
+            )
+
+        self._active.add(var)
+
+        try:
+            result = self._exprs[var].evaluate(self._get_ragged)
+        finally:
+            self._active.discard(var)
+
+        if isinstance(result, Ragged):
+            self._ragged[var] = result
+            self._values[var] = result.to_varr()
+        else:
+            self._values[var] = np.broadcast_to(result, (len(self),))
+
+    def get(self, var, index = None):
+        if var not in self._exprs:
+            return self._data_loader.get(var, index)
+
+        self._calc(var)
+
+        if index is None:
+            return self._values[var]
+
+        return self._values[var][index]
@@ -2,6 +2,8 @@
 Definition of a DataLoader Interface.
 """
 
+import numpy as np
+
 class IDataLoader():
     """An interface for DataLoader object.
 
@@ -45,6 +47,30 @@ class IDataLoader():
         """
         raise NotImplementedError
 
+    def get_base_index(self, index = None):
+        """Map `index` to the row indices of the underlying raw dataset.
+
+        DataLoader decorators (e.g. shuffling or slicing) reorder and subset
+        rows of the DataLoader they decorate. This function allows one to
+        find out which rows of the raw dataset correspond to the rows of
+        this DataLoader.
+
+        Parameters
+        ----------
+        index : int or ndarray or None
+            Index of rows of this DataLoader. If None, then indices for all
+            rows will be returned.
+
+        Returns
+        -------
+        ndarray
+            Row indices of the raw dataset corresponding to `index`.
+        """
+        if index is None:
+            return np.arange(len(self))
+
+        return np.arange(len(self))[index]
+
     def __len__(self):
         raise NotImplementedError
 
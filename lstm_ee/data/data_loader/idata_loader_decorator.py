@@ -17,6 +17,9 @@ class IDataLoaderDecorator(IDataLoader):
     def get(self, var, index = None):
         return self._data_loader.get(var, index)
 
+    def get_base_index(self, index = None):
+        return self._data_loader.get_base_index(index)
+
     def __len__(self):
         return len(self._data_loader)
 
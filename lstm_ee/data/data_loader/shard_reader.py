@@ -0,0 +1,320 @@
+"""
+Definition of a `ShardReader` that reads sharded datasets sequentially in
+chunks.
+"""
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import tables
+
+from .csv_loader   import convert_varr_series
+from .data_filter  import eval_filters, get_filter_variables
+from .derived_variables import DerivedVariables, get_derived_inputs
+from .idata_loader import IDataLoader
+
+H5_EXTS    = [ 'h5', 'hdf', 'hdf5' ]
+SHARD_EXTS = H5_EXTS + [ 'csv', 'csv.gz', 'csv.bz2', 'csv.xz' ]
+
+def is_hdf_path(path):
+    """Check whether `path` has an extension of the HDF file"""
+    return any(path.endswith(ext) for ext in H5_EXTS)
+
+def find_shards(path):
+    """Find shards of a dataset located at `path`.
+
+    Parameters
+    ----------
+    path : str
+        Either a path to a single dataset file, or a path to a directory
+        with shards, or a glob pattern matching shards. Shards inside a
+        directory are recognized by their extensions (c.f. `SHARD_EXTS`).
+
+    Returns
+    -------
+    list of str
+        Sorted list of paths to shards.
+    """
+    if os.path.isdir(path):
+        result = [
+            os.path.join(path, x) for x in os.listdir(path)
+                if any(x.endswith('.' + ext) for ext in SHARD_EXTS)
+        ]
+    elif any(c in path for c in '*?['):
+        result = glob.glob(path)
+    else:
+        result = [ path ]
+
+    if not result:
+        raise RuntimeError("No dataset shards found at: %s" % (path))
+
+    return sorted(result)
+
+class ChunkLoader(IDataLoader):
+    """`IDataLoader` over a chunk of already deserialized values.
+
+    Parameters
+    ----------
+    arrays : dict
+        Dictionary { var : values }, where values of scalar variables are
+        numeric arrays and values of prong level variables are object
+        arrays of arrays.
+    """
+
+    def __init__(self, arrays):
+        super(ChunkLoader, self).__init__()
+
+        self._arrays = arrays
+        self._len    = 0
+
+        if arrays:
+            self._len = len(next(iter(arrays.values())))
+
+    def variables(self):
+        return list(self._arrays)
+
+    def get(self, var, index = None):
+        if index is None:
+            return self._arrays[var]
+
+        return self._arrays[var][index]
+
+    def __len__(self):
+        return self._len
+
+def _read_hdf_values(node, start, stop):
+    values = node.read(start, stop)
+
+    if not isinstance(node, tables.VLArray):
+        return np.asarray(values)
+
+    # Assign one by one, so that arrays of equal lengths are not merged
+    # into a multidimensional array.
+    result = np.empty(len(values), dtype = object)
+
+    for (idx, x) in enumerate(values):
+        result[idx] = x
+
+    return result
+
+class ShardReader:
+    """Sequential reader of a sharded dataset.
+
+    `ShardReader` reads dataset shards (csv or hdf files) one at a time, in
+    chunks of `chunk_size` events, so that at any time only a single chunk
+    of the dataset is held in memory. Only `variables` are read.
+
+    Parameters
+    ----------
+    shards : list of str
+        Paths to the dataset shards. C.f. `find_shards`.
+    variables : list of str
+        Names of variables to read.
+    chunk_size : int
+        Number of events to read at once.
+    varr_variables : list of str or None, optional
+        Names of prong level (variable length array) variables. Values of
+        these variables in csv files are always deserialized as variable
+        length arrays, even if all of them in a chunk hold a single number.
+    filters : str or list of str or None, optional
+        Selection cuts applied to each chunk. Variables used by the cuts
+        should be a part of `variables`. If `filters` are specified, then
+        `lengths` count events that pass the selection, which requires an
+        extra pass over the variables used by the cuts. C.f. `DataFilter`.
+        Default: None.
+    derived_vars : dict or None, optional
+        Definitions of derived variables that are calculated for each chunk.
+        Derived variables from `variables` are not read from the shards, but
+        the variables they depend on are. C.f. `DerivedVariables`.
+        Default: None.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self, shards, variables, chunk_size, varr_variables = None,
+        filters = None, derived_vars = None
+    ):
+        self._shards         = shards
+        self._variables      = list(variables)
+        self._chunk_size     = chunk_size
+        self._varr_variables = set(varr_variables or [])
+        self._filters        = filters
+        self._derived_vars   = derived_vars or {}
+        self._lengths        = None
+
+        self._read_vars = [
+            x for x in self._variables if x not in self._derived_vars
+        ]
+        self._read_vars += [
+            x for x in get_derived_inputs(self._derived_vars)
+                if x not in self._read_vars
+        ]
+
+        self._filter_vars, self._filter_derived_vars = (
+            self._get_filter_inputs()
+        )
+
+    @property
+    def shards(self):
+        """List of paths to the dataset shards"""
+        return self._shards
+
+    @property
+    def chunk_size(self):
+        """Number of events read at once"""
+        return self._chunk_size
+
+    def _get_filter_inputs(self):
+        """Find variables and derived variables needed by the selection"""
+        read_vars    = []
+        derived_vars = {}
+        queue        = get_filter_variables(self._filters)
+
+        while queue:
+            var = queue.pop()
+
+            if (var in read_vars) or (var in derived_vars):
+                continue
+
+            if var in self._derived_vars:
+                derived_vars[var] = self._derived_vars[var]
+                queue += get_derived_inputs({ var : derived_vars[var] })
+            else:
+                read_vars.append(var)
+
+        if not read_vars:
+            # Selection of constants still needs the number of events
+            read_vars = self._read_vars[:1]
+
+        return (read_vars, derived_vars)
+
+    def _count_selected(self, path):
+        """Count events of the shard `path` that pass the selection"""
+        result = 0
+
+        for chunk in self._iter_raw_shard(path, self._filter_vars):
+            if self._filter_derived_vars:
+                chunk = DerivedVariables(chunk, self._filter_derived_vars)
+
+            result += np.count_nonzero(eval_filters(chunk, self._filters))
+
+        return result
+
+    def _get_shard_len(self, path):
+        if self._filters is not None:
+            return self._count_selected(path)
+
+        if is_hdf_path(path):
+            with tables.open_file(path, 'r') as f:
+                return len(f.get_node('/' + self._read_vars[0]))
+
+        with pd.read_csv(
+            path, usecols = self._read_vars[:1], chunksize = self._chunk_size
+        ) as reader:
+            return sum(len(df) for df in reader)
+
+    @property
+    def lengths(self):
+        """List of numbers of events in each shard that pass the selection"""
+        if self._lengths is None:
+            self._lengths = [ self._get_shard_len(x) for x in self._shards ]
+
+        return self._lengths
+
+    def __len__(self):
+        return sum(self.lengths)
+
+    def _iter_hdf_shard(self, path, read_vars):
+        with tables.open_file(path, 'r') as f:
+            nodes = { var : f.get_node('/' + var) for var in read_vars }
+            n     = len(nodes[read_vars[0]])
+
+            for start in range(0, n, self._chunk_size):
+                stop = min(start + self._chunk_size, n)
+
+                yield ChunkLoader({
+                    var : _read_hdf_values(node, start, stop)
+                        for (var, node) in nodes.items()
+                })
+
+    def _iter_csv_shard(self, path, read_vars):
+        # Close the file also when the iteration stops early
+        with pd.read_csv(
+            path, usecols = read_vars, chunksize = self._chunk_size
+        ) as reader:
+            for df in reader:
+                arrays = {}
+
+                for var in read_vars:
+                    s = df[var]
+
+                    if (
+                            (var not in self._varr_variables)
+                        and np.issubdtype(s.dtype, np.number)
+                    ):
+                        arrays[var] = s.values
+                    else:
+                        arrays[var] = convert_varr_series(
+                            s, np.float32
+                        ).values
+
+                yield ChunkLoader(arrays)
+
+    def _iter_raw_shard(self, path, read_vars):
+        """Iterate over chunks of `read_vars` of the shard `path`"""
+        if is_hdf_path(path):
+            return self._iter_hdf_shard(path, read_vars)
+
+        return self._iter_csv_shard(path, read_vars)
+
+    def iter_shard(self, index):
+        """Iterate over chunks of shard `index`.
+
+        Yields
+        ------
+        ChunkLoader
+            Consecutive chunks of the shard.
+        """
+        chunks = self._iter_raw_shard(self._shards[index], self._read_vars)
+
+        if (self._filters is None) and (not self._derived_vars):
+            return chunks
+
+        return (self._process_chunk(chunk) for chunk in chunks)
+
+    def _process_chunk(self, chunk):
+        """Calculate derived variables and apply selection to `chunk`"""
+        if self._derived_vars:
+            chunk = DerivedVariables(chunk, self._derived_vars)
+
+        if self._filters is None:
+            mask = slice(None)
+        else:
+            mask = eval_filters(chunk, self._filters)
+
+        return ChunkLoader({
+            var : chunk.get(var)[mask] for var in self._variables
+        })
+
+    def iter_chunks(self, order = None):
+        """Iterate over chunks of all shards.
+
+        Parameters
+        ----------
+        order : list of int or None, optional
+            Order in which shards are read. If None, shards are read in
+            their natural order.
+
+        Yields
+        ------
+        (int, int, ChunkLoader)
+            Shard index, chunk index inside the shard and the chunk itself.
+        """
+        if order is None:
+            order = range(len(self._shards))
+
+        for shard in order:
+            for (chunk_index, chunk) in enumerate(self.iter_shard(shard)):
+                yield (shard, chunk_index, chunk)
@@ -0,0 +1,287 @@
+"""
+Opt-in instrumentation of the data pipeline.
+
+When enabled, every stage of the `IDataGenerator` decorator chain and of the
+`IDataLoader` chain underneath it is wrapped by a proxy that records number
+of calls, wall time, bytes produced and cache hits of that stage. When
+disabled, the chains are not modified at all.
+"""
+
+import copy
+import csv
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from lstm_ee.consts import INSTRUMENT
+from lstm_ee.data.data_generator.idata_decorator     import IDataDecorator
+from lstm_ee.data.data_loader.idata_loader_decorator import (
+    IDataLoaderDecorator
+)
+
+LOGGER = logging.getLogger('lstm_ee.data.instrument')
+
+PROFILE_COLUMNS = [
+    'epoch', 'stage', 'calls', 'hits', 'time', 'self_time', 'bytes'
+]
+
+def is_instrument_enabled(instrument = None):
+    """Check whether the data pipeline instrumentation is enabled.
+
+    Parameters
+    ----------
+    instrument : bool or None, optional
+        Value of the `instrument` runtime argument. If None, then the
+        instrumentation is controlled by the environment variable
+        `LSTM_EE_INSTRUMENT`.
+    """
+    if instrument is None:
+        return INSTRUMENT
+
+    return bool(instrument)
+
+def get_nbytes(obj):
+    """Calculate number of bytes held by arrays of a nested `obj`"""
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            return sum(get_nbytes(x) for x in obj.ravel())
+
+        return obj.nbytes
+
+    if isinstance(obj, dict):
+        return sum(get_nbytes(x) for x in obj.values())
+
+    if isinstance(obj, (list, tuple)):
+        return sum(get_nbytes(x) for x in obj)
+
+    return 0
+
+class PipelineProfiler:
+    """Accumulator of the per stage statistics of the data pipeline.
+
+    For each stage the profiler records number of calls, total wall time
+    spent in the stage (including the decorated stages), the time spent in
+    the stage itself (excluding calls to the decorated stages made from the
+    same thread), number of bytes produced and number of cache hits. A call
+    is counted as a cache hit if the stage has served it without calling
+    the decorated stage synchronously.
+    """
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self._local  = threading.local()
+        self._stages = {}
+
+    def __getstate__(self):
+        state = copy.copy(self.__dict__)
+        state.pop('_lock',  None)
+        state.pop('_local', None)
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock  = threading.Lock()
+        self._local = threading.local()
+
+    def add_stage(self, name, has_children):
+        """Register stage `name`. Stages without children have no hits."""
+        with self._lock:
+            self._stages[name] = {
+                'calls'     : 0,
+                'hits'      : 0 if has_children else None,
+                'time'      : 0.0,
+                'self_time' : 0.0,
+                'bytes'     : 0,
+            }
+
+    def _get_stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+
+        return self._local.stack
+
+    def call(self, name, func, *args):
+        """Call `func(*args)` recording statistics of the stage `name`"""
+        stack = self._get_stack()
+        frame = [ 0, 0.0 ]
+
+        if stack:
+            stack[-1][0] += 1
+
+        stack.append(frame)
+        start = time.perf_counter()
+
+        try:
+            result = func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+
+            if stack:
+                stack[-1][1] += elapsed
+
+        nbytes = get_nbytes(result)
+
+        with self._lock:
+            stats = self._stages[name]
+
+            stats['calls']     += 1
+            stats['time']      += elapsed
+            stats['self_time'] += elapsed - frame[1]
+            stats['bytes']     += nbytes
+
+            if (stats['hits'] is not None) and (frame[0] == 0):
+                stats['hits'] += 1
+
+        return result
+
+    def get_stats(self):
+        """Return a list of (stage, stats) in the order of registration"""
+        with self._lock:
+            return [ (k, dict(v)) for (k, v) in self._stages.items() ]
+
+    def reset(self):
+        """Reset accumulated statistics of all stages"""
+        with self._lock:
+            for stats in self._stages.values():
+                for k in stats:
+                    if stats[k] is not None:
+                        stats[k] = type(stats[k])(0)
+
+    def format_table(self):
+        """Format accumulated statistics as a human readable table"""
+        lines = [
+            "%-40s %8s %8s %10s %10s %12s" % (
+                'STAGE', 'CALLS', 'HITS', 'TIME', 'SELF TIME', 'MBYTES'
+            )
+        ]
+
+        for (name, stats) in self.get_stats():
+            lines.append("%-40s %8d %8s %9.3fs %9.3fs %12.1f" % (
+                name, stats['calls'],
+                '-' if stats['hits'] is None else stats['hits'],
+                stats['time'], stats['self_time'], stats['bytes'] / 2**20
+            ))
+
+        return '\n'.join(lines)
+
+    def save_epoch(self, path, epoch):
+        """Append statistics of `epoch` to a csv file `path` and reset them"""
+        write_header = not os.path.exists(path)
+
+        with open(path, 'a', newline = '') as f:
+            writer = csv.writer(f)
+
+            if write_header:
+                writer.writerow(PROFILE_COLUMNS)
+
+            for (name, stats) in self.get_stats():
+                writer.writerow(
+                    [ epoch, name ] + [ stats[k] for k in PROFILE_COLUMNS[2:] ]
+                )
+
+        self.reset()
+
+# Profiler used by the training pipeline
+PROFILER = PipelineProfiler()
+
+class InstrumentedGenerator(IDataDecorator):
+    """A proxy around `IDataGenerator` that records its statistics"""
+
+    def __init__(self, dgen, profiler, name):
+        super(InstrumentedGenerator, self).__init__(dgen)
+        self._profiler = profiler
+        self._name     = name
+
+    def __getitem__(self, index):
+        return self._profiler.call(self._name, self._dgen.__getitem__, index)
+
+class InstrumentedLoader(IDataLoaderDecorator):
+    """A proxy around `IDataLoader` that records statistics of `get` calls"""
+
+    def __init__(self, data_loader, profiler, name):
+        super(InstrumentedLoader, self).__init__(data_loader)
+        self._profiler = profiler
+        self._name     = name
+
+    def get(self, var, index = None):
+        return self._profiler.call(
+            self._name, self._data_loader.get, var, index
+        )
+
+def _instrument_loader(data_loader, profiler, prefix, depth, memo):
+    # pylint: disable=protected-access
+    if id(data_loader) in memo:
+        return memo[id(data_loader)]
+
+    name   = "%s/loader%d:%s" % (prefix, depth, type(data_loader).__name__)
+    parent = getattr(data_loader, '_data_loader', None)
+
+    profiler.add_stage(name, parent is not None)
+
+    if parent is not None:
+        data_loader._data_loader = _instrument_loader(
+            parent, profiler, prefix, depth + 1, memo
+        )
+
+    result = InstrumentedLoader(data_loader, profiler, name)
+    memo[id(data_loader)] = result
+
+    return result
+
+def _instrument_generator(dgen, profiler, prefix, depth, memo):
+    # pylint: disable=protected-access
+    if id(dgen) in memo:
+        return memo[id(dgen)]
+
+    name   = "%s/%d:%s" % (prefix, depth, type(dgen).__name__)
+    parent = getattr(dgen, '_dgen', None)
+    loader = getattr(dgen, '_data_loader', None)
+
+    profiler.add_stage(name, (parent is not None) or (loader is not None))
+
+    if parent is not None:
+        dgen._dgen = _instrument_generator(
+            parent, profiler, prefix, depth + 1, memo
+        )
+
+    elif loader is not None:
+        dgen._data_loader = _instrument_loader(
+            dgen._data_loader, profiler, prefix, 0, memo
+        )
+
+    result = InstrumentedGenerator(dgen, profiler, name)
+    memo[id(dgen)] = result
+
+    return result
+
+def instrument_data_generators(dgen_list, prefixes, profiler = PROFILER):
+    """Wrap every stage of the `dgen_list` chains by instrumented proxies.
+
+    Parameters
+    ----------
+    dgen_list : list of IDataGenerator
+        Decorator chains to be instrumented. They are modified in place.
+    prefixes : list of str
+        Names of the chains (e.g. [ 'train', 'test' ]) used as prefixes of
+        the stage names.
+    profiler : PipelineProfiler, optional
+        Profiler that will accumulate statistics. Default: `PROFILER`.
+
+    Returns
+    -------
+    list of IDataGenerator
+        Instrumented proxies of the top stages of `dgen_list`.
+    """
+    memo = {}
+
+    LOGGER.info("Instrumenting data pipeline")
+
+    return [
+        _instrument_generator(dgen, profiler, prefix, 0, memo)
+            for (dgen, prefix) in zip(dgen_list, prefixes)
+    ]
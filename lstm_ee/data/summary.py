@@ -0,0 +1,707 @@
+"""
+Streaming summaries of the dataset variables.
+
+Summaries are calculated chunk by chunk in a single pass over an
+`IDataLoader`. Partial summaries of different chunks can be merged, which
+allows one to calculate them in parallel processes, and saved to a sidecar
+file next to the dataset, so that they can be reused without scanning the
+dataset again.
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+
+import numpy as np
+
+from lstm_ee.data.data_loader.derived_variables import (
+    DerivedVariables, Ragged
+)
+
+LOGGER = logging.getLogger('lstm_ee.data.summary')
+
+# Absolute values below `MIN_SKETCH_VALUE` are counted as zeros by the sketch
+MIN_SKETCH_VALUE = 1e-9
+
+# Summary job that is being processed. Shared with the forked workers.
+_JOB = None
+
+def merge_stores(keys_a, counts_a, keys_b, counts_b):
+    """Merge two sparse stores of counts { key : count }"""
+    keys, inverse = np.unique(
+        np.concatenate([ keys_a, keys_b ]), return_inverse = True
+    )
+    counts = np.bincount(
+        inverse, weights = np.concatenate([ counts_a, counts_b ]),
+        minlength = len(keys)
+    )
+
+    return (keys, counts)
+
+class QuantileSketch:
+    """Mergeable sketch of a distribution for approximate quantiles.
+
+    The sketch counts values in logarithmic buckets, such that every value
+    that falls into a bucket is within `relative_accuracy` of the bucket
+    representative value. Therefore, quantiles estimated by the sketch have
+    the relative error not worse than `relative_accuracy`, and the number of
+    buckets grows only logarithmically with the range of values. Sketches of
+    different chunks of data are merged by adding their bucket counts.
+
+    Parameters
+    ----------
+    relative_accuracy : float, optional
+        Relative accuracy of the quantile estimates. Default: 0.01.
+    """
+
+    def __init__(self, relative_accuracy = 0.01):
+        self._accuracy  = relative_accuracy
+        self._gamma     = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self._gamma)
+
+        self._pos   = (np.zeros(0, dtype = np.int64), np.zeros(0))
+        self._neg   = (np.zeros(0, dtype = np.int64), np.zeros(0))
+        self._zeros = 0.0
+
+    @property
+    def relative_accuracy(self):
+        """Relative accuracy of the quantile estimates"""
+        return self._accuracy
+
+    def _get_store(self, values, weights):
+        keys, inverse = np.unique(
+            np.ceil(np.log(values) / self._log_gamma).astype(np.int64),
+            return_inverse = True
+        )
+        counts = np.bincount(inverse, weights = weights, minlength = len(keys))
+
+        return (keys, counts)
+
+    def update(self, values, weights):
+        """Add finite `values` with `weights` to the sketch"""
+        mask_pos = (values >  MIN_SKETCH_VALUE)
+        mask_neg = (values < -MIN_SKETCH_VALUE)
+
+        self._zeros += np.sum(weights[~(mask_pos | mask_neg)])
+
+        self._pos = merge_stores(
+            *self._pos, *self._get_store(values[mask_pos], weights[mask_pos])
+        )
+        self._neg = merge_stores(
+            *self._neg, *self._get_store(-values[mask_neg], weights[mask_neg])
+        )
+
+    def merge(self, other):
+        """Add counts of the `other` sketch to this one"""
+        if other.relative_accuracy != self._accuracy:
+            raise ValueError("Cannot merge sketches of different accuracies")
+
+        self._zeros += other._zeros
+        self._pos    = merge_stores(*self._pos, *other._pos)
+        self._neg    = merge_stores(*self._neg, *other._neg)
+
+    def _bucket_values(self, keys):
+        return 2 * np.power(self._gamma, keys) / (self._gamma + 1)
+
+    def quantile(self, q):
+        """Estimate quantiles `q` of the distribution.
+
+        Parameters
+        ----------
+        q : float or ndarray
+            Quantiles to estimate, in [0, 1].
+
+        Returns
+        -------
+        float or ndarray
+            Estimated quantiles. NaN if the sketch is empty.
+        """
+        values = np.concatenate([
+            -self._bucket_values(self._neg[0])[::-1],
+            [ 0 ],
+            self._bucket_values(self._pos[0]),
+        ])
+        counts = np.concatenate([
+            self._neg[1][::-1], [ self._zeros ], self._pos[1]
+        ])
+
+        cumsum = np.cumsum(counts)
+        total  = cumsum[-1]
+
+        if total <= 0:
+            return np.full(np.shape(q), np.nan)[()]
+
+        # First bucket whose cumulative count exceeds the rank. It is never
+        # an empty bucket, except for q = 1.
+        index = np.searchsorted(cumsum, np.asarray(q) * total, side = 'right')
+        index = np.minimum(index, np.nonzero(counts)[0][-1])
+
+        return values[index][()]
+
+    def to_dict(self):
+        """Convert sketch to a json serializable dictionary"""
+        return {
+            'relative_accuracy' : self._accuracy,
+            'zeros'             : float(self._zeros),
+            'pos'               : [ x.tolist() for x in self._pos ],
+            'neg'               : [ x.tolist() for x in self._neg ],
+        }
+
+    @staticmethod
+    def from_dict(data):
+        """Construct sketch from a dictionary created by `to_dict`"""
+        result = QuantileSketch(data['relative_accuracy'])
+
+        result._zeros = data['zeros']
+        result._pos   = (
+            np.array(data['pos'][0], dtype = np.int64),
+            np.array(data['pos'][1], dtype = float)
+        )
+        result._neg   = (
+            np.array(data['neg'][0], dtype = np.int64),
+            np.array(data['neg'][1], dtype = float)
+        )
+
+        return result
+
+class VarSummary:
+    """Mergeable summary of the values of a single variable.
+
+    `VarSummary` accumulates the number of values, min/max, weighted mean
+    and variance, a fixed bin histogram and a quantile sketch. Values of the
+    prong level variables are flattened, and the histogram of the number of
+    prongs (multiplicity) is accumulated as well. NaN values are counted, but
+    otherwise ignored.
+
+    Parameters
+    ----------
+    bins : ndarray or None, optional
+        Histogram bin edges. If None, no histogram will be accumulated.
+        Default: None.
+    relative_accuracy : float, optional
+        Relative accuracy of the quantile estimates. Default: 0.01.
+
+    Attributes
+    ----------
+    n_events : int
+        Number of summarized events.
+    n : int
+        Number of summarized (finite) values.
+    n_nan : int
+        Number of NaN values.
+    sum_w : float
+        Sum of weights of the summarized values.
+    min, max : float
+        Minimum and maximum of the summarized values.
+    mean : float
+        Weighted mean of the values.
+    hist, hist_w2 : ndarray or None
+        Histogram of weights and squared weights of the values in `bins`.
+        Values outside of `bins` are not counted.
+    multiplicity : ndarray or None
+        Histogram of event weights by the number of prongs. None for slice
+        level variables.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, bins = None, relative_accuracy = 0.01):
+        self.bins     = None if bins is None else np.asarray(bins, float)
+        self.n_events = 0
+        self.n        = 0
+        self.n_nan    = 0
+        self.sum_w    = 0.0
+        self.min      = np.inf
+        self.max      = -np.inf
+        self.mean     = 0.0
+        self.m2       = 0.0
+
+        self.hist         = None
+        self.hist_w2      = None
+        self.multiplicity = None
+        self.sketch       = QuantileSketch(relative_accuracy)
+
+        if self.bins is not None:
+            self.hist    = np.zeros(len(self.bins) - 1)
+            self.hist_w2 = np.zeros(len(self.bins) - 1)
+
+    @property
+    def variance(self):
+        """Weighted variance of the values"""
+        if self.sum_w <= 0:
+            return np.nan
+
+        return self.m2 / self.sum_w
+
+    @property
+    def std(self):
+        """Weighted standard deviation of the values"""
+        return np.sqrt(self.variance)
+
+    def quantile(self, q):
+        """Approximate quantiles `q` of the values. C.f. `QuantileSketch`"""
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan)[()]
+
+        return np.clip(self.sketch.quantile(q), self.min, self.max)
+
+    def _update_multiplicity(self, lengths, weights):
+        counts = np.bincount(lengths, weights = weights)
+
+        if self.multiplicity is None:
+            self.multiplicity = counts
+        else:
+            n = max(len(counts), len(self.multiplicity))
+            self.multiplicity = (
+                  np.pad(self.multiplicity, (0, n - len(self.multiplicity)))
+                + np.pad(counts, (0, n - len(counts)))
+            )
+
+    def _update_moments(self, sum_w, mean, m2):
+        """Merge moments of a different sample (Chan et al.)"""
+        total = self.sum_w + sum_w
+
+        if total <= 0:
+            return
+
+        delta = mean - self.mean
+
+        self.m2   += m2 + delta**2 * self.sum_w * sum_w / total
+        self.mean += delta * sum_w / total
+        self.sum_w = total
+
+    def update(self, values, weights = None):
+        """Add `values` of a chunk of events with `weights` to the summary.
+
+        Parameters
+        ----------
+        values : ndarray
+            Values of the variable. Either an array of numbers or an array of
+            variable length arrays.
+        weights : ndarray or None, optional
+            Weights of events. If None, all events are weighted equally.
+        """
+        n_events = len(values)
+
+        if weights is None:
+            weights = np.ones(n_events)
+
+        if (values.dtype == object) or (values.ndim == 2):
+            ragged  = Ragged.from_varr(values)
+            self._update_multiplicity(ragged.lengths, weights)
+
+            weights = ragged.broadcast(weights)
+            values  = ragged.values
+
+        values  = np.asarray(values, dtype = float).ravel()
+        weights = np.asarray(weights, dtype = float)
+
+        mask = np.isnan(values)
+
+        self.n_events += n_events
+        self.n_nan    += int(np.sum(mask))
+
+        values  = values[~mask]
+        weights = weights[~mask]
+
+        if len(values) == 0:
+            return
+
+        self.n  += len(values)
+        self.min = min(self.min, float(np.min(values)))
+        self.max = max(self.max, float(np.max(values)))
+
+        sum_w = np.sum(weights)
+
+        if sum_w > 0:
+            mean = np.sum(weights * values) / sum_w
+            m2   = np.sum(weights * (values - mean)**2)
+            self._update_moments(sum_w, mean, m2)
+
+        if self.bins is not None:
+            self.hist    += np.histogram(
+                values, self.bins, weights = weights
+            )[0]
+            self.hist_w2 += np.histogram(
+                values, self.bins, weights = weights**2
+            )[0]
+
+        self.sketch.update(values, weights)
+
+    def merge(self, other):
+        """Add summary `other` of a different chunk to this summary"""
+        self.n_events += other.n_events
+        self.n        += other.n
+        self.n_nan    += other.n_nan
+        self.min       = min(self.min, other.min)
+        self.max       = max(self.max, other.max)
+
+        self._update_moments(other.sum_w, other.mean, other.m2)
+
+        if self.bins is not None:
+            self.hist    += other.hist
+            self.hist_w2 += other.hist_w2
+
+        if other.multiplicity is not None:
+            self._update_multiplicity(
+                np.arange(len(other.multiplicity)), other.multiplicity
+            )
+
+        self.sketch.merge(other.sketch)
+
+    def to_dict(self):
+        """Convert summary to a json serializable dictionary"""
+        def to_list(x):
+            return None if x is None else x.tolist()
+
+        return {
+            'bins'         : to_list(self.bins),
+            'n_events'     : self.n_events,
+            'n'            : self.n,
+            'n_nan'        : self.n_nan,
+            'sum_w'        : float(self.sum_w),
+            'min'          : self.min,
+            'max'          : self.max,
+            'mean'         : float(self.mean),
+            'm2'           : float(self.m2),
+            'hist'         : to_list(self.hist),
+            'hist_w2'      : to_list(self.hist_w2),
+            'multiplicity' : to_list(self.multiplicity),
+            'sketch'       : self.sketch.to_dict(),
+        }
+
+    @staticmethod
+    def from_dict(data):
+        """Construct summary from a dictionary created by `to_dict`"""
+        result = VarSummary(data['bins'])
+
+        for k in [ 'n_events', 'n', 'n_nan', 'sum_w', 'min', 'max', 'mean',
+                   'm2' ]:
+            setattr(result, k, data[k])
+
+        for k in [ 'hist', 'hist_w2', 'multiplicity' ]:
+            if data[k] is not None:
+                setattr(result, k, np.array(data[k]))
+
+        result.sketch = QuantileSketch.from_dict(data['sketch'])
+
+        return result
+
+class DatasetSummary:
+    """Mergeable summaries of a number of dataset variables.
+
+    Parameters
+    ----------
+    variables : list of str
+        Names of variables to summarize.
+    hists : dict or None, optional
+        Dictionary { var : bins } of histogram bin edges of variables.
+        `bins` can also be a dict { 'bins' : int, 'range' : (lo, hi) } of
+        uniform bins. Variables that are not in `hists` will not be
+        histogrammed. Default: None.
+    relative_accuracy : float, optional
+        Relative accuracy of the quantile estimates. Default: 0.01.
+    """
+
+    def __init__(self, variables, hists = None, relative_accuracy = 0.01):
+        hists = hists or {}
+
+        self._vars = {
+            var : VarSummary(
+                get_bin_edges(hists.get(var, None)), relative_accuracy
+            ) for var in variables
+        }
+
+    def variables(self):
+        """List of summarized variables"""
+        return list(self._vars)
+
+    def __getitem__(self, var):
+        return self._vars[var]
+
+    def update(self, data_loader, index = None, weights = None):
+        """Add events `index` of `data_loader` to the summary"""
+        for (var, summary) in self._vars.items():
+            summary.update(data_loader.get(var, index), weights)
+
+    def merge(self, other):
+        """Add summary `other` of a different chunk to this summary"""
+        for (var, summary) in self._vars.items():
+            summary.merge(other[var])
+
+    def to_dict(self):
+        """Convert summary to a json serializable dictionary"""
+        return { var : x.to_dict() for (var, x) in self._vars.items() }
+
+    @staticmethod
+    def from_dict(data):
+        """Construct summary from a dictionary created by `to_dict`"""
+        result = DatasetSummary([])
+        result._vars = {
+            var : VarSummary.from_dict(x) for (var, x) in data.items()
+        }
+
+        return result
+
+def get_bin_edges(bins):
+    """Convert histogram specification `bins` to an array of bin edges"""
+    if bins is None:
+        return None
+
+    if isinstance(bins, dict):
+        return np.histogram_bin_edges(
+            [], bins = bins['bins'], range = bins['range']
+        )
+
+    return np.asarray(bins, dtype = float)
+
+def _summarize_chunk(job, start, stop):
+    data_loader, weights, kwargs = job
+    result = DatasetSummary(**kwargs)
+    index  = np.arange(start, stop)
+
+    result.update(
+        data_loader, index, None if weights is None else weights[index]
+    )
+
+    return result.to_dict()
+
+def _summarize_chunk_global(bounds):
+    return _summarize_chunk(_JOB, *bounds)
+
+def summarize(
+    data_loader,
+    variables         = None,
+    hists             = None,
+    weights           = None,
+    chunk_size        = 100000,
+    workers           = None,
+    relative_accuracy = 0.01,
+):
+    """Calculate summary of `variables` of `data_loader` in a single pass.
+
+    The dataset is summarized in chunks of `chunk_size` events, which are
+    processed in parallel by `workers` forked processes (sharing
+    `data_loader` with the current process) and then merged.
+
+    Parameters
+    ----------
+    data_loader : IDataLoader
+        Dataset to summarize.
+    variables : list of str or None, optional
+        Variables to summarize. If None, all variables of `data_loader` will
+        be summarized. Default: None.
+    hists : dict or None, optional
+        Histogram specifications. C.f. `DatasetSummary`. Default: None.
+    weights : ndarray or None, optional
+        Weights of the `data_loader` events. Default: None.
+    chunk_size : int, optional
+        Number of events to summarize at once. Default: 100000.
+    workers : int or None, optional
+        Number of parallel processes. If None or 1, the summary will be
+        calculated in the current process. Default: None.
+    relative_accuracy : float, optional
+        Relative accuracy of the quantile estimates. Default: 0.01.
+
+    Returns
+    -------
+    DatasetSummary
+        Summary of the dataset.
+    """
+    # pylint: disable=global-statement
+    global _JOB
+
+    if variables is None:
+        variables = data_loader.variables()
+
+    kwargs = {
+        'variables'         : variables,
+        'hists'             : hists,
+        'relative_accuracy' : relative_accuracy,
+    }
+
+    job    = (data_loader, weights, kwargs)
+    result = DatasetSummary(**kwargs)
+    bounds = [
+        (start, min(start + chunk_size, len(data_loader)))
+            for start in range(0, len(data_loader), chunk_size)
+    ]
+
+    if (workers is None) or (workers <= 1) or (len(bounds) <= 1):
+        partials = (_summarize_chunk(job, *x) for x in bounds)
+
+        for partial in partials:
+            result.merge(DatasetSummary.from_dict(partial))
+
+        return result
+
+    _JOB = job
+
+    try:
+        ctx = multiprocessing.get_context('fork')
+
+        with ctx.Pool(processes = workers) as pool:
+            for partial in pool.imap_unordered(
+                _summarize_chunk_global, bounds
+            ):
+                result.merge(DatasetSummary.from_dict(partial))
+    finally:
+        _JOB = None
+
+    return result
+
+def get_dataset_stamp(path):
+    """Get sizes and modification times of the dataset files at `path`"""
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(path, x) for x in os.listdir(path))
+    else:
+        paths = [ path ]
+
+    return [
+        [ os.path.basename(x), os.path.getsize(x), os.path.getmtime(x) ]
+            for x in paths if os.path.isfile(x)
+    ]
+
+def get_split_key(
+    datadir, dataset, seed, test_size, filters = None, derived_vars = None
+):
+    """Get json serializable key of a train/test split of the dataset.
+
+    The key includes `get_dataset_stamp` of the dataset files, so that it
+    changes when the dataset is modified.
+    """
+    return {
+        'dataset'      : dataset,
+        'stamp'        : get_dataset_stamp(os.path.join(datadir, dataset)),
+        'seed'         : seed,
+        'test_size'    : test_size,
+        'filters'      : filters,
+        'derived_vars' : derived_vars,
+    }
+
+def get_summary_path(datadir, key):
+    """Get path of the summary sidecar file under `datadir`/.summary"""
+    digest = bytes(json.dumps(key, sort_keys = True), 'utf-8')
+    digest = hashlib.sha1(digest).hexdigest()
+
+    return os.path.join(datadir, '.summary', '%s.json' % (digest))
+
+def get_summary(data_loader, path = None, key = None, **kwargs):
+    """Load summary from a sidecar file `path` or calculate and save it.
+
+    Parameters
+    ----------
+    data_loader : IDataLoader
+        Dataset to summarize.
+    path : str or None, optional
+        Path of the sidecar file. If None, the summary will be calculated
+        but not saved. C.f. `get_summary_path`. Default: None.
+    key : dict or None, optional
+        Json serializable description of `data_loader` (e.g. dataset name,
+        split parameters, and `get_dataset_stamp` of its files). The saved
+        summary is only reused if it was calculated for the same `key` and
+        `kwargs`.
+    **kwargs : dict
+        Arguments of `summarize`, except for `weights`, that are expected
+        to be determined by `key`.
+
+    Returns
+    -------
+    DatasetSummary
+        Summary of the dataset.
+
+    See Also
+    --------
+    summarize
+    """
+    weights = kwargs.pop('weights', None)
+    config  = {
+        'key'    : key,
+        'kwargs' : {
+            k : v for (k, v) in kwargs.items() if k not in [ 'workers' ]
+        },
+    }
+    # Normalize numpy values, so that config can be compared to the saved one
+    config = json.loads(json.dumps(config, default = lambda x : x.tolist()))
+
+    if (path is not None) and os.path.exists(path):
+        with open(path, 'rt') as f:
+            saved = json.load(f)
+
+        if saved['config'] == config:
+            LOGGER.info("Loading dataset summary from %s", path)
+            return DatasetSummary.from_dict(saved['summary'])
+
+    LOGGER.info("Calculating dataset summary of %d events", len(data_loader))
+    result = summarize(data_loader, weights = weights, **kwargs)
+
+    if path is not None:
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+
+        with open(tmp_path, 'wt') as f:
+            json.dump({ 'config' : config, 'summary' : result.to_dict() }, f)
+
+        os.replace(tmp_path, path)
+
+    return result
+
+def get_split_summary(
+    args, data_loader, part, variables,
+    hists        = None,
+    weights      = None,
+    workers      = None,
+    derived_vars = None,
+):
+    """Get summary of a train/test part of the dataset of `args`.
+
+    The summary is cached in a sidecar file under `args.root_datadir`/.summary
+    and is recalculated only if the dataset files, the split or the summary
+    parameters change.
+
+    Parameters
+    ----------
+    args : Args
+        Arguments that define the dataset and its train/test split.
+    data_loader : IDataLoader
+        `IDataLoader` of the part `part` of the split, e.g.
+        `dgen.data_loader` of the DataGenerator created by `load_data`.
+    part : int
+        Index of the part of the split (0 -- train, 1 -- test).
+    variables : list of str
+        Variables to summarize.
+    hists : dict or None, optional
+        Histogram specifications. C.f. `DatasetSummary`. Default: None.
+    weights : ndarray or None, optional
+        Weights of the `data_loader` events, calculated according to
+        `args.weights`. Default: None.
+    workers : int or None, optional
+        Number of parallel processes. Default: None.
+    derived_vars : dict or None, optional
+        Definitions of additional variables to derive for the summary.
+        C.f. `DerivedVariables`. Default: None.
+
+    Returns
+    -------
+    DatasetSummary
+        Summary of the dataset part.
+    """
+    key = get_split_key(
+        args.root_datadir, args.dataset, args.seed, args.test_size,
+        args.filters, args.derived_vars
+    )
+    key['summary_vars'] = derived_vars
+    key['part']         = part
+    key['weights']      = None if weights is None else args.weights
+
+    if derived_vars:
+        data_loader = DerivedVariables(data_loader, derived_vars)
+
+    return get_summary(
+        data_loader, get_summary_path(args.root_datadir, key), key,
+        variables = variables,
+        hists     = hists,
+        weights   = weights,
+        workers   = workers,
+    )
@@ -0,0 +1,284 @@
+"""
+Mergeable accumulators of the relative energy resolution stats/hists.
+
+Accumulators are updated batch by batch, so that the evaluation stats can be
+calculated without keeping all predicted energies in memory. Accumulators of
+different parts of a dataset (e.g. of different shards) can be merged, and
+the merged accumulator is the same as the one updated by all parts.
+"""
+
+import numpy as np
+
+from lstm_ee.data.summary import QuantileSketch
+
+class MomentsAccumulator:
+    """Mergeable accumulator of weighted moments of a dataset.
+
+    The accumulator keeps weighted power sums of values, which are enough to
+    calculate all the moment based stats of `calc_all_stats`.
+    """
+
+    def __init__(self):
+        self._count  = 0
+        self._sum_w  = 0.0
+        self._sum_w2 = 0.0
+        self._sum_x1 = 0.0
+        self._sum_x2 = 0.0
+        self._sum_x4 = 0.0
+
+    @property
+    def count(self):
+        """Number of accumulated values"""
+        return self._count
+
+    def update(self, values, weights):
+        """Add `values` with `weights` to the accumulator"""
+        values2 = values**2
+
+        self._count  += len(values)
+        self._sum_w  += np.sum(weights)
+        self._sum_w2 += np.sum(weights**2)
+        self._sum_x1 += np.sum(weights * values)
+        self._sum_x2 += np.sum(weights * values2)
+        self._sum_x4 += np.sum(weights * values2**2)
+
+    def merge(self, other):
+        """Add sums of the `other` accumulator to this one"""
+        self._count  += other._count
+        self._sum_w  += other._sum_w
+        self._sum_w2 += other._sum_w2
+        self._sum_x1 += other._sum_x1
+        self._sum_x2 += other._sum_x2
+        self._sum_x4 += other._sum_x4
+
+    def calc_stats(self):
+        """Calculate moment based stats.
+
+        Returns
+        -------
+        dict
+            Dictionary of stats "mean", "rms", "stdev", "stderr", "m1", "m2",
+            "m4", "x1var", "x2var", "m1var", "m2var" defined the same way as
+            in `calc_all_stats`.
+        """
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            m1 = np.float64(self._sum_x1) / self._sum_w
+            m2 = np.float64(self._sum_x2) / self._sum_w
+            m4 = np.float64(self._sum_x4) / self._sum_w
+
+            x1var = m2 - m1**2
+            x2var = m4 - m2**2
+
+            norm2 = np.float64(self._sum_w2) / self._sum_w**2
+            m1var = norm2 * x1var
+            m2var = norm2 * x2var
+
+            return {
+                'mean'   : m1,
+                'rms'    : np.sqrt(m2),
+                'stdev'  : np.sqrt(x1var),
+                'stderr' : np.sqrt(m1var),
+                'm1'     : m1,
+                'm2'     : m2,
+                'm4'     : m4,
+                'x1var'  : x1var,
+                'x2var'  : x2var,
+                'm1var'  : m1var,
+                'm2var'  : m2var,
+            }
+
+    def to_dict(self):
+        """Convert accumulator to a json serializable dictionary"""
+        return {
+            'count'  : int(self._count),
+            'sum_w'  : float(self._sum_w),
+            'sum_w2' : float(self._sum_w2),
+            'sum_x1' : float(self._sum_x1),
+            'sum_x2' : float(self._sum_x2),
+            'sum_x4' : float(self._sum_x4),
+        }
+
+    @staticmethod
+    def from_dict(data):
+        """Construct accumulator from a dictionary created by `to_dict`"""
+        result = MomentsAccumulator()
+
+        result._count  = data['count']
+        result._sum_w  = data['sum_w']
+        result._sum_w2 = data['sum_w2']
+        result._sum_x1 = data['sum_x1']
+        result._sum_x2 = data['sum_x2']
+        result._sum_x4 = data['sum_x4']
+
+        return result
+
+class HistAccumulator:
+    """Mergeable accumulator of a weighted histogram with fixed bins.
+
+    Parameters
+    ----------
+    bins : int or ndarray
+        Number of bins in a histogram, or a list of bin edges.
+    range : (float, float) or None
+        Range of a histogram (lower, upper). Cannot be None if `bins` is int.
+    """
+
+    def __init__(self, bins, range = None):
+        # pylint: disable=redefined-builtin
+        self._bins    = np.histogram_bin_edges([], bins = bins, range = range)
+        self._hist    = np.zeros(len(self._bins) - 1)
+        self._hist_w2 = np.zeros(len(self._bins) - 1)
+
+    @property
+    def bins(self):
+        """Histogram bin edges"""
+        return self._bins
+
+    @property
+    def hist(self):
+        """Sum of weights of values in each bin"""
+        return self._hist
+
+    @property
+    def hist_w2(self):
+        """Sum of squared weights of values in each bin"""
+        return self._hist_w2
+
+    def update(self, values, weights):
+        """Add `values` with `weights` to the histogram"""
+        self._hist    += np.histogram(values, self._bins, weights = weights)[0]
+        self._hist_w2 += np.histogram(
+            values, self._bins, weights = weights**2
+        )[0]
+
+    def merge(self, other):
+        """Add counts of the `other` histogram to this one"""
+        if not np.array_equal(self._bins, other._bins):
+            raise ValueError("Cannot merge histograms with different bins")
+
+        self._hist    += other._hist
+        self._hist_w2 += other._hist_w2
+
+    def to_dict(self):
+        """Convert accumulator to a json serializable dictionary"""
+        return {
+            'bins'    : self._bins.tolist(),
+            'hist'    : self._hist.tolist(),
+            'hist_w2' : self._hist_w2.tolist(),
+        }
+
+    @staticmethod
+    def from_dict(data):
+        """Construct accumulator from a dictionary created by `to_dict`"""
+        result = HistAccumulator(np.array(data['bins'], dtype = float))
+
+        result._hist    = np.array(data['hist'],    dtype = float)
+        result._hist_w2 = np.array(data['hist_w2'], dtype = float)
+
+        return result
+
+class FomAccumulator:
+    """Mergeable accumulator of the relative energy resolution stats/hists.
+
+    This is a streaming counterpart of the `calc_fom_stats` and
+    `calc_fom_hist` functions. The relative energy resolution is defined as
+    (Reco - True) / True. Its moments are accumulated exactly, and its median
+    and quantiles are estimated by a `QuantileSketch`.
+
+    Parameters
+    ----------
+    bins : int or ndarray
+        Number of bins of the energy resolution histogram, or its bin edges.
+    range : (float, float)
+        Range of the energy resolution histogram. Only energy resolution
+        values inside `range` are used in calculation of statistics.
+    relative_accuracy : float, optional
+        Relative accuracy of the quantile estimates. Default: 0.001.
+
+    See Also
+    --------
+    calc_fom_stats
+    calc_fom_hist
+    """
+
+    # pylint: disable=redefined-builtin
+    def __init__(self, bins, range, relative_accuracy = 0.001):
+        self._range   = tuple(range)
+        self._moments = MomentsAccumulator()
+        self._hist    = HistAccumulator(bins, range)
+        self._sketch  = QuantileSketch(relative_accuracy)
+
+    @property
+    def hist(self):
+        """`HistAccumulator` of the energy resolution histogram"""
+        return self._hist
+
+    def update(self, pred, true, weights):
+        """Add energies of a batch to the accumulator.
+
+        Parameters
+        ----------
+        pred : ndarray, shape (N,)
+            Array of predicted energies.
+        true : ndarray, shape (N,)
+            Array of true energies.
+        weights : ndarray, shape (N,)
+            Array of sample weights.
+        """
+        fom  = (pred - true) / true
+        mask = ((fom > self._range[0]) & (fom < self._range[1]))
+
+        self._hist.update(fom, weights)
+        self._moments.update(fom[mask], weights[mask])
+        self._sketch.update(fom[mask], weights[mask])
+
+    def merge(self, other):
+        """Merge `other` accumulator into this one"""
+        if self._range != other._range:
+            raise ValueError("Cannot merge accumulators of different ranges")
+
+        self._moments.merge(other._moments)
+        self._hist.merge(other._hist)
+        self._sketch.merge(other._sketch)
+
+    def calc_stats(self):
+        """Calculate energy resolution stats.
+
+        Returns
+        -------
+        dict
+            Dictionary of stats in the format of `calc_all_stats`.
+        """
+        result = self._moments.calc_stats()
+
+        if self._moments.count == 0:
+            median, q16, q84 = 0, np.nan, np.nan
+        else:
+            median, q16, q84 = self._sketch.quantile([ 0.5, 0.16, 0.84 ])
+
+        result['median'] = median
+        result['q16']    = q16
+        result['q84']    = q84
+        result['iqw68']  = q84 - q16
+
+        return result
+
+    def to_dict(self):
+        """Convert accumulator to a json serializable dictionary"""
+        return {
+            'range'   : list(self._range),
+            'moments' : self._moments.to_dict(),
+            'hist'    : self._hist.to_dict(),
+            'sketch'  : self._sketch.to_dict(),
+        }
+
+    @staticmethod
+    def from_dict(data):
+        """Construct accumulator from a dictionary created by `to_dict`"""
+        result = FomAccumulator(data['hist']['bins'], data['range'])
+
+        result._moments = MomentsAccumulator.from_dict(data['moments'])
+        result._hist    = HistAccumulator.from_dict(data['hist'])
+        result._sketch  = QuantileSketch.from_dict(data['sketch'])
+
+        return result
@@ -3,7 +3,242 @@ Functions for calculating binned statistics.
 """
 
 import numpy as np
-from .stats import calc_stat
+from .stats import QUANTILE_STATS, find_sorted_quantiles
+
+BINNED_STATS = [ 'mean', 'rms', 'std', 'stderr', 'median', 'q16', 'q84' ]
+
+def digitize_nd(coords, bins):
+    """Find flat indices of bins of an N-D grid that contain data points.
+
+    Parameters
+    ----------
+    coords : list of ndarray, shape (N,)
+        Coordinates of data points along each dimension of the grid.
+    bins : list of list of float
+        Bin edges along each dimension of the grid.
+
+    Returns
+    -------
+    flat_idx : ndarray, shape (N,)
+        Index of a bin that contains each data point in the flattened grid.
+        Points outside of the grid get index -1. Like `np.digitize`, bins
+        include their lower edges and exclude upper edges.
+    shape : tuple of int
+        Shape of the grid.
+    """
+    shape = tuple(len(b) - 1 for b in bins)
+    mask  = np.ones(len(coords[0]), dtype = bool)
+    index = []
+
+    for (x, b) in zip(coords, bins):
+        idx   = np.digitize(x, bins = b) - 1
+        mask &= (idx >= 0) & (idx < len(b) - 1)
+        index.append(idx)
+
+    flat_idx = np.full(len(mask), -1, dtype = np.int64)
+    flat_idx[mask] = np.ravel_multi_index(
+        [ idx[mask] for idx in index ], shape
+    )
+
+    return flat_idx, shape
+
+class BinnedStats:
+    """Binned statistics of a weighted dataset over an N-D grid of bins.
+
+    Data points are assigned to bins once. Then, the moment based stats of
+    all bins are calculated together from the weighted sums of each bin
+    (`np.bincount`), and the quantiles of all bins are calculated from a
+    single sort of data points by (bin, value). So, the cost of calculation
+    of any number of stats does not depend on the number of bins.
+
+    Parameters
+    ----------
+    coords : list of ndarray, shape (N,)
+        Coordinates of data points that will be used to determine the bin
+        indices. One array per dimension of the grid.
+    y : ndarray, shape (N,)
+        Coordinates of data points that will be used to calculate statistics
+        for each bin.
+    weights : ndarray, shape (N,)
+        Weight of each data point.
+    bins : list of list of float
+        Bin edges along each dimension of the grid.
+    """
+
+    def __init__(self, coords, y, weights, bins):
+        flat_idx, self._shape = digitize_nd(coords, bins)
+
+        mask    = (flat_idx >= 0)
+        n_bins  = int(np.prod(self._shape))
+
+        self._idx     = flat_idx[mask]
+        self._y       = np.asarray(y,       dtype = float)[mask]
+        self._w       = np.asarray(weights, dtype = float)[mask]
+        self._sums    = {}
+        self._sorted  = None
+        self._n_bins  = n_bins
+
+        self._counts  = np.bincount(self._idx, minlength = n_bins)
+
+    @property
+    def shape(self):
+        """Shape of the grid of bins"""
+        return self._shape
+
+    @property
+    def counts(self):
+        """Number of data points in each bin"""
+        return self._counts.reshape(self._shape)
+
+    def _sum(self, pow_w, pow_y):
+        """Calculate sum of (w**pow_w * y**pow_y) for each bin"""
+        key = (pow_w, pow_y)
+
+        if key not in self._sums:
+            self._sums[key] = np.bincount(
+                self._idx, weights = self._w**pow_w * self._y**pow_y,
+                minlength = self._n_bins
+            )
+
+        return self._sums[key]
+
+    def _calc_stat(self, stat):
+        # pylint: disable=too-many-return-statements
+        sum_w = self._sum(1, 0)
+
+        if stat == 'mean':
+            return self._sum(1, 1) / sum_w
+
+        if stat == 'rms':
+            return np.sqrt(self._sum(1, 2) / sum_w)
+
+        if stat == 'std':
+            mean = self._sum(1, 1) / sum_w
+            return np.sqrt(self._sum(1, 2) / sum_w - mean**2)
+
+        if stat == 'stderr':
+            # sum(w**2 * (y - mean)**2) / sum(w)**2, c.f. `calc_stderr`
+            mean   = self._sum(1, 1) / sum_w
+            result = (
+                    self._sum(2, 2)
+                - 2 * mean * self._sum(2, 1)
+                + mean**2 * self._sum(2, 0)
+            ) / sum_w**2
+
+            n      = self._counts
+            result = np.where(
+                n > 1, n / np.maximum(n - 1, 1) * result, result
+            )
+
+            return np.sqrt(result)
+
+        if stat == 'median':
+            return self.calc_quantiles(0.5).ravel()
+
+        if stat in QUANTILE_STATS:
+            return self.calc_quantiles(QUANTILE_STATS[stat]).ravel()
+
+        raise ValueError("Unknown stat: %s" % stat)
+
+    def calc_stat(self, stat):
+        """Calculate statistical property `stat` of each bin.
+
+        Parameters
+        ----------
+        stat : str
+            Name of the binned statistics to calculate.
+            C.f. `BINNED_STATS`.
+
+        Returns
+        -------
+        ndarray, shape `self.shape`
+            Value of statistics `stat` for each bin. NaN for empty bins.
+        """
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            result = self._calc_stat(stat)
+
+        result = np.where(self._counts > 0, result, np.nan)
+
+        return result.reshape(self._shape)
+
+    def _sort(self):
+        if self._sorted is None:
+            if self._n_bins <= np.iinfo(np.uint16).max + 1:
+                # Stable sort of small integers is a linear time radix sort
+                order = np.argsort(self._y)
+                order = order[np.argsort(
+                    self._idx[order].astype(np.uint16), kind = 'stable'
+                )]
+            else:
+                order = np.lexsort((self._y, self._idx))
+
+            starts = np.concatenate([ [ 0 ], np.cumsum(self._counts)[:-1] ])
+
+            self._sorted = (
+                self._y[order], np.cumsum(self._w[order]), starts
+            )
+
+        return self._sorted
+
+    def calc_quantiles(self, q):
+        """Calculate weighted quantiles `q` of each bin.
+
+        The weighted quantile `q` of a bin is the smallest value of the bin
+        such that the total weight of the values not greater than it is at
+        least `q` of the bin weight. C.f. `find_sorted_quantiles`.
+
+        Parameters
+        ----------
+        q : float or ndarray, shape (Q,)
+            Quantiles to calculate, in [0, 1].
+
+        Returns
+        -------
+        ndarray, shape `self.shape` or `self.shape` + (Q,)
+            Quantiles of each bin. NaN for empty bins.
+        """
+        y, cumsum, starts = self._sort()
+
+        result = find_sorted_quantiles(
+            y, cumsum, q, starts, starts + self._counts
+        )
+
+        return result.reshape(self._shape + np.shape(q))
+
+    def calc_stats(self, stats):
+        """Calculate multiple statistical properties `stats` of each bin"""
+        return { stat : self.calc_stat(stat) for stat in stats }
+
+def calc_binned_stats_nd(coords, y, weights, bins, stats = ( 'mean', )):
+    """Calculate binned statistics over an N-D grid of bins.
+
+    Parameters
+    ----------
+    coords : list of ndarray, shape (N,)
+        Coordinates of data points that will be used to determine the bin
+        indices. One array per dimension of the grid.
+    y : ndarray, shape (N,)
+        Coordinates of data points that will be used to calculate statistics
+        for each bin.
+    weights : ndarray, shape (N,)
+        Weight of each data point.
+    bins : list of list of float
+        Bin edges along each dimension of the grid.
+    stats : list of str, optional
+        Names of the binned statistics to calculate. C.f. `BINNED_STATS`.
+        Default: [ 'mean' ].
+
+    Returns
+    -------
+    dict
+        Dictionary where keys are `stats` and values are the `ndarray` of
+        the corresponding stats of each bin, shape (len(b) - 1 for b in bins).
+
+    See Also
+    --------
+    BinnedStats
+    """
+    return BinnedStats(coords, y, weights, bins).calc_stats(stats)
 
 def calc_binned_stats(x, y, weights, bins_x, stat = 'mean'):
     """Calculate binned statistics for the data.
@@ -20,26 +255,12 @@ def calc_binned_stats(x, y, weights, bins_x, stat = 'mean'):
         Weight of each data point.
     bins_x : list of float
         List of bin edges.
-    stat : { 'mean', 'rms', 'stdev', 'stderr', 'median' }
-        Name of the binned statistics to calculate.
+    stat : str
+        Name of the binned statistics to calculate. C.f. `BINNED_STATS`.
 
     Returns
     -------
     ndarray, shape (len(bins_x) - 1,)
         Value of statistics `stat` for each bin defined by `bins_x`.
     """
-
-    bin_idx = np.digitize(x, bins = bins_x)
-
-    results = []
-
-    for i in range(1, len(bins_x)):
-        cur_y = y[bin_idx == i]
-        cur_w = weights[bin_idx == i]
-
-        value = calc_stat(cur_y, cur_w, stat)
-
-        results.append(value)
-
-    return np.array(results)
-
+    return BinnedStats([ x ], y, weights, [ bins_x ]).calc_stat(stat)
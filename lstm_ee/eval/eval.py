@@ -5,8 +5,12 @@ Function to calculate basic evaluation metrics for the `lstm_ee` networks.
 import logging
 import pandas as pd
 
+from cafplot.rhist import RHist1D
+
+from lstm_ee.eval.accumulators import FomAccumulator
 from lstm_ee.eval.predict import (
-    predict_energies,get_base_energies,get_true_energies
+    predict_energies,get_base_energies,get_true_energies,calc_predictions,
+    predict_batches
 )
 from lstm_ee.eval.fom   import calc_fom_stats, calc_fom_hist
 from lstm_ee.eval.gauss import fit_gaussian
@@ -78,12 +82,104 @@ def calc_fom_stats_hists(pred_dict, true_dict, weights, fom_specs, margin):
         )
         rhist_dict[k] = rhist
 
-        try:
-            x = (rhist.bins_x[1:] + rhist.bins_x[:-1]) / 2
-            stats_dict[k].update(fit_gaussian(x, rhist.hist, margin))
-        except RuntimeError:
-            LOGGER.warning("Failed to fit gaussian for: %s", k)
-            stats_dict[k].update({ 'a' : 0, 'mu' : 0, 'sigma' : 0 })
+        _fit_fom_gaussian(stats_dict[k], rhist, margin, k)
+
+    return stats_dict, rhist_dict
+
+def _fit_fom_gaussian(stats, rhist, margin, label):
+    """Add parameters of a gaussian fit to `rhist` to `stats`"""
+    try:
+        x = (rhist.bins_x[1:] + rhist.bins_x[:-1]) / 2
+        stats.update(fit_gaussian(x, rhist.hist, margin))
+    except RuntimeError:
+        LOGGER.warning("Failed to fit gaussian for: %s", label)
+        stats.update({ 'a' : 0, 'mu' : 0, 'sigma' : 0 })
+
+def accumulate_fom(
+    dgen, model, fom_specs, base_map = None, relative_accuracy = 0.001
+):
+    """Accumulate energy resolution of the `model` and baseline batch by batch.
+
+    Parameters
+    ----------
+    dgen : IDataGenerator
+        DataGenerator on which network will be evaluated.
+    model : keras.Model
+        Network to be evaluated.
+    fom_specs : dict
+        Dictionary where keys are energy labels and values are the `PlotSpec`
+        objects that parametrize histograms of the relative energy resolution.
+    base_map : dict or None, optional
+        Dictionary that specifies mapping between energy label and a variable
+        name in `dgen.data_loader` that holds baseline reconstructed energy.
+        Default: None.
+    relative_accuracy : float, optional
+        Relative accuracy of the median estimates. Default: 0.001.
+
+    Returns
+    -------
+    (acc_model_dict, acc_base_dict) : (dict, dict)
+        Dictionaries where keys are energy labels and values are the
+        `FomAccumulator` of the energies predicted by `model` and of the
+        baseline energies. Accumulators of different datasets (e.g. shards of
+        a dataset) can be merged before calculating the stats.
+
+    See Also
+    --------
+    predict_batches
+    calc_fom_stats_hists_from_accumulators
+    """
+    acc_model_dict = {}
+    acc_base_dict  = {}
+
+    for batch in predict_batches(dgen, model, base_map):
+        for (energy_set, acc_dict) in [
+            ('pred_model', acc_model_dict), ('pred_base', acc_base_dict)
+        ]:
+            for k, pred in batch[energy_set].items():
+                if pred is None:
+                    continue
+
+                if k not in acc_dict:
+                    acc_dict[k] = FomAccumulator(
+                        fom_specs[k].bins_x, fom_specs[k].range_x,
+                        relative_accuracy
+                    )
+
+                acc_dict[k].update(pred, batch['true'][k], batch['weights'])
+
+    return (acc_model_dict, acc_base_dict)
+
+def calc_fom_stats_hists_from_accumulators(acc_dict, margin):
+    """Calculate energy resolution stats and hists from accumulators.
+
+    This function is a streaming counterpart of `calc_fom_stats_hists`.
+
+    Parameters
+    ----------
+    acc_dict : dict
+        Dictionary where keys are energy labels and values are
+        `FomAccumulator` objects. C.f. `accumulate_fom`.
+    margin : float
+        Fraction of the height of the peak of energy resolution histogram
+        (Reco - True) / True, that will be used to fit a gaussian curve.
+
+    Returns
+    -------
+    (stats_dict, rhist_dict) : (dict, dict)
+        Dictionaries of stats and histograms in the format of
+        `calc_fom_stats_hists`. The median is estimated by a quantile sketch.
+    """
+    stats_dict = {}
+    rhist_dict = {}
+
+    for k, acc in acc_dict.items():
+        stats_dict[k] = acc.calc_stats()
+        rhist_dict[k] = RHist1D(
+            [ acc.hist.bins ], acc.hist.hist, acc.hist.hist_w2
+        )
+
+        _fit_fom_gaussian(stats_dict[k], rhist_dict[k], margin, k)
 
     return stats_dict, rhist_dict
 
@@ -219,17 +315,111 @@ def evaluate(
     See Also
     --------
     calc_fom_stats_hists
-    eval_model
-    eval_base
+    evaluate_predictions
     """
-    stats_model_dict, rhist_model_dict = eval_model(
-        args, dgen, model, fom_specs, fit_margin
+    return evaluate_predictions(
+        calc_predictions(args, dgen, model, base_map),
+        fom_specs, fit_margin, outdir
+    )
+
+def evaluate_predictions(predictions, fom_specs, fit_margin, outdir):
+    """Calculate relative energy resolution hists from evaluation energies.
+
+    This function is similar to `evaluate`, but instead of running a model
+    it uses the evaluation energies calculated beforehand, e.g. loaded by
+    `load_predictions`.
+
+    Parameters
+    ----------
+    predictions : dict
+        Evaluation energies. C.f. `calc_predictions`.
+    fom_specs : dict
+        Dictionary where keys are energy labels and values are the `PlotSpec`
+        objects that parametrize histograms of the relative energy resolution.
+    fit_margin : float
+        Fraction of the height of the peak of energy resolution histogram
+        (Reco - True) / True, that will be used to fit a gaussian curve.
+    outdir : str
+        Directory where evaluation statistics will be saved.
+
+    Returns
+    -------
+    (stat_model_dict, rhist_model_dict) : (dict, dict)
+        Statistics and histograms of the energies predicted by the model.
+    (stat_base_dict, rhist_base_dict) : (dict, dict)
+        Statistics and histograms of the baseline energies.
+
+    See Also
+    --------
+    evaluate
+    """
+    stats_model_dict, rhist_model_dict = calc_fom_stats_hists(
+        predictions['pred_model'], predictions['true'],
+        predictions['weights'], fom_specs, fit_margin
     )
     save_model_stats(stats_model_dict, outdir)
 
-    stats_base_dict, rhist_base_dict = eval_base(
-        dgen, base_map, fom_specs, fit_margin
+    stats_base_dict, rhist_base_dict = calc_fom_stats_hists(
+        predictions['pred_base'], predictions['true'],
+        predictions['weights'], fom_specs, fit_margin
+    )
+    save_base_stats(stats_base_dict, outdir)
+
+    return (
+        (stats_model_dict, rhist_model_dict),
+        (stats_base_dict , rhist_base_dict),
+    )
+
+def evaluate_streaming(
+    dgen, model, base_map, fom_specs, fit_margin, outdir
+):
+    """Calculate energy resolution hists for the `model` and baseline.
+
+    This function is a streaming counterpart of `evaluate`. Instead of
+    keeping all predicted energies in memory, it accumulates energy
+    resolution stats and hists batch by batch. So, its memory usage does not
+    depend on the size of the dataset.
+
+    Parameters
+    ----------
+    dgen : IDataGenerator
+        DataGenerator on which network will be evaluated.
+    model : keras.Model
+        Network to be evaluated.
+    base_map : dict
+        Dictionary that specifies mapping between energy label and a variable
+        name in `dgen.data_loader` that holds baseline reconstructed energy.
+    fom_specs : dict
+        Dictionary where keys are energy labels and values are the `PlotSpec`
+        objects that parametrize histograms of the relative energy resolution.
+    fit_margin : float
+        Fraction of the height of the peak of energy resolution histogram
+        (Reco - True) / True, that will be used to fit a gaussian curve.
+    outdir : str
+        Directory where evaluation statistics will be saved.
+
+    Returns
+    -------
+    (stat_model_dict, rhist_model_dict) : (dict, dict)
+        Statistics and histograms of the energies predicted by the model.
+    (stat_base_dict, rhist_base_dict) : (dict, dict)
+        Statistics and histograms of the baseline energies.
+
+    See Also
+    --------
+    evaluate
+    accumulate_fom
+    """
+    acc_model_dict, acc_base_dict = accumulate_fom(
+        dgen, model, fom_specs, base_map
     )
+
+    stats_model_dict, rhist_model_dict = \
+        calc_fom_stats_hists_from_accumulators(acc_model_dict, fit_margin)
+    save_model_stats(stats_model_dict, outdir)
+
+    stats_base_dict, rhist_base_dict = \
+        calc_fom_stats_hists_from_accumulators(acc_base_dict, fit_margin)
     save_base_stats(stats_base_dict, outdir)
 
     return (
@@ -2,6 +2,8 @@
 Functions to calculate true and predicted energies.
 """
 
+import numpy as np
+
 from lstm_ee.consts import ( LABEL_TOTAL, LABEL_PRIMARY, LABEL_SECONDARY )
 from lstm_ee.train.setup import get_keras_concurrency_kwargs
 
@@ -148,3 +150,110 @@ def get_base_energies(dgen, pred_map):
 
     return result
 
+
+def calc_predictions(args, dgen, model, base_map):
+    """Calculate all energies needed to evaluate a `model`.
+
+    Parameters
+    ----------
+    args : Args
+        Arguments that define `lstm_ee` training/evaluation.
+    dgen : IDataGenerator
+        Data generator on which `model` will be evaluated.
+    model : `keras.Model`
+        Model that will be used to predict energies.
+    base_map : dict
+        Dictionary that specifies mapping between energy label and a variable
+        name in `dgen.data_loader` that holds baseline reconstructed energy.
+
+    Returns
+    -------
+    dict
+        Dictionary with keys
+          - 'pred_model' : energies predicted by `model`,
+            c.f. `predict_energies`.
+          - 'pred_base'  : baseline energies, c.f. `get_base_energies`.
+          - 'true'       : true energies, c.f. `get_true_energies`.
+          - 'weights'    : sample weights of `dgen`.
+    """
+    return {
+        'pred_model' : predict_energies(args, dgen, model),
+        'pred_base'  : get_base_energies(dgen, base_map),
+        'true'       : get_true_energies(dgen),
+        'weights'    : dgen.weights,
+    }
+
+def predict_batches(dgen, model, base_map = None):
+    """Predict energies of `dgen` batch by batch.
+
+    This is a streaming counterpart of `calc_predictions`. Instead of
+    predicting energies of the whole `dgen` at once, it yields energies of
+    one batch at a time, so that only a single batch is kept in memory.
+
+    Parameters
+    ----------
+    dgen : IDataGenerator
+        Data generator on which `model` will be evaluated. Its batches
+        should follow the order of `dgen.data_loader`.
+    model : `keras.Model`
+        Model that will be used to predict energies.
+    base_map : dict or None, optional
+        Dictionary that specifies mapping between energy label and a variable
+        name in `dgen.data_loader` that holds baseline reconstructed energy.
+        Default: None.
+
+    Yields
+    ------
+    dict
+        Energies of a batch in the format of `calc_predictions`.
+    """
+    start = 0
+
+    for index in range(len(dgen)):
+        inputs, _targets, weights = dgen[index]
+        weights = weights[0]
+        rows    = np.arange(start, start + len(weights))
+        start  += len(weights)
+
+        pred = model.predict_on_batch(inputs)
+        if not isinstance(pred, list):
+            pred = [ pred ]
+
+        pred_model = {}
+        true       = {}
+        idx        = 0
+
+        for (label, var) in [
+            (LABEL_TOTAL,   dgen.var_target_total),
+            (LABEL_PRIMARY, dgen.var_target_primary),
+        ]:
+            if var is None:
+                pred_model[label] = None
+                true[label]       = None
+                continue
+
+            pred_model[label] = np.asarray(pred[idx]).ravel()
+            true[label]       = dgen.data_loader.get(var, rows).ravel()
+            idx += 1
+
+        _calc_secondary(pred_model)
+        _calc_secondary(true)
+
+        if base_map is None:
+            pred_base = {
+                k : None
+                    for k in [ LABEL_PRIMARY, LABEL_SECONDARY, LABEL_TOTAL ]
+            }
+        else:
+            pred_base = {
+                k : dgen.data_loader.get(v, rows).ravel()
+                    for k,v in base_map.items()
+            }
+            _calc_secondary(pred_base)
+
+        yield {
+            'pred_model' : pred_model,
+            'pred_base'  : pred_base,
+            'true'       : true,
+            'weights'    : weights,
+        }
@@ -0,0 +1,205 @@
+"""
+Functions to save/load energies predicted by `lstm_ee` networks.
+
+Each evaluation script needs the same set of energies: energies predicted by
+the model, baseline energies, true energies and sample weights. Calculation
+of these energies requires loading of the model and of the evaluation
+dataset and running of the model over that dataset. The functions of this
+module allow to save these energies once under the evaluation directory, so
+that the other evaluation scripts and plots can reuse them.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from lstm_ee.consts import LABEL_TOTAL, LABEL_PRIMARY, LABEL_SECONDARY
+
+LOGGER = logging.getLogger('lstm_ee.eval.predict_cache')
+
+PREDICT_DIR   = 'predictions'
+PREDICT_FNAME = 'key.json'
+
+ENERGY_SETS   = [ 'pred_model', 'pred_base', 'true' ]
+ENERGY_LABELS = [ LABEL_TOTAL, LABEL_PRIMARY, LABEL_SECONDARY ]
+
+def get_model_digest(savedir, chunk_size = 2**20):
+    """Calculate sha1 checksum of the model file `savedir`/model.h5"""
+    result = hashlib.sha1()
+
+    with open(os.path.join(savedir, 'model.h5'), 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            result.update(chunk)
+
+    return result.hexdigest()
+
+def get_predictions_key(model_digest, config, split_key, base_map):
+    """Get key that uniquely identifies evaluation energies.
+
+    Parameters
+    ----------
+    model_digest : str
+        Checksum of the model file. C.f. `get_model_digest`.
+    config : Config
+        Configuration of the evaluation, i.e. `Config` of the model modified
+        by `EvalConfig`.
+    split_key : dict or None
+        Key of the evaluation dataset and its train/test split.
+        C.f. `get_split_key`.
+    base_map : dict or None
+        Mapping between energy labels and variables of the baseline energies.
+
+    Returns
+    -------
+    dict
+        JSON serializable key of the evaluation energies.
+    """
+    return {
+        'model'    : model_digest,
+        'config'   : str(config),
+        'split'    : split_key,
+        'base_map' : base_map,
+    }
+
+def get_predictions_dir(outdir):
+    """Get directory where evaluation energies are saved under `outdir`"""
+    return os.path.join(outdir, PREDICT_DIR)
+
+def _get_array_path(path, name):
+    return os.path.join(path, '%s.npy' % (name))
+
+def _save_array(path, name, values):
+    fname    = _get_array_path(path, name)
+    tmp_path = '%s.%d.tmp.npy' % (fname[:-len('.npy')], os.getpid())
+
+    np.save(tmp_path, np.asarray(values))
+    os.replace(tmp_path, fname)
+
+def save_predictions(path, key, predictions):
+    """Save evaluation energies `predictions` under directory `path`.
+
+    Each array of `predictions` is saved to a separate ".npy" file, and the
+    `key` of `predictions` is saved to `path`/key.json. The key is written
+    last, so that an interrupted save is never mistaken for a complete one.
+
+    Parameters
+    ----------
+    path : str
+        Directory where evaluation energies will be saved.
+    key : dict
+        Key of the evaluation energies. C.f. `get_predictions_key`.
+    predictions : dict
+        Dictionary with keys { 'pred_model', 'pred_base', 'true' } and
+        values that are dictionaries of the corresponding energies (c.f.
+        `predict_energies`), and a key 'weights' with sample weights.
+    """
+    os.makedirs(path, exist_ok = True)
+
+    key_path = os.path.join(path, PREDICT_FNAME)
+
+    if os.path.exists(key_path):
+        os.remove(key_path)
+
+    arrays = []
+
+    for energy_set in ENERGY_SETS:
+        for label in ENERGY_LABELS:
+            values = predictions[energy_set].get(label)
+            if values is None:
+                continue
+
+            name = '%s_%s' % (energy_set, label)
+            _save_array(path, name, values)
+            arrays.append(name)
+
+    _save_array(path, 'weights', predictions['weights'])
+    arrays.append('weights')
+
+    tmp_path = '%s.%d.tmp' % (key_path, os.getpid())
+
+    with open(tmp_path, 'wt') as f:
+        json.dump(
+            { 'key' : key, 'arrays' : arrays }, f,
+            sort_keys = True, indent = 4
+        )
+
+    os.replace(tmp_path, key_path)
+
+def load_predictions(path, key):
+    """Load evaluation energies saved by `save_predictions`.
+
+    Parameters
+    ----------
+    path : str
+        Directory where evaluation energies were saved.
+    key : dict
+        Key of the evaluation energies. C.f. `get_predictions_key`.
+
+    Returns
+    -------
+    dict or None
+        Evaluation energies in the format of `save_predictions`, where
+        arrays are memory mapped from the saved files. None if energies
+        were not saved, or if they were saved for a different `key`.
+    """
+    key_path = os.path.join(path, PREDICT_FNAME)
+
+    if not os.path.exists(key_path):
+        return None
+
+    with open(key_path, 'rt') as f:
+        saved = json.load(f)
+
+    # Normalize key, so that it can be compared to the saved one
+    if saved['key'] != json.loads(json.dumps(key)):
+        LOGGER.info("Saved predictions in %s are out of date", path)
+        return None
+
+    arrays = set(saved['arrays'])
+
+    def load(name):
+        if name not in arrays:
+            return None
+        return np.load(_get_array_path(path, name), mmap_mode = 'r')
+
+    result = {
+        energy_set : {
+            label : load('%s_%s' % (energy_set, label))
+                for label in ENERGY_LABELS
+        } for energy_set in ENERGY_SETS
+    }
+    result['weights'] = load('weights')
+
+    LOGGER.info("Loading predictions from %s", path)
+
+    return result
+
+def get_predictions(path, key, calc_predictions):
+    """Load evaluation energies under `path` or calculate and save them.
+
+    Parameters
+    ----------
+    path : str
+        Directory where evaluation energies are saved.
+    key : dict
+        Key of the evaluation energies. C.f. `get_predictions_key`.
+    calc_predictions : callable
+        Function without arguments that calculates evaluation energies in
+        the format of `save_predictions`. It is called only if the energies
+        for `key` were not saved yet.
+
+    Returns
+    -------
+    dict
+        Evaluation energies in the format of `save_predictions`.
+    """
+    result = load_predictions(path, key)
+
+    if result is None:
+        result = calc_predictions()
+        save_predictions(path, key, result)
+
+    return result
@@ -4,9 +4,151 @@ Functions to calculate various statistical properties.
 
 import numpy as np
 
+# Quantile stats that `calc_stat` recognizes
+QUANTILE_STATS = { 'q16' : 0.16, 'q84' : 0.84 }
+
+# Size of arrays above which median is found by selection instead of sorting
+MEDIAN_SELECT_SIZE = 2**16
+
+def find_sorted_quantiles(v, cumsum, q, starts = None, ends = None):
+    """Find weighted quantiles of segments of sorted values.
+
+    The weighted quantile `q` of a segment is the first value of the segment
+    at which cumulative weight of the segment reaches `q` of the total
+    weight of the segment.
+
+    Parameters
+    ----------
+    v : ndarray, shape (N,)
+        Array of values sorted within each segment.
+    cumsum : ndarray, shape (N,)
+        Cumulative sum of weights of `v`.
+    q : float or ndarray, shape (Q,)
+        Quantiles to find, in [0, 1].
+    starts : ndarray, shape (S,) or None, optional
+        Indices of the first elements of segments. If None, then the whole
+        `v` is a single segment. Default: None.
+    ends : ndarray, shape (S,) or None, optional
+        Indices past the last elements of segments. Default: None.
+
+    Returns
+    -------
+    ndarray, shape (S, Q)
+        Quantiles of each segment. NaN for empty segments.
+    """
+    if starts is None:
+        starts = np.array([ 0 ])
+        ends   = np.array([ len(v) ])
+
+    q      = np.atleast_1d(np.asarray(q, dtype = float))
+    filled = (ends > starts)
+
+    # Cumulative weights of the preceding segments and weights of segments
+    cumsum0 = np.concatenate([ [ 0 ], cumsum ])
+    offset  = cumsum0[starts]
+    total   = cumsum0[ends] - offset
+
+    target = offset[:, np.newaxis] + total[:, np.newaxis] * q
+    index  = np.searchsorted(cumsum, target, side = 'left')
+    index  = np.clip(index, starts[:, np.newaxis], (ends - 1)[:, np.newaxis])
+
+    result = np.full(target.shape, np.nan)
+    result[filled] = v[index[filled]]
+
+    return result
+
+def calc_quantiles(v, w, q):
+    """Calculate multiple quantiles of a weighted dataset with a single sort.
+
+    Parameters
+    ----------
+    v : ndarray, shape (N,)
+        Array of values for which quantiles will be found.
+    w : ndarray, shape (N,)
+        Array of weights.
+    q : float or ndarray, shape (Q,)
+        Quantiles to calculate, in [0, 1].
+
+    Returns
+    -------
+    float or ndarray, shape (Q,)
+        Quantiles `q` of the `v` array. NaN if `v` is empty.
+
+    See Also
+    --------
+    find_sorted_quantiles
+    """
+    sorted_indices = np.argsort(v)
+
+    result = find_sorted_quantiles(
+        v[sorted_indices], np.cumsum(w[sorted_indices]), q
+    )
+
+    return result[0].reshape(np.shape(q))[()]
+
+def calc_quantile_select(v, w, q):
+    """Calculate quantile of a weighted dataset by selection.
+
+    Unlike `calc_quantiles`, this function does not sort `v`. Instead, it
+    repeatedly partitions `v` around its (unweighted) median with
+    `np.partition` and keeps only the part that contains the quantile. So,
+    its complexity is O(N) on average.
+
+    Parameters
+    ----------
+    v : ndarray, shape (N,)
+        Array of values for which quantile will be found.
+    w : ndarray, shape (N,)
+        Array of weights.
+    q : float
+        Quantile to calculate, in [0, 1].
+
+    Returns
+    -------
+    float
+        Quantile `q` of the `v` array. NaN if `v` is empty.
+    """
+    # pylint: disable=len-as-condition
+    if len(v) == 0:
+        return np.nan
+
+    target = q * np.sum(w)
+    below  = 0
+
+    while len(v) > 1024:
+        pivot = np.partition(v, len(v) // 2)[len(v) // 2]
+
+        mask_left  = (v < pivot)
+        mask_right = (v > pivot)
+
+        weight_left  = np.sum(w[mask_left])
+        weight_pivot = np.sum(w[~(mask_left | mask_right)])
+
+        if np.any(mask_left) and (below + weight_left >= target):
+            v, w = v[mask_left], w[mask_left]
+        elif (
+                (below + weight_left + weight_pivot >= target)
+             or (not np.any(mask_right))
+        ):
+            return pivot
+        else:
+            below += weight_left + weight_pivot
+            v, w = v[mask_right], w[mask_right]
+
+    sorted_indices = np.argsort(v)
+
+    v      = v[sorted_indices]
+    cumsum = below + np.cumsum(w[sorted_indices])
+    index  = np.searchsorted(cumsum, target, side = 'left')
+
+    return v[min(index, len(v) - 1)]
+
 def calc_median(v, w):
     """Calculate median of a weighted dataset.
 
+    The median of large arrays is found by `calc_quantile_select`, and of
+    the small ones by `calc_quantiles`.
+
     Parameters
     ----------
     v : ndarray, shape (N,)
@@ -23,15 +165,10 @@ def calc_median(v, w):
     if len(v) == 0:
         return 0
 
-    sorted_indices = np.argsort(v)
-
-    v = v[sorted_indices]
-    w = w[sorted_indices]
-
-    cumsum     = np.cumsum(w)
-    median_idx = np.searchsorted(cumsum, cumsum[-1] / 2)
+    if len(v) > MEDIAN_SELECT_SIZE:
+        return calc_quantile_select(v, w, 0.5)
 
-    return v[median_idx]
+    return calc_quantiles(v, w, 0.5)
 
 def calc_stderr(v, w):
     """Calculate standard error of a weighted dataset.
@@ -86,6 +223,9 @@ def calc_all_stats(data, weights):
         - "stdev"  -- standard deviation
         - "stderr" -- unbiased standard error
         - "median" -- median
+        - "q16"    -- 16% quantile
+        - "q84"    -- 84% quantile
+        - "iqw68"  -- 68% interquantile width, "q84" - "q16"
         - "m1"     -- First moment, same as "mean"
         - "m2"     -- Second moment, same as "rms"**2
         - "m4"     -- Fourth moment
@@ -117,7 +257,12 @@ def calc_all_stats(data, weights):
     rms    = np.sqrt(m2)
     stdev  = np.sqrt(x1var)
     stderr = np.sqrt(m1var)
-    median = calc_median(data, weights)
+
+    # pylint: disable=len-as-condition
+    if len(data) == 0:
+        median, q16, q84 = 0, np.nan, np.nan
+    else:
+        median, q16, q84 = calc_quantiles(data, weights, [ 0.5, 0.16, 0.84 ])
 
     return {
         'mean'   : mean,
@@ -125,6 +270,9 @@ def calc_all_stats(data, weights):
         'stdev'  : stdev,
         'stderr' : stderr,
         'median' : median,
+        'q16'    : q16,
+        'q84'    : q84,
+        'iqw68'  : q84 - q16,
         'm1'     : m1,
         'm2'     : m2,
         'm4'     : m4,
@@ -143,7 +291,7 @@ def calc_stat(v, w, stat):
         Array of values.
     w : ndarray, shape (N,)
         Array of weights.
-    stat : { 'mean', 'rms', 'stdev', 'stderr', 'median' }
+    stat : { 'mean', 'rms', 'std', 'stderr', 'median', 'q16', 'q84' }
         Type of the statistical property to calculate.
 
     Returns
@@ -172,6 +320,9 @@ def calc_stat(v, w, stat):
     elif stat == 'median':
         return calc_median(v, w)
 
+    elif stat in QUANTILE_STATS:
+        return calc_quantiles(v, w, QUANTILE_STATS[stat])
+
     else:
         raise ValueError("Unknown stat: %s" % stat)
 
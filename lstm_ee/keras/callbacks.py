@@ -1,8 +1,13 @@
 """Custom `keras` callbacks"""
 
+import logging
 import time
+
+import numpy as np
 from keras.callbacks import Callback
 
+LOGGER = logging.getLogger('lstm_ee.keras.callbacks')
+
 class TrainTime(Callback):
     """Callback that saves cumulative training time for each epoch in log."""
 
@@ -21,3 +26,117 @@ class TrainTime(Callback):
             timestamp = time.perf_counter()
             logs['train_time'] = timestamp - self.start_time
 
+# Keys of the throughput measurements added to the training log
+THROUGHPUT_KEYS = [
+    'events_per_sec', 'step_time_mean', 'step_time_p95', 'data_wait_time',
+    'compute_time', 'data_time', 'val_time',
+]
+
+class TrainThroughput(Callback):
+    """Callback that saves training throughput measurements in log.
+
+    For each epoch it adds the following values to the log:
+        - 'events_per_sec' -- number of training events per second.
+        - 'step_time_mean', 'step_time_p95' -- mean and 95th percentile of
+          the training step (`train_on_batch`) time.
+        - 'data_wait_time' -- total time the trainer spent between training
+          steps waiting for the data generator.
+        - 'compute_time' -- total time spent in training steps.
+        - 'data_time' -- total time spent producing training batches, as
+          measured by the generator side hook `data_timer`. If batches are
+          produced in parallel, it may exceed 'data_wait_time'. Batches
+          produced ahead of an epoch (e.g. by `PrefetchSequence`) are not
+          dropped, but may be counted in the preceding epoch. Batches
+          produced by forked worker processes are counted as well.
+        - 'val_time' -- validation time.
+
+    Parameters
+    ----------
+    data_timer : DataTimer or None, optional
+        Generator side hook that measures time spent producing training
+        batches. If None, 'data_time' will be NaN.
+    """
+
+    def __init__(self, data_timer = None):
+        super(TrainThroughput, self).__init__()
+        self.data_timer = data_timer
+
+        self._epoch_start = None
+        self._batch_start = None
+        self._batch_end   = None
+        self._step_times  = []
+        self._wait_time   = 0
+        self._events      = 0
+
+    def on_train_begin(self, logs = None):
+        if self.data_timer is not None:
+            self.data_timer.pop_stats()
+
+    def on_epoch_begin(self, epoch, logs = None):
+        self._epoch_start = time.perf_counter()
+        self._batch_end   = self._epoch_start
+        self._step_times  = []
+        self._wait_time   = 0
+        self._events      = 0
+
+    def on_batch_begin(self, batch, logs = None):
+        self._batch_start = time.perf_counter()
+        self._wait_time  += self._batch_start - self._batch_end
+
+    def on_batch_end(self, batch, logs = None):
+        self._batch_end = time.perf_counter()
+        self._step_times.append(self._batch_end - self._batch_start)
+
+        if logs is not None:
+            self._events += logs.get('size', 0)
+
+    def on_epoch_end(self, epoch, logs = None):
+        if logs is None:
+            return
+
+        timestamp  = time.perf_counter()
+        train_time = self._batch_end - self._epoch_start
+        step_times = np.array(self._step_times)
+
+        step_mean = np.nan
+        step_p95  = np.nan
+        data_time = np.nan
+
+        if len(step_times) > 0:
+            step_mean = np.mean(step_times)
+            step_p95  = np.percentile(step_times, 95)
+
+        if self.data_timer is not None:
+            data_time = self.data_timer.pop_stats()[1]
+
+        logs['events_per_sec'] = self._events / max(train_time, 1e-9)
+        logs['step_time_mean'] = step_mean
+        logs['step_time_p95']  = step_p95
+        logs['data_wait_time'] = self._wait_time
+        logs['compute_time']   = np.sum(step_times)
+        logs['data_time']      = data_time
+        logs['val_time']       = timestamp - self._batch_end
+
+class PipelineProfile(Callback):
+    """Callback that saves per epoch statistics of the data pipeline.
+
+    Parameters
+    ----------
+    profiler : PipelineProfiler
+        Profiler that accumulates statistics of the instrumented pipeline.
+        C.f. `lstm_ee.data.instrument`.
+    path : str
+        Path to the csv file where statistics will be appended.
+    """
+
+    def __init__(self, profiler, path):
+        super(PipelineProfile, self).__init__()
+        self.profiler = profiler
+        self.path     = path
+
+    def on_epoch_end(self, epoch, logs = None):
+        LOGGER.info(
+            "Data pipeline profile of epoch %d:\n%s",
+            epoch, self.profiler.format_table()
+        )
+        self.profiler.save_epoch(self.path, epoch)
@@ -5,7 +5,8 @@ Functions to make binstat plots.
 import matplotlib.pyplot as plt
 
 from cafplot.plot import plot_nphist1d_base, save_fig
-from lstm_ee.eval.binned_stats import calc_binned_stats, calc_stat
+from lstm_ee.eval.binned_stats import calc_binned_stats
+from lstm_ee.eval.stats        import calc_stat
 
 def plot_binstat_single(ax, x, y, weights, label, color, spec, stat):
     """Add a plot of single binstat to axes `ax`"""
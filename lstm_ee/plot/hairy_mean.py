@@ -4,17 +4,20 @@ Functions to make binstat plots of means with error bars.
 
 import matplotlib.pyplot as plt
 
-from lstm_ee.eval.binned_stats import calc_binned_stats, calc_stat
+from lstm_ee.eval.binned_stats import BinnedStats
+from lstm_ee.eval.stats        import calc_stat
 from cafplot.plot.nphist import plot_nphist1d_base, plot_nphist1d_error
 from cafplot.plot import save_fig
 
 def plot_hairy_mean_binstat_single(ax, x, y, weights, bins, color, label, err):
     """Add binstat plot of mean with error bars to axes `ax`"""
 
-    mean_binstats = calc_binned_stats(x, y, weights, bins, 'mean')
+    binstats = BinnedStats([ x ], y, weights, [ bins ])
+
+    mean_binstats = binstats.calc_stat('mean')
     mean_fullstat = calc_stat(y, weights, 'mean')
 
-    err_binstats = calc_binned_stats(x, y, weights, bins, err)
+    err_binstats = binstats.calc_stat(err)
     err_fullstat = calc_stat(y, weights, err)
 
     plot_nphist1d_base(
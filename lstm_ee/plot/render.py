@@ -0,0 +1,56 @@
+"""
+Functions to render independent plots in parallel.
+"""
+
+import multiprocessing
+
+# Plot tasks that are being rendered. Shared with the forked workers.
+_TASKS = None
+
+def _render_task(task):
+    func, args, kwargs = task
+    func(*args, **kwargs)
+
+def _render_task_global(index):
+    _render_task(_TASKS[index])
+
+def render_plots(tasks, workers = None):
+    """Render plots `tasks` by `workers` parallel processes.
+
+    Making a plot is dominated by the matplotlib rendering, which cannot be
+    parallelized with threads. So, the plots are rendered by forked processes
+    that share the plot data with the current process.
+
+    Parameters
+    ----------
+    tasks : list of (callable, tuple, dict)
+        List of plot tasks. Each task is a tuple of plot function, its
+        positional and keyword arguments. Plot functions should save their
+        plots and return nothing.
+    workers : int or None, optional
+        Number of parallel processes. If None, the number of CPUs is used.
+        If 1, the plots will be rendered in the current process.
+        Default: None.
+    """
+    # pylint: disable=global-statement
+    global _TASKS
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    workers = min(workers, len(tasks))
+
+    if workers <= 1:
+        for task in tasks:
+            _render_task(task)
+        return
+
+    _TASKS = tasks
+
+    try:
+        ctx = multiprocessing.get_context('fork')
+
+        with ctx.Pool(processes = workers) as pool:
+            pool.map(_render_task_global, range(len(tasks)), chunksize = 1)
+    finally:
+        _TASKS = None
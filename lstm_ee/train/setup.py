@@ -4,7 +4,11 @@ A collection of functions to setup keras training.
 
 import keras
 
-from lstm_ee.keras.callbacks import TrainTime
+from lstm_ee.data.data_generator.data_timer import DataTimer, find_decorator
+from lstm_ee.data.instrument import PROFILER, is_instrument_enabled
+from lstm_ee.keras.callbacks import (
+    PipelineProfile, TrainThroughput, TrainTime
+)
 from lstm_ee.keras.models    import (
     flattened_model, model_lstm_v1, model_lstm_v2, model_lstm_v3,
     model_slice_linear, model_lstm_v3_stack
@@ -61,8 +65,13 @@ def get_early_stop(early_stop):
     else:
         raise ValueError("Unknown early stoping: %s" % (early_stop))
 
-def get_default_callbacks(args):
-    """Get default `keras` callbacks for the `lstm_ee` training"""
+def get_default_callbacks(args, dgen_train = None):
+    """Get default `keras` callbacks for the `lstm_ee` training
+
+    If the training DataGenerator `dgen_train` is specified, then the time
+    spent producing its batches will be recorded by the `TrainThroughput`
+    callback.
+    """
 
     cb_checkpoint = keras.callbacks.ModelCheckpoint(
         "%s/model.h5" % args.savedir,
@@ -73,10 +82,11 @@ def get_default_callbacks(args):
 
     cb_logger     = keras.callbacks.CSVLogger("%s/log.csv" % args.savedir)
     cb_time       = TrainTime()
+    cb_throughput = TrainThroughput(find_decorator(dgen_train, DataTimer))
     cb_schedule   = get_schedule(args.schedule)
     cb_early_stop = get_early_stop(args.early_stop)
 
-    callbacks = [ cb_time, cb_checkpoint, cb_logger ]
+    callbacks = [ cb_time, cb_throughput, cb_checkpoint, cb_logger ]
 
     if cb_schedule is not None:
         callbacks.append(cb_schedule)
@@ -84,6 +94,11 @@ def get_default_callbacks(args):
     if cb_early_stop is not None:
         callbacks.append(cb_early_stop)
 
+    if is_instrument_enabled(args.instrument):
+        callbacks.append(
+            PipelineProfile(PROFILER, "%s/profile.csv" % args.savedir)
+        )
+
     return callbacks
 
 def get_regularizer(regularizer):
@@ -143,6 +158,18 @@ def get_keras_concurrency_kwargs(args):
     result = {}
     result['workers'] = 0
 
+    if (
+           args.prefetch
+        or (args.stream_buffer is not None)
+        or (args.disk_cache and args.disk_cache_prefetch)
+    ):
+        # Batches of these generators need to be requested in order. Prefetch
+        # and disk cache read ahead shuffle training batches themselves in an
+        # order that they know in advance (c.f. `PrefetchSequenceBase`,
+        # `DataPrefetchBase`).
+        result['shuffle'] = False
+        return result
+
     if args.cache or (args.concurrency is None):
         return result
 
@@ -151,7 +178,7 @@ def get_keras_concurrency_kwargs(args):
 
     result['workers'] = args.workers
 
-    if args.concurrency == 'process':
+    if args.concurrency in [ 'process', 'stream' ]:
         result['use_multiprocessing'] = True
     elif args.concurrency == 'thread':
         result['use_multiprocessing'] = False
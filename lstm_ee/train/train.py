@@ -5,9 +5,10 @@ Functions to train `lstm_ee` model.
 import logging
 import numpy as np
 
-from lstm_ee.args import Args
-from lstm_ee.data import load_data
-from .setup       import (
+from lstm_ee.args            import Args
+from lstm_ee.data.data       import load_data, save_split
+from lstm_ee.keras.callbacks import THROUGHPUT_KEYS
+from .setup                  import (
     get_optimizer, get_default_callbacks, get_keras_concurrency_kwargs,
     select_model
 )
@@ -27,20 +28,29 @@ def return_training_stats(train_log, savedir):
     Return
     ------
     dict
-        Dictionary with training summary.
+        Dictionary with training summary. The 'throughput' item holds
+        averages over epochs of the `TrainThroughput` measurements.
     """
 
-    best_idx = np.argmin(train_log.history['val_loss'])
+    best_idx   = np.argmin(train_log.history['val_loss'])
+    throughput = {}
+
+    for k in THROUGHPUT_KEYS:
+        values = np.array(train_log.history.get(k, []), dtype = float)
+        values = values[np.isfinite(values)]
+
+        throughput[k] = float(np.mean(values)) if len(values) > 0 else None
 
     result = {
-        'loss'    : (
+        'loss'       : (
             train_log.history['val_target_total_loss'][best_idx]
           + train_log.history['val_target_primary_loss'][best_idx]
         ),
-        'status'  : 0,
-        'time'    : train_log.history['train_time'][-1],
-        'epochs'  : len(train_log.history['val_loss']),
-        'savedir' : savedir
+        'status'     : 0,
+        'time'       : train_log.history['train_time'][-1],
+        'epochs'     : len(train_log.history['val_loss']),
+        'savedir'    : savedir,
+        'throughput' : throughput,
     }
 
     return result
@@ -81,12 +91,16 @@ def create_and_train_model(args = None, extra_kwargs = None, **kwargs):
     LOGGER.info("Loading data...")
     dgen_train, dgen_test = load_data(args)
 
+    if args.stream_buffer is None:
+        # Allow evaluation to load only the test sample
+        save_split(args, dgen_test)
+
     LOGGER.info("Compiling model..")
     np.random.seed(args.seed)
 
     optimizer = get_optimizer(args.optimizer)
     model     = select_model(args)
-    callbacks = get_default_callbacks(args)
+    callbacks = get_default_callbacks(args, dgen_train)
 
     model.compile(
         loss      = args.config.loss,
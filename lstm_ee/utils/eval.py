@@ -6,7 +6,15 @@ import copy
 import os
 
 from cafplot.plot import make_plotdir
-from lstm_ee.data import load_data
+
+from lstm_ee.args               import Args
+from lstm_ee.data               import load_test_data
+from lstm_ee.data.data          import get_args_split_key
+from lstm_ee.eval.predict       import calc_predictions
+from lstm_ee.eval.predict_cache import (
+    get_model_digest, get_predictions, get_predictions_dir,
+    get_predictions_key
+)
 
 from .eval_config import EvalConfig
 from .io          import load_model
@@ -21,10 +29,28 @@ def make_eval_outdir(outdir, eval_config):
     return result
 
 def modify_concurrency_args(args, cmdargs):
-    """Modify concurrency arguments of `args` from `argparse.Namespace`"""
-    args.concurrency = cmdargs.concurrency
-    args.cache       = cmdargs.cache
-    args.workers     = cmdargs.workers
+    """Modify concurrency arguments of `args` from `argparse.Namespace`
+
+    The streaming mode is not supported by the evaluation, since its
+    generators produce batches only sequentially and do not provide the
+    event variables and weights that the evaluation needs.
+    """
+    if cmdargs.stream_buffer is not None:
+        raise RuntimeError(
+            "Streaming mode (--stream-buffer) is not supported by the"
+            " evaluation"
+        )
+
+    args.concurrency         = cmdargs.concurrency
+    args.cache               = cmdargs.cache
+    args.workers             = cmdargs.workers
+    args.event_store         = cmdargs.event_store
+    args.disk_cache_prefetch = cmdargs.disk_cache_prefetch
+    args.chunksize           = cmdargs.chunksize
+    args.prefetch            = cmdargs.prefetch
+    args.prefetch_mode       = cmdargs.prefetch_mode
+    args.fuse_augment        = cmdargs.fuse_augment
+    args.instrument          = cmdargs.instrument
 
 def modify_specs(specs, func):
     """Map `func` over a dict of `PlotSpec`"""
@@ -47,10 +73,79 @@ def standard_eval_prologue(cmdargs, presets_eval):
     eval_config.modify_eval_args(args)
     modify_concurrency_args(args, cmdargs)
 
-    _, dgen    = load_data(args)
+    dgen       = load_test_data(args)
     outdir     = make_eval_outdir(cmdargs.outdir, eval_config)
     plotdir    = make_plotdir(outdir)
     eval_specs = presets_eval[cmdargs.preset]
 
     return (dgen, args, model, outdir, plotdir, eval_specs)
 
+
+def load_eval_predictions(
+    args, outdir, eval_specs, dgen = None, model = None
+):
+    """Load evaluation energies saved under `outdir` or calculate them.
+
+    Evaluation energies are saved under `outdir`/predictions and are keyed
+    by the checksum of the model file, evaluation configuration, dataset
+    and baseline energy map. The model and the evaluation dataset are
+    loaded only if the saved energies are missing or out of date.
+
+    Parameters
+    ----------
+    args : Args
+        Arguments of the trained model modified by `EvalConfig`.
+    outdir : str
+        Evaluation directory created by `make_eval_outdir`.
+    eval_specs : dict
+        Evaluation preset. C.f. `PRESETS_EVAL`.
+    dgen : IDataGenerator or None, optional
+        Evaluation data generator. If None, it will be loaded with
+        `load_test_data` when needed. Default: None.
+    model : keras.Model or None, optional
+        Trained model. If None, it will be loaded from `args.savedir` when
+        needed. Default: None.
+
+    Returns
+    -------
+    dict
+        Evaluation energies. C.f. `calc_predictions`.
+    """
+    key = get_predictions_key(
+        get_model_digest(args.savedir), args.config,
+        get_args_split_key(args), eval_specs['base_map']
+    )
+
+    def calc():
+        nonlocal dgen, model
+
+        if model is None:
+            _, model = load_model(args.savedir, compile = False)
+
+        if dgen is None:
+            dgen = load_test_data(args)
+
+        return calc_predictions(args, dgen, model, eval_specs['base_map'])
+
+    return get_predictions(get_predictions_dir(outdir), key, calc)
+
+def cached_eval_prologue(cmdargs, presets_eval):
+    """Evaluation prologue that reuses saved evaluation energies.
+
+    Unlike `standard_eval_prologue`, this prologue does not return the model
+    and the evaluation dataset, but the evaluation energies instead. The
+    model and the dataset are loaded only if the energies were not saved
+    by a previous evaluation. C.f. `load_eval_predictions`.
+    """
+    args        = Args.load(savedir = cmdargs.outdir)
+    eval_config = EvalConfig.from_cmdargs(cmdargs)
+
+    eval_config.modify_eval_args(args)
+    modify_concurrency_args(args, cmdargs)
+
+    outdir      = make_eval_outdir(cmdargs.outdir, eval_config)
+    plotdir     = make_plotdir(outdir)
+    eval_specs  = presets_eval[cmdargs.preset]
+    predictions = load_eval_predictions(args, outdir, eval_specs)
+
+    return (predictions, args, outdir, plotdir, eval_specs)
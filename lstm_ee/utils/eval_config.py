@@ -153,3 +153,7 @@ class EvalConfig:
             args.config, 'prong_sorters', self.prong_sorter
         )
 
+        # Resampling and rotation of epochs only affect the training
+        args.config.resample      = None
+        args.config.rotate_epochs = None
+
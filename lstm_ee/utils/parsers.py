@@ -99,6 +99,21 @@ def add_concurrency_parser(parser):
         dest    = 'disk_cache',
     )
 
+    parser.add_argument(
+        '--disk-cache-prefetch',
+        help    = 'Number of disk cached batches to read ahead',
+        dest    = 'disk_cache_prefetch',
+        default = None,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--event-store',
+        help    = 'Gather batches from a preprocessed event store',
+        action  = 'store_true',
+        dest    = 'event_store',
+    )
+
     parser.add_argument(
         '--workers',
         help    = 'Number of concurrent workers',
@@ -111,18 +126,82 @@ def add_concurrency_parser(parser):
         '--concurrency',
         help    = 'Type of parallelization',
         dest    = 'concurrency',
+        choices = [ 'thread', 'process', 'stream' ],
+        default = None,
+    )
+
+    parser.add_argument(
+        '--chunksize',
+        help    = 'Number of batches sent to a streaming worker at once',
+        dest    = 'chunksize',
+        default = None,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--prefetch',
+        help    = 'Number of batches to produce ahead of the training',
+        dest    = 'prefetch',
+        default = None,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--prefetch-mode',
+        help    = 'Type of prefetch workers',
+        dest    = 'prefetch_mode',
         choices = [ 'thread', 'process' ],
         default = None,
     )
 
+    parser.add_argument(
+        '--fuse-augment',
+        help    = 'Sort prongs, add noise and mask NaNs in a single pass',
+        action  = 'store_true',
+        dest    = 'fuse_augment',
+    )
+
+    parser.add_argument(
+        '--instrument',
+        help    = 'Record per stage statistics of the data pipeline',
+        action  = 'store_true',
+        default = None,
+        dest    = 'instrument',
+    )
+
+    parser.add_argument(
+        '--stream-buffer',
+        help    = 'Stream dataset from disk with a shuffle buffer of N events',
+        dest    = 'stream_buffer',
+        default = None,
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--stream-chunk',
+        help    = 'Number of events to read at once when streaming',
+        dest    = 'stream_chunk',
+        default = None,
+        type    = int,
+    )
+
 def parse_concurrency_cmdargs(config_dict, title = "Train"):
     """Parse command line concurrency options into `config_dict`"""
     parser = argparse.ArgumentParser(title)
     add_concurrency_parser(parser)
 
     cmdargs = parser.parse_args()
-    config_dict['concurrency'] = cmdargs.concurrency
-    config_dict['cache']       = cmdargs.cache
-    config_dict['disk_cache']  = cmdargs.disk_cache
-    config_dict['workers']     = cmdargs.workers
+    config_dict['concurrency']         = cmdargs.concurrency
+    config_dict['cache']               = cmdargs.cache
+    config_dict['disk_cache']          = cmdargs.disk_cache
+    config_dict['disk_cache_prefetch'] = cmdargs.disk_cache_prefetch
+    config_dict['event_store']         = cmdargs.event_store
+    config_dict['workers']             = cmdargs.workers
+    config_dict['chunksize']           = cmdargs.chunksize
+    config_dict['prefetch']            = cmdargs.prefetch
+    config_dict['prefetch_mode']       = cmdargs.prefetch_mode
+    config_dict['fuse_augment']        = cmdargs.fuse_augment
+    config_dict['instrument']          = cmdargs.instrument
+    config_dict['stream_buffer']       = cmdargs.stream_buffer
+    config_dict['stream_chunk']        = cmdargs.stream_chunk
 
@@ -0,0 +1,211 @@
+"""Manage disk caches of data batches"""
+
+import argparse
+import datetime
+import json
+import os
+
+from lstm_ee.consts import ROOT_DATADIR
+from lstm_ee.data.cache_warmup import load_args_list, warm_disk_cache
+from lstm_ee.data.data_generator.funcs.disk_cache import (
+    format_size, get_cache_info, list_caches, prune_caches
+)
+from lstm_ee.utils.log import setup_logging
+
+def add_list_parser(subparsers):
+    # pylint: disable=missing-function-docstring
+    subparsers.add_parser('list', help = 'List caches')
+
+def add_inspect_parser(subparsers):
+    # pylint: disable=missing-function-docstring
+    parser = subparsers.add_parser('inspect', help = 'Inspect cache')
+
+    parser.add_argument(
+        'name',
+        help    = 'Cache name (or its unique prefix)',
+        metavar = 'NAME',
+        type    = str,
+    )
+
+def add_prune_parser(subparsers):
+    # pylint: disable=missing-function-docstring
+    parser = subparsers.add_parser('prune', help = 'Remove unused caches')
+
+    parser.add_argument(
+        '--max-size',
+        help    = 'Remove least recently used caches to fit size (e.g. 100G)',
+        dest    = 'max_size',
+        default = None,
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--older-than',
+        help    = 'Remove caches not accessed in the last N days',
+        dest    = 'older_than',
+        default = None,
+        type    = float,
+    )
+
+    parser.add_argument(
+        '--all',
+        help    = 'Remove all caches that are not in use',
+        action  = 'store_true',
+        dest    = 'all',
+    )
+
+    parser.add_argument(
+        '-n', '--dry-run',
+        help    = 'Only print caches that would be removed',
+        action  = 'store_true',
+        dest    = 'dry_run',
+    )
+
+def add_prebuild_parser(subparsers):
+    # pylint: disable=missing-function-docstring
+    parser = subparsers.add_parser(
+        'prebuild', help = 'Fill disk caches of a training'
+    )
+
+    parser.add_argument(
+        'config',
+        help    = 'Training script or directory with a saved training',
+        metavar = 'CONFIG',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--workers',
+        help    = 'Number of parallel processes',
+        dest    = 'workers',
+        default = None,
+        type    = int,
+    )
+
+def parse_cmdargs():
+    # pylint: disable=missing-function-docstring
+    parser = argparse.ArgumentParser("Manage disk caches of data batches")
+
+    parser.add_argument(
+        '--datadir',
+        help    = 'Root data directory that holds the .cache subdir',
+        dest    = 'datadir',
+        default = ROOT_DATADIR,
+        type    = str,
+    )
+
+    subparsers = parser.add_subparsers(dest = 'command')
+    subparsers.required = True
+
+    add_list_parser(subparsers)
+    add_inspect_parser(subparsers)
+    add_prune_parser(subparsers)
+    add_prebuild_parser(subparsers)
+
+    return parser.parse_args()
+
+def format_time(timestamp):
+    """Format unix `timestamp` into a human readable string"""
+    return datetime.datetime.fromtimestamp(timestamp).strftime(
+        '%Y-%m-%d %H:%M'
+    )
+
+def format_fill(info):
+    """Format fill status of the cache"""
+    if info['len'] is None:
+        return "%d/?" % (info['filled'])
+
+    return "%d/%d" % (info['filled'], info['len'])
+
+def cmd_list(cachedir):
+    # pylint: disable=missing-function-docstring
+    infos = list_caches(cachedir)
+
+    print("%-12s %10s %12s %16s  %s" % (
+        'NAME', 'SIZE', 'BATCHES', 'LAST ACCESS', 'DATASET'
+    ))
+
+    for info in infos:
+        config  = info['config'] or {}
+        dataset = "%s (part %s, batch size %s)" % (
+            config.get('dataset'), config.get('part'),
+            config.get('batch_size')
+        )
+
+        print("%-12s %10s %12s %16s  %s" % (
+            info['name'][:12], format_size(info['size']), format_fill(info),
+            format_time(info['last_access']), dataset
+        ))
+
+    print("Total: %d caches, %s" % (
+        len(infos), format_size(sum(x['size'] for x in infos))
+    ))
+
+def cmd_inspect(cachedir, name):
+    # pylint: disable=missing-function-docstring
+    matches = [
+        x for x in os.listdir(cachedir)
+            if x.startswith(name) and os.path.isdir(os.path.join(cachedir, x))
+    ]
+
+    if len(matches) != 1:
+        raise RuntimeError(
+            "Cache name '%s' matches %d caches" % (name, len(matches))
+        )
+
+    info = get_cache_info(os.path.join(cachedir, matches[0]))
+
+    info['created']     = format_time(info['created'])
+    info['last_access'] = format_time(info['last_access'])
+    info['size']        = format_size(info['size'])
+
+    print(json.dumps(info, indent = 4))
+
+def cmd_prune(cachedir, cmdargs):
+    # pylint: disable=missing-function-docstring
+    max_size   = cmdargs.max_size
+    older_than = None
+
+    if cmdargs.all:
+        max_size = 0
+
+    if cmdargs.older_than is not None:
+        older_than = cmdargs.older_than * 24 * 3600
+
+    if (max_size is None) and (older_than is None):
+        raise RuntimeError(
+            "Either --max-size, --older-than or --all should be specified"
+        )
+
+    removed = prune_caches(
+        cachedir, max_size, older_than, dry_run = cmdargs.dry_run
+    )
+
+    print("%s %d caches, %s" % (
+        "Would remove" if cmdargs.dry_run else "Removed", len(removed),
+        format_size(sum(x['size'] for x in removed))
+    ))
+
+def cmd_prebuild(datadir, config, workers):
+    # pylint: disable=missing-function-docstring
+    for args in load_args_list(config):
+        warm_disk_cache(args, workers, datadir)
+
+def main():
+    # pylint: disable=missing-function-docstring
+    setup_logging()
+    cmdargs  = parse_cmdargs()
+    cachedir = os.path.join(cmdargs.datadir, '.cache')
+
+    if cmdargs.command == 'list':
+        cmd_list(cachedir)
+    elif cmdargs.command == 'inspect':
+        cmd_inspect(cachedir, cmdargs.name)
+    elif cmdargs.command == 'prune':
+        cmd_prune(cachedir, cmdargs)
+    elif cmdargs.command == 'prebuild':
+        cmd_prebuild(cmdargs.datadir, cmdargs.config, cmdargs.workers)
+
+if __name__ == '__main__':
+    main()
+
@@ -0,0 +1,65 @@
+"""Fill disk caches of a training ahead of time in parallel processes"""
+
+import argparse
+
+from lstm_ee.data.cache_warmup import load_args_list, warm_disk_cache
+from lstm_ee.utils.log         import setup_logging
+
+def parse_cmdargs():
+    # pylint: disable=missing-function-docstring
+    parser = argparse.ArgumentParser("Fill disk caches of a training")
+
+    parser.add_argument(
+        'config',
+        help    = 'Training script or directory with a saved training',
+        metavar = 'CONFIG',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--datadir',
+        help    = 'Root data directory',
+        dest    = 'datadir',
+        default = None,
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--event-store',
+        help    = 'Gather batches from a preprocessed event store',
+        action  = 'store_true',
+        dest    = 'event_store',
+    )
+
+    parser.add_argument(
+        '--workers',
+        help    = 'Number of parallel processes',
+        dest    = 'workers',
+        default = None,
+        type    = int,
+    )
+
+    return parser.parse_args()
+
+def main():
+    # pylint: disable=missing-function-docstring
+    setup_logging()
+    cmdargs = parse_cmdargs()
+
+    for args in load_args_list(cmdargs.config):
+        args.event_store = cmdargs.event_store
+
+        stats_list = warm_disk_cache(args, cmdargs.workers, cmdargs.datadir)
+
+        for (part, stats) in enumerate(stats_list):
+            print(
+                "%s [part %d]: filled %d batches in %.1fs (%.1f batches/s)"
+                % (
+                    args.dataset, part, stats['batches'], stats['time'],
+                    stats['batches_per_sec']
+                )
+            )
+
+if __name__ == '__main__':
+    main()
+
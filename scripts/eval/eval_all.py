@@ -0,0 +1,137 @@
+"""Make the standard set of model evaluation stats and plots at once.
+
+This script is equivalent to running `eval_model.py`, `make_binstat_plots.py`
+and `make_auxiliary_plots.py`, but it loads the evaluation energies once and
+renders all plots in parallel.
+"""
+
+import argparse
+
+from lstm_ee.presets         import PRESETS_EVAL
+from lstm_ee.eval.eval       import evaluate_predictions
+from lstm_ee.plot.aux        import plot_rel_res_vs_true
+from lstm_ee.plot.binstat    import plot_binstats
+from lstm_ee.plot.fom        import plot_fom
+from lstm_ee.plot.hairy_mean import plot_hairy_mean_binstat
+from lstm_ee.plot.hist       import plot_energy_hists
+from lstm_ee.plot.render     import render_plots
+from lstm_ee.utils.eval      import cached_eval_prologue
+from lstm_ee.utils.log       import setup_logging
+from lstm_ee.utils.parsers   import add_basic_eval_args, add_concurrency_parser
+
+FOM_FIT_MARGIN = 0.5
+
+def parse_cmdargs():
+    # pylint: disable=missing-function-docstring
+    parser = argparse.ArgumentParser("Make all standard evaluation plots")
+    add_basic_eval_args(parser, PRESETS_EVAL)
+    add_concurrency_parser(parser)
+
+    parser.add_argument(
+        '--plot-workers',
+        help    = 'Number of processes rendering plots (default: all CPUs)',
+        dest    = 'plot_workers',
+        default = None,
+        type    = int,
+    )
+
+    return parser.parse_args()
+
+def get_fom_tasks(predictions, eval_specs, outdir, plotdir, ext):
+    """Calculate energy resolution stats and make tasks to plot them"""
+    (stats_model_dict, hCont_model_dict), (stats_base_dict, hCont_base_dict) \
+        = evaluate_predictions(
+            predictions, eval_specs['fom'], FOM_FIT_MARGIN, outdir
+        )
+
+    return [
+        (
+            plot_fom,
+            (
+                [
+                    (hCont_base_dict,  stats_base_dict,  'Base ', 'left',
+                     'C0'),
+                    (hCont_model_dict, stats_model_dict, 'Model', 'right',
+                     'C1'),
+                ],
+                eval_specs['fom'],
+            ),
+            { 'fname' : '%s/fom' % (plotdir), 'ext' : ext }
+        ),
+    ]
+
+def get_binstat_tasks(predictions, eval_specs, plotdir, ext):
+    """Make tasks to plot binned stats of energy resolution vs TrueE"""
+    weights = predictions['weights']
+    data    = [
+        (predictions['pred_base'],  predictions['true'], weights, 'Baseline',
+         'C0'),
+        (predictions['pred_model'], predictions['true'], weights, 'Model',
+         'C1'),
+    ]
+
+    args = (
+        data, eval_specs['binstats_abs'], eval_specs['binstats_rel'],
+        "%s/plot_aux_binstat" % (plotdir), ext
+    )
+
+    return [ (plot_binstats, args, {}), (plot_hairy_mean_binstat, args, {}) ]
+
+def get_aux_tasks(predictions, eval_specs, plotdir, ext):
+    """Make tasks to plot 2D resolution vs TrueE and energy histograms"""
+    weights = predictions['weights']
+    true    = predictions['true']
+
+    return [
+        (
+            plot_rel_res_vs_true,
+            (
+                predictions['pred_model'], true, weights,
+                eval_specs['rel_vs_true'],
+                "%s/plot_aux_model_rel_res_vs_true" % (plotdir), ext
+            ),
+            {}
+        ),
+        (
+            plot_rel_res_vs_true,
+            (
+                predictions['pred_base'], true, weights,
+                eval_specs['rel_vs_true'],
+                "%s/plot_aux_base_rel_res_vs_true" % (plotdir), ext
+            ),
+            {}
+        ),
+        (
+            plot_energy_hists,
+            (
+                [
+                    (true,                      weights, 'True',  'C3'),
+                    (predictions['pred_base'],  weights, 'Base',  'C0'),
+                    (predictions['pred_model'], weights, 'Model', 'C1'),
+                ],
+                eval_specs['hist'],
+                "%s/plot_aux_hist" % (plotdir), ext
+            ),
+            {}
+        ),
+    ]
+
+def main():
+    # pylint: disable=missing-function-docstring
+    setup_logging()
+    cmdargs = parse_cmdargs()
+
+    predictions, _args, outdir, plotdir, eval_specs = cached_eval_prologue(
+        cmdargs, PRESETS_EVAL
+    )
+
+    tasks = (
+          get_fom_tasks(predictions, eval_specs, outdir, plotdir, cmdargs.ext)
+        + get_binstat_tasks(predictions, eval_specs, plotdir, cmdargs.ext)
+        + get_aux_tasks(predictions, eval_specs, plotdir, cmdargs.ext)
+    )
+
+    render_plots(tasks, cmdargs.plot_workers)
+
+if __name__ == '__main__':
+    main()
@@ -5,8 +5,10 @@ import argparse
 from lstm_ee.presets       import PRESETS_EVAL
 from lstm_ee.utils.log     import setup_logging
 from lstm_ee.utils.parsers import add_basic_eval_args, add_concurrency_parser
-from lstm_ee.utils.eval    import standard_eval_prologue
-from lstm_ee.eval.eval     import evaluate
+from lstm_ee.utils.eval    import (
+    cached_eval_prologue, standard_eval_prologue
+)
+from lstm_ee.eval.eval     import evaluate_predictions, evaluate_streaming
 from lstm_ee.plot.fom      import plot_fom
 
 FOM_FIT_MARGIN = 0.5
@@ -17,6 +19,13 @@ def parse_cmdargs():
     add_basic_eval_args(parser, PRESETS_EVAL)
     add_concurrency_parser(parser)
 
+    parser.add_argument(
+        '--stream',
+        help    = 'Accumulate stats batch by batch without saving predictions',
+        action  = 'store_true',
+        dest    = 'stream',
+    )
+
     return parser.parse_args()
 
 def main():
@@ -24,15 +33,24 @@ def main():
     setup_logging()
     cmdargs = parse_cmdargs()
 
-    dgen, args, model, outdir, plotdir, eval_specs = standard_eval_prologue(
-        cmdargs, PRESETS_EVAL
-    )
+    if cmdargs.stream:
+        dgen, _args, model, outdir, plotdir, eval_specs = \
+            standard_eval_prologue(cmdargs, PRESETS_EVAL)
 
-    (stats_model_dict, hCont_model_dict), (stats_base_dict, hCont_base_dict) \
-        = evaluate(
-            args, dgen, model, eval_specs['base_map'], eval_specs['fom'],
+        result = evaluate_streaming(
+            dgen, model, eval_specs['base_map'], eval_specs['fom'],
             FOM_FIT_MARGIN, outdir
         )
+    else:
+        predictions, _args, outdir, plotdir, eval_specs = \
+            cached_eval_prologue(cmdargs, PRESETS_EVAL)
+
+        result = evaluate_predictions(
+            predictions, eval_specs['fom'], FOM_FIT_MARGIN, outdir
+        )
+
+    (stats_model_dict, hCont_model_dict), (stats_base_dict, hCont_base_dict) \
+        = result
 
     plot_fom(
         [
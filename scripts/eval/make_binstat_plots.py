@@ -5,12 +5,9 @@ import argparse
 from lstm_ee.presets         import PRESETS_EVAL
 from lstm_ee.plot.hairy_mean import plot_hairy_mean_binstat
 from lstm_ee.plot.binstat    import plot_binstats
-from lstm_ee.utils.eval      import standard_eval_prologue
+from lstm_ee.utils.eval      import cached_eval_prologue
 from lstm_ee.utils.log       import setup_logging
 from lstm_ee.utils.parsers   import add_basic_eval_args, add_concurrency_parser
-from lstm_ee.eval.predict    import (
-    get_true_energies, get_base_energies, predict_energies
-)
 
 def parse_cmdargs():
     # pylint: disable=missing-function-docstring
@@ -49,16 +46,16 @@ def main():
     setup_logging()
     cmdargs = parse_cmdargs()
 
-    dgen, args, model, _outdir, plotdir, eval_specs = standard_eval_prologue(
+    predictions, _args, _outdir, plotdir, eval_specs = cached_eval_prologue(
         cmdargs, PRESETS_EVAL
     )
 
-    pred_model_dict = predict_energies(args, dgen, model)
-    true_dict       = get_true_energies(dgen)
-    pred_base_dict  = get_base_energies(dgen, eval_specs['base_map'])
+    pred_model_dict = predictions['pred_model']
+    true_dict       = predictions['true']
+    pred_base_dict  = predictions['pred_base']
 
     make_binstat_plots(
-        pred_model_dict, pred_base_dict, true_dict, dgen.weights,
+        pred_model_dict, pred_base_dict, true_dict, predictions['weights'],
         eval_specs, plotdir, cmdargs.ext
     )
 
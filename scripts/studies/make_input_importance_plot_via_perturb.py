@@ -17,12 +17,14 @@ import os
 
 import pandas as pd
 
-from lstm_ee.eval.eval           import eval_model
+from lstm_ee.eval.eval           import calc_fom_stats_hists, eval_model
 from lstm_ee.data.data_generator import DataSmear
 from lstm_ee.plot.profile        import plot_profile
 from lstm_ee.presets             import PRESETS_EVAL
 from lstm_ee.utils               import setup_logging
-from lstm_ee.utils.eval          import standard_eval_prologue
+from lstm_ee.utils.eval          import (
+    load_eval_predictions, standard_eval_prologue
+)
 from lstm_ee.utils.parsers       import (
     add_basic_eval_args, add_concurrency_parser
 )
@@ -66,7 +68,7 @@ def prologue(cmdargs):
     )
     os.makedirs(plotdir, exist_ok = True)
 
-    return (args, model, dgen, plotdir, eval_specs)
+    return (args, model, dgen, outdir, plotdir, eval_specs)
 
 def get_stats_for_energy(stat_list, energy):
     """Extract stats for a given energy type"""
@@ -190,10 +192,20 @@ def main():
     setup_logging()
 
     cmdargs = parse_cmdargs()
-    args, model, dgen, plotdir, eval_specs = prologue(cmdargs)
+    args, model, dgen, outdir, plotdir, eval_specs = prologue(cmdargs)
+
+    # Unperturbed performance is the same as the one of the eval scripts
+    predictions = load_eval_predictions(
+        args, outdir, eval_specs, dgen, model
+    )
 
     var_list  = [ 'none' ]
-    stat_list = [ eval_model(args, dgen, model, eval_specs['fom'])[0] ]
+    stat_list = [
+        calc_fom_stats_hists(
+            predictions['pred_model'], predictions['true'],
+            predictions['weights'], eval_specs['fom'], 0.5
+        )[0]
+    ]
 
     make_perturb_profile(
         slice_var_generator(dgen, cmdargs.smear), var_list, stat_list,
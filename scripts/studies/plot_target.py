@@ -13,7 +13,8 @@ from cafplot.plot  import (
 )
 from cafplot.rhist import RHist1D
 
-from lstm_ee.eval.predict  import get_true_energies
+from lstm_ee.consts        import LABEL_TOTAL, LABEL_PRIMARY, LABEL_SECONDARY
+from lstm_ee.data.summary  import get_split_summary
 from lstm_ee.presets       import PRESETS_EVAL
 from lstm_ee.utils.eval    import standard_eval_prologue
 from lstm_ee.utils.log     import setup_logging
@@ -26,22 +27,42 @@ def parse_cmdargs():
     add_concurrency_parser(parser)
     return parser.parse_args()
 
-def plot_energy(data, weights, name, spec, log_scale = False):
-    """Plot single energy distribution."""
+# Name of the derived variable that holds secondary energy
+VAR_SECONDARY = '__secondary__'
+
+def get_energy_vars(dgen):
+    """Get variables of the true energies and definitions of derived ones"""
+    result  = {}
+    derived = {}
+
+    if dgen.var_target_total is not None:
+        result[LABEL_TOTAL] = dgen.var_target_total
+
+    if dgen.var_target_primary is not None:
+        result[LABEL_PRIMARY] = dgen.var_target_primary
+
+    if len(result) == 2:
+        result[LABEL_SECONDARY] = VAR_SECONDARY
+        derived[VAR_SECONDARY]  = '%s - %s' % (
+            dgen.var_target_total, dgen.var_target_primary
+        )
+
+    return (result, derived)
+
+def plot_energy(summary, name, spec, log_scale = False):
+    """Plot single energy distribution from its summary."""
     f, ax = plt.subplots()
     if log_scale:
         ax.set_yscale('log')
 
-    rhist = RHist1D.from_data(data, spec.bins_x, weights)
+    rhist = RHist1D([ summary.bins, ], summary.hist, summary.hist_w2)
 
     plot_rhist1d(
         ax, rhist,
         histtype = 'step',
         linewidth = 2,
         color     = 'C0',
-        label     = "True %s. Mean: %.2e" % (
-            name, np.average(data, weights = weights)
-        ),
+        label     = "True %s. Mean: %.2e" % (name, summary.mean),
     )
     plot_rhist1d_error(
         ax, rhist, err_type = 'bar', color = 'C0', linewidth = 2
@@ -58,20 +79,30 @@ def main():
     setup_logging()
     cmdargs = parse_cmdargs()
 
-    dgen, _, _, outdir, _, eval_specs = standard_eval_prologue(
+    dgen, args, _, outdir, _, eval_specs = standard_eval_prologue(
         cmdargs, PRESETS_EVAL
     )
 
     plotdir = os.path.join(outdir, 'targets')
     os.makedirs(plotdir, exist_ok = True)
 
-    true_energies = get_true_energies(dgen)
-    weights       = dgen.weights
+    energy_vars, derived_vars = get_energy_vars(dgen)
+
+    summary = get_split_summary(
+        args, dgen.data_loader, 1, list(energy_vars.values()),
+        hists        = {
+            var : eval_specs['hist'][label].bins_x
+                for (label, var) in energy_vars.items()
+        },
+        weights      = dgen.weights,
+        workers      = cmdargs.workers,
+        derived_vars = derived_vars,
+    )
 
-    for label,energy in true_energies.items():
+    for label,var in energy_vars.items():
         for log_scale in [ True, False ]:
             f,_,rhist = plot_energy(
-                energy, weights, eval_specs['name_map'][label],
+                summary[var], eval_specs['name_map'][label],
                 eval_specs['hist'][label], log_scale
             )
 
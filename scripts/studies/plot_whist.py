@@ -8,12 +8,15 @@ import numpy as np
 
 from cafplot.plot  import plot_nphist1d_base, save_fig
 
-from lstm_ee.args        import Args
-from lstm_ee.data        import load_data
-from lstm_ee.utils.eval  import EvalConfig, make_eval_outdir, make_plotdir
-from lstm_ee.utils.log   import setup_logging
+from lstm_ee.args         import Args
+from lstm_ee.data         import load_data
+from lstm_ee.data.summary import get_split_summary
+from lstm_ee.utils.eval   import EvalConfig, make_eval_outdir, make_plotdir
+from lstm_ee.utils.log    import setup_logging
 
-from lstm_ee.data.data_generator.funcs.weights import calc_flat_whist
+from lstm_ee.data.data_generator.funcs.weights import (
+    calc_summary_whist, get_bin_edges
+)
 
 def parse_cmdargs():
     """Parse command line arguments"""
@@ -42,6 +45,14 @@ def parse_cmdargs():
         type    = str,
     )
 
+    parser.add_argument(
+        '--workers',
+        help    = 'Number of parallel processes to summarize the dataset',
+        default = None,
+        dest    = 'workers',
+        type    = int,
+    )
+
     cmdargs = parser.parse_args()
 
     cmdargs.weights   = 'same'
@@ -51,14 +62,30 @@ def parse_cmdargs():
 
     return cmdargs
 
-def get_weights_hist_func(args):
-    """Get function that calculates inverse of the TrueE histogram"""
+def get_weights_hist_func(args, workers = None):
+    """Get function that calculates inverse of the TrueE histogram.
+
+    The histogram is taken from the summary of the dataset part, which is
+    calculated once and cached next to the dataset.
+    """
 
     if (args.weights is None) or (args.weights['name'] != 'flat'):
         raise ValueError("Invalid weight: %s" % (args.weights))
 
-    # pylint: disable=unnecessary-lambda
-    return lambda x : calc_flat_whist(x, **args.weights['kwargs'])
+    kwargs = args.weights.get('kwargs', {})
+    var    = kwargs.get('var', 'trueE')
+    bins   = get_bin_edges(kwargs.get('bins', 50), kwargs.get('range', (0, 5)))
+
+    def whist_func(dgen, part):
+        summary = get_split_summary(
+            args, dgen.data_loader, part, [ var ],
+            hists   = { var : bins },
+            workers = workers,
+        )
+
+        return calc_summary_whist(summary[var], kwargs.get('clip', None))
+
+    return whist_func
 
 def prologue():
     """Load data, model and setup output directory"""
@@ -75,7 +102,7 @@ def prologue():
     outdir  = os.path.join(outdir, 'weights')
     plotdir = make_plotdir(outdir)
 
-    return (args, dgen_train, dgen_test, outdir, plotdir, cmdargs.ext)
+    return (args, dgen_train, dgen_test, outdir, plotdir, cmdargs)
 
 def plot_whist(whist_train, whist_test, bins, plotdir, ext):
     """Plot inverse of the TrueE histogram"""
@@ -111,12 +138,13 @@ def save_weghts(whist_train, whist_test, bins, outdir):
 
 def main():
     # pylint: disable=missing-function-docstring
-    args, dgen_train, dgen_test, outdir, plotdir, ext = prologue()
+    args, dgen_train, dgen_test, outdir, plotdir, cmdargs = prologue()
 
-    whist_func = get_weights_hist_func(args)
+    ext        = cmdargs.ext
+    whist_func = get_weights_hist_func(args, cmdargs.workers)
 
-    (_, whist_train, bins) = whist_func(dgen_train.data_loader)
-    (_, whist_test,  _   ) = whist_func(dgen_test.data_loader)
+    (whist_train, bins) = whist_func(dgen_train, 0)
+    (whist_test,  _   ) = whist_func(dgen_test,  1)
 
     save_weghts(whist_train, whist_test, bins, outdir)
 
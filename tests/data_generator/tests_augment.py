@@ -0,0 +1,111 @@
+"""Test that `DataAugment` matches the chain of the unfused decorators"""
+
+import unittest
+import numpy as np
+
+from lstm_ee.data.data_generator.data_augment      import DataAugment
+from lstm_ee.data.data_generator.data_nan_mask     import DataNANMask
+from lstm_ee.data.data_generator.data_noise        import DataNoise
+from lstm_ee.data.data_generator.data_prong_sorter import DataProngSorter
+
+from .tests_data_generator_base import (
+    DictLoader, TestsDataGeneratorBase, make_data_generator
+)
+
+NOISE = [
+    {
+        'noise'               : 'gaussian',
+        'noise_kwargs'        : { 'mu' : 0, 'sigma' : 0.1 },
+        'affected_vars_slice' : [ 'x_slice1' ],
+        'affected_vars_png3d' : [ 'x_png3d1', 'x_png3d2' ],
+    },
+    [
+        {
+            'noise'               : 'uniform',
+            'noise_kwargs'        : { 'a' : -0.5, 'b' : 0.5 },
+            'affected_vars_slice' : [ 'x_slice1', 'x_slice2' ],
+            'affected_vars_png2d' : [ 'x_png2d2' ],
+        },
+    ],
+]
+
+PRONG_SORTERS = { 'input_png3d' : 'random', 'input_png2d' : '-x_png2d1' }
+
+def make_unfused(dgen, prong_sorters, noise):
+    """Create a chain of the unfused decorators"""
+    for (k, v) in prong_sorters.items():
+        dgen = DataProngSorter(dgen, v, k, getattr(dgen, 'vars_' + k))
+
+    for n in noise:
+        if isinstance(n, list):
+            n = n[0]
+
+        dgen = DataNoise(dgen, **n)
+
+    return DataNANMask(dgen)
+
+class TestsAugment(TestsDataGeneratorBase, unittest.TestCase):
+    """Compare `DataAugment` batches to the unfused chain ones"""
+
+    def _get_batch_data(self, dgen, seed):
+        np.random.seed(seed)
+        batches = [ dgen[i] for i in range(len(dgen)) ]
+
+        return [ { **x[0], **x[1] } for x in batches ]
+
+    def _compare_fused(self, prong_sorters, noise, **kwargs):
+        for batch_size in [ 1, 2, 5 ]:
+            unfused = make_unfused(
+                make_data_generator(batch_size = batch_size, **kwargs),
+                prong_sorters, noise
+            )
+            fused   = DataAugment(
+                make_data_generator(batch_size = batch_size, **kwargs),
+                prong_sorters, noise
+            )
+
+            batch_data = self._get_batch_data(unfused, 1337)
+
+            np.random.seed(1337)
+            self._compare_dgen_to_batch_data(fused, batch_data)
+
+    def test_nan_mask(self):
+        """Test fused decorator without noise and prong sorters"""
+        self._compare_fused({}, [])
+
+    def test_prong_sorters(self):
+        """Test fused prong sorting"""
+        self._compare_fused(PRONG_SORTERS, [])
+
+    def test_noise(self):
+        """Test fused multiple noise layers"""
+        self._compare_fused({}, NOISE)
+
+    def test_full(self):
+        """Test fused prong sorting, noise and NaN masking"""
+        self._compare_fused(PRONG_SORTERS, NOISE)
+
+    def test_nans(self):
+        """Test masking of NaNs affected by noise"""
+        data = {
+            'x_slice1'       : [ np.nan, 1.0, 2.0 ],
+            'x_slice2'       : [ 1.0, np.nan, 3.0 ],
+            'x_png2d1'       : [ [ 1, np.nan ], [], [ 3, 2, 1 ] ],
+            'x_png2d2'       : [ [ np.nan, 2 ], [], [ 1, 1, np.nan ] ],
+            'x_png3d1'       : [ [ 1 ], [ np.nan ], [] ],
+            'x_png3d2'       : [ [ 2 ], [ 3 ], [] ],
+            'target_total'   : [ 1, 2, 3 ],
+            'target_primary' : [ 1, 2, 3 ],
+        }
+
+        self._compare_fused(
+            PRONG_SORTERS, NOISE, data_loader = DictLoader(data)
+        )
+
+    def test_unknown_prong_input(self):
+        """Test that unknown prong input names are rejected"""
+        with self.assertRaises(ValueError):
+            DataAugment(make_data_generator(), { 'input_slice' : 'random' })
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,307 @@
+"""Test correctness of batches served by the `DataDiskCache`"""
+
+import gc
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from lstm_ee.data.data_generator.data_disk_cache import DataDiskCache
+from lstm_ee.data.data_generator.data_weight     import DataWeight
+from lstm_ee.data.data_generator.idata_decorator import IDataDecorator
+from lstm_ee.data.data_generator.base.data_disk_cache_base import (
+    flatten_batch, unflatten_batch
+)
+from lstm_ee.data.data_generator.funcs.disk_cache import (
+    list_caches, parse_size, prune_caches
+)
+from lstm_ee.data.cache_warmup import fill_disk_cache, load_script_config
+
+from .tests_data_generator_base import (
+    TestsDataGeneratorBase, make_data_generator
+)
+
+class CallCounter(IDataDecorator):
+    """A decorator that counts number of batches requested from it"""
+
+    def __init__(self, dgen):
+        super(CallCounter, self).__init__(dgen)
+        self.calls = 0
+
+    def __getitem__(self, index):
+        self.calls += 1
+        return self._dgen[index]
+
+class BuildLogger(IDataDecorator):
+    """A decorator that logs built batches into a file"""
+
+    def __init__(self, dgen, fname):
+        super(BuildLogger, self).__init__(dgen)
+        self._fname = fname
+
+    def __getitem__(self, index):
+        time.sleep(0.02)
+
+        with open(self._fname, 'at') as f:
+            f.write('%d\n' % index)
+
+        return self._dgen[index]
+
+class TestsDiskCache(TestsDataGeneratorBase, unittest.TestCase):
+    """Compare `DataDiskCache` batches to the uncached ones"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def _get_batch_data(self, dgen):
+        return [
+            { **dgen[i][0], **dgen[i][1] } for i in range(len(dgen))
+        ]
+
+    def _make_cache(self, dgen, **kwargs):
+        return DataDiskCache(dgen, self._tmpdir, **kwargs)
+
+    def test_flatten_batch(self):
+        """Test that flattened batch is reassembled correctly"""
+        dgen  = DataWeight(make_data_generator(batch_size = 2), 2, None)
+        batch = dgen[0]
+
+        leaves, treedef = flatten_batch(batch)
+        result = unflatten_batch(leaves, treedef)
+
+        self.assertEqual(len(result), len(batch))
+        self.assertEqual(list(result[0].keys()), list(batch[0].keys()))
+        self.assertEqual(list(result[1].keys()), list(batch[1].keys()))
+        self.assertIsInstance(result[2], list)
+
+        for (test, null) in zip(flatten_batch(result)[0], leaves):
+            self.assertTrue(np.array_equal(test, null, equal_nan = True))
+
+    def test_cache_fill(self):
+        """Test that cached batches match the uncached ones"""
+        for batch_size in [ 1, 2, 3, 10 ]:
+            dgen  = make_data_generator(batch_size = batch_size)
+            cache = self._make_cache(dgen, batch_size = batch_size)
+
+            batch_data = self._get_batch_data(dgen)
+
+            # First pass fills cache, second reads from it
+            self._compare_dgen_to_batch_data(cache, batch_data)
+            self._compare_dgen_to_batch_data(cache, batch_data)
+
+    def test_cache_reuse(self):
+        """Test that cache is shared between decorator instances"""
+        dgen       = make_data_generator(batch_size = 2)
+        batch_data = self._get_batch_data(dgen)
+
+        counter = CallCounter(dgen)
+        cache   = self._make_cache(counter)
+        self._compare_dgen_to_batch_data(cache, batch_data)
+
+        self.assertEqual(counter.calls, len(dgen))
+
+        counter = CallCounter(dgen)
+        cache   = self._make_cache(counter)
+        self._compare_dgen_to_batch_data(cache, batch_data)
+
+        self.assertEqual(counter.calls, 0)
+
+    def test_inplace_modification(self):
+        """Test that in place modifications do not leak into the cache"""
+        dgen       = make_data_generator(batch_size = 2)
+        batch_data = self._get_batch_data(dgen)
+        cache      = self._make_cache(dgen)
+
+        for _ in range(2):
+            for i in range(len(cache)):
+                batch = cache[i]
+                batch[0]['input_slice'][:] = -1
+                batch[0]['input_png3d'][:] = -1
+
+        self._compare_dgen_to_batch_data(cache, batch_data)
+
+    def test_pickle(self):
+        """Test that unpickled cache serves the same batches"""
+        dgen       = make_data_generator(batch_size = 3)
+        batch_data = self._get_batch_data(dgen)
+        cache      = self._make_cache(dgen)
+
+        cache[0]
+        cache = pickle.loads(pickle.dumps(cache))
+
+        self._compare_dgen_to_batch_data(cache, batch_data)
+
+    def test_cooperative_fill(self):
+        """Test that concurrent processes do not build the same batches"""
+        fname      = os.path.join(self._tmpdir, 'built.log')
+        dgen       = make_data_generator(batch_size = 1)
+        batch_data = self._get_batch_data(dgen)
+        cache      = self._make_cache(BuildLogger(dgen, fname))
+
+        ctx       = multiprocessing.get_context('fork')
+        processes = [ ctx.Process(target = cache.fill) for _ in range(3) ]
+
+        for process in processes:
+            process.start()
+
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+        with open(fname, 'rt') as f:
+            built = sorted(int(x) for x in f)
+
+        self.assertEqual(built, list(range(len(dgen))))
+        self._compare_dgen_to_batch_data(cache, batch_data)
+
+class TestsDiskCacheAdmin(unittest.TestCase):
+    """Test disk cache metadata and eviction"""
+
+    def setUp(self):
+        self._tmpdir   = tempfile.mkdtemp()
+        self._cachedir = os.path.join(self._tmpdir, '.cache')
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def _make_filled_cache(self, batch_size, last_access):
+        cache = DataDiskCache(
+            make_data_generator(batch_size = batch_size), self._tmpdir,
+            batch_size = batch_size
+        )
+        cache.fill()
+
+        fname = os.path.join(cache.cache_root, 'meta.json')
+
+        with open(fname, 'rt') as f:
+            meta = json.load(f)
+
+        meta['last_access'] = last_access
+
+        with open(fname, 'wt') as f:
+            json.dump(meta, f)
+
+        return cache
+
+    def test_parse_size(self):
+        """Test parsing of human readable sizes"""
+        self.assertEqual(parse_size(None),    None)
+        self.assertEqual(parse_size(100),     100)
+        self.assertEqual(parse_size('100'),   100)
+        self.assertEqual(parse_size('2K'),    2048)
+        self.assertEqual(parse_size('1.5M'),  3 * 2**19)
+        self.assertEqual(parse_size('1gb'),   2**30)
+
+    def test_fill(self):
+        """Test that filled cache holds all batches"""
+        cache = self._make_filled_cache(2, 0)
+
+        self.assertTrue(all(cache.is_cached(i) for i in range(len(cache))))
+
+        info = list_caches(self._cachedir)[0]
+        self.assertEqual(info['filled'], len(cache))
+        self.assertEqual(info['len'],    len(cache))
+        self.assertGreater(info['size'], 0)
+
+    def test_lru_eviction(self):
+        """Test that least recently used unused caches are evicted"""
+        caches = [
+            self._make_filled_cache(batch_size, last_access)
+                for (batch_size, last_access) in [ (1, 30), (2, 10), (3, 20) ]
+        ]
+        roots = [ x.cache_root for x in caches ]
+        sizes = { x['path'] : x['size'] for x in list_caches(self._cachedir) }
+
+        # Caches in use are never evicted
+        self.assertEqual(prune_caches(self._cachedir, max_size = 0), [])
+
+        del caches
+        gc.collect()
+
+        removed = prune_caches(
+            self._cachedir, max_size = sizes[roots[0]] + sizes[roots[2]]
+        )
+
+        self.assertEqual([ x['path'] for x in removed ], [ roots[1] ])
+        self.assertEqual(
+            sorted(x['path'] for x in list_caches(self._cachedir)),
+            sorted([ roots[0], roots[2] ])
+        )
+
+        removed = prune_caches(self._cachedir, older_than = 0)
+        self.assertEqual(len(removed), 2)
+        self.assertEqual(list_caches(self._cachedir), [])
+
+TEST_SCRIPT = """
+from lstm_ee.args import join_dicts
+
+config = join_dicts({ 'batch_size' : 32 }, { 'dataset' : 'test.h5' })
+parse_concurrency_cmdargs(config)
+
+search_space = [ None ]
+
+for batch_size in [ 64, 128 ]:
+    search_space.append({ 'batch_size' : batch_size })
+
+logger = setup_logging(log_file = 'train.log')
+speval(lambda x : create_and_train_model(**config), search_space, 'db')
+"""
+
+class TestsCacheWarmup(TestsDataGeneratorBase, unittest.TestCase):
+    """Test parallel filling of the disk caches"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def test_load_script_config(self):
+        """Test extraction of config from a training script"""
+        fname = os.path.join(self._tmpdir, 'train.py')
+
+        with open(fname, 'wt') as f:
+            f.write(TEST_SCRIPT)
+
+        config, search_space = load_script_config(fname)
+
+        self.assertEqual(config, { 'batch_size' : 32, 'dataset' : 'test.h5' })
+        self.assertEqual(
+            search_space,
+            [ None, { 'batch_size' : 64 }, { 'batch_size' : 128 } ]
+        )
+
+    def test_parallel_fill(self):
+        """Test that cache filled in parallel matches the uncached batches"""
+        for workers in [ None, 2 ]:
+            dgen       = make_data_generator(batch_size = 1)
+            batch_data = [
+                { **dgen[i][0], **dgen[i][1] } for i in range(len(dgen))
+            ]
+
+            counter = CallCounter(dgen)
+            cache   = DataDiskCache(counter, self._tmpdir, workers = workers)
+            stats   = fill_disk_cache(cache, workers, chunk_size = 2)
+
+            self.assertEqual(stats['batches'], len(dgen))
+            self.assertTrue(
+                all(cache.is_cached(i) for i in range(len(cache)))
+            )
+
+            self._compare_dgen_to_batch_data(cache, batch_data)
+
+            if workers is not None:
+                # Batches were computed by the workers
+                self.assertEqual(counter.calls, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""Test correctness of batches gathered from an `EventStore`"""
+
+import shutil
+import tempfile
+import unittest
+
+from lstm_ee.data.data_loader.data_shuffle            import DataShuffle
+from lstm_ee.data.data_loader.data_slice              import DataSlice
+from lstm_ee.data.data_generator.event_store          import EventStore
+from lstm_ee.data.data_generator.data_store_generator import (
+    DataStoreGenerator
+)
+
+from ..data import (
+    TEST_DATA, TEST_INPUT_VARS_SLICE, TEST_INPUT_VARS_PNG3D,
+    TEST_INPUT_VARS_PNG2D, TEST_TARGET_VAR_TOTAL, TEST_TARGET_VAR_PRIMARY,
+)
+from .tests_data_generator_base import (
+    DictLoader, TestsDataGeneratorBase, make_data_generator
+)
+
+class TestsEventStore(TestsDataGeneratorBase, unittest.TestCase):
+    """Compare `DataStoreGenerator` batches to the `DataGenerator` ones"""
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def _make_store(self, data_loader, chunk_size = 2):
+        return EventStore(
+            data_loader, self._tmpdir, 'test',
+            vars_input_slice   = TEST_INPUT_VARS_SLICE,
+            vars_input_png3d   = TEST_INPUT_VARS_PNG3D,
+            vars_input_png2d   = TEST_INPUT_VARS_PNG2D,
+            var_target_total   = TEST_TARGET_VAR_TOTAL,
+            var_target_primary = TEST_TARGET_VAR_PRIMARY,
+            chunk_size         = chunk_size,
+        )
+
+    def _compare_store_to_dgen(self, store, data_loader, **kwargs):
+        dgen_null  = make_data_generator(data_loader, **kwargs)
+        dgen_test  = DataStoreGenerator(
+            store, data_loader,
+            vars_input_slice   = TEST_INPUT_VARS_SLICE,
+            vars_input_png3d   = TEST_INPUT_VARS_PNG3D,
+            vars_input_png2d   = TEST_INPUT_VARS_PNG2D,
+            var_target_total   = TEST_TARGET_VAR_TOTAL,
+            var_target_primary = TEST_TARGET_VAR_PRIMARY,
+            **kwargs
+        )
+
+        batch_data = [
+            { **dgen_null[i][0], **dgen_null[i][1] }
+                for i in range(len(dgen_null))
+        ]
+
+        self._compare_dgen_to_batch_data(dgen_test, batch_data)
+
+    def test_batch_sizes(self):
+        """Test gathering of batches of various sizes"""
+        data_loader = DictLoader(TEST_DATA)
+        store       = self._make_store(data_loader)
+
+        for batch_size in [ 1, 2, 3, 5, 10 ]:
+            self._compare_store_to_dgen(
+                store, data_loader, batch_size = batch_size
+            )
+
+    def test_max_prongs(self):
+        """Test gathering of batches with truncated number of prongs"""
+        data_loader = DictLoader(TEST_DATA)
+        store       = self._make_store(data_loader)
+
+        for max_prongs in [ 0, 1, 2, 4 ]:
+            self._compare_store_to_dgen(
+                store, data_loader, batch_size = 2, max_prongs = max_prongs
+            )
+
+    def test_shuffled_slice(self):
+        """Test gathering of batches from a shuffled and sliced dataset"""
+        data_loader = DictLoader(TEST_DATA)
+        store       = self._make_store(data_loader, chunk_size = 3)
+
+        shuffled = DataShuffle(data_loader, 1337)
+        sliced   = DataSlice(shuffled, [ 4, 0, 2 ])
+
+        self._compare_store_to_dgen(store, shuffled, batch_size = 2)
+        self._compare_store_to_dgen(store, sliced,   batch_size = 2)
+
+    def test_store_reuse(self):
+        """Test that existing store is reused without data loader"""
+        data_loader = DictLoader(TEST_DATA)
+        self._make_store(data_loader)
+
+        store = self._make_store(None)
+        self.assertEqual(len(store), len(data_loader))
+
+        self._compare_store_to_dgen(store, data_loader, batch_size = 3)
+
+if __name__ == '__main__':
+    unittest.main()
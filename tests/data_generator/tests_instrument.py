@@ -0,0 +1,106 @@
+"""Test data pipeline instrumentation"""
+
+import csv
+import os
+import tempfile
+import unittest
+
+from lstm_ee.data.data_loader.data_shuffle     import DataShuffle
+from lstm_ee.data.data_generator.data_cache    import DataCache
+from lstm_ee.data.data_generator.data_nan_mask import DataNANMask
+from lstm_ee.data.instrument import (
+    PipelineProfiler, instrument_data_generators
+)
+
+from .tests_data_generator_base import (
+    DictLoader, TestsDataGeneratorBase, make_data_generator
+)
+from ..data import TEST_DATA
+
+def make_chain():
+    """Create a chain of decorators over a shuffled loader"""
+    loader = DataShuffle(DictLoader(TEST_DATA), seed = 1)
+    dgen   = make_data_generator(data_loader = loader, batch_size = 2)
+
+    return DataNANMask(DataCache(dgen))
+
+class TestsInstrument(TestsDataGeneratorBase, unittest.TestCase):
+    """Test statistics collected by the instrumented pipeline"""
+
+    def _get_batch_data(self, dgen):
+        batches = [ dgen[i] for i in range(len(dgen)) ]
+        return [ { **x[0], **x[1] } for x in batches ]
+
+    def test_batches(self):
+        """Test that instrumented chain produces the same batches"""
+        batch_data = self._get_batch_data(make_chain())
+        dgen       = instrument_data_generators(
+            [ make_chain() ], [ 'train' ], PipelineProfiler()
+        )[0]
+
+        self._compare_dgen_to_batch_data(dgen, batch_data)
+        self._compare_dgen_to_batch_data(dgen, batch_data)
+
+    def test_stats(self):
+        """Test call counts and cache hits of the stages"""
+        profiler = PipelineProfiler()
+        dgen     = instrument_data_generators(
+            [ make_chain() ], [ 'train' ], profiler
+        )[0]
+
+        for _ in range(2):
+            for i in range(len(dgen)):
+                dgen[i]
+
+        stats = dict(profiler.get_stats())
+        n     = len(dgen)
+
+        self.assertEqual(
+            list(stats), [
+                'train/0:DataNANMask', 'train/1:DataCache',
+                'train/2:DataGenerator', 'train/loader0:DataShuffle',
+                'train/loader1:DictLoader',
+            ]
+        )
+
+        self.assertEqual(stats['train/0:DataNANMask']['calls'],   2 * n)
+        self.assertEqual(stats['train/0:DataNANMask']['hits'],    0)
+        self.assertEqual(stats['train/1:DataCache']['calls'],     2 * n)
+        self.assertEqual(stats['train/1:DataCache']['hits'],      n)
+        self.assertEqual(stats['train/2:DataGenerator']['calls'], n)
+        self.assertIsNone(stats['train/loader1:DictLoader']['hits'])
+
+        for x in stats.values():
+            self.assertGreater(x['bytes'], 0)
+            self.assertLessEqual(x['self_time'], x['time'])
+
+    def test_save_epoch(self):
+        """Test that epoch statistics are saved and reset"""
+        profiler = PipelineProfiler()
+        dgen     = instrument_data_generators(
+            [ make_chain() ], [ 'train' ], profiler
+        )[0]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'profile.csv')
+
+            for epoch in range(2):
+                dgen[0]
+                profiler.save_epoch(path, epoch)
+
+            with open(path, 'rt') as f:
+                rows = list(csv.DictReader(f))
+
+        self.assertEqual(len(rows), 2 * len(profiler.get_stats()))
+        calls = [
+            int(x['calls']) for x in rows
+                if x['stage'] == 'train/0:DataNANMask'
+        ]
+        self.assertEqual(calls, [ 1, 1 ])
+
+        self.assertTrue(
+            all(x['calls'] == 0 for (_, x) in profiler.get_stats())
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""Test correctness of batches served by the `DataPrefetch`"""
+
+import pickle
+import unittest
+
+from lstm_ee.data.data_generator.data_prefetch   import DataPrefetch
+from lstm_ee.data.data_generator.idata_generator import IDataGenerator
+
+from .tests_data_generator_base import (
+    TestsDataGeneratorBase, make_data_generator
+)
+
+class IndexGenerator(IDataGenerator):
+    """`IDataGenerator` whose batches are their indices"""
+
+    def __init__(self, n):
+        super(IndexGenerator, self).__init__()
+        self._n = n
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, index):
+        return index
+
+class TestsPrefetch(TestsDataGeneratorBase, unittest.TestCase):
+    """Compare `DataPrefetch` batches to the original ones"""
+
+    def _get_batch_data(self, dgen, order = None):
+        if order is None:
+            order = range(len(dgen))
+
+        return [ { **dgen[i][0], **dgen[i][1] } for i in order ]
+
+    def test_sequential(self):
+        """Test prefetching of sequentially requested batches"""
+        for depth in [ 1, 2, 4, 10 ]:
+            dgen       = make_data_generator(batch_size = 2)
+            batch_data = self._get_batch_data(dgen)
+            prefetch   = DataPrefetch(dgen, depth)
+
+            self._compare_dgen_to_batch_data(prefetch, batch_data)
+            self._compare_dgen_to_batch_data(prefetch, batch_data)
+
+            stats = prefetch.stats
+            self.assertEqual(stats['misses'], 1)
+            self.assertEqual(
+                stats['hits'] + stats['waits'], 2 * len(dgen) - 1
+            )
+
+    def test_permutation(self):
+        """Test prefetching of batches requested in a known order"""
+        dgen       = make_data_generator(batch_size = 1)
+        order      = [ 3, 0, 4, 1, 2 ]
+        batch_data = self._get_batch_data(dgen, order)
+        prefetch   = DataPrefetch(dgen, 3, order = order)
+
+        for (i, index) in enumerate(order):
+            inputs, targets = prefetch[index][:2]
+
+            for label in [ 'input_slice', 'input_png3d', 'target_total' ]:
+                self._compare_np_arrays(
+                    label, i, { **inputs, **targets }, batch_data[i]
+                )
+
+        self.assertEqual(prefetch.stats['misses'], 1)
+
+    def test_unpredicted_order(self):
+        """Test that batches requested in an unknown order are correct"""
+        dgen       = make_data_generator(batch_size = 1)
+        order      = [ 3, 0, 4, 1, 2, 4, 0 ]
+        batch_data = self._get_batch_data(dgen, order)
+        prefetch   = DataPrefetch(dgen, 2)
+
+        for (i, index) in enumerate(order):
+            inputs, targets = prefetch[index][:2]
+
+            for label in [ 'input_slice', 'input_png3d', 'target_total' ]:
+                self._compare_np_arrays(
+                    label, i, { **inputs, **targets }, batch_data[i]
+                )
+
+        stats = prefetch.stats
+        self.assertEqual(
+            stats['hits'] + stats['waits'] + stats['misses'], len(order)
+        )
+
+        # Predicted order is followed after it is supplied
+        prefetch.set_order(order[:5])
+        prefetch.reset_stats()
+
+        for index in order[:5] * 2:
+            prefetch[index]
+
+        self.assertLessEqual(prefetch.stats['misses'], 1)
+
+    def _get_shuffled_epochs(self, seed, n_epochs = 3):
+        prefetch = DataPrefetch(
+            IndexGenerator(20), 3, shuffle = True, seed = seed
+        )
+        result   = []
+
+        for _ in range(n_epochs):
+            prefetch.reset_stats()
+            result.append([ prefetch[i] for i in range(len(prefetch)) ])
+            prefetch.on_epoch_end()
+
+            self.assertLessEqual(prefetch.stats['misses'], 1)
+
+        return result
+
+    def test_shuffle(self):
+        """Test that batch order is shuffled at each epoch and predicted"""
+        epochs = self._get_shuffled_epochs(1)
+
+        for order in epochs:
+            self.assertEqual(sorted(order), list(range(20)))
+            self.assertNotEqual(order, list(range(20)))
+
+        self.assertNotEqual(epochs[0], epochs[1])
+        self.assertEqual(epochs, self._get_shuffled_epochs(1))
+        self.assertNotEqual(epochs, self._get_shuffled_epochs(2))
+
+    def test_pickle(self):
+        """Test that unpickled decorator serves the same batches"""
+        dgen       = make_data_generator(batch_size = 3)
+        batch_data = self._get_batch_data(dgen)
+        prefetch   = DataPrefetch(dgen, 2)
+
+        prefetch[0]
+        prefetch = pickle.loads(pickle.dumps(prefetch))
+
+        self._compare_dgen_to_batch_data(prefetch, batch_data)
+
+if __name__ == '__main__':
+    unittest.main()
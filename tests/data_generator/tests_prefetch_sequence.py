@@ -0,0 +1,136 @@
+"""Test correctness of batches served by the `PrefetchSequenceBase`"""
+
+import pickle
+import unittest
+
+from lstm_ee.data.data_loader import DictLoader
+from lstm_ee.data.data_generator.idata_decorator import IDataDecorator
+from lstm_ee.data.data_generator.base.prefetch_sequence_base import (
+    PrefetchSequenceBase
+)
+
+from .tests_data_generator_base import (
+    TestsDataGeneratorBase, make_data_generator
+)
+
+class Prefetcher(PrefetchSequenceBase, IDataDecorator):
+    """`PrefetchSequence` without the `keras` dependency"""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self, dgen, depth, workers = 1, concurrency = 'thread',
+        shuffle = False, seed = None
+    ):
+        IDataDecorator      .__init__(self, dgen)
+        PrefetchSequenceBase.__init__(
+            self, dgen, depth, workers, concurrency, shuffle, seed
+        )
+
+class EpochCounter(IDataDecorator):
+    """Decorator that counts `on_epoch_end` calls"""
+
+    def __init__(self, dgen):
+        super(EpochCounter, self).__init__(dgen)
+        self.epochs = 0
+
+    def on_epoch_end(self):
+        self.epochs += 1
+
+class TestsPrefetchSequence(TestsDataGeneratorBase, unittest.TestCase):
+    """Compare `PrefetchSequenceBase` batches to the original ones"""
+
+    def _get_batch_data(self, dgen):
+        return [ { **dgen[i][0], **dgen[i][1] } for i in range(len(dgen)) ]
+
+    def _test_epochs(self, concurrency):
+        for depth in [ 1, 2, 10 ]:
+            for workers in [ 1, 3 ]:
+                dgen       = EpochCounter(make_data_generator(batch_size = 1))
+                batch_data = self._get_batch_data(dgen)
+                prefetcher = Prefetcher(dgen, depth, workers, concurrency)
+
+                for epoch in range(2):
+                    self._compare_dgen_to_batch_data(prefetcher, batch_data)
+                    prefetcher.on_epoch_end()
+                    self.assertEqual(dgen.epochs, epoch + 1)
+
+                prefetcher.close()
+
+    def test_threads(self):
+        """Test batches produced by background threads"""
+        self._test_epochs('thread')
+
+    def test_processes(self):
+        """Test batches produced by background processes"""
+        self._test_epochs('process')
+
+    def test_out_of_order(self):
+        """Test that out of order requests restart the production"""
+        dgen       = make_data_generator(batch_size = 1)
+        batch_data = self._get_batch_data(dgen)
+        prefetcher = Prefetcher(dgen, 2, 2)
+
+        for index in [ 3, 4, 0, 2, 1, 1 ]:
+            inputs, targets = prefetcher[index][:2]
+            self._compare_np_arrays(
+                'input_slice', index, { **inputs, **targets },
+                batch_data[index]
+            )
+
+        prefetcher.close()
+
+    def _get_shuffled_epochs(self, concurrency, seed, n_epochs = 3):
+        dgen = make_data_generator(
+            data_loader        = DictLoader({
+                'x' : list(range(20)), 'y' : [ 1 ] * 20
+            }),
+            vars_input_slice   = [ 'x' ],
+            vars_input_png3d   = None,
+            vars_input_png2d   = None,
+            var_target_total   = 'y',
+            var_target_primary = None,
+            batch_size         = 1,
+        )
+        dgen       = EpochCounter(dgen)
+        prefetcher = Prefetcher(dgen, 3, 2, concurrency, True, seed)
+        result     = []
+
+        for epoch in range(n_epochs):
+            result.append([
+                int(prefetcher[i][0]['input_slice'][0, 0])
+                    for i in range(len(prefetcher))
+            ])
+            prefetcher.on_epoch_end()
+            self.assertEqual(dgen.epochs, epoch + 1)
+
+        prefetcher.close()
+
+        return result
+
+    def test_shuffle(self):
+        """Test that batch order is shuffled at each epoch"""
+        for concurrency in [ 'thread', 'process' ]:
+            epochs = self._get_shuffled_epochs(concurrency, 1)
+
+            for order in epochs:
+                self.assertEqual(sorted(order), list(range(20)))
+                self.assertNotEqual(order, list(range(20)))
+
+            self.assertNotEqual(epochs[0], epochs[1])
+            self.assertEqual(epochs, self._get_shuffled_epochs('thread', 1))
+            self.assertNotEqual(epochs, self._get_shuffled_epochs('thread', 2))
+
+    def test_pickle(self):
+        """Test that unpickled decorator serves the same batches"""
+        dgen       = make_data_generator(batch_size = 2)
+        batch_data = self._get_batch_data(dgen)
+        prefetcher = Prefetcher(dgen, 2)
+
+        prefetcher[0]
+        prefetcher = pickle.loads(pickle.dumps(prefetcher))
+
+        self._compare_dgen_to_batch_data(prefetcher, batch_data)
+        prefetcher.close()
+
+if __name__ == '__main__':
+    unittest.main()
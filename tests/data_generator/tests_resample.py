@@ -0,0 +1,133 @@
+"""Test `DataResample` and `DataEpochWindow` decorators"""
+
+import unittest
+import numpy as np
+
+from lstm_ee.data.data_generator.data_epoch_window import DataEpochWindow
+from lstm_ee.data.data_generator.data_resample     import DataResample
+
+from .tests_data_generator_base import DataGenerator, DictLoader
+
+N_EVENTS = 1000
+
+def create_dgen(batch_size):
+    """Create `DataGenerator` where slice input is the event index"""
+    return DataGenerator(
+        DictLoader({
+            'id' : np.arange(N_EVENTS), 'w' : np.arange(N_EVENTS) % 4,
+        }),
+        batch_size       = batch_size,
+        vars_input_slice = [ 'id' ],
+        var_target_total = 'id',
+    )
+
+def get_epoch_ids(dgen):
+    """Get ids of events of all batches of a single epoch"""
+    return np.concatenate([
+        dgen[i][0]['input_slice'][:, 0] for i in range(len(dgen))
+    ]).astype(int)
+
+class TestsResample(unittest.TestCase):
+    """Test correctness of the `DataResample` decorator"""
+
+    def test_replace(self):
+        """Test that events are drawn with probabilities of their weights"""
+        dgen = DataResample(create_dgen(64), 64, 'w', size = 20000, seed = 1)
+        ids  = get_epoch_ids(dgen)
+
+        self.assertEqual(len(dgen), np.ceil(20000 / 64))
+        self.assertEqual(len(ids), 20000)
+
+        # Events with zero weight are never drawn
+        counts = np.bincount(ids % 4, minlength = 4)
+        self.assertEqual(counts[0], 0)
+        self.assertTrue(np.allclose(
+            counts[1:] / 20000, [ 1/6, 2/6, 3/6 ], atol = 0.02
+        ))
+
+    def test_noreplace(self):
+        """Test that events are drawn without repetitions"""
+        dgen = DataResample(
+            create_dgen(64), 64, 'w', replace = False, size = 0.5, seed = 1
+        )
+        ids  = get_epoch_ids(dgen)
+
+        self.assertEqual(len(ids), N_EVENTS // 2)
+        self.assertEqual(len(np.unique(ids)), len(ids))
+        self.assertTrue(np.all(ids % 4 != 0))
+
+        with self.assertRaises(ValueError):
+            DataResample(create_dgen(64), 64, 'w', replace = False, size = 900)
+
+    def test_effective_size(self):
+        """Test default number of events drawn without replacement"""
+        dgen = DataResample(create_dgen(64), 64, 'w', replace = False)
+        w    = np.arange(N_EVENTS) % 4
+
+        self.assertEqual(
+            len(dgen.index), int(np.sum(w)**2 / np.sum(w**2))
+        )
+
+    def test_batches(self):
+        """Test that batches hold drawn events with unit weights"""
+        dgen = DataResample(create_dgen(10), 10, 'w', seed = 2)
+
+        for index in range(len(dgen)):
+            inputs, targets, weights = dgen[index]
+            ids = np.sort(dgen.index[index * 10:(index + 1) * 10])
+
+            self.assertTrue(np.all(inputs['input_slice'][:, 0] == ids))
+            self.assertTrue(np.all(targets['target_total'][:, 0] == ids))
+            self.assertTrue(np.all(weights[0] == 1))
+
+    def test_epochs(self):
+        """Test that events are drawn anew and reproducibly each epoch"""
+        epochs = []
+
+        for _ in range(2):
+            dgen = DataResample(create_dgen(64), 64, 'w', seed = 3)
+            ids  = [ dgen.index ]
+
+            dgen.on_epoch_end()
+            ids.append(dgen.index)
+
+            epochs.append(ids)
+
+        self.assertFalse(np.array_equal(epochs[0][0], epochs[0][1]))
+        self.assertTrue(np.array_equal(epochs[0][0], epochs[1][0]))
+        self.assertTrue(np.array_equal(epochs[0][1], epochs[1][1]))
+
+class TestsEpochWindow(unittest.TestCase):
+    """Test correctness of the `DataEpochWindow` decorator"""
+
+    def test_rotation(self):
+        """Test that successive epochs cover the whole dataset"""
+        dgen = DataEpochWindow(create_dgen(100), 3)
+        ids  = []
+
+        for _ in range(4):
+            self.assertEqual(len(dgen), 3)
+            ids.append(get_epoch_ids(dgen))
+            dgen.on_epoch_end()
+
+        self.assertTrue(np.array_equal(
+            np.concatenate(ids)[:N_EVENTS], np.arange(N_EVENTS)
+        ))
+        # The fourth epoch wraps around to the beginning of the dataset
+        self.assertTrue(np.array_equal(ids[3][-200:], np.arange(200)))
+        self.assertEqual(dgen.offset, 2)
+
+    def test_resample(self):
+        """Test that a new draw starts after a pass over all batches"""
+        resample = DataResample(create_dgen(100), 100, 'w', seed = 4)
+        dgen     = DataEpochWindow(resample, 5)
+        index    = resample.index
+
+        dgen.on_epoch_end()
+        self.assertTrue(np.array_equal(index, resample.index))
+
+        dgen.on_epoch_end()
+        self.assertFalse(np.array_equal(index, resample.index))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,287 @@
+"""Test correctness of the streamed data generation"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from lstm_ee.data.data_generator.data_stream_generator import (
+    DataStreamGenerator
+)
+from lstm_ee.data.data_generator.funcs.weights import (
+    flat_weights, stream_flat_weights
+)
+from lstm_ee.data.data_loader import DictLoader
+from lstm_ee.data.data_loader.shard_reader import ShardReader, find_shards
+
+from tests.data_loader.tests_csv_loader import create_csv_data_str
+from tests.data_loader.tests_hdf_loader import create_hdf_data_bytes
+
+N_EVENTS  = 200
+N_SHARDS  = 3
+VARIABLES = [ 'id', 'png', 'trueE' ]
+
+def make_data(start, end):
+    """Create dataset where values of each event are derived from its id"""
+    return {
+        'id'    : list(range(start, end)),
+        'png'   : [
+            [ i + 0.125 * k for k in range(i % 4) ] for i in range(start, end)
+        ],
+        'trueE' : [ 0.1 * (i % 50) for i in range(start, end) ],
+    }
+
+def save_shards(root, ext):
+    """Save dataset split into `N_SHARDS` files with extension `ext`"""
+    bounds = np.linspace(0, N_EVENTS, N_SHARDS + 1).astype(int)
+
+    for idx in range(N_SHARDS):
+        data  = make_data(bounds[idx], bounds[idx + 1])
+        fname = os.path.join(root, 'shard_%d.%s' % (idx, ext))
+
+        if ext == 'csv':
+            with open(fname, 'wt') as f:
+                f.write(create_csv_data_str(data).getvalue())
+        else:
+            create_hdf_data_bytes(fname, data)
+
+class TestsStream(unittest.TestCase):
+    """Test `ShardReader` and `DataStreamGenerator`"""
+
+    def setUp(self):
+        self._root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._root)
+
+    def _make_reader(self, ext, chunk_size = 32):
+        save_shards(self._root, ext)
+
+        return ShardReader(
+            find_shards(self._root), VARIABLES, chunk_size, [ 'png' ]
+        )
+
+    def _make_dgen(self, reader, **kwargs):
+        return DataStreamGenerator(
+            reader,
+            vars_input_slice = [ 'id' ],
+            vars_input_png3d = [ 'png' ],
+            var_target_total = 'trueE',
+            **kwargs
+        )
+
+    def _check_reader(self, ext):
+        reader = self._make_reader(ext)
+        data   = make_data(0, N_EVENTS)
+
+        self.assertEqual(len(reader), N_EVENTS)
+        self.assertEqual(len(reader.shards), N_SHARDS)
+
+        chunks = [ chunk for (_, _, chunk) in reader.iter_chunks() ]
+        self.assertTrue(all(len(x) <= 32 for x in chunks))
+
+        ids = np.concatenate([ x.get('id') for x in chunks ])
+        png = np.concatenate([ x.get('png') for x in chunks ])
+
+        self.assertTrue(np.all(ids == data['id']))
+
+        for (value, truth) in zip(png, data['png']):
+            self.assertTrue(np.allclose(value, truth))
+
+    def test_reader_csv(self):
+        """Test that csv shards are read in order"""
+        self._check_reader('csv')
+
+    def test_reader_hdf(self):
+        """Test that hdf shards are read in order"""
+        self._check_reader('h5')
+
+    def test_reader_filters(self):
+        """Test that selection cuts are applied to the streamed chunks"""
+        save_shards(self._root, 'csv')
+
+        reader = ShardReader(
+            find_shards(self._root), VARIABLES, 32, [ 'png' ],
+            [ 'len(png) >= 2', 'id < 150' ]
+        )
+        ids = np.concatenate([
+            chunk.get('id') for (_, _, chunk) in reader.iter_chunks()
+        ])
+
+        truth = np.arange(N_EVENTS)
+        truth = truth[(truth % 4 >= 2) & (truth < 150)]
+
+        self.assertTrue(np.array_equal(ids, truth))
+        self.assertEqual(len(reader), len(truth))
+
+    def test_reader_derived_vars(self):
+        """Test that derived variables are calculated for streamed chunks"""
+        save_shards(self._root, 'h5')
+
+        reader = ShardReader(
+            find_shards(self._root), [ 'id', 'npng' ], 32, [],
+            'npng > 1', { 'npng' : 'len(png)' }
+        )
+        chunks = [ chunk for (_, _, chunk) in reader.iter_chunks() ]
+        ids    = np.concatenate([ x.get('id') for x in chunks ])
+        npng   = np.concatenate([ x.get('npng') for x in chunks ])
+
+        self.assertEqual(chunks[0].variables(), [ 'id', 'npng' ])
+        self.assertTrue(np.array_equal(ids % 4, npng))
+        self.assertTrue(np.array_equal(
+            ids, [ x for x in range(N_EVENTS) if x % 4 > 1 ]
+        ))
+        self.assertEqual(len(reader), len(ids))
+
+    def test_filtered_epoch(self):
+        """Test that epoch length counts events that pass the selection"""
+        save_shards(self._root, 'h5')
+
+        reader = ShardReader(
+            find_shards(self._root), VARIABLES, 32, [ 'png' ], 'id < 40'
+        )
+        dgen   = self._make_dgen(reader, batch_size = 10, test_size = 0.5)
+
+        self.assertEqual(reader.lengths, [ 40, 0, 0 ])
+        self.assertEqual(len(dgen), 2)
+
+    def test_split(self):
+        """Test that train and test parts are disjoint and complete"""
+        reader = self._make_reader('h5')
+        ids    = []
+
+        for part in [ 0, 1 ]:
+            dgen = self._make_dgen(
+                reader, batch_size = N_EVENTS, test_size = 0.25,
+                part = part, shuffle = False, n_batches = 1
+            )
+
+            ids.append(dgen[0][0]['input_slice'][:, 0])
+
+        self.assertEqual(len(np.intersect1d(ids[0], ids[1])), 0)
+        self.assertTrue(np.all(
+            np.sort(np.concatenate(ids)) == np.arange(N_EVENTS)
+        ))
+        self.assertTrue(0.1 < len(ids[1]) / N_EVENTS < 0.4)
+
+    def test_split_chunk_size(self):
+        """Test that train/test split does not depend on the chunk size"""
+        ids = []
+
+        for chunk_size in [ 7, 64 ]:
+            reader = self._make_reader('h5', chunk_size = chunk_size)
+            dgen   = self._make_dgen(
+                reader, batch_size = N_EVENTS, test_size = 0.25,
+                part = 1, shuffle = False, n_batches = 1
+            )
+
+            ids.append(dgen[0][0]['input_slice'][:, 0])
+
+        self.assertTrue(np.array_equal(ids[0], ids[1]))
+
+    def test_batch_content(self):
+        """Test that batches hold values of the same events"""
+        reader = self._make_reader('csv')
+        dgen   = self._make_dgen(reader, batch_size = 16, buffer_size = 50)
+
+        for index in range(len(dgen)):
+            inputs, targets, weights = dgen[index]
+            ids = inputs['input_slice'][:, 0].astype(int)
+
+            self.assertEqual(len(ids), 16)
+            self.assertTrue(np.allclose(
+                targets['target_total'][:, 0], 0.1 * (ids % 50)
+            ))
+            self.assertTrue(np.all(weights[0] == 1))
+
+            for (idx, event_id) in enumerate(ids):
+                png = inputs['input_png3d'][idx, :, 0]
+                n   = event_id % 4
+
+                self.assertTrue(np.allclose(
+                    png[:n], event_id + 0.125 * np.arange(n)
+                ))
+                self.assertTrue(np.all(np.isnan(png[n:])))
+
+    def test_shuffle(self):
+        """Test that a shuffled pass holds each event once in random order"""
+        reader = self._make_reader('h5')
+        dgen   = self._make_dgen(reader, batch_size = 10, buffer_size = 50)
+
+        n_batches = (N_EVENTS - 50 - 10) // 10
+        ids = np.concatenate([
+            dgen[i][0]['input_slice'][:, 0] for i in range(n_batches)
+        ])
+
+        self.assertEqual(len(np.unique(ids)), len(ids))
+        self.assertFalse(np.all(np.diff(ids) > 0))
+
+    def test_validation_epochs(self):
+        """Test that unshuffled generator repeats the same events each epoch"""
+        reader = self._make_reader('h5')
+        dgen   = self._make_dgen(
+            reader, batch_size = 16, test_size = 0.5, part = 1,
+            shuffle = False
+        )
+
+        epochs = [
+            np.concatenate([
+                dgen[i][0]['input_slice'][:, 0] for i in range(len(dgen))
+            ]) for _ in range(2)
+        ]
+
+        self.assertTrue(np.all(epochs[0] == epochs[1]))
+
+    def test_validation_exact(self):
+        """Test that unshuffled epoch holds each event of the part once"""
+        save_shards(self._root, 'h5')
+
+        for filters in [ None, 'id < 150' ]:
+            reader = ShardReader(
+                find_shards(self._root), VARIABLES, 32, [ 'png' ], filters
+            )
+            truth  = self._make_dgen(
+                reader, batch_size = N_EVENTS, test_size = 0.5, part = 1,
+                shuffle = False, n_batches = 1
+            )[0][0]['input_slice'][:, 0]
+
+            dgen = self._make_dgen(
+                reader, batch_size = 16, test_size = 0.5, part = 1,
+                shuffle = False
+            )
+            ids  = np.concatenate([
+                dgen[i][0]['input_slice'][:, 0] for i in range(len(dgen))
+            ])
+
+            self.assertTrue(np.array_equal(ids, truth))
+
+    def test_sequential_access(self):
+        """Test that out of order requests are rejected"""
+        reader = self._make_reader('h5')
+        dgen   = self._make_dgen(reader, batch_size = 16)
+
+        dgen[0]
+
+        with self.assertRaises(RuntimeError):
+            dgen[2]
+
+    def test_flat_weights(self):
+        """Test that streaming flat weights match `flat_weights`"""
+        reader   = self._make_reader('h5', chunk_size = 17)
+        data     = make_data(0, N_EVENTS)
+        kwargs   = { 'bins' : 7, 'range' : (0, 4), 'clip' : 5 }
+        weights  = flat_weights(DictLoader(data), **kwargs)
+        func     = stream_flat_weights(
+            (chunk for (_, _, chunk) in reader.iter_chunks()), **kwargs
+        )
+
+        result = np.concatenate([
+            func(chunk) for (_, _, chunk) in reader.iter_chunks()
+        ])
+
+        self.assertTrue(np.allclose(result, weights))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""Test correctness of batches served by the `StreamingCache`"""
+
+import pickle
+import unittest
+
+from lstm_ee.data.data_generator.streaming_cache import StreamingCache
+
+from .tests_data_generator_base import (
+    TestsDataGeneratorBase, make_data_generator
+)
+
+class TestsStreamingCache(TestsDataGeneratorBase, unittest.TestCase):
+    """Compare `StreamingCache` batches to the original ones"""
+
+    def _get_batch_data(self, dgen):
+        return [ { **dgen[i][0], **dgen[i][1] } for i in range(len(dgen)) ]
+
+    def test_streaming(self):
+        """Test batches computed by parallel workers"""
+        for batch_size in [ 1, 2, 3 ]:
+            for chunksize in [ 1, 2 ]:
+                dgen       = make_data_generator(batch_size = batch_size)
+                batch_data = self._get_batch_data(dgen)
+                cache      = StreamingCache(dgen, 2, chunksize)
+
+                self._compare_dgen_to_batch_data(cache, batch_data)
+                self._compare_dgen_to_batch_data(cache, batch_data)
+
+    def test_reverse_order(self):
+        """Test waiting for the batches that are not computed yet"""
+        dgen       = make_data_generator(batch_size = 1)
+        batch_data = self._get_batch_data(dgen)
+        cache      = StreamingCache(dgen, 2)
+
+        for index in reversed(range(len(dgen))):
+            inputs, targets = cache[index][:2]
+            self._compare_np_arrays(
+                'input_slice', index, { **inputs, **targets },
+                batch_data[index]
+            )
+
+    def test_pickle(self):
+        """Test that unpickled decorator serves the same batches"""
+        dgen       = make_data_generator(batch_size = 2)
+        batch_data = self._get_batch_data(dgen)
+        cache      = StreamingCache(dgen, 2)
+
+        cache[0]
+        cache = pickle.loads(pickle.dumps(cache))
+
+        self._compare_dgen_to_batch_data(cache, batch_data)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""Test the `DataTimer` generator side hook"""
+
+import multiprocessing
+import pickle
+import unittest
+
+from lstm_ee.data.data_generator.data_nan_mask import DataNANMask
+from lstm_ee.data.data_generator.data_timer    import (
+    DataTimer, find_decorator
+)
+
+from .tests_data_generator_base import (
+    TestsDataGeneratorBase, make_data_generator
+)
+from .tests_prefetch_sequence import Prefetcher
+
+_TIMER = None
+
+def _get_batch(index):
+    _TIMER[index]
+
+class TestsTimer(TestsDataGeneratorBase, unittest.TestCase):
+    """Test correctness of the `DataTimer` decorator"""
+
+    def test_batches(self):
+        """Test that `DataTimer` does not modify batches"""
+        dgen       = make_data_generator(batch_size = 2)
+        batches    = [ dgen[i] for i in range(len(dgen)) ]
+        batch_data = [ { **x[0], **x[1] } for x in batches ]
+
+        self._compare_dgen_to_batch_data(DataTimer(dgen), batch_data)
+
+    def test_stats(self):
+        """Test that `DataTimer` counts batches and resets on pop"""
+        timer = DataTimer(make_data_generator(batch_size = 1))
+
+        for i in range(len(timer)):
+            timer[i]
+
+        calls, elapsed = timer.pop_stats()
+
+        self.assertEqual(calls, len(timer))
+        self.assertGreater(elapsed, 0)
+        self.assertEqual(timer.pop_stats(), (0, 0))
+
+    def test_find_decorator(self):
+        """Test search of `DataTimer` in a decorator chain"""
+        timer = DataTimer(make_data_generator())
+        dgen  = DataNANMask(timer)
+
+        self.assertIs(find_decorator(dgen, DataTimer), timer)
+        self.assertIsNone(find_decorator(timer._dgen, DataTimer))
+        self.assertIsNone(find_decorator(None, DataTimer))
+
+    def test_pickle(self):
+        """Test that `DataTimer` can be pickled"""
+        timer = pickle.loads(pickle.dumps(DataTimer(make_data_generator())))
+        timer[0]
+
+        self.assertEqual(timer.pop_stats()[0], 1)
+
+    def test_prefetch_processes(self):
+        """Test that batches of `PrefetchSequence` processes are counted"""
+        timer = DataTimer(make_data_generator(batch_size = 1))
+        timer[0]
+
+        prefetcher = Prefetcher(timer, 2, 2, 'process')
+        calls      = 0
+
+        for _ in range(2):
+            for i in range(len(prefetcher)):
+                prefetcher[i]
+
+            prefetcher.on_epoch_end()
+            calls += timer.pop_stats()[0]
+
+        # Closing waits for the 2 batches produced ahead of the next epoch
+        prefetcher.close()
+        calls += timer.pop_stats()[0]
+
+        self.assertEqual(calls, 1 + 2 * len(timer) + 2)
+
+    def test_process_workers(self):
+        """Test that batches of forked workers are counted by the parent"""
+        # pylint: disable=global-statement
+        global _TIMER
+        _TIMER = DataTimer(make_data_generator(batch_size = 1))
+
+        # Mimics `keras` workers with `use_multiprocessing`
+        with multiprocessing.get_context('fork').Pool(2) as pool:
+            pool.map(_get_batch, range(len(_TIMER)))
+
+        calls, elapsed = _TIMER.pop_stats()
+
+        self.assertEqual(calls, len(_TIMER))
+        self.assertGreater(elapsed, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,15 @@
 """Test correctness of the weights calculations"""
 
+import os
+import shutil
+import tempfile
 import unittest
 
+import numpy as np
+
 from lstm_ee.data.data_generator.funcs.weights  import (
-    calc_flat_whist, flat_weights
+    calc_flat_whist, flat_weights, flat_weights_nd, get_weights_path,
+    persistent_weights
 )
 
 from lstm_ee.data.data_loader.dict_loader import DictLoader
@@ -125,6 +131,71 @@ class TestsWeights(unittest.TestCase):
 
         self.assertTrue(nan_equal(weights_test, weights_null))
 
+    def test_flat_weights_nd(self):
+        """Test flat weight calculation over two variables"""
+        data = {
+            'x' : [ 1, 1, 1, 3, 3, 9 ],
+            'y' : [ 0, 0, 5, 5, 5, 5 ],
+        }
+        # bins: x [ (0, 2), (2, 4) ], y [ (0, 5), (5, 10) ]
+        # x = 9 is an overflow: it is not counted in the histogram, but
+        # gets the weight of the last bin
+        # hist_null     = [ [ 2, 1 ], [ 0, 2 ] ]
+        # hist_null_reg = [ [ 3, 2 ], [ 1, 3 ] ]
+        whist_null   = [ [ 1/3, 1/2 ], [ 1, 1/3 ] ]
+        weights_null = np.array(
+            [ whist_null[0][0] ] * 2 + [ whist_null[0][1] ]
+            + [ whist_null[1][1] ] * 3
+        )
+        weights_null = weights_null / np.sum(weights_null) * 6
+
+        weights_test = flat_weights_nd(
+            DictLoader(data), vars = [ 'x', 'y' ], bins = [ 2, 2 ],
+            range = [ (0, 4), (0, 10) ]
+        )
+
+        self.assertTrue(nan_equal(weights_test, weights_null))
+
+    def test_flat_weights_nd_1d(self):
+        """Test that 1D `flat_weights_nd` matches `flat_weights`"""
+        values      = np.random.RandomState(0).uniform(-1, 6, size = 1000)
+        data_loader = DictLoader({ 'trueE' : values })
+
+        self.assertTrue(nan_equal(
+            flat_weights_nd(
+                data_loader, [ 'trueE' ], [ 20 ], [ (0, 5) ], clip = 10
+            ),
+            flat_weights(data_loader, 'trueE', 20, (0, 5), clip = 10)
+        ))
+
+    def test_persistent_weights(self):
+        """Test that saved weights are reused"""
+        root = tempfile.mkdtemp()
+        calls = []
+
+        def func(data_loader):
+            calls.append(len(data_loader))
+            return np.arange(len(data_loader), dtype = float)
+
+        try:
+            path   = get_weights_path(root, { 'part' : 0 })
+            result = [
+                persistent_weights(func, path)(
+                    DictLoader({ 'x' : np.zeros(10) })
+                ) for _ in range(2)
+            ]
+
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(calls, [ 10 ])
+            self.assertIsInstance(result[1], np.memmap)
+            self.assertTrue(np.all(result[0] == result[1]))
+
+            # Weights of a dataset of a different size are recalculated
+            persistent_weights(func, path)(DictLoader({ 'x' : np.zeros(5) }))
+            self.assertEqual(calls, [ 10, 5 ])
+        finally:
+            shutil.rmtree(root)
+
 if __name__ == '__main__':
     unittest.main()
 
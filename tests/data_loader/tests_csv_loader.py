@@ -3,6 +3,9 @@
 import io
 import unittest
 
+import numpy as np
+
+from lstm_ee.data.data_loader import csv_loader
 from lstm_ee.data.data_loader.csv_loader import CSVLoader
 
 from .tests_data_loader_base import TestsDataLoaderBase
@@ -38,6 +41,46 @@ class TestsCSVLoader(TestsDataLoaderBase, unittest.TestCase):
         csv_data = create_csv_data_str(data)
         return CSVLoader(csv_data)
 
+class TestsCSVLoaderRows(unittest.TestCase):
+    """Test loading of a subset of rows of a csv file"""
+
+    def setUp(self):
+        self._chunk_size = csv_loader.CSV_CHUNK_SIZE
+        csv_loader.CSV_CHUNK_SIZE = 7
+
+        self._data = {
+            'var'  : list(range(50)),
+            'varr' : [ [ i, i + 0.5 ] for i in range(50) ],
+        }
+
+    def tearDown(self):
+        csv_loader.CSV_CHUNK_SIZE = self._chunk_size
+
+    def test_rows(self):
+        """Test that only the rows are kept, in the increasing order"""
+        rows   = [ 33, 0, 6, 7, 49, 20 ]
+        loader = CSVLoader(create_csv_data_str(self._data), rows)
+        truth  = np.sort(rows)
+
+        self.assertEqual(len(loader), len(rows))
+        self.assertEqual(loader.variables(), [ 'var', 'varr' ])
+        self.assertTrue(np.array_equal(loader.get('var'), truth))
+        self.assertTrue(np.array_equal(loader.get_base_index(), truth))
+        self.assertTrue(np.array_equal(loader.get_base_index([ 1 ]), [ 6 ]))
+
+        for (value, row) in zip(loader.get('varr'), truth):
+            self.assertTrue(np.allclose(value, [ row, row + 0.5 ]))
+
+    def test_invalid_rows(self):
+        """Test that duplicate and out of range rows are rejected"""
+        with self.assertRaises(ValueError):
+            CSVLoader(create_csv_data_str(self._data), [ 1, 1 ])
+
+        loader = CSVLoader(create_csv_data_str(self._data), [ 1, 50 ])
+
+        with self.assertRaises(IndexError):
+            loader.get('var')
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,90 @@
+"""Test `IDataLoader` selection cuts by a filtering decorator `DataFilter`"""
+
+import unittest
+
+import numpy as np
+
+from lstm_ee.data.data_loader.dict_loader  import DictLoader
+from lstm_ee.data.data_loader.data_filter  import (
+    DataFilter, get_filter_variables
+)
+from lstm_ee.data.data_loader.data_shuffle import DataShuffle
+
+from .tests_data_loader_base import FuncsDataLoaderBase
+
+class TestsDataFilter(unittest.TestCase, FuncsDataLoaderBase):
+    """Test `DataFilter` decorator"""
+
+    def test_scalar_cut(self):
+        """Test a single cut on a scalar variable"""
+        data        = { 'var' : [ 1, 2, 3, 4, -1 ] }
+        filter_data = { 'var' : [ 1, 2, -1 ] }
+        data_loader = DataFilter(DictLoader(data), 'var < 3')
+
+        self._compare_scalar_vars(filter_data, data_loader, 'var')
+
+    def test_multiple_cuts(self):
+        """Test that multiple cuts on different variables are combined"""
+        data = {
+            'a' : [ 1, 2, 3, 4, 5, 6 ],
+            'b' : [ 0, 1, 0, 1, 0, 1 ],
+        }
+        filter_data = { 'a' : [ 2, 4 ], 'b' : [ 1, 1 ] }
+        data_loader = DataFilter(DictLoader(data), [ 'a <= 4', 'b != 0' ])
+
+        self._compare_scalar_vars(filter_data, data_loader, 'a')
+        self._compare_scalar_vars(filter_data, data_loader, 'b')
+
+    def test_chained_cut(self):
+        """Test chained comparisons and comparisons between variables"""
+        data        = { 'a' : [ 1, 2, 3, 4, 5 ], 'b' : [ 5, 1, 2, 5, 1 ] }
+        filter_data = { 'a' : [ 1, 4 ] }
+        data_loader = DataFilter(DictLoader(data), [ '0.5 < a < b' ])
+
+        self._compare_scalar_vars(filter_data, data_loader, 'a')
+
+    def test_prong_count_cut(self):
+        """Test cut on the number of prongs"""
+        data        = { 'var' : [ [1, 2], [], [3], [4,5,6,7], [-1] ] }
+        filter_data = { 'var' : [ [1, 2], [4,5,6,7] ] }
+        data_loader = DataFilter(DictLoader(data), 'len(var) >= 2')
+
+        self._compare_varr_vars(filter_data, data_loader, 'var')
+
+    def test_nan_cut(self):
+        """Test that NaN values never pass cuts"""
+        data        = { 'var' : [ 1, np.nan, 3 ] }
+        filter_data = { 'var' : [ 1, 3 ] }
+        data_loader = DataFilter(DictLoader(data), 'var > 0')
+
+        self._compare_scalar_vars(filter_data, data_loader, 'var')
+
+    def test_base_index(self):
+        """Test that shuffled filter maps indices to the raw dataset"""
+        data        = { 'var' : np.arange(100) }
+        data_loader = DataShuffle(
+            DataFilter(DictLoader(data), 'var >= 50'), 1
+        )
+
+        self.assertEqual(len(data_loader), 50)
+        self.assertTrue(np.all(
+            data_loader.get_base_index() == data_loader.get('var')
+        ))
+
+    def test_variables(self):
+        """Test extraction of variables used by cuts"""
+        self.assertEqual(
+            get_filter_variables([ '1 < a < b', 'len(png.c) > 2', 'a > 0' ]),
+            [ 'a', 'b', 'png.c' ]
+        )
+
+    def test_invalid_cut(self):
+        """Test that malformed cuts are rejected"""
+        data_loader = DictLoader({ 'var' : [ 1, 2 ] })
+
+        for expr in [ 'var', 'var < 1 +', 'sum(var) > 1' ]:
+            with self.assertRaises(ValueError):
+                DataFilter(data_loader, expr)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""Test `DataRows` projection and loading of the saved test sample"""
+
+import os
+import shutil
+import tempfile
+import types
+import unittest
+
+import numpy as np
+
+from lstm_ee.data.data import (
+    create_basic_data_generators, get_args_split_key, load_split, save_split
+)
+from lstm_ee.data.data_loader.data_rows   import DataRows
+from lstm_ee.data.data_loader.dict_loader import DictLoader
+
+from .tests_csv_loader        import create_csv_data_str
+from .tests_data_loader_base  import FuncsDataLoaderBase
+
+class CountingLoader(DictLoader):
+    """`DictLoader` that records which rows were requested"""
+
+    def __init__(self, data):
+        super(CountingLoader, self).__init__(data)
+        self.requests = []
+
+    def get(self, var, index = None):
+        self.requests.append((var, index))
+        return super(CountingLoader, self).get(var, index)
+
+class TestsDataRows(unittest.TestCase, FuncsDataLoaderBase):
+    """Test `DataRows` decorator"""
+
+    def test_projection(self):
+        """Test that rows are returned in the order of indices"""
+        data = {
+            'var' : [ 1, 2, 3, 4, 5 ],
+            'png' : [ [1], [], [2, 3], [4], [5, 6, 7] ],
+        }
+        data_loader = DataRows(DictLoader(data), [ 4, 0, 2 ])
+
+        self._compare_scalar_vars({ 'var' : [ 5, 1, 3 ] }, data_loader, 'var')
+        self._compare_scalar_vars(
+            { 'var' : [ 5, 1, 3 ] }, data_loader, 'var', [ 1, 2 ]
+        )
+        self._compare_varr_vars(
+            { 'png' : [ [5, 6, 7], [1], [2, 3] ] }, data_loader, 'png'
+        )
+        self.assertTrue(np.all(data_loader.get_base_index() == [ 4, 0, 2 ]))
+
+    def test_reads(self):
+        """Test that only selected rows are read once in increasing order"""
+        base        = CountingLoader({ 'var' : np.arange(100) })
+        data_loader = DataRows(base, [ 50, 10, 30 ])
+
+        data_loader.get('var', [ 0 ])
+        data_loader.get('var', [ 1, 2 ])
+
+        self.assertEqual(len(base.requests), 1)
+        self.assertTrue(np.all(base.requests[0][1] == [ 10, 30, 50 ]))
+
+    def test_duplicates(self):
+        """Test that duplicate rows are rejected"""
+        with self.assertRaises(ValueError):
+            DataRows(DictLoader({ 'var' : [ 1, 2 ] }), [ 0, 0 ])
+
+class TestsSplit(unittest.TestCase):
+    """Test saving of the train/test split and loading of the test sample"""
+
+    def setUp(self):
+        self._root = tempfile.mkdtemp()
+        self._args = types.SimpleNamespace(
+            savedir       = self._root,
+            root_datadir  = self._root,
+            dataset       = 'data.csv',
+            seed          = 1,
+            test_size     = 0.3,
+            filters       = 'var != 3',
+            derived_vars  = { 'var2' : '2 * var' },
+            stream_buffer = None,
+        )
+
+        data = { 'var' : list(range(100)) }
+
+        with open(os.path.join(self._root, 'data.csv'), 'wt') as f:
+            f.write(create_csv_data_str(data).getvalue())
+
+    def tearDown(self):
+        shutil.rmtree(self._root)
+
+    def _create_dgens(self, test_index = None):
+        return create_basic_data_generators(
+            datadir          = self._root,
+            dataset          = self._args.dataset,
+            batch_size       = 16,
+            seed             = self._args.seed,
+            test_size        = self._args.test_size,
+            vars_input_slice = [ 'var', 'var2' ],
+            filters          = self._args.filters,
+            derived_vars     = self._args.derived_vars,
+            test_index       = test_index,
+        )
+
+    def test_test_sample(self):
+        """Test that saved split reproduces the test sample"""
+        _, dgen_test = self._create_dgens()
+        save_split(self._args, dgen_test)
+
+        test_index = load_split(self._args)
+        dgen_list  = self._create_dgens(test_index)
+
+        self.assertEqual(len(dgen_list), 1)
+        self.assertEqual(len(dgen_list[0]), len(dgen_test))
+        self.assertTrue(np.array_equal(
+            dgen_list[0].data_loader.get_base_index(), test_index
+        ))
+
+        for index in range(len(dgen_test)):
+            self.assertTrue(np.array_equal(
+                dgen_test[index][0]['input_slice'],
+                dgen_list[0][index][0]['input_slice'],
+            ))
+
+    def test_mismatch(self):
+        """Test that split of a different dataset or seed is not used"""
+        _, dgen_test = self._create_dgens()
+        save_split(self._args, dgen_test)
+
+        self._args.seed = 2
+        self.assertIsNone(load_split(self._args))
+
+        self._args.seed = 1
+        self.assertIsNotNone(load_split(self._args))
+
+        with open(os.path.join(self._root, 'data.csv'), 'at') as f:
+            f.write('100\n')
+
+        self.assertIsNone(load_split(self._args))
+
+    def test_stream_key(self):
+        """Test that streamed and shuffled splits have different keys"""
+        key = get_args_split_key(self._args)
+
+        self._args.stream_buffer = 1000
+        self.assertNotEqual(key, get_args_split_key(self._args))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Test calculation of derived variables by `DerivedVariables` decorator"""
+
+import unittest
+
+import numpy as np
+
+from lstm_ee.data.data_loader.dict_loader       import DictLoader
+from lstm_ee.data.data_loader.data_filter       import DataFilter
+from lstm_ee.data.data_loader.derived_variables import (
+    DerivedVariables, get_derived_inputs
+)
+
+from .tests_data_loader_base import FuncsDataLoaderBase
+
+DATA = {
+    'calE'          : [ 1, 2, 4, 8 ],
+    'png.calE'      : [ [ 1, 2 ], [], [ 3 ], [ 4, 5, 6 ] ],
+    'png.bpf[0].px' : [ [ 3, 0 ], [], [ 1 ], [ 0, 0, 2 ] ],
+    'png.bpf[0].py' : [ [ 4, 1 ], [], [ 0 ], [ 0, 3, 0 ] ],
+}
+
+class TestsDerivedVariables(unittest.TestCase, FuncsDataLoaderBase):
+    """Test `DerivedVariables` decorator"""
+
+    def _create_data_loader(self, derived_vars):
+        return DerivedVariables(DictLoader(DATA), derived_vars)
+
+    def test_scalar_var(self):
+        """Test arithmetic over scalar variables"""
+        data_loader = self._create_data_loader({ 'var' : '2 * calE - 1' })
+        data        = { 'var' : [ 1, 3, 7, 15 ] }
+
+        self._compare_scalar_vars(data, data_loader, 'var')
+        self._compare_scalar_vars(data, data_loader, 'var', [ 3, 0 ])
+
+    def test_prong_var(self):
+        """Test elementwise operations over prong level variables"""
+        data_loader = self._create_data_loader({
+            'png.p' : 'sqrt(png.bpf[0].px**2 + png.bpf[0].py**2)',
+        })
+        data = { 'png.p' : [ [ 5, 1 ], [], [ 1 ], [ 0, 3, 2 ] ] }
+
+        self._compare_varr_vars(data, data_loader, 'png.p')
+        self._compare_varr_vars(data, data_loader, 'png.p', [ 2, 1 ])
+
+    def test_broadcast(self):
+        """Test operations between prong and slice level variables"""
+        data_loader = self._create_data_loader({
+            'png.frac' : 'png.calE / calE',
+        })
+        data = {
+            'png.frac' : [ [ 1, 2 ], [], [ 0.75 ], [ 0.5, 0.625, 0.75 ] ]
+        }
+
+        self._compare_varr_vars(data, data_loader, 'png.frac')
+
+    def test_reductions(self):
+        """Test reductions of prong level variables to slice level"""
+        data_loader = self._create_data_loader({
+            'sum'  : 'sum(png.calE)',
+            'mean' : 'mean(png.calE)',
+            'max'  : 'max(png.calE)',
+            'min'  : 'min(png.calE)',
+            'len'  : 'len(png.calE)',
+        })
+
+        expected = {
+            'sum'  : [ 3, 0, 3, 15 ],
+            'mean' : [ 1.5, np.nan, 3, 5 ],
+            'max'  : [ 2, np.nan, 3, 6 ],
+            'min'  : [ 1, np.nan, 3, 4 ],
+            'len'  : [ 2, 0, 1, 3 ],
+        }
+
+        for (var, values) in expected.items():
+            self.assertTrue(np.allclose(
+                data_loader.get(var), values, equal_nan = True
+            ), var)
+
+    def test_chained_vars(self):
+        """Test derived variables defined through other derived variables"""
+        data_loader = self._create_data_loader({
+            'remE' : 'calE - sumE',
+            'sumE' : 'sum(png.calE)',
+        })
+        data = { 'remE' : [ -2, 2, 1, -7 ] }
+
+        self.assertEqual(
+            data_loader.variables(), list(DATA) + [ 'remE', 'sumE' ]
+        )
+        self._compare_scalar_vars(data, data_loader, 'remE')
+
+    def test_filter(self):
+        """Test selection cuts on derived variables"""
+        data_loader = DataFilter(
+            self._create_data_loader({ 'sumE' : 'sum(png.calE)' }),
+            'sumE > 1'
+        )
+        data = { 'calE' : [ 1, 4, 8 ] }
+
+        self._compare_scalar_vars(data, data_loader, 'calE')
+
+    def test_inputs(self):
+        """Test extraction of variables used by derived variables"""
+        self.assertEqual(
+            get_derived_inputs({
+                'a' : 'b + c * 1e-3',
+                'b' : 'sum(png.bpf[1].x) + 2 / c',
+            }),
+            [ 'c', 'png.bpf[1].x' ]
+        )
+
+    def test_invalid(self):
+        """Test that invalid expressions are rejected"""
+        exprs = [
+            'calE +', 'open(calE)', 'calE.__class__()', 'calE if calE else 1',
+            'sum(calE)', 'png.calE + png.bpf[0].px[0:1]',
+        ]
+
+        for expr in exprs:
+            with self.assertRaises(ValueError, msg = expr):
+                self._create_data_loader({ 'var' : expr }).get('var')
+
+    def test_circular(self):
+        """Test that circular definitions are rejected"""
+        data_loader = self._create_data_loader({ 'a' : 'b', 'b' : 'a + 1' })
+
+        with self.assertRaises(ValueError):
+            data_loader.get('a')
+
+if __name__ == '__main__':
+    unittest.main()
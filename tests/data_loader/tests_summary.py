@@ -0,0 +1,181 @@
+"""Test streaming dataset summaries of `lstm_ee.data.summary`"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from lstm_ee.data.data_generator.funcs.weights import (
+    calc_flat_whist, calc_summary_whist
+)
+from lstm_ee.data.data_loader import DictLoader
+from lstm_ee.data.summary     import (
+    DatasetSummary, get_summary, get_summary_path, summarize
+)
+
+N_EVENTS = 5000
+HISTS    = { 'trueE' : { 'bins' : 20, 'range' : (0, 5) } }
+
+def make_data(seed = 0):
+    """Create dataset with a slice level and a prong level variables"""
+    prg  = np.random.RandomState(seed)
+    npng = prg.randint(0, 4, size = N_EVENTS)
+
+    return {
+        'trueE' : prg.lognormal(0, 0.5, size = N_EVENTS),
+        'png'   : [ prg.uniform(-1, 1, size = n) for n in npng ],
+    }
+
+class TestsSummary(unittest.TestCase):
+    """Test `summarize` and the summary sidecar files"""
+
+    def setUp(self):
+        self._data        = make_data()
+        self._data_loader = DictLoader(self._data)
+        self._weights     = np.random.RandomState(1).uniform(
+            0.5, 2, size = N_EVENTS
+        )
+
+    def test_moments(self):
+        """Test weighted mean, variance and histogram against numpy"""
+        summary = summarize(
+            self._data_loader, [ 'trueE' ], HISTS, self._weights,
+            chunk_size = 333
+        )['trueE']
+
+        values = self._data['trueE']
+        mean   = np.average(values, weights = self._weights)
+        hist   = np.histogram(
+            values, bins = 20, range = (0, 5), weights = self._weights
+        )[0]
+
+        self.assertEqual(summary.n, N_EVENTS)
+        self.assertAlmostEqual(summary.mean, mean)
+        self.assertAlmostEqual(
+            summary.variance,
+            np.average((values - mean)**2, weights = self._weights)
+        )
+        self.assertAlmostEqual(summary.min, values.min())
+        self.assertAlmostEqual(summary.max, values.max())
+        self.assertTrue(np.allclose(summary.hist, hist))
+
+    def test_quantiles(self):
+        """Test that quantiles are within the sketch accuracy"""
+        summary = summarize(
+            self._data_loader, [ 'trueE' ], chunk_size = 1000
+        )['trueE']
+
+        for q in [ 0.1, 0.5, 0.9 ]:
+            truth = np.quantile(self._data['trueE'], q)
+            self.assertLess(abs(summary.quantile(q) / truth - 1), 0.03)
+
+    def test_prong_var(self):
+        """Test summary of flattened prong values and their multiplicity"""
+        summary = summarize(self._data_loader, [ 'png' ])['png']
+        values  = np.concatenate(self._data['png'])
+        lengths = [ len(x) for x in self._data['png'] ]
+
+        self.assertEqual(summary.n_events, N_EVENTS)
+        self.assertEqual(summary.n, len(values))
+        self.assertAlmostEqual(summary.mean, values.mean())
+        self.assertTrue(np.allclose(
+            summary.multiplicity[:4], np.bincount(lengths, minlength = 4)
+        ))
+
+    def test_merge(self):
+        """Test that chunked and parallel summaries match a single pass"""
+        kwargs = {
+            'variables' : [ 'trueE', 'png' ],
+            'hists'     : HISTS,
+            'weights'   : self._weights,
+        }
+
+        single   = summarize(
+            self._data_loader, chunk_size = N_EVENTS, **kwargs
+        )
+        parallel = summarize(
+            self._data_loader, chunk_size = 700, workers = 3, **kwargs
+        )
+
+        for var in kwargs['variables']:
+            self.assertEqual(single[var].n, parallel[var].n)
+            self.assertAlmostEqual(single[var].mean, parallel[var].mean)
+            self.assertAlmostEqual(
+                single[var].variance, parallel[var].variance
+            )
+            self.assertAlmostEqual(
+                single[var].quantile(0.5), parallel[var].quantile(0.5)
+            )
+
+        self.assertTrue(np.allclose(
+            single['trueE'].hist, parallel['trueE'].hist
+        ))
+
+    def test_serialization(self):
+        """Test that summary survives conversion to dict and back"""
+        summary = summarize(self._data_loader, [ 'trueE', 'png' ], HISTS)
+        loaded  = DatasetSummary.from_dict(summary.to_dict())
+
+        for var in [ 'trueE', 'png' ]:
+            self.assertEqual(summary[var].n, loaded[var].n)
+            self.assertAlmostEqual(summary[var].std, loaded[var].std)
+            self.assertAlmostEqual(
+                summary[var].quantile(0.3), loaded[var].quantile(0.3)
+            )
+
+    def test_summary_whist(self):
+        """Test that whist from summary matches `calc_flat_whist`"""
+        summary = summarize(self._data_loader, [ 'trueE' ], HISTS)
+
+        whist, bins = calc_summary_whist(summary['trueE'], clip = 10)
+        _, truth_whist, truth_bins = calc_flat_whist(
+            self._data_loader, 'trueE', 20, (0, 5), clip = 10
+        )
+
+        self.assertTrue(np.allclose(bins, truth_bins))
+        self.assertTrue(np.allclose(whist, truth_whist))
+
+class TestsSummarySidecar(unittest.TestCase):
+    """Test reuse and invalidation of the summary sidecar files"""
+
+    def setUp(self):
+        self._root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._root)
+
+    def test_reuse(self):
+        """Test that saved summary is reused only for the same key"""
+        key  = { 'dataset' : 'a' }
+        path = get_summary_path(self._root, key)
+
+        summary = get_summary(
+            DictLoader(make_data(0)), path, key, variables = [ 'trueE' ]
+        )
+        self.assertTrue(os.path.exists(path))
+
+        # Same key: saved summary of the original data is returned
+        reused = get_summary(
+            DictLoader(make_data(1)), path, key, variables = [ 'trueE' ]
+        )
+        self.assertEqual(reused['trueE'].mean, summary['trueE'].mean)
+
+        # Different summary parameters: summary is recalculated
+        updated = get_summary(
+            DictLoader(make_data(1)), path, key,
+            variables = [ 'trueE' ], hists = HISTS
+        )
+        self.assertNotEqual(updated['trueE'].mean, summary['trueE'].mean)
+        self.assertIsNotNone(updated['trueE'].hist)
+
+    def test_path(self):
+        """Test that different keys are saved to different files"""
+        self.assertNotEqual(
+            get_summary_path(self._root, { 'part' : 0 }),
+            get_summary_path(self._root, { 'part' : 1 }),
+        )
+
+if __name__ == '__main__':
+    unittest.main()
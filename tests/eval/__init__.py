@@ -0,0 +1 @@
+"""Various `lstm_ee.eval` tests"""
@@ -0,0 +1,116 @@
+"""Test mergeable accumulators of the energy resolution stats/hists"""
+
+import json
+import unittest
+
+import numpy as np
+
+from lstm_ee.eval.accumulators import (
+    FomAccumulator, HistAccumulator, MomentsAccumulator
+)
+from lstm_ee.eval.stats import calc_all_stats
+
+MOMENT_STATS = [
+    'mean', 'rms', 'stdev', 'stderr', 'm1', 'm2', 'm4',
+    'x1var', 'x2var', 'm1var', 'm2var',
+]
+
+def create_energies(n = 10000, seed = 1):
+    """Create predicted, true energies and weights"""
+    prg  = np.random.RandomState(seed)
+    true = prg.uniform(0.5, 5, n)
+    pred = true * (1 + prg.normal(0.02, 0.3, n))
+    w    = prg.uniform(0, 2, n)
+
+    return (pred, true, w)
+
+def accumulate(acc, batch_size, *arrays):
+    """Update accumulator `acc` by batches of `arrays`"""
+    for start in range(0, len(arrays[0]), batch_size):
+        acc.update(*[ x[start:start + batch_size] for x in arrays ])
+
+    return acc
+
+class TestsAccumulators(unittest.TestCase):
+    """Test accumulators against the in-memory stats/hists"""
+
+    def _compare_stats(self, expected, result, stats = None):
+        if stats is None:
+            stats = MOMENT_STATS
+
+        for stat in stats:
+            self.assertTrue(
+                np.isclose(expected[stat], result[stat], rtol = 1e-8),
+                "%s: %s != %s" % (stat, expected[stat], result[stat])
+            )
+
+    def test_moments(self):
+        """Test that accumulated moments match `calc_all_stats`"""
+        _, values, w = create_energies()
+        acc = accumulate(MomentsAccumulator(), 333, values, w)
+
+        self._compare_stats(calc_all_stats(values, w), acc.calc_stats())
+
+    def test_hist(self):
+        """Test that accumulated histogram matches `np.histogram`"""
+        _, values, w = create_energies()
+        acc = accumulate(HistAccumulator(20, (1, 4)), 333, values, w)
+
+        hist, bins = np.histogram(values, 20, (1, 4), weights = w)
+        hist_w2, _ = np.histogram(values, 20, (1, 4), weights = w**2)
+
+        self.assertTrue(np.allclose(acc.bins, bins))
+        self.assertTrue(np.allclose(acc.hist, hist))
+        self.assertTrue(np.allclose(acc.hist_w2, hist_w2))
+
+    def test_fom(self):
+        """Test that accumulated stats match `calc_fom_stats`"""
+        pred, true, w = create_energies()
+        acc = accumulate(FomAccumulator(50, (-1, 1)), 1000, pred, true, w)
+
+        fom  = (pred - true) / true
+        mask = (fom > -1) & (fom < 1)
+
+        expected = calc_all_stats(fom[mask], w[mask])
+        result   = acc.calc_stats()
+
+        self._compare_stats(expected, result)
+        self.assertTrue(np.isclose(
+            result['median'], expected['median'], rtol = 0.002
+        ))
+
+        hist, _ = np.histogram(fom, 50, (-1, 1), weights = w)
+        self.assertTrue(np.allclose(acc.hist.hist, hist))
+
+    def test_merge(self):
+        """Test that merged accumulators match a single one"""
+        pred, true, w = create_energies()
+        half = len(pred) // 2
+
+        acc_full = accumulate(FomAccumulator(50, (-1, 1)), 500, pred, true, w)
+        acc_a    = accumulate(
+            FomAccumulator(50, (-1, 1)), 500,
+            pred[:half], true[:half], w[:half]
+        )
+        acc_b    = accumulate(
+            FomAccumulator(50, (-1, 1)), 500,
+            pred[half:], true[half:], w[half:]
+        )
+
+        # Shard results are combined after a round trip through json
+        acc_b = FomAccumulator.from_dict(
+            json.loads(json.dumps(acc_b.to_dict()))
+        )
+        acc_a.merge(acc_b)
+
+        expected = acc_full.calc_stats()
+        result   = acc_a.calc_stats()
+
+        self._compare_stats(expected, result, MOMENT_STATS + [ 'median' ])
+        self.assertTrue(np.allclose(acc_full.hist.hist, acc_a.hist.hist))
+
+        with self.assertRaises(ValueError):
+            acc_a.merge(FomAccumulator(50, (-2, 2)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""Test vectorized binned statistics"""
+
+import unittest
+import numpy as np
+
+from lstm_ee.eval.binned_stats import (
+    BINNED_STATS, BinnedStats, calc_binned_stats, calc_binned_stats_nd
+)
+from lstm_ee.eval.stats import calc_stat
+
+def create_data(n = 5000, seed = 1):
+    """Create coordinates, values and weights of a random dataset"""
+    prg = np.random.RandomState(seed)
+
+    x1 = prg.uniform(-0.5, 5.5, n)
+    x2 = prg.uniform(0, 1, n)
+    y  = prg.normal(0, 1, n)
+    w  = prg.uniform(0, 2, n)
+
+    return (x1, x2, y, w)
+
+class TestsBinnedStats(unittest.TestCase):
+    """Test binned stats against per bin `calc_stat`"""
+
+    def _compare(self, expected, result):
+        self.assertTrue(
+            np.allclose(expected, result, rtol = 1e-9, equal_nan = True),
+            "%s != %s" % (expected, result)
+        )
+
+    def test_binned_stats(self):
+        """Test 1D binned stats, including empty and outside bins"""
+        x, _, y, w = create_data()
+        bins = np.array([ 0, 1, 2, 2.5, 2.6, 2.6001, 4, 5 ])
+
+        for stat in BINNED_STATS:
+            expected = []
+
+            for i in range(len(bins) - 1):
+                mask = (x >= bins[i]) & (x < bins[i + 1])
+                expected.append(calc_stat(y[mask], w[mask], stat))
+
+            self._compare(
+                expected, calc_binned_stats(x, y, w, bins, stat)
+            )
+
+        self.assertEqual(
+            np.sum(BinnedStats([ x ], y, w, [ bins ]).counts),
+            np.sum((x >= 0) & (x < 5))
+        )
+
+    def test_binned_stats_nd(self):
+        """Test binned stats over a 2D grid of bins"""
+        x1, x2, y, w = create_data()
+        bins1  = np.linspace(0, 5, 6)
+        bins2  = np.linspace(0, 1, 4)
+        result = calc_binned_stats_nd(
+            [ x1, x2 ], y, w, [ bins1, bins2 ], BINNED_STATS
+        )
+
+        for stat in BINNED_STATS:
+            self.assertEqual(result[stat].shape, (5, 3))
+
+            for i in range(5):
+                for j in range(3):
+                    mask = (
+                          (x1 >= bins1[i]) & (x1 < bins1[i + 1])
+                        & (x2 >= bins2[j]) & (x2 < bins2[j + 1])
+                    )
+
+                    self._compare(
+                        calc_stat(y[mask], w[mask], stat), result[stat][i, j]
+                    )
+
+    def test_quantiles(self):
+        """Test weighted quantiles of bins"""
+        x    = np.array([ 0.5, 0.5, 0.5, 0.5, 1.5, 1.5, 2.5 ])
+        y    = np.array([ 4,   1,   3,   2,   7,   5,   9   ])
+        w    = np.array([ 1,   1,   1,   1,   1,   3,   1   ])
+        bins = [ 0, 1, 2, 3, 4 ]
+
+        result = BinnedStats([ x ], y, w, [ bins ]).calc_quantiles(
+            [ 0, 0.25, 0.5, 0.75, 1 ]
+        )
+
+        self._compare(
+            [
+                [ 1, 1, 2, 3, 4 ],
+                [ 5, 5, 5, 5, 7 ],
+                [ 9, 9, 9, 9, 9 ],
+                [ np.nan ] * 5,
+            ],
+            result
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""Test saving and loading of the evaluation energies"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from lstm_ee.consts import LABEL_TOTAL, LABEL_PRIMARY, LABEL_SECONDARY
+from lstm_ee.eval.predict_cache import (
+    get_model_digest, get_predictions, get_predictions_key,
+    load_predictions, save_predictions
+)
+
+def create_predictions(n = 100):
+    """Create evaluation energies where primary base energy is missing"""
+    prg = np.random.RandomState(1)
+
+    def energies(primary = True):
+        total   = prg.uniform(0, 5, n)
+        primary = prg.uniform(0, 1, n) * total if primary else None
+
+        return {
+            LABEL_TOTAL     : total,
+            LABEL_PRIMARY   : primary,
+            LABEL_SECONDARY : None if primary is None else total - primary,
+        }
+
+    return {
+        'pred_model' : energies(),
+        'pred_base'  : energies(primary = False),
+        'true'       : energies(),
+        'weights'    : prg.uniform(0, 1, n),
+    }
+
+class TestsPredictCache(unittest.TestCase):
+    """Test saving and loading of the evaluation energies"""
+
+    def setUp(self):
+        self._root = tempfile.mkdtemp()
+        self._key  = get_predictions_key(
+            'digest', 'config', { 'dataset' : 'data.h5' },
+            { LABEL_TOTAL : 'calE' }
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self._root)
+
+    def _compare_predictions(self, expected, result):
+        self.assertTrue(np.array_equal(expected['weights'], result['weights']))
+
+        for energy_set in [ 'pred_model', 'pred_base', 'true' ]:
+            for label, values in expected[energy_set].items():
+                if values is None:
+                    self.assertIsNone(result[energy_set][label])
+                else:
+                    self.assertTrue(
+                        np.array_equal(values, result[energy_set][label])
+                    )
+
+    def test_roundtrip(self):
+        """Test that saved energies are loaded unchanged"""
+        predictions = create_predictions()
+        save_predictions(self._root, self._key, predictions)
+
+        self._compare_predictions(
+            predictions, load_predictions(self._root, self._key)
+        )
+
+    def test_key(self):
+        """Test that energies saved for a different key are not loaded"""
+        self.assertIsNone(load_predictions(self._root, self._key))
+
+        save_predictions(self._root, self._key, create_predictions())
+        key = dict(self._key, model = 'other')
+
+        self.assertIsNone(load_predictions(self._root, key))
+        self.assertIsNotNone(load_predictions(self._root, self._key))
+
+    def test_get_predictions(self):
+        """Test that energies are calculated only once"""
+        calls = []
+
+        def calc():
+            calls.append(1)
+            return create_predictions()
+
+        get_predictions(self._root, self._key, calc)
+        result = get_predictions(self._root, self._key, calc)
+
+        self.assertEqual(len(calls), 1)
+        self._compare_predictions(create_predictions(), result)
+
+    def test_model_digest(self):
+        """Test that model checksum changes when model file is modified"""
+        with open(os.path.join(self._root, 'model.h5'), 'wb') as f:
+            f.write(b'model')
+
+        digest = get_model_digest(self._root, chunk_size = 2)
+
+        with open(os.path.join(self._root, 'model.h5'), 'ab') as f:
+            f.write(b'!')
+
+        self.assertNotEqual(digest, get_model_digest(self._root))
+
+if __name__ == '__main__':
+    unittest.main()
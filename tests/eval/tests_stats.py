@@ -0,0 +1,93 @@
+"""Test weighted median and quantiles"""
+
+import unittest
+import numpy as np
+
+from lstm_ee.eval.stats import (
+    calc_all_stats, calc_median, calc_quantile_select, calc_quantiles,
+    calc_stat
+)
+
+def calc_quantile_ref(v, w, q):
+    """Reference weighted quantile found with a full sort"""
+    order  = np.argsort(v)
+    cumsum = np.cumsum(w[order])
+    index  = np.searchsorted(cumsum, q * cumsum[-1])
+
+    return v[order][min(index, len(v) - 1)]
+
+def create_data(n, seed = 1, ties = False, int_weights = True):
+    """Create values and weights of a random dataset"""
+    prg = np.random.RandomState(seed)
+
+    if ties:
+        v = prg.randint(0, 20, n).astype(float)
+    else:
+        v = prg.normal(0, 1, n)
+
+    if int_weights:
+        # Integer weights make cumulative sums exact, including zero weights
+        w = prg.randint(0, 4, n).astype(float)
+    else:
+        w = prg.uniform(0, 1, n)
+
+    return (v, w)
+
+class TestsQuantiles(unittest.TestCase):
+    """Test weighted quantiles against a reference implementation"""
+
+    def test_quantiles(self):
+        """Test that quantiles found with a single sort are correct"""
+        q = [ 0, 0.16, 0.5, 0.84, 1 ]
+
+        for ties in [ False, True ]:
+            v, w   = create_data(1000, ties = ties)
+            result = calc_quantiles(v, w, q)
+
+            self.assertEqual(result.shape, (5,))
+
+            for (x, y) in zip(q, result):
+                self.assertEqual(calc_quantile_ref(v, w, x), y)
+
+        self.assertTrue(
+            np.isnan(calc_quantiles(np.zeros(0), np.zeros(0), 0.5))
+        )
+
+    def test_select(self):
+        """Test that quantiles found by selection are the same as sorted"""
+        for ties in [ False, True ]:
+            for seed in range(3):
+                v, w = create_data(50000, seed, ties)
+
+                for q in [ 0, 0.16, 0.5, 0.84, 1 ]:
+                    self.assertEqual(
+                        calc_quantile_select(v, w, q),
+                        calc_quantiles(v, w, q),
+                    )
+
+    def test_median(self):
+        """Test median of small and large arrays"""
+        for n in [ 1, 10, 300000 ]:
+            v, w = create_data(n, int_weights = False)
+
+            self.assertEqual(calc_median(v, w), calc_quantile_ref(v, w, 0.5))
+            self.assertEqual(
+                calc_stat(v, w, 'median'), calc_quantile_ref(v, w, 0.5)
+            )
+
+        self.assertEqual(calc_median(np.zeros(0), np.zeros(0)), 0)
+
+    def test_all_stats(self):
+        """Test quantile stats of `calc_all_stats`"""
+        v, w  = create_data(1000, int_weights = False)
+        stats = calc_all_stats(v, w)
+
+        self.assertEqual(stats['median'], calc_quantile_ref(v, w, 0.5))
+        self.assertEqual(stats['q16'],    calc_quantile_ref(v, w, 0.16))
+        self.assertEqual(stats['q84'],    calc_quantile_ref(v, w, 0.84))
+        self.assertEqual(stats['iqw68'],  stats['q84'] - stats['q16'])
+
+        self.assertEqual(calc_stat(v, w, 'q16'), stats['q16'])
+
+if __name__ == '__main__':
+    unittest.main()
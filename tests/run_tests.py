@@ -15,11 +15,29 @@ import tests.data_loader.tests_hdf_loader
 import tests.data_loader.tests_dict_loader
 import tests.data_loader.tests_data_shuffle
 import tests.data_loader.tests_data_slice
+import tests.data_loader.tests_data_filter
+import tests.data_loader.tests_derived_variables
 
 import tests.data_generator.tests_batch_split
 import tests.data_generator.tests_varr_sorting
 import tests.data_generator.tests_noise
 import tests.data_generator.tests_weights
+import tests.data_generator.tests_event_store
+import tests.data_generator.tests_disk_cache
+import tests.data_generator.tests_prefetch
+import tests.data_generator.tests_streaming_cache
+import tests.data_generator.tests_prefetch_sequence
+import tests.data_generator.tests_augment
+import tests.data_generator.tests_instrument
+import tests.data_generator.tests_timer
+import tests.data_generator.tests_stream
+import tests.data_loader.tests_summary
+import tests.data_generator.tests_resample
+import tests.data_loader.tests_data_rows
+import tests.eval.tests_predict_cache
+import tests.eval.tests_accumulators
+import tests.eval.tests_binned_stats
+import tests.eval.tests_stats
 
 def suite():
     """Create test suite"""
@@ -41,6 +59,12 @@ def suite():
     result.addTest(loader.loadTestsFromModule(
         tests.data_loader.tests_data_slice
     ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_loader.tests_data_filter
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_loader.tests_derived_variables
+    ))
     result.addTest(loader.loadTestsFromModule(
         tests.data_generator.tests_batch_split
     ))
@@ -53,6 +77,54 @@ def suite():
     result.addTest(loader.loadTestsFromModule(
         tests.data_generator.tests_weights
     ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_generator.tests_event_store
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_generator.tests_disk_cache
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_generator.tests_prefetch
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_generator.tests_streaming_cache
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_generator.tests_prefetch_sequence
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_generator.tests_augment
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_generator.tests_instrument
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_generator.tests_timer
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_generator.tests_stream
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_loader.tests_summary
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_generator.tests_resample
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.data_loader.tests_data_rows
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.eval.tests_predict_cache
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.eval.tests_accumulators
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.eval.tests_binned_stats
+    ))
+    result.addTest(loader.loadTestsFromModule(
+        tests.eval.tests_stats
+    ))
 
     return result
 